@@ -3,91 +3,335 @@
  * Executa ações parsed das respostas da IA contra o Supabase.
  * Suporta CREATE_TASK, COMPLETE_TASK, LOG_HABIT, CREATE_FINANCE,
  * CREATE_HABIT, CREATE_REMINDER, CREATE_PROJECT.
+ *
+ * Todas as ações de uma resposta são planejadas primeiro e aplicadas juntas:
+ * - caminho principal: uma chamada à RPC orbis_apply_actions, que roda o plano
+ *   inteiro numa transação (tudo ou nada) — uma ida ao banco por mensagem;
+ * - sem a RPC instalada: inserts agrupados por tabela (um request por tabela),
+ *   buscas por título num único select por tabela e um update/upsert em lote.
+ *   Essas buscas usam ilike e diferenciam acentos ("ingles" não acha "Inglês"),
+ *   como o fallback de findTaskByTitle.
+ *
+ * Idempotência: com uma dedupeKey (ex: a chave do job, telegram:<update_id>),
+ * o id de cada linha criada é derivado da chave + tipo da ação + posição entre
+ * as criações desse tipo (não do conteúdo, que muda quando a nova tentativa
+ * chama a IA de novo), e os inserts ignoram conflito de id. Reprocessar a
+ * mesma mensagem não duplica linhas; registrar hábito é idempotente por
+ * natureza, e concluir tarefa aceita uma tarefa já concluída com o título
+ * idêntico (a tentativa anterior já a concluiu).
+ *
+ * Ao final, o snapshot de contexto da IA é invalidado se algo foi escrito,
+ * então a próxima mensagem já vê o efeito das ações executadas aqui.
+ *
+ * SQL (cole no SQL Editor do Supabase; depende de orbis_match_tasks /
+ * orbis_match_habits, em src/services/supabaseService.js):
+ *
+ * create or replace function orbis_apply_actions(p_actions jsonb, p_today date)
+ * returns jsonb language plpgsql as $$
+ * declare
+ *   a          jsonb;
+ *   d          jsonb;
+ *   rec        record;
+ *   n          int;
+ *   v_results  jsonb := '[]'::jsonb;
+ * begin
+ *   for a in select value from jsonb_array_elements(p_actions) loop
+ *     d := a->'data';
+ *     case a->>'action'
+ *       when 'CREATE_TASK' then
+ *         insert into tasks (id, titulo, status, prioridade, data_prazo)
+ *         values (a->>'id', d->>'titulo', 'pendente', d->>'prioridade', (d->>'dataPrazo')::date)
+ *         on conflict (id) do nothing;
+ *         v_results := v_results || jsonb_build_object('ok', true);
+ *       when 'CREATE_HABIT' then
+ *         insert into habits (id, titulo, descricao, icone, meta_mensal)
+ *         values (a->>'id', d->>'titulo', d->>'descricao', d->>'icone', (d->>'metaMensal')::int)
+ *         on conflict (id) do nothing;
+ *         v_results := v_results || jsonb_build_object('ok', true);
+ *       when 'CREATE_FINANCE' then
+ *         insert into finances (id, descricao, valor, tipo, categoria, data)
+ *         values (a->>'id', d->>'descricao', (d->>'valor')::numeric, d->>'tipo', d->>'categoria',
+ *                 coalesce((d->>'data')::date, p_today))
+ *         on conflict (id) do nothing;
+ *         v_results := v_results || jsonb_build_object('ok', true);
+ *       when 'CREATE_REMINDER' then
+ *         insert into reminders (id, titulo, descricao, importancia, data_hora)
+ *         values (a->>'id', d->>'titulo', d->>'descricao', d->>'importancia', (d->>'dataHora')::timestamptz)
+ *         on conflict (id) do nothing;
+ *         v_results := v_results || jsonb_build_object('ok', true);
+ *       when 'CREATE_PROJECT' then
+ *         insert into projects (id, titulo, descricao, cor, status)
+ *         values (a->>'id', d->>'titulo', d->>'descricao', d->>'cor', 'ativo')
+ *         on conflict (id) do nothing;
+ *         v_results := v_results || jsonb_build_object('ok', true);
+ *       when 'COMPLETE_TASK' then
+ *         select m.id, m.titulo into rec from orbis_match_tasks(d->>'titulo', 1) m
+ *          where m.score >= 0.5;   -- MIN_MATCH_SCORE
+ *         if not found then
+ *           -- nova tentativa do job: a tarefa já foi concluída pela anterior
+ *           select t.id, t.titulo into rec from tasks t
+ *            where t.status = 'concluida' and orbis_fold(t.titulo) = orbis_fold(d->>'titulo')
+ *            limit 1;
+ *           if found then
+ *             v_results := v_results || jsonb_build_object('ok', true, 'titulo', rec.titulo);
+ *           else
+ *             v_results := v_results || jsonb_build_object('ok', false, 'notFound', true);
+ *           end if;
+ *         else
+ *           update tasks set status = 'concluida', updated_at = now() where id = rec.id;
+ *           v_results := v_results || jsonb_build_object('ok', true, 'titulo', rec.titulo);
+ *         end if;
+ *       when 'LOG_HABIT' then
+ *         select m.id, m.titulo into rec from orbis_match_habits(d->>'titulo', 1) m
+ *          where m.score >= 0.5;
+ *         if not found then
+ *           v_results := v_results || jsonb_build_object('ok', false, 'notFound', true);
+ *         else
+ *           insert into habit_logs (habit_id, date) values (rec.id, p_today)
+ *           on conflict (habit_id, date) do nothing;
+ *           get diagnostics n = row_count;
+ *           v_results := v_results || jsonb_build_object('ok', true, 'titulo', rec.titulo, 'alreadyLogged', n = 0);
+ *         end if;
+ *       else
+ *         v_results := v_results || jsonb_build_object('ok', false);
+ *     end case;
+ *   end loop;
+ *   return v_results;
+ * end;
+ * $$;
  */
 
+import { createHash } from 'node:crypto';
 import {
-    createTask, completeTask, findTaskByTitle,
-    logHabitByTitle, createFinance,
-    createHabit, createReminder, createProject
+    invalidateServerAiContext, rankTitleMatches,
+    MISSING_RPC_CODES, MIN_MATCH_SCORE,
 } from './supabase-server.js';
 
-export async function executeServerAction(supabase, actionObj) {
-    const { action, data } = actionObj;
-    if (!action || !data) return null;
+// ── Plano ──────────────────────────────────────────────────────────────────────
+
+// Dados normalizados por ação (mesmos defaults dos helpers de supabase-server.js)
+const NORMALIZE = {
+    CREATE_TASK: d => ({ titulo: d.titulo, prioridade: d.prioridade || 'media', dataPrazo: d.dataPrazo || null }),
+    CREATE_HABIT: d => ({ titulo: d.titulo, descricao: d.descricao || null, icone: d.icone || '✨', metaMensal: d.metaMensal || 30 }),
+    CREATE_FINANCE: d => ({
+        descricao: d.descricao, valor: Math.abs(Number(d.valor)),
+        tipo: d.tipo === 'receita' ? 'receita' : 'despesa',
+        categoria: d.categoria || 'outros', data: d.data || null,
+    }),
+    CREATE_REMINDER: d => ({ titulo: d.titulo, descricao: d.descricao || null, importancia: d.importancia || 'media', dataHora: d.dataHora || null }),
+    CREATE_PROJECT: d => ({ titulo: d.titulo, descricao: d.descricao || null, cor: d.cor || '#06b6d4' }),
+    COMPLETE_TASK: d => ({ titulo: d.titulo }),
+    LOG_HABIT: d => ({ titulo: d.titulo }),
+};
+
+// UUID determinístico a partir de uma string (sha256, formato 8-4-4-4-12)
+function stableUuid(seed) {
+    const h = createHash('sha256').update(seed).digest('hex');
+    return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20, 32)}`;
+}
+
+/**
+ * Normaliza as ações e atribui ids às criações. Retorna um item por ação de
+ * entrada (null para ações desconhecidas ou sem data), preservando a ordem.
+ */
+export function planActions(actions, { dedupeKey } = {}) {
+    // Id = chave do job + tipo + n-ésima criação desse tipo, sem o conteúdo: a
+    // nova tentativa chama a IA de novo e o texto gerado muda, mas a 1ª tarefa
+    // criada continua sendo a mesma linha (e o insert dela é ignorado)
+    const seen = new Map(); // tipo → criações até aqui
+    return actions.map(actionObj => {
+        const { action, data } = actionObj || {};
+        const normalize = NORMALIZE[action];
+        if (!normalize || !data) return null;
+
+        const op = { action, data: normalize(data) };
+        if (action.startsWith('CREATE_')) {
+            const n = (seen.get(action) || 0) + 1;
+            seen.set(action, n);
+            op.id = dedupeKey ? stableUuid(`${dedupeKey}|${action}|${n}`) : crypto.randomUUID();
+        }
+        return op;
+    });
+}
+
+// ── Caminho em lote (sem RPC) ──────────────────────────────────────────────────
+
+const INSERTS = {
+    CREATE_TASK: { table: 'tasks', row: (id, d) => ({ id, titulo: d.titulo, status: 'pendente', prioridade: d.prioridade, data_prazo: d.dataPrazo }) },
+    CREATE_HABIT: { table: 'habits', row: (id, d) => ({ id, titulo: d.titulo, descricao: d.descricao, icone: d.icone, meta_mensal: d.metaMensal }) },
+    CREATE_FINANCE: { table: 'finances', row: (id, d, today) => ({ id, descricao: d.descricao, valor: d.valor, tipo: d.tipo, categoria: d.categoria, data: d.data || today }) },
+    CREATE_REMINDER: { table: 'reminders', row: (id, d) => ({ id, titulo: d.titulo, descricao: d.descricao, importancia: d.importancia, data_hora: d.dataHora }) },
+    CREATE_PROJECT: { table: 'projects', row: (id, d) => ({ id, titulo: d.titulo, descricao: d.descricao, cor: d.cor, status: 'ativo' }) },
+};
+
+// Filtro PostgREST "titulo contém qualquer um dos termos" (valores entre aspas)
+const anyTitleLike = terms => terms.map(t => `titulo.ilike."%${t.replace(/["\\]/g, '\\$&')}%"`).join(',');
+
+// Um select para todos os termos; para cada termo vence o título mais bem ranqueado.
+// Tarefas: só as pendentes, mas uma já concluída com o título idêntico volta com
+// done (nova tentativa de um job cuja primeira execução já a concluiu)
+async function resolveTitles(supabase, table, terms, isTasks) {
+    if (terms.length === 0) return [];
+    const { data, error } = await supabase.from(table)
+        .select(isTasks ? 'id, titulo, status' : 'id, titulo')
+        .or(anyTitleLike(terms))
+        .limit(50);
+    if (error) throw error;
+    const rows = data || [];
+    const pending = isTasks ? rows.filter(r => r.status !== 'concluida') : rows;
+    return terms.map(term => {
+        const [best] = rankTitleMatches(pending, term);
+        if (best && best.score >= MIN_MATCH_SCORE) return best;
+        if (!isTasks) return null;
+        const done = rankTitleMatches(rows, term).find(r => r.score === 1 && r.status === 'concluida');
+        return done ? { ...done, done: true } : null;
+    });
+}
+
+async function applyPlanBatched(supabase, plan, today) {
+    const results = plan.map(() => null);
+    const now = new Date().toISOString();
+
+    // Inserts: um upsert por tabela, ignorando ids já gravados
+    const byTable = new Map();
+    plan.forEach((op, i) => {
+        const spec = op && INSERTS[op.action];
+        if (!spec) return;
+        if (!byTable.has(spec.table)) byTable.set(spec.table, []);
+        byTable.get(spec.table).push({ i, row: { ...spec.row(op.id, op.data, today), updated_at: now } });
+    });
+
+    // Buscas por título: um select por tabela
+    const completes = plan.map((op, i) => [op, i]).filter(([op]) => op?.action === 'COMPLETE_TASK');
+    const habitLogs = plan.map((op, i) => [op, i]).filter(([op]) => op?.action === 'LOG_HABIT');
+
+    const [, tasksFound, habitsFound] = await Promise.all([
+        Promise.all([...byTable].map(async ([table, entries]) => {
+            const { error } = await supabase.from(table)
+                .upsert(entries.map(e => e.row), { onConflict: 'id', ignoreDuplicates: true });
+            entries.forEach(e => { results[e.i] = error ? { ok: false, error } : { ok: true }; });
+        })),
+        resolveTitles(supabase, 'tasks', completes.map(([op]) => op.data.titulo), true),
+        resolveTitles(supabase, 'habits', habitLogs.map(([op]) => op.data.titulo), false),
+    ]);
+
+    // Conclusões: um update para todas as tarefas encontradas
+    const taskIds = [...new Set(tasksFound.filter(t => t && !t.done).map(t => t.id))];
+    let completeError = null;
+    if (taskIds.length > 0) {
+        ({ error: completeError } = await supabase.from('tasks')
+            .update({ status: 'concluida', updated_at: now })
+            .in('id', taskIds));
+    }
+    completes.forEach(([, i], k) => {
+        const task = tasksFound[k];
+        if (!task) results[i] = { ok: false, notFound: true };
+        else if (task.done) results[i] = { ok: true, titulo: task.titulo };
+        else results[i] = completeError ? { ok: false, titulo: task.titulo, error: completeError } : { ok: true, titulo: task.titulo };
+    });
+
+    // Registros de hábito: um upsert; só as linhas novas voltam no select
+    const habitIds = [...new Set(habitsFound.filter(Boolean).map(h => h.id))];
+    let inserted = new Set();
+    let logError = null;
+    if (habitIds.length > 0) {
+        const { data, error } = await supabase.from('habit_logs')
+            .upsert(habitIds.map(habit_id => ({ habit_id, date: today })), { onConflict: 'habit_id,date', ignoreDuplicates: true })
+            .select('habit_id');
+        logError = error;
+        inserted = new Set((data || []).map(r => r.habit_id));
+    }
+    const loggedNow = new Set();
+    habitLogs.forEach(([, i], k) => {
+        const habit = habitsFound[k];
+        if (!habit) { results[i] = { ok: false, notFound: true }; return; }
+        if (logError) { results[i] = { ok: false, titulo: habit.titulo, error: logError }; return; }
+        // O mesmo hábito pedido duas vezes: só a primeira conta como novo registro
+        const fresh = inserted.has(habit.id) && !loggedNow.has(habit.id);
+        loggedNow.add(habit.id);
+        results[i] = { ok: true, titulo: habit.titulo, alreadyLogged: !fresh };
+    });
+
+    return results;
+}
+
+// ── Execução ───────────────────────────────────────────────────────────────────
+
+function describe(op, r) {
+    const { action, data } = op;
+    const detail = r.error ? ` Detalhes: ${r.error.message || 'erro desconhecido'}` : '';
 
     switch (action) {
-        case 'CREATE_TASK': {
-            const result = await createTask(supabase, {
-                titulo: data.titulo,
-                prioridade: data.prioridade,
-                dataPrazo: data.dataPrazo,
-            });
-            if (result.error) return `[ ERRO ]: Falha ao criar tarefa "${data.titulo}". Detalhes: ${result.error.message || 'erro desconhecido'}`;
+        case 'CREATE_TASK':
+            if (!r.ok) return `[ ERRO ]: Falha ao criar tarefa "${data.titulo}".${detail}`;
             return `✅ Tarefa "${data.titulo}" criada no Orbis!`;
-        }
 
-        case 'COMPLETE_TASK': {
-            const tasks = await findTaskByTitle(supabase, data.titulo);
-            if (tasks.length === 0) return `[ AVISO ]: Nenhuma tarefa encontrada com "${data.titulo}". Verifique o nome e tente novamente.`;
-            const task = tasks[0];
-            const ok = await completeTask(supabase, task.id);
-            if (!ok) return `[ ERRO ]: Falha ao concluir tarefa "${task.titulo}". Pode ser problema de permissao (RLS).`;
-            return `✅ Tarefa "${task.titulo}" marcada como concluida no Orbis!`;
-        }
+        case 'COMPLETE_TASK':
+            if (r.notFound) return `[ AVISO ]: Nenhuma tarefa encontrada com "${data.titulo}". Verifique o nome e tente novamente.`;
+            if (!r.ok) return `[ ERRO ]: Falha ao concluir tarefa "${r.titulo || data.titulo}". Pode ser problema de permissao (RLS).`;
+            return `✅ Tarefa "${r.titulo}" marcada como concluida no Orbis!`;
 
-        case 'LOG_HABIT': {
-            const result = await logHabitByTitle(supabase, data.titulo);
-            if (!result.found) return `[ AVISO ]: Nenhum habito encontrado com "${data.titulo}".`;
-            if (result.alreadyLogged) return `[ INFO ]: Habito "${result.titulo}" ja foi registrado hoje!`;
-            if (result.error) return `[ ERRO ]: Falha ao registrar habito. Detalhes: ${result.error.message || 'erro desconhecido'}`;
-            return `✅ Habito "${result.titulo}" registrado no Orbis!`;
-        }
+        case 'LOG_HABIT':
+            if (r.notFound) return `[ AVISO ]: Nenhum habito encontrado com "${data.titulo}".`;
+            if (!r.ok) return `[ ERRO ]: Falha ao registrar habito.${detail}`;
+            if (r.alreadyLogged) return `[ INFO ]: Habito "${r.titulo}" ja foi registrado hoje!`;
+            return `✅ Habito "${r.titulo}" registrado no Orbis!`;
 
-        case 'CREATE_FINANCE': {
-            const result = await createFinance(supabase, {
-                descricao: data.descricao,
-                valor: data.valor,
-                tipo: data.tipo,
-                categoria: data.categoria,
-                data: data.data,
-            });
-            if (result.error) return `[ ERRO ]: Falha ao registrar lancamento. Detalhes: ${result.error.message || 'erro desconhecido'}`;
-            return `✅ ${data.tipo === 'receita' ? 'Receita' : 'Despesa'} de R$${Math.abs(Number(data.valor)).toFixed(2)} (${data.descricao}) registrada no Orbis!`;
-        }
+        case 'CREATE_FINANCE':
+            if (!r.ok) return `[ ERRO ]: Falha ao registrar lancamento.${detail}`;
+            return `✅ ${data.tipo === 'receita' ? 'Receita' : 'Despesa'} de R$${data.valor.toFixed(2)} (${data.descricao}) registrada no Orbis!`;
 
-        case 'CREATE_HABIT': {
-            const result = await createHabit(supabase, {
-                titulo: data.titulo,
-                descricao: data.descricao,
-                icone: data.icone,
-                metaMensal: data.metaMensal,
-            });
-            if (result.error) return `[ ERRO ]: Falha ao criar habito. Detalhes: ${result.error.message || 'erro desconhecido'}`;
+        case 'CREATE_HABIT':
+            if (!r.ok) return `[ ERRO ]: Falha ao criar habito.${detail}`;
             return `✅ Habito "${data.titulo}" criado no Orbis!`;
-        }
 
-        case 'CREATE_REMINDER': {
-            const result = await createReminder(supabase, {
-                titulo: data.titulo,
-                descricao: data.descricao,
-                importancia: data.importancia,
-                dataHora: data.dataHora,
-            });
-            if (result.error) return `[ ERRO ]: Falha ao criar lembrete. Detalhes: ${result.error.message || 'erro desconhecido'}`;
+        case 'CREATE_REMINDER':
+            if (!r.ok) return `[ ERRO ]: Falha ao criar lembrete.${detail}`;
             return `✅ Lembrete "${data.titulo}" criado no Orbis!`;
-        }
 
-        case 'CREATE_PROJECT': {
-            const result = await createProject(supabase, {
-                titulo: data.titulo,
-                descricao: data.descricao,
-                cor: data.cor,
-            });
-            if (result.error) return `[ ERRO ]: Falha ao criar projeto. Detalhes: ${result.error.message || 'erro desconhecido'}`;
+        case 'CREATE_PROJECT':
+            if (!r.ok) return `[ ERRO ]: Falha ao criar projeto.${detail}`;
             return `✅ Projeto "${data.titulo}" criado no Orbis!`;
-        }
 
         default:
             return null;
     }
 }
+
+/**
+ * Executa todas as ações de uma resposta de uma vez.
+ * Retorna uma mensagem por ação (null para ações ignoradas), na ordem de entrada.
+ */
+export async function executeServerActions(supabase, actions, { dedupeKey } = {}) {
+    const plan = planActions(actions, { dedupeKey });
+    const ops = plan.filter(Boolean);
+    if (ops.length === 0) return plan.map(() => null);
+
+    const today = new Date().toISOString().split('T')[0];
+    let results;
+
+    const { data, error } = await supabase.rpc('orbis_apply_actions', { p_actions: ops, p_today: today });
+    if (!error) {
+        results = data;
+    } else if (MISSING_RPC_CODES.has(error.code)) {
+        try {
+            results = await applyPlanBatched(supabase, ops, today);
+        } catch (e) {
+            results = ops.map(() => ({ ok: false, error: e }));
+        }
+    } else {
+        // A transação inteira foi desfeita: nenhuma ação foi aplicada
+        results = ops.map(() => ({ ok: false, error }));
+    }
+
+    if (results.some(r => r?.ok)) invalidateServerAiContext();
+
+    let k = 0;
+    return plan.map(op => (op ? describe(op, results[k++] || { ok: false }) : null));
+}
+
+/** Uma ação isolada (mesmo caminho do lote). */
+export async function executeServerAction(supabase, actionObj, options) {
+    const [message] = await executeServerActions(supabase, [actionObj], options);
+    return message;
+}
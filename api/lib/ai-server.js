@@ -5,8 +5,11 @@
  * Inclui ações estendidas: COMPLETE_TASK, LOG_HABIT.
  */
 
+import { getProviderRouter, providerBaseUrl, PROVIDERS } from './provider-router.js';
+
 // ── Context Builder ────────────────────────────────────────────────────────────
-// Espelha buildLiveContext() de src/services/aiProviderService.js
+// Espelha buildLiveContext() de src/services/aiProviderService.js, sobre o
+// snapshot compacto de fetchServerAiContext (totais já agregados no banco)
 
 export function buildLiveContextFromSnapshot(snap) {
     if (!snap) return '';
@@ -14,7 +17,7 @@ export function buildLiveContextFromSnapshot(snap) {
     const lines = [];
 
     if (snap.tasks.length > 0) {
-        lines.push('MISSOES ATIVAS:');
+        lines.push(snap.overdueTasks > 0 ? `MISSOES ATIVAS (${snap.overdueTasks} atrasadas):` : 'MISSOES ATIVAS:');
         snap.tasks.forEach(t => {
             const prazo = t.data_prazo ? ` | prazo ${t.data_prazo}` : '';
             lines.push(`- [${(t.prioridade || 'media').toUpperCase()}] ${t.titulo} — ${t.status}${prazo}`);
@@ -34,25 +37,16 @@ export function buildLiveContextFromSnapshot(snap) {
         });
     }
 
-    if (snap.finances.length > 0) {
-        const receitas = snap.finances.filter(f => f.tipo === 'receita').reduce((s, f) => s + Number(f.valor), 0);
-        const despesas = snap.finances.filter(f => f.tipo === 'despesa').reduce((s, f) => s + Number(f.valor), 0);
-        lines.push(`FINANCAS (ultimos 30 dias): receitas R$${receitas.toFixed(2)} | despesas R$${despesas.toFixed(2)} | saldo R$${(receitas - despesas).toFixed(2)}`);
-        const cats = {};
-        snap.finances.filter(f => f.tipo === 'despesa').forEach(f => {
-            const c = f.categoria || 'outros';
-            cats[c] = (cats[c] || 0) + Number(f.valor);
-        });
-        const topCats = Object.entries(cats).sort((a, b) => b[1] - a[1]).slice(0, 3);
+    if (snap.finance?.count > 0) {
+        const { receitas, despesas, saldo, topCategories: topCats } = snap.finance;
+        lines.push(`FINANCAS (ultimos 30 dias): receitas R$${receitas.toFixed(2)} | despesas R$${despesas.toFixed(2)} | saldo R$${saldo.toFixed(2)}`);
         if (topCats.length) lines.push('Top gastos: ' + topCats.map(([c, v]) => `${c} R$${v.toFixed(2)}`).join(' | '));
     }
 
     if (snap.habits.length > 0) {
         lines.push('HABITOS:');
         snap.habits.forEach(h => {
-            const logs = h.habit_logs || [];
-            const thisMonth = logs.filter(l => l.date?.startsWith(snap.today.slice(0, 7))).length;
-            lines.push(`- ${h.icone || '✨'} ${h.titulo}: ${thisMonth} vezes este mes`);
+            lines.push(`- ${h.icone || '✨'} ${h.titulo}: ${h.monthCount} vezes este mes`);
         });
     }
 
@@ -67,6 +61,22 @@ export function buildLiveContextFromSnapshot(snap) {
         });
     }
 
+    if (snap.notes?.length > 0) {
+        lines.push('NOTAS DO CADERNO:');
+        snap.notes.forEach(n => {
+            const preview = (n.conteudo || '').slice(0, 120).replace(/\n/g, ' ');
+            lines.push(`- "${n.titulo}": ${preview || '(sem conteudo)'}`);
+        });
+    }
+
+    if (snap.diary?.length > 0) {
+        lines.push('DIARIO (entradas recentes):');
+        snap.diary.forEach(d => {
+            const preview = (d.conteudo || '').slice(0, 150).replace(/\n/g, ' ');
+            lines.push(`- ${d.data}: ${preview || '(vazio)'}`);
+        });
+    }
+
     if (lines.length === 0) return '';
     return '\n\n[DADOS REAIS DO CACADOR — ATUALIZADO AGORA]:\n' + lines.join('\n');
 }
@@ -138,18 +148,37 @@ ${contextBlock}`;
 }
 
 // ── AI Provider Call ───────────────────────────────────────────────────────────
-// Espelha callAiProvider() de src/services/aiProviderService.js
+// Espelha callAiProvider() de src/services/aiProviderService.js. O transporte
+// (keep-alive, prazo, failover, hedging, circuit breaker) fica no provider-router.
 
+/**
+ * options: { model, systemPrompt, fallbacks: [{ provider, apiKey, model }],
+ *            deadlineMs, hedge, hedgeAfterMs } — ver provider-router.js.
+ */
 export async function callServerAiProvider(provider, messages, apiKey, options = {}) {
-    if (provider === 'gemini') {
-        return callServerGemini(messages, apiKey, options);
-    }
-    return callServerOpenAiCompatible(provider, messages, apiKey, options);
+    const routes = [{ provider, apiKey, model: options.model }, ...(options.fallbacks || [])]
+        .filter(r => r.apiKey);
+    return getProviderRouter().call(routes, route => buildProviderRequest(route, messages, options), options);
 }
 
-async function callServerGemini(messages, apiKey, options) {
-    const model = options.model || 'gemini-2.5-flash';
-    const url = `https://generativelanguage.googleapis.com/v1beta/models/${model}:generateContent?key=${apiKey}`;
+/** Rotas reserva do env: AI_FALLBACK_PROVIDER + AI_FALLBACK_API_KEY (+ AI_FALLBACK_MODEL). */
+export function fallbackRoutesFromEnv(primaryProvider) {
+    const provider = process.env.AI_FALLBACK_PROVIDER;
+    const apiKey = process.env.AI_FALLBACK_API_KEY;
+    if (!provider || !apiKey) return [];
+    // Mesmo provedor só faz sentido com outro modelo
+    if (provider === primaryProvider && !process.env.AI_FALLBACK_MODEL) return [];
+    return [{ provider, apiKey, model: process.env.AI_FALLBACK_MODEL || undefined }];
+}
+
+function buildProviderRequest(route, messages, options) {
+    return route.provider === 'gemini'
+        ? buildGeminiRequest(route, messages, options)
+        : buildOpenAiCompatibleRequest(route, messages, options);
+}
+
+function buildGeminiRequest(route, messages, options) {
+    const model = route.model || PROVIDERS.gemini.model;
 
     const history = messages.slice(0, -1).map(msg => ({
         role: msg.role === 'assistant' ? 'model' : 'user',
@@ -157,10 +186,9 @@ async function callServerGemini(messages, apiKey, options) {
     }));
     const currentMessage = messages[messages.length - 1].content;
 
-    const response = await fetch(url, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
+    return {
+        url: `${providerBaseUrl('gemini')}/models/${model}:generateContent?key=${route.apiKey}`,
+        body: {
             contents: [...history, { role: 'user', parts: [{ text: currentMessage }] }],
             systemInstruction: { parts: [{ text: options.systemPrompt || '' }] },
             generationConfig: {
@@ -169,60 +197,32 @@ async function callServerGemini(messages, apiKey, options) {
                 topP: 0.95,
                 maxOutputTokens: 2048,
             }
-        })
-    });
-
-    if (!response.ok) {
-        const err = await response.json().catch(() => ({}));
-        throw new Error(err.error?.message || `Erro no Gemini (${response.status})`);
-    }
-    const data = await response.json();
-    return data.candidates[0].content.parts[0].text;
+        },
+        parse: data => data.candidates[0].content.parts[0].text,
+    };
 }
 
-async function callServerOpenAiCompatible(provider, messages, apiKey, options) {
-    let baseUrl = 'https://api.siliconflow.com/v1';
-    let model = options.model || 'deepseek-ai/DeepSeek-V3';
-
-    if (provider === 'zhipu') {
-        baseUrl = 'https://open.bigmodel.cn/api/paas/v4';
-        model = options.model || 'glm-4-plus';
-    } else if (provider === 'siliconflow') {
-        baseUrl = 'https://api.siliconflow.com/v1';
-        model = options.model || 'deepseek-ai/DeepSeek-V3';
-    } else if (provider === 'openrouter') {
-        baseUrl = 'https://openrouter.ai/api/v1';
-        model = options.model || 'google/gemini-2.0-flash-001';
-    }
+function buildOpenAiCompatibleRequest(route, messages, options) {
+    const { provider } = route;
+    const model = route.model || (PROVIDERS[provider] || PROVIDERS.siliconflow).model;
 
     const formattedMessages = [
         { role: 'system', content: options.systemPrompt || '' },
         ...messages,
     ];
 
-    const response = await fetch(`${baseUrl}/chat/completions`, {
-        method: 'POST',
+    return {
+        url: `${providerBaseUrl(provider)}/chat/completions`,
         headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${apiKey}`,
+            'Authorization': `Bearer ${route.apiKey}`,
             ...(provider === 'openrouter' && { 'HTTP-Referer': 'https://orbis-app.vercel.app', 'X-Title': 'The System' })
         },
-        body: JSON.stringify({
+        body: {
             model,
             messages: formattedMessages,
             temperature: 0.7,
             max_tokens: 2048,
-        })
-    });
-
-    if (!response.ok) {
-        let errorMsg = `Erro no provedor ${provider} (${response.status})`;
-        try {
-            const err = await response.json();
-            errorMsg = err.error?.message || err.message || errorMsg;
-        } catch {}
-        throw new Error(errorMsg);
-    }
-    const data = await response.json();
-    return data.choices[0].message.content;
+        },
+        parse: data => data.choices[0].message.content,
+    };
 }
@@ -0,0 +1,165 @@
+/**
+ * conversation-store.js
+ * Histórico de conversa dos bots (WhatsApp, Telegram) com interface plugável.
+ *
+ * Toda store expõe:
+ *   load(key)              → mensagens [{ role: 'user'|'assistant', content }], mais antiga primeiro
+ *   append(key, messages)  → acrescenta e corta ao orçamento de tokens
+ *   clear(key)
+ *
+ * - memória: LRU + TTL em escopo de módulo (padrão). Some em cold starts e não é
+ *   compartilhada entre instâncias, mas tem teto de conversas — não cresce sem limite.
+ * - supabase: uma linha por conversa na tabela bot_conversations; sobrevive a
+ *   cold starts e é vista por todas as instâncias. Falhas de leitura/escrita viram
+ *   "sem histórico" em vez de derrubar a resposta.
+ *
+ * Escolha via env CONVERSATION_STORE=memory|supabase (padrão: memory).
+ *
+ * SQL (cole no SQL Editor do Supabase):
+ *
+ * create table if not exists bot_conversations (
+ *   channel           text    not null,   -- 'whatsapp' | 'telegram'
+ *   conversation_key  text    not null,   -- número / chat_id
+ *   messages          jsonb   not null default '[]',
+ *   updated_at        timestamptz default now(),
+ *   primary key (channel, conversation_key)
+ * );
+ * create index if not exists bot_conversations_updated_idx on bot_conversations (updated_at);
+ */
+
+import { getSupabase } from './supabase-server.js';
+
+const DEFAULT_MAX_TOKENS = 3000;       // orçamento do histórico enviado ao modelo
+const DEFAULT_MAX_MESSAGES = 20;
+const DEFAULT_TTL_MS = 6 * 60 * 60 * 1000;
+const DEFAULT_MAX_CONVERSATIONS = 500;
+const TABLE = 'bot_conversations';
+
+// ── Orçamento de tokens ────────────────────────────────────────────────────────
+
+/** Estimativa barata (~4 caracteres por token), suficiente para limitar o histórico. */
+export function estimateTokens(text) {
+    return Math.ceil((text || '').length / 4);
+}
+
+/**
+ * Mantém as mensagens mais recentes que cabem no orçamento. A fatia nunca
+ * começa por uma resposta da IA (alguns provedores exigem usuário primeiro).
+ */
+export function trimToBudget(messages, { maxTokens = DEFAULT_MAX_TOKENS, maxMessages = DEFAULT_MAX_MESSAGES } = {}) {
+    let used = 0;
+    let start = messages.length;
+    while (start > 0 && messages.length - start < maxMessages) {
+        const cost = estimateTokens(messages[start - 1].content);
+        if (used + cost > maxTokens) break;
+        used += cost;
+        start--;
+    }
+    while (start < messages.length && messages[start].role !== 'user') start++;
+    return messages.slice(start);
+}
+
+// ── Memória (LRU + TTL) ────────────────────────────────────────────────────────
+
+export function createMemoryConversationStore({
+    maxConversations = DEFAULT_MAX_CONVERSATIONS,
+    ttlMs = DEFAULT_TTL_MS,
+    ...budget
+} = {}) {
+    // Map mantém ordem de inserção: reinserir no acesso = LRU
+    const entries = new Map(); // key → { at, messages }
+
+    function touch(key, messages) {
+        entries.delete(key);
+        entries.set(key, { at: Date.now(), messages });
+        while (entries.size > maxConversations) {
+            entries.delete(entries.keys().next().value);
+        }
+    }
+
+    return {
+        async load(key) {
+            const entry = entries.get(key);
+            if (!entry) return [];
+            if (Date.now() - entry.at > ttlMs) {
+                entries.delete(key);
+                return [];
+            }
+            touch(key, entry.messages);
+            return entry.messages;
+        },
+
+        async append(key, messages) {
+            const history = await this.load(key);
+            touch(key, trimToBudget([...history, ...messages], budget));
+        },
+
+        async clear(key) {
+            entries.delete(key);
+        },
+    };
+}
+
+// ── Supabase ───────────────────────────────────────────────────────────────────
+
+export function createSupabaseConversationStore(supabase, {
+    channel,
+    ttlMs = DEFAULT_TTL_MS,
+    ...budget
+} = {}) {
+    const row = key => ({ channel, conversation_key: String(key) });
+
+    return {
+        async load(key) {
+            const { data, error } = await supabase
+                .from(TABLE)
+                .select('messages, updated_at')
+                .match(row(key))
+                .maybeSingle();
+            if (error) {
+                console.error('[ConversationStore] Erro ao carregar histórico:', error.message);
+                return [];
+            }
+            if (!data || Date.now() - new Date(data.updated_at).getTime() > ttlMs) return [];
+            return Array.isArray(data.messages) ? data.messages : [];
+        },
+
+        // Ler-e-regravar: duas mensagens simultâneas da mesma conversa podem
+        // perder uma troca do histórico — aceitável para um chat pessoal
+        async append(key, messages) {
+            const history = await this.load(key);
+            const { error } = await supabase.from(TABLE).upsert({
+                ...row(key),
+                messages: trimToBudget([...history, ...messages], budget),
+                updated_at: new Date().toISOString(),
+            });
+            if (error) console.error('[ConversationStore] Erro ao salvar histórico:', error.message);
+        },
+
+        async clear(key) {
+            await supabase.from(TABLE).delete().match(row(key));
+        },
+    };
+}
+
+// ── Fábrica ────────────────────────────────────────────────────────────────────
+
+// Uma store por canal, reaproveitada enquanto a instância estiver quente
+const _stores = new Map();
+
+/** Store configurada para o canal ('whatsapp', 'telegram'). */
+export function getConversationStore(channel, supabase) {
+    if (_stores.has(channel)) return _stores.get(channel);
+
+    let store = null;
+    if (process.env.CONVERSATION_STORE === 'supabase') {
+        try {
+            store = createSupabaseConversationStore(supabase || getSupabase(), { channel });
+        } catch (e) {
+            console.error('[ConversationStore] Supabase indisponível, usando memória:', e.message);
+        }
+    }
+    if (!store) store = createMemoryConversationStore();
+    _stores.set(channel, store);
+    return store;
+}
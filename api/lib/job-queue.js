@@ -0,0 +1,258 @@
+/**
+ * job-queue.js
+ * Fila de jobs dos webhooks (Telegram, WhatsApp): o webhook só valida,
+ * enfileira e responde 200; o worker (api/worker.js) faz o trabalho pesado —
+ * contexto, chamada à IA, ações e envio da resposta.
+ *
+ * Idempotência: cada job tem uma chave única (telegram:<update_id>,
+ * whatsapp:<id da mensagem>). Retentativas da Meta/Telegram caem na mesma
+ * chave e são descartadas no enqueue, então a ação não roda duas vezes.
+ *
+ * Implementações:
+ * - supabase (padrão): tabela bot_jobs, durável e compartilhada entre instâncias.
+ *   O claim é atômico (RPC com FOR UPDATE SKIP LOCKED) e tem lease: um worker
+ *   que morreu no meio devolve o job à fila quando o lease expira.
+ * - memória (JOB_QUEUE=memory): substituta local para desenvolvimento e testes;
+ *   o próprio processo do webhook drena a fila.
+ *
+ * SQL (cole no SQL Editor do Supabase):
+ *
+ * create table if not exists bot_jobs (
+ *   id               bigint  generated always as identity primary key,
+ *   idempotency_key  text    not null unique,
+ *   channel          text    not null,          -- 'telegram' | 'whatsapp'
+ *   payload          jsonb   not null,
+ *   status           text    not null default 'pending',  -- pending | processing | done | failed
+ *   attempts         int     not null default 0,
+ *   run_after        timestamptz not null default now(),
+ *   locked_until     timestamptz,
+ *   last_error       text,
+ *   created_at       timestamptz default now(),
+ *   updated_at       timestamptz default now()
+ * );
+ * create index if not exists bot_jobs_ready_idx on bot_jobs (status, run_after);
+ *
+ * create or replace function claim_bot_jobs(p_limit int, p_lease_seconds int)
+ * returns setof bot_jobs language sql as $$
+ *   update bot_jobs
+ *      set status = 'processing', attempts = attempts + 1, updated_at = now(),
+ *          locked_until = now() + make_interval(secs => p_lease_seconds)
+ *    where id in (
+ *      select id from bot_jobs
+ *       where (status = 'pending' and run_after <= now())
+ *          or (status = 'processing' and locked_until < now())
+ *       order by id
+ *       limit p_limit
+ *       for update skip locked)
+ *   returning *;
+ * $$;
+ */
+
+import { getSupabase } from './supabase-server.js';
+
+export const MAX_ATTEMPTS = 3;
+const RETRY_BASE_MS = 5 * 1000;        // 5s, 10s, 20s...
+const LEASE_MS = 90 * 1000;            // maior que a duração de um job
+const KICK_TIMEOUT_MS = 1500;
+
+// Orçamento do worker: maxDuration de api/worker.js em vercel.json e o tempo
+// máximo de um job (prazo de 25s da IA no provider-router + contexto e envio)
+export const WORKER_MAX_DURATION_MS = 60 * 1000;
+const JOB_BUDGET_MS = 30 * 1000;
+const LEASE_MARGIN_MS = 15 * 1000;
+
+const retryDelay = attempts => RETRY_BASE_MS * 2 ** Math.max(0, attempts - 1);
+
+// ── Supabase ───────────────────────────────────────────────────────────────────
+
+export function createSupabaseJobQueue(supabase, { maxAttempts = MAX_ATTEMPTS } = {}) {
+    return {
+        /** Enfileira; { enqueued: false } se a chave já existe (update repetido). */
+        async enqueue({ idempotencyKey, channel, payload }) {
+            const { error } = await supabase
+                .from('bot_jobs')
+                .insert({ idempotency_key: idempotencyKey, channel, payload });
+            if (error?.code === '23505') return { enqueued: false };
+            if (error) throw new Error(`Falha ao enfileirar job: ${error.message}`);
+            return { enqueued: true };
+        },
+
+        async claim(limit, leaseMs = LEASE_MS) {
+            const { data, error } = await supabase.rpc('claim_bot_jobs', {
+                p_limit: limit,
+                p_lease_seconds: Math.ceil(leaseMs / 1000),
+            });
+            if (error) throw new Error(`Falha ao buscar jobs: ${error.message}`);
+            return data || [];
+        },
+
+        async complete(job) {
+            await supabase.from('bot_jobs')
+                .update({ status: 'done', locked_until: null, last_error: null, updated_at: new Date().toISOString() })
+                .eq('id', job.id);
+        },
+
+        async fail(job, err) {
+            const giveUp = job.attempts >= maxAttempts;
+            await supabase.from('bot_jobs')
+                .update({
+                    status: giveUp ? 'failed' : 'pending',
+                    run_after: new Date(Date.now() + retryDelay(job.attempts)).toISOString(),
+                    locked_until: null,
+                    last_error: String(err?.message || err).slice(0, 500),
+                    updated_at: new Date().toISOString(),
+                })
+                .eq('id', job.id);
+        },
+    };
+}
+
+// ── Memória (substituta local) ─────────────────────────────────────────────────
+
+export function createMemoryJobQueue({ maxAttempts = MAX_ATTEMPTS, now = Date.now } = {}) {
+    const jobs = new Map();     // id → job
+    const keys = new Set();
+    let seq = 0;
+
+    return {
+        local: true,
+        jobs,
+
+        async enqueue({ idempotencyKey, channel, payload }) {
+            if (keys.has(idempotencyKey)) return { enqueued: false };
+            keys.add(idempotencyKey);
+            const id = ++seq;
+            jobs.set(id, {
+                id, idempotency_key: idempotencyKey, channel, payload,
+                status: 'pending', attempts: 0, run_after: now(), locked_until: null, last_error: null,
+            });
+            return { enqueued: true };
+        },
+
+        async claim(limit, leaseMs = LEASE_MS) {
+            const t = now();
+            const ready = [...jobs.values()]
+                .filter(j => (j.status === 'pending' && j.run_after <= t)
+                    || (j.status === 'processing' && j.locked_until < t))
+                .slice(0, limit);
+            ready.forEach(j => {
+                j.status = 'processing';
+                j.attempts++;
+                j.locked_until = t + leaseMs;
+            });
+            return ready.map(j => ({ ...j }));
+        },
+
+        async complete(job) {
+            Object.assign(jobs.get(job.id), { status: 'done', locked_until: null, last_error: null });
+        },
+
+        async fail(job, err) {
+            Object.assign(jobs.get(job.id), {
+                status: job.attempts >= maxAttempts ? 'failed' : 'pending',
+                run_after: now() + retryDelay(job.attempts),
+                locked_until: null,
+                last_error: String(err?.message || err),
+            });
+        },
+    };
+}
+
+// ── Fábrica ────────────────────────────────────────────────────────────────────
+
+let _queue = null;
+
+export function getJobQueue() {
+    if (_queue) return _queue;
+    _queue = process.env.JOB_QUEUE === 'memory'
+        ? createMemoryJobQueue()
+        : createSupabaseJobQueue(getSupabase());
+    return _queue;
+}
+
+// ── Worker ─────────────────────────────────────────────────────────────────────
+
+// Executa fn sobre os itens com no máximo `limit` em paralelo
+async function runPool(items, limit, fn) {
+    let next = 0;
+    const lanes = Array.from({ length: Math.min(limit, items.length) }, async () => {
+        while (next < items.length) await fn(items[next++]);
+    });
+    await Promise.all(lanes);
+}
+
+/**
+ * Drena a fila até esvaziar ou acabar o tempo da função, com no máximo
+ * `concurrency` jobs simultâneos. handlers: { [channel]: async payload => {} }.
+ * Job que lança erro volta à fila com backoff (até maxAttempts, depois 'failed').
+ *
+ * Só pega um lote novo se ainda couber um job inteiro (JOB_BUDGET_MS) antes de
+ * a plataforma matar a função (maxDurationMs, contado de startedAt). O lease
+ * vai além desse fim: se a função morrer no meio, o job só volta à fila depois
+ * que ela com certeza parou — e a nova tentativa conta em attempts.
+ * Jobs em backoff ficam para a próxima chamada (kick de webhook ou o cron de
+ * /api/worker — ver README).
+ */
+export async function drainQueue(queue, handlers, {
+    concurrency = 4,
+    startedAt = Date.now(),
+    maxDurationMs = WORKER_MAX_DURATION_MS,
+    jobBudgetMs = JOB_BUDGET_MS,
+} = {}) {
+    const killedAt = startedAt + maxDurationMs;
+    const stats = { done: 0, failed: 0 };
+
+    while (killedAt - Date.now() >= jobBudgetMs) {
+        const jobs = await queue.claim(concurrency, killedAt - Date.now() + LEASE_MARGIN_MS);
+        if (jobs.length === 0) break;
+
+        await runPool(jobs, concurrency, async job => {
+            try {
+                const handle = handlers[job.channel];
+                if (!handle) throw new Error(`Canal sem handler: ${job.channel}`);
+                await handle(job.payload, job);
+                await queue.complete(job);
+                stats.done++;
+            } catch (err) {
+                console.error(`[Worker] Job ${job.idempotency_key} falhou (tentativa ${job.attempts}):`, err);
+                await queue.fail(job, err).catch(e => console.error('[Worker] Falha ao devolver job:', e));
+                stats.failed++;
+            }
+        });
+    }
+    return stats;
+}
+
+/**
+ * Acorda o worker depois de enfileirar. Com a fila em memória, drena no próprio
+ * processo (localHandlers); senão chama /api/worker e não espera o término —
+ * a requisição é abortada após KICK_TIMEOUT_MS, mas o worker segue rodando.
+ * Um kick perdido não perde o job: o próximo kick (ou um cron em /api/worker) o pega.
+ */
+export async function kickWorker(req, localHandlers) {
+    const queue = getJobQueue();
+    if (queue.local) {
+        drainQueue(queue, localHandlers).catch(e => console.error('[Worker] Erro ao drenar fila local:', e));
+        return;
+    }
+
+    const protocol = req.headers['x-forwarded-proto'] || 'https';
+    const host = req.headers['x-forwarded-host'] || req.headers.host;
+    // Mesmas credenciais que /api/worker aceita (só CRON_SECRET definido: usa ele)
+    const headers = process.env.WORKER_SECRET
+        ? { 'x-worker-secret': process.env.WORKER_SECRET }
+        : process.env.CRON_SECRET ? { authorization: `Bearer ${process.env.CRON_SECRET}` } : {};
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), KICK_TIMEOUT_MS);
+    try {
+        await fetch(`${protocol}://${host}/api/worker`, {
+            method: 'POST',
+            headers,
+            signal: controller.signal,
+        });
+    } catch {
+        // abortado por timeout (esperado) ou worker indisponível
+    } finally {
+        clearTimeout(timer);
+    }
+}
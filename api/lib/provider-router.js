@@ -0,0 +1,373 @@
+/**
+ * provider-router.js
+ * Transporte e política das chamadas de IA do servidor (ver ai-server.js).
+ *
+ * - Keep-alive: um http(s).Agent por origem, reaproveitado entre chamadas da
+ *   mesma instância quente — o handshake TLS sai do caminho crítico.
+ * - Prazo: cada chamada tem um prazo total (padrão 25s, abaixo dos 30s da
+ *   Vercel); cada tentativa usa o que sobrar dele, até ATTEMPT_TIMEOUT_MS.
+ * - Failover: uma rota que falha passa a vez para a próxima na hora.
+ * - Hedging: se a rota atual passa do próprio p95 sem responder, a próxima é
+ *   disparada em paralelo; a primeira resposta vence e a outra é abortada.
+ *   Seguro porque a chamada só gera texto — as ações rodam depois, uma vez.
+ * - Circuit breaker por provedor: 429 abre na hora (respeita Retry-After);
+ *   5xx/timeout/erro de rede abrem após BREAKER_THRESHOLD falhas seguidas.
+ *   Aberto, o provedor é pulado; passado o cooldown, uma chamada de teste
+ *   (meio-aberto) decide se fecha de novo.
+ * - Histograma de latência por provedor (buckets fixos) → p50/p95 em stats().
+ *
+ * URLs base podem ser trocadas por env (AI_BASE_URL_GEMINI, AI_BASE_URL_SILICONFLOW...)
+ * para apontar para o servidor simulado de scripts/mock-ai-provider.js.
+ */
+
+import http from 'node:http';
+import https from 'node:https';
+
+const DEFAULT_DEADLINE_MS = 25 * 1000;
+const ATTEMPT_TIMEOUT_MS = 20 * 1000;
+const HEDGE_MIN_SAMPLES = 20;          // antes disso o p95 não diz nada
+const HEDGE_DEFAULT_MS = 8 * 1000;
+const HEDGE_FLOOR_MS = 1500;
+const BREAKER_THRESHOLD = 3;
+const BREAKER_COOLDOWN_MS = 30 * 1000;
+const BREAKER_MAX_COOLDOWN_MS = 5 * 60 * 1000;
+
+// Limites superiores dos buckets (ms); o último bucket é "acima de 30s"
+const LATENCY_BUCKETS = [100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000, 13000, 20000, 30000];
+
+export const PROVIDERS = {
+    gemini:      { baseUrl: 'https://generativelanguage.googleapis.com/v1beta', model: 'gemini-2.5-flash' },
+    siliconflow: { baseUrl: 'https://api.siliconflow.com/v1', model: 'deepseek-ai/DeepSeek-V3' },
+    zhipu:       { baseUrl: 'https://open.bigmodel.cn/api/paas/v4', model: 'glm-4-plus' },
+    openrouter:  { baseUrl: 'https://openrouter.ai/api/v1', model: 'google/gemini-2.0-flash-001' },
+};
+
+export function providerBaseUrl(provider) {
+    return process.env[`AI_BASE_URL_${provider.toUpperCase()}`] || (PROVIDERS[provider] || PROVIDERS.siliconflow).baseUrl;
+}
+
+// ── Keep-alive ─────────────────────────────────────────────────────────────────
+
+const _agents = new Map();
+
+function agentFor(url) {
+    let agent = _agents.get(url.origin);
+    if (!agent) {
+        const Agent = url.protocol === 'http:' ? http.Agent : https.Agent;
+        agent = new Agent({ keepAlive: true, keepAliveMsecs: 15 * 1000, maxSockets: 16, maxFreeSockets: 4 });
+        _agents.set(url.origin, agent);
+    }
+    return agent;
+}
+
+function providerError(message, extra) {
+    return Object.assign(new Error(message), extra);
+}
+
+/**
+ * POST JSON por um agente keep-alive. Resolve { status, headers, data } para
+ * qualquer status; rejeita em timeout (err.timeout), abort ou erro de rede.
+ */
+export function postJson(rawUrl, body, { headers = {}, timeoutMs = ATTEMPT_TIMEOUT_MS, signal } = {}) {
+    const url = new URL(rawUrl);
+    const payload = Buffer.from(JSON.stringify(body));
+    const lib = url.protocol === 'http:' ? http : https;
+
+    return new Promise((resolve, reject) => {
+        if (signal?.aborted) return reject(providerError('Requisição cancelada', { aborted: true }));
+        const req = lib.request(url, {
+            method: 'POST',
+            agent: agentFor(url),
+            headers: { 'Content-Type': 'application/json', 'Content-Length': payload.length, ...headers },
+        }, res => {
+            const chunks = [];
+            res.on('data', c => chunks.push(c));
+            res.on('end', () => {
+                cleanup();
+                const text = Buffer.concat(chunks).toString('utf8');
+                let data = null;
+                try { data = text ? JSON.parse(text) : null; } catch { data = { message: text.slice(0, 200) }; }
+                resolve({ status: res.statusCode, headers: res.headers, data });
+            });
+            res.on('error', fail);
+        });
+
+        const timer = setTimeout(() => {
+            req.destroy(providerError(`Sem resposta em ${Math.round(timeoutMs / 1000)}s`, { timeout: true }));
+        }, timeoutMs);
+        const onAbort = () => req.destroy(providerError('Requisição cancelada', { aborted: true }));
+        signal?.addEventListener('abort', onAbort, { once: true });
+        function cleanup() {
+            clearTimeout(timer);
+            signal?.removeEventListener('abort', onAbort);
+        }
+        function fail(err) {
+            cleanup();
+            reject(err);
+        }
+
+        req.on('error', fail);
+        req.end(payload);
+    });
+}
+
+// ── Histograma de latência ─────────────────────────────────────────────────────
+
+export function createLatencyHistogram(bounds = LATENCY_BUCKETS) {
+    const counts = new Uint32Array(bounds.length + 1);
+    let count = 0;
+    let sum = 0;
+
+    return {
+        record(ms) {
+            let i = 0;
+            while (i < bounds.length && ms > bounds[i]) i++;
+            counts[i]++;
+            count++;
+            sum += ms;
+        },
+
+        /** Quantil aproximado: interpola dentro do bucket onde ele cai. */
+        quantile(q) {
+            if (count === 0) return null;
+            const target = q * count;
+            let seen = 0;
+            for (let i = 0; i < counts.length; i++) {
+                if (counts[i] === 0) continue;
+                if (seen + counts[i] >= target) {
+                    const lo = i === 0 ? 0 : bounds[i - 1];
+                    const hi = i < bounds.length ? bounds[i] : bounds[bounds.length - 1] * 2;
+                    return Math.round(lo + (hi - lo) * ((target - seen) / counts[i]));
+                }
+                seen += counts[i];
+            }
+            return bounds[bounds.length - 1];
+        },
+
+        snapshot() {
+            return {
+                count,
+                mean: count ? Math.round(sum / count) : null,
+                p50: this.quantile(0.5),
+                p95: this.quantile(0.95),
+                buckets: Object.fromEntries(
+                    [...counts].map((c, i) => [i < bounds.length ? `<=${bounds[i]}` : `>${bounds[bounds.length - 1]}`, c])
+                ),
+            };
+        },
+    };
+}
+
+// ── Circuit breaker ────────────────────────────────────────────────────────────
+
+// 4xx que não é 429 é erro de configuração/requisição: não diz nada sobre a saúde do provedor
+const countsForBreaker = err => err.timeout || err.status === 429 || err.status >= 500 || (!err.status && !err.aborted);
+
+export function createCircuitBreaker({ threshold = BREAKER_THRESHOLD, cooldownMs = BREAKER_COOLDOWN_MS, now = Date.now } = {}) {
+    let failures = 0;
+    let openUntil = 0;
+    let opens = 0;          // aberturas seguidas: o cooldown dobra a cada uma
+    let probing = false;
+
+    return {
+        /** Pode tentar? No meio-aberto, só uma chamada de teste por vez. */
+        tryAcquire() {
+            if (openUntil === 0) return true;
+            if (now() < openUntil || probing) return false;
+            probing = true;
+            return true;
+        },
+
+        success() {
+            failures = 0;
+            openUntil = 0;
+            opens = 0;
+            probing = false;
+        },
+
+        failure(err) {
+            const wasProbe = probing;
+            probing = false;
+            if (!countsForBreaker(err)) return;
+            failures++;
+            if (err.status === 429 || wasProbe || failures >= threshold) {
+                opens++;
+                const backoff = Math.min(cooldownMs * 2 ** (opens - 1), BREAKER_MAX_COOLDOWN_MS);
+                openUntil = now() + Math.max(backoff, err.retryAfterMs || 0);
+            }
+        },
+
+        /** Devolve a vaga de teste sem veredito (tentativa abortada pelo hedging). */
+        release() {
+            probing = false;
+        },
+
+        state() {
+            if (openUntil === 0) return 'fechado';
+            return now() < openUntil ? 'aberto' : 'meio-aberto';
+        },
+
+        snapshot() {
+            return { state: this.state(), failures, openUntil: openUntil ? new Date(openUntil).toISOString() : null };
+        },
+    };
+}
+
+// ── Router ─────────────────────────────────────────────────────────────────────
+
+function retryAfterMs(headers) {
+    const value = headers?.['retry-after'];
+    if (!value) return 0;
+    const secs = Number(value);
+    if (Number.isFinite(secs)) return secs * 1000;
+    const at = Date.parse(value);
+    return Number.isFinite(at) ? Math.max(0, at - Date.now()) : 0;
+}
+
+/**
+ * routes: [{ provider, apiKey, model }] em ordem de preferência.
+ * buildRequest(route) → { url, headers, body, parse(data) → texto }.
+ */
+export function createProviderRouter({ now = Date.now } = {}) {
+    const health = new Map();   // provedor → { breaker, latency }
+
+    function healthOf(provider) {
+        let h = health.get(provider);
+        if (!h) {
+            h = { breaker: createCircuitBreaker({ now }), latency: createLatencyHistogram() };
+            health.set(provider, h);
+        }
+        return h;
+    }
+
+    function hedgeDelay(provider, options) {
+        if (options.hedgeAfterMs != null) return options.hedgeAfterMs;
+        const latency = healthOf(provider).latency;
+        const p95 = latency.snapshot().count >= HEDGE_MIN_SAMPLES ? latency.quantile(0.95) : HEDGE_DEFAULT_MS;
+        return Math.max(HEDGE_FLOOR_MS, p95);
+    }
+
+    async function attempt(route, buildRequest, { signal, deadline }) {
+        const { breaker, latency } = healthOf(route.provider);
+        const startedAt = now();
+        const timeoutMs = Math.max(0, Math.min(ATTEMPT_TIMEOUT_MS, deadline - startedAt));
+        try {
+            const req = buildRequest(route);
+            const res = await postJson(req.url, req.body, { headers: req.headers, timeoutMs, signal });
+            if (res.status < 200 || res.status >= 300) {
+                const message = res.data?.error?.message || res.data?.message || `Erro no provedor ${route.provider} (${res.status})`;
+                throw providerError(message, { status: res.status, retryAfterMs: retryAfterMs(res.headers) });
+            }
+            const text = req.parse(res.data);
+            latency.record(now() - startedAt);
+            breaker.success();
+            return text;
+        } catch (err) {
+            err.provider = route.provider;
+            if (err.aborted) {
+                breaker.release();
+            } else {
+                // Timeout também entra no histograma: o p95 precisa enxergar a cauda
+                if (err.timeout) latency.record(now() - startedAt);
+                breaker.failure(err);
+            }
+            throw err;
+        }
+    }
+
+    function call(routes, buildRequest, options = {}) {
+        const deadline = now() + (options.deadlineMs || DEFAULT_DEADLINE_MS);
+        const hedge = options.hedge !== false;
+        const skipped = [];
+
+        return new Promise((resolve, reject) => {
+            const controllers = [];
+            const errors = [];
+            let next = 0;
+            let active = 0;
+            let settled = false;
+            let hedgeTimer = null;
+
+            const finish = (err, text) => {
+                if (settled) return;
+                settled = true;
+                clearTimeout(hedgeTimer);
+                clearTimeout(deadlineTimer);
+                controllers.forEach(c => c.abort());
+                if (err) reject(err);
+                else resolve(text);
+            };
+
+            const giveUp = () => {
+                const last = errors[errors.length - 1];
+                if (!last && skipped.length) {
+                    finish(providerError(`Provedores indisponíveis (circuito aberto): ${skipped.join(', ')}`, { status: 503 }));
+                } else if (errors.length > 1) {
+                    finish(providerError(errors.map(e => `${e.provider}: ${e.message}`).join(' | '), { status: last.status }));
+                } else {
+                    finish(last);
+                }
+            };
+
+            // Dispara a próxima rota com circuito fechado; false se não há mais
+            const launch = () => {
+                while (next < routes.length) {
+                    const route = routes[next++];
+                    if (!healthOf(route.provider).breaker.tryAcquire()) {
+                        skipped.push(route.provider);
+                        continue;
+                    }
+                    const controller = new AbortController();
+                    controllers.push(controller);
+                    active++;
+                    attempt(route, buildRequest, { signal: controller.signal, deadline })
+                        .then(text => finish(null, text))
+                        .catch(err => {
+                            active--;
+                            if (settled) return;
+                            errors.push(err);
+                            console.warn(`[AI Router] ${route.provider} falhou: ${err.message}`);
+                            if (!launch() && active === 0) giveUp();
+                        });
+                    clearTimeout(hedgeTimer);
+                    if (hedge && next < routes.length) {
+                        hedgeTimer = setTimeout(() => {
+                            if (settled) return;
+                            console.warn(`[AI Router] ${route.provider} passou de ${hedgeDelay(route.provider, options)}ms, disparando a próxima rota`);
+                            launch();
+                        }, hedgeDelay(route.provider, options));
+                    }
+                    return true;
+                }
+                return false;
+            };
+
+            const deadlineTimer = setTimeout(() => {
+                finish(providerError(`Prazo de ${Math.round((options.deadlineMs || DEFAULT_DEADLINE_MS) / 1000)}s esgotado sem resposta da IA`, { timeout: true }));
+            }, Math.max(0, deadline - now()));
+
+            if (!launch()) giveUp();
+        });
+    }
+
+    return {
+        call,
+
+        /** Latência (p50/p95/buckets) e estado do circuito por provedor. */
+        stats() {
+            return Object.fromEntries([...health].map(([provider, h]) => [provider, {
+                ...h.latency.snapshot(),
+                breaker: h.breaker.snapshot(),
+            }]));
+        },
+    };
+}
+
+// ── Fábrica ────────────────────────────────────────────────────────────────────
+
+let _router = null;
+
+export function getProviderRouter() {
+    if (!_router) _router = createProviderRouter();
+    return _router;
+}
@@ -0,0 +1,110 @@
+/**
+ * reminder-dispatch.js
+ * Envio dos lembretes vencidos pelos bots, chamado pelo cron (api/reminders.js).
+ *
+ * A cada execução:
+ *   1. busca os lembretes com data_hora até agora + REMINDER_LEAD_MS — só a
+ *      faixa recente (índice reminders_data_hora_idx) mais os recorrentes,
+ *      cuja data_hora é a da primeira ocorrência;
+ *   2. calcula a ocorrência atual de cada um (utils/reminderSchedule, a mesma
+ *      regra do app) e fica com as que vencem agora e ainda não foram enviadas;
+ *   3. reivindica cada ocorrência com um update condicional em notified_for —
+ *      duas execuções simultâneas não enviam o mesmo lembrete duas vezes;
+ *   4. junta as reivindicadas em mensagens de até REMINDERS_PER_MESSAGE
+ *      linhas e entrega a `send`. Mensagem que não saiu (send resolveu falso
+ *      ou lançou) devolve notified_for ao valor anterior nos lembretes dela:
+ *      a próxima execução tenta de novo; as outras mensagens seguem.
+ * Horários em tempo de parede no fuso do usuário (timeZone, IANA).
+ * SQL da migration (recorrencia, notified_for, índice) em src/services/supabaseService.js.
+ */
+
+import {
+    nextOccurrence, reminderWallTime, wallTime, wallToIso, REMINDER_LEAD_MS,
+} from '../../src/utils/reminderSchedule.js';
+
+// Cron atrasado ou pulado: ainda envia o que venceu nesta janela
+const CATCH_UP_MS = 60 * 60 * 1000;
+const MAX_ROWS = 500;
+const MAX_PER_RUN = 50;
+const REMINDERS_PER_MESSAGE = 10;
+
+function formatReminder({ row, at }) {
+    const hora = wallToIso(at).slice(11, 16);
+    const icon = row.importancia === 'alta' ? '🔴' : '⏰';
+    const detalhe = row.descricao ? ` — ${row.descricao}` : '';
+    return `${icon} ${hora} ${row.titulo}${detalhe}`;
+}
+
+// Desfaz a reivindicação (só se ainda for a nossa) para o lembrete voltar a vencer
+async function releaseClaim(supabase, { row, at }) {
+    const { error } = await supabase
+        .from('reminders')
+        .update({ notified_for: row.notified_for ?? null })
+        .eq('id', row.id)
+        .eq('notified_for', wallToIso(at));
+    if (error) console.error('[Reminders] Falha ao liberar lembrete para nova tentativa:', row.id, error.message);
+}
+
+/**
+ * send(text) entrega uma mensagem (ex: para cada chat configurado) e resolve
+ * true se ela saiu. Resolve { due, claimed, messages, failed }.
+ */
+export async function dispatchDueReminders(supabase, { send, timeZone, now = new Date() }) {
+    const nowWall = wallTime(now, timeZone);
+    const from = nowWall - CATCH_UP_MS;
+    const horizon = nowWall + REMINDER_LEAD_MS;
+
+    const { data, error } = await supabase
+        .from('reminders')
+        .select('id, titulo, descricao, importancia, data_hora, recorrencia, notified_for')
+        .lte('data_hora', wallToIso(horizon))
+        .or(`data_hora.gte.${wallToIso(from)},recorrencia.not.is.null`)
+        .order('data_hora', { ascending: true })
+        .limit(MAX_ROWS);
+    if (error) throw new Error(`Falha ao buscar lembretes (migration aplicada?): ${error.message}`);
+
+    const due = [];
+    for (const row of data || []) {
+        const at = nextOccurrence(row, from);
+        if (at === null || at > horizon) continue;
+        if (reminderWallTime(row.notified_for) === at) continue;
+        due.push({ row, at });
+    }
+    due.sort((a, b) => a.at - b.at);
+    const batch = due.slice(0, MAX_PER_RUN);
+
+    // Reivindica: só quem mudou notified_for para esta ocorrência envia
+    const claims = await Promise.all(batch.map(async ({ row, at }) => {
+        const iso = wallToIso(at);
+        const { data: updated, error: claimError } = await supabase
+            .from('reminders')
+            .update({ notified_for: iso })
+            .eq('id', row.id)
+            .or(`notified_for.is.null,notified_for.neq.${iso}`)
+            .select('id');
+        if (claimError) console.error('[Reminders] Falha ao reivindicar lembrete:', row.id, claimError.message);
+        return !claimError && updated?.length > 0;
+    }));
+    const claimed = batch.filter((_, i) => claims[i]);
+
+    let messages = 0, failed = 0;
+    for (let i = 0; i < claimed.length; i += REMINDERS_PER_MESSAGE) {
+        const group = claimed.slice(i, i + REMINDERS_PER_MESSAGE);
+        const lines = group.map(formatReminder);
+        const header = lines.length === 1 ? 'LEMBRETE' : 'LEMBRETES';
+        let delivered = false;
+        try {
+            delivered = await send(`${header}:\n\n${lines.join('\n')}`);
+        } catch (err) {
+            console.error('[Reminders] Falha ao enviar lembretes:', err);
+        }
+        if (delivered) {
+            messages++;
+        } else {
+            failed += group.length;
+            await Promise.all(group.map(item => releaseClaim(supabase, item)));
+        }
+    }
+
+    return { due: due.length, claimed: claimed.length, messages, failed };
+}
@@ -6,6 +6,8 @@
  */
 
 import { createClient } from '@supabase/supabase-js';
+import { aggregateFinances } from '../../src/utils/financeAggregates.js';
+import { habitDays } from '../../src/utils/habitDays.js';
 
 let _client = null;
 
@@ -18,6 +20,39 @@ export function getSupabase() {
     return _client;
 }
 
+// ── Busca por título ───────────────────────────────────────────────────────────
+// Caminho principal: RPCs orbis_match_tasks / orbis_match_habits (trigram +
+// unaccent, ranqueadas por similaridade — SQL em src/services/supabaseService.js).
+// Sem as RPCs instaladas: ilike + o mesmo ranqueamento feito aqui.
+
+// Erros do PostgREST/Postgres que significam "RPC não instalada"
+export const MISSING_RPC_CODES = new Set(['PGRST202', '42883']);
+
+// Abaixo disso o melhor resultado não é confiável o bastante para agir sozinho
+export const MIN_MATCH_SCORE = 0.5;
+
+const foldTitle = s => (s || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase().trim();
+
+/**
+ * Ordena por confiança e anexa `score` (0..1) na mesma escala das RPCs:
+ * 1 = título idêntico; termo contido no título = 0.7..1 (mais perto de 1
+ * quanto mais do título o termo cobre). Linhas que não contêm o termo saem.
+ */
+export function rankTitleMatches(rows, searchTerm) {
+    const term = foldTitle(searchTerm);
+    if (!term) return [];
+    return rows
+        .map(row => {
+            const title = foldTitle(row.titulo);
+            const score = title === term ? 1
+                : title.includes(term) ? 0.7 + 0.3 * (term.length / title.length)
+                : 0;
+            return { ...row, score };
+        })
+        .filter(row => row.score > 0)
+        .sort((a, b) => b.score - a.score);
+}
+
 // ── Tasks ──────────────────────────────────────────────────────────────────────
 
 export async function listPendingTasks(supabase) {
@@ -31,13 +66,19 @@ export async function listPendingTasks(supabase) {
 }
 
 export async function findTaskByTitle(supabase, searchTerm) {
-    const { data } = await supabase
+    const { data, error } = await supabase.rpc('orbis_match_tasks', { p_term: searchTerm, p_limit: 5 });
+    if (!error) return data || [];
+    if (!MISSING_RPC_CODES.has(error.code)) {
+        console.error('[Supabase] Erro na busca de tarefas:', error.message);
+        return [];
+    }
+    const { data: rows } = await supabase
         .from('tasks')
         .select('id, titulo, status, prioridade, data_prazo')
         .neq('status', 'concluida')
         .ilike('titulo', `%${searchTerm}%`)
-        .limit(5);
-    return data || [];
+        .limit(20);
+    return rankTitleMatches(rows || [], searchTerm).slice(0, 5);
 }
 
 export async function completeTask(supabase, taskId) {
@@ -45,6 +86,7 @@ export async function completeTask(supabase, taskId) {
         .from('tasks')
         .update({ status: 'concluida', updated_at: new Date().toISOString() })
         .eq('id', taskId);
+    if (!error) invalidateServerAiContext();
     return !error;
 }
 
@@ -58,6 +100,7 @@ export async function createTask(supabase, { titulo, prioridade, dataPrazo, desc
         data_prazo: dataPrazo || null,
         updated_at: new Date().toISOString(),
     });
+    if (!error) invalidateServerAiContext();
     return { id, titulo, error };
 }
 
@@ -71,45 +114,48 @@ export async function listHabitsWithTodayStatus(supabase) {
         .limit(20);
 
     return (habits || []).map(h => {
-        const logs = h.habit_logs || [];
-        const doneToday = logs.some(l => l.date === today);
-        const thisMonth = logs.filter(l => l.date?.startsWith(today.slice(0, 7))).length;
-        return { id: h.id, titulo: h.titulo, icone: h.icone, metaMensal: h.meta_mensal, doneToday, thisMonth };
+        const days = habitDays(h);
+        return {
+            id: h.id, titulo: h.titulo, icone: h.icone, metaMensal: h.meta_mensal,
+            doneToday: days.has(today),
+            thisMonth: days.countMonth(today.slice(0, 7)),
+            streak: days.streak(today),
+        };
     });
 }
 
 export async function findHabitByTitle(supabase, searchTerm) {
-    const { data } = await supabase
+    const { data, error } = await supabase.rpc('orbis_match_habits', { p_term: searchTerm, p_limit: 3 });
+    if (!error) return data || [];
+    if (!MISSING_RPC_CODES.has(error.code)) {
+        console.error('[Supabase] Erro na busca de hábitos:', error.message);
+        return [];
+    }
+    const { data: rows } = await supabase
         .from('habits')
         .select('id, titulo, icone')
         .ilike('titulo', `%${searchTerm}%`)
-        .limit(3);
-    return data || [];
+        .limit(20);
+    return rankTitleMatches(rows || [], searchTerm).slice(0, 3);
 }
 
 export async function logHabitByTitle(supabase, searchTerm) {
     const today = new Date().toISOString().split('T')[0];
     const habits = await findHabitByTitle(supabase, searchTerm);
-    if (!habits || habits.length === 0) return { found: false };
+    if (!habits || habits.length === 0 || habits[0].score < MIN_MATCH_SCORE) return { found: false };
 
     const habit = habits[0];
 
-    // Verifica se já foi logado hoje
-    const { data: existing } = await supabase
-        .from('habit_logs')
-        .select('id')
-        .eq('habit_id', habit.id)
-        .eq('date', today)
-        .limit(1);
-
-    if (existing && existing.length > 0) {
-        return { found: true, titulo: habit.titulo, alreadyLogged: true };
-    }
-
+    // Insert direto: unique (habit_id, date) resolve a corrida com o app —
+    // violação de unicidade (23505) significa que o dia já estava registrado
     const { error } = await supabase
         .from('habit_logs')
         .insert({ habit_id: habit.id, date: today });
 
+    if (error?.code === '23505') {
+        return { found: true, titulo: habit.titulo, alreadyLogged: true };
+    }
+    if (!error) invalidateServerAiContext();
     return { found: true, titulo: habit.titulo, alreadyLogged: false, error };
 }
 
@@ -127,6 +173,7 @@ export async function createFinance(supabase, { descricao, valor, tipo, categori
         data: data || today,
         updated_at: new Date().toISOString(),
     });
+    if (!error) invalidateServerAiContext();
     return { id, error };
 }
 
@@ -142,6 +189,7 @@ export async function createReminder(supabase, { titulo, descricao, importancia,
         data_hora: dataHora || null,
         updated_at: new Date().toISOString(),
     });
+    if (!error) invalidateServerAiContext();
     return { id, error };
 }
 
@@ -157,6 +205,7 @@ export async function createProject(supabase, { titulo, descricao, cor }) {
         status: 'ativo',
         updated_at: new Date().toISOString(),
     });
+    if (!error) invalidateServerAiContext();
     return { id, error };
 }
 
@@ -172,13 +221,88 @@ export async function createHabit(supabase, { titulo, descricao, icone, metaMens
         meta_mensal: metaMensal || 30,
         updated_at: new Date().toISOString(),
     });
+    if (!error) invalidateServerAiContext();
     return { id, error };
 }
 
 // ── AI Context Snapshot ────────────────────────────────────────────────────────
-// Espelha fetchAiContextSnapshot() de src/services/supabaseService.js
+// Uma ida ao banco: a RPC orbis_ai_context (SQL em src/services/supabaseService.js)
+// já devolve totais e contagens agregados. Sem ela, cai nas consultas separadas.
+//
+// Cache em escopo de módulo: sobrevive entre invocações da mesma instância
+// "quente" da função serverless, então mensagens seguidas de uma conversa
+// reaproveitam o snapshot em vez de repetir a busca. Qualquer escrita
+// feita por este módulo (bot, executeServerAction) invalida o cache.
+
+const AI_CONTEXT_TTL_MS = 60 * 1000;
+// userKey → { at, promise }
+const _aiContextCache = new Map();
 
-export async function fetchServerAiContext(supabase) {
+/**
+ * Descarta o snapshot de um usuário, ou de todos se userKey for omitido.
+ * Uma busca em andamento ainda responde a quem a pediu, mas não fica em cache.
+ */
+export function invalidateServerAiContext(userKey) {
+    if (userKey === undefined) _aiContextCache.clear();
+    else _aiContextCache.delete(userKey);
+}
+
+/**
+ * Snapshot para o prompt da IA, com cache por usuário (TTL curto).
+ * Chamadas simultâneas compartilham a mesma busca; falhas não ficam em cache.
+ */
+export function fetchServerAiContext(supabase, { userKey = 'default', force = false } = {}) {
+    const cached = _aiContextCache.get(userKey);
+    if (!force && cached && Date.now() - cached.at < AI_CONTEXT_TTL_MS) return cached.promise;
+
+    const entry = { at: Date.now(), promise: loadServerAiContext(supabase) };
+    _aiContextCache.set(userKey, entry);
+    entry.promise.catch(() => {
+        if (_aiContextCache.get(userKey) === entry) _aiContextCache.delete(userKey);
+    });
+    return entry.promise;
+}
+
+// Snapshot compacto (o que o prompt usa): listas curtas + totais prontos.
+// { today, tasks, overdueTasks, habits: [{ titulo, icone, monthCount }],
+//   finance: { receitas, despesas, saldo, count, topCategories: [[categoria, total]] },
+//   projects, reminders, healthLogs, notes, diary }
+async function loadServerAiContext(supabase) {
+    const today = new Date().toISOString().split('T')[0];
+    const { data, error } = await supabase.rpc('orbis_ai_context', { p_today: today });
+    if (!error && data) return compactFromRpc(data, today);
+    if (error && !MISSING_RPC_CODES.has(error.code)) {
+        console.error('[Supabase] Erro no contexto agregado, usando consultas separadas:', error.message);
+    }
+    return loadServerAiContextLegacy(supabase, today);
+}
+
+function compactFromRpc(data, today) {
+    const finance = data.finance || {};
+    const receitas = Number(finance.receitas) || 0;
+    const despesas = Number(finance.despesas) || 0;
+    return {
+        today: data.today || today,
+        tasks:        data.tasks || [],
+        overdueTasks: Number(data.overdue_tasks) || 0,
+        habits: (data.habits || []).map(h => ({ titulo: h.titulo, icone: h.icone, monthCount: Number(h.month_count) || 0 })),
+        finance: {
+            receitas,
+            despesas,
+            saldo: receitas - despesas,
+            count: Number(finance.count) || 0,
+            topCategories: (finance.top_categories || []).map(([cat, total]) => [cat, Number(total)]),
+        },
+        projects:   data.projects || [],
+        reminders:  data.reminders || [],
+        healthLogs: data.health_logs || [],
+        notes:      data.notes || [],
+        diary:      data.diary || [],
+    };
+}
+
+// Sem a RPC instalada: 8 consultas em paralelo, agregadas aqui no mesmo formato
+async function loadServerAiContextLegacy(supabase, today) {
     const weekAgo = new Date();
     weekAgo.setDate(weekAgo.getDate() - 7);
     const weekAgoStr = weekAgo.toISOString().split('T')[0];
@@ -187,7 +311,9 @@ export async function fetchServerAiContext(supabase) {
     thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
     const thirtyDaysAgoStr = thirtyDaysAgo.toISOString().split('T')[0];
 
-    const [tasksRes, habitsRes, financesRes, projectsRes, remindersRes, healthRes] =
+    const monthStart = today.slice(0, 7) + '-01';
+
+    const [tasksRes, habitsRes, financesRes, projectsRes, remindersRes, healthRes, notesRes, diaryRes] =
         await Promise.allSettled([
             supabase.from('tasks')
                 .select('titulo, status, prioridade, data_prazo')
@@ -195,15 +321,15 @@ export async function fetchServerAiContext(supabase) {
                 .order('data_prazo', { ascending: true })
                 .limit(20),
 
+            // Só os logs do mês corrente vêm embutidos, não o histórico inteiro
             supabase.from('habits')
                 .select('titulo, icone, habit_logs(date)')
+                .gte('habit_logs.date', monthStart)
                 .limit(15),
 
             supabase.from('finances')
-                .select('descricao, valor, tipo, categoria, data')
-                .gte('data', thirtyDaysAgoStr)
-                .order('data', { ascending: false })
-                .limit(30),
+                .select('valor, tipo, categoria')
+                .gte('data', thirtyDaysAgoStr),
 
             supabase.from('projects')
                 .select('titulo, status, cor')
@@ -219,15 +345,36 @@ export async function fetchServerAiContext(supabase) {
                 .select('date, sleep_hours, energy, weight')
                 .gte('date', weekAgoStr)
                 .order('date', { ascending: false }),
+
+            supabase.from('notes')
+                .select('titulo, conteudo')
+                .order('updated_at', { ascending: false })
+                .limit(5),
+
+            supabase.from('diary_entries')
+                .select('data, conteudo')
+                .order('data', { ascending: false })
+                .limit(5),
         ]);
 
+    const rows = res => (res.status === 'fulfilled' ? (res.value.data || []) : []);
+    const tasks = rows(tasksRes);
+    const fin = aggregateFinances(rows(financesRes));
+
     return {
-        tasks:      tasksRes.status      === 'fulfilled' ? (tasksRes.value.data      || []) : [],
-        habits:     habitsRes.status     === 'fulfilled' ? (habitsRes.value.data     || []) : [],
-        finances:   financesRes.status   === 'fulfilled' ? (financesRes.value.data   || []) : [],
-        projects:   projectsRes.status   === 'fulfilled' ? (projectsRes.value.data   || []) : [],
-        reminders:  remindersRes.status  === 'fulfilled' ? (remindersRes.value.data  || []) : [],
-        healthLogs: healthRes.status     === 'fulfilled' ? (healthRes.value.data     || []) : [],
-        today: new Date().toISOString().split('T')[0],
+        today,
+        tasks,
+        overdueTasks: tasks.filter(t => t.status === 'atrasada' || (t.data_prazo && t.data_prazo < today)).length,
+        habits: rows(habitsRes).map(h => ({
+            titulo: h.titulo,
+            icone: h.icone,
+            monthCount: habitDays(h).countMonth(today.slice(0, 7)),
+        })),
+        finance: { ...fin.totals(), topCategories: fin.expenseCategories().slice(0, 3) },
+        projects:   rows(projectsRes),
+        reminders:  rows(remindersRes),
+        healthLogs: rows(healthRes),
+        notes:      rows(notesRes),
+        diary:      rows(diaryRes),
     };
 }
@@ -0,0 +1,61 @@
+/**
+ * api/reminders.js
+ * Cron dos lembretes: envia pelo Telegram os lembretes que vencem agora
+ * (ver api/lib/reminder-dispatch.js). Chamado a cada minuto por um cron
+ * externo, ou pelo Vercel Cron no plano Pro (ver README).
+ *
+ * Env vars: TELEGRAM_BOT_TOKEN, TELEGRAM_REMINDER_CHAT_IDS (ids separados por vírgula),
+ *           ORBIS_TIMEZONE (opcional, padrão America/Sao_Paulo — fuso das datas dos lembretes),
+ *           CRON_SECRET (o Vercel Cron manda Authorization: Bearer <CRON_SECRET>;
+ *           obrigatório se WORKER_SECRET estiver definido, senão o cron leva 401),
+ *           WORKER_SECRET (opcional — para um cron externo, como em api/worker.js)
+ */
+
+import { getSupabase } from './lib/supabase-server.js';
+import { dispatchDueReminders } from './lib/reminder-dispatch.js';
+import { sendTelegramMessage } from './telegram.js';
+
+const DEFAULT_TIMEZONE = 'America/Sao_Paulo';
+
+// Vercel Cron: Bearer CRON_SECRET. Cron externo: o WORKER_SECRET, como em api/worker.js
+function isAuthorized(req) {
+    const cronSecret = process.env.CRON_SECRET;
+    const workerSecret = process.env.WORKER_SECRET;
+    if (!cronSecret && !workerSecret) return true;
+    if (cronSecret && req.headers.authorization === `Bearer ${cronSecret}`) return true;
+    return !!workerSecret
+        && (req.headers['x-worker-secret'] === workerSecret || req.headers.authorization === `Bearer ${workerSecret}`);
+}
+
+export default async function handler(req, res) {
+    if (!isAuthorized(req)) {
+        if (!process.env.CRON_SECRET) console.error('[Reminders] CRON_SECRET ausente: o Vercel Cron não passa pela checagem do WORKER_SECRET.');
+        return res.status(401).json({ error: 'Não autorizado' });
+    }
+
+    const chatIds = (process.env.TELEGRAM_REMINDER_CHAT_IDS || '').split(',').map(s => s.trim()).filter(Boolean);
+    if (chatIds.length === 0 || !process.env.TELEGRAM_BOT_TOKEN) {
+        return res.status(200).json({ ok: true, skipped: 'TELEGRAM_REMINDER_CHAT_IDS ou TELEGRAM_BOT_TOKEN ausente' });
+    }
+
+    try {
+        const stats = await dispatchDueReminders(getSupabase(), {
+            timeZone: process.env.ORBIS_TIMEZONE || DEFAULT_TIMEZONE,
+            // Chats diferentes em paralelo; cada mensagem já agrupa vários lembretes.
+            // Conta como entregue se algum chat recebeu: repetir para todos por causa
+            // de um chat com problema duplicaria o aviso nos outros
+            send: async text => {
+                const results = await Promise.all(chatIds.map(chatId =>
+                    sendTelegramMessage(chatId, text).catch(err => {
+                        console.error(`[Reminders] Falha ao enviar para ${chatId}:`, err);
+                        return false;
+                    })));
+                return results.some(Boolean);
+            },
+        });
+        return res.status(200).json({ ok: true, ...stats });
+    } catch (err) {
+        console.error('[Reminders] Erro no envio de lembretes:', err);
+        return res.status(500).json({ ok: false, error: err.message });
+    }
+}
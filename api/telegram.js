@@ -4,29 +4,39 @@
  * Recebe mensagens, processa comandos diretos ou linguagem natural via Lyra.
  *
  * Env vars: TELEGRAM_BOT_TOKEN, SUPABASE_URL, SUPABASE_SERVICE_KEY,
- *           AI_PROVIDER, AI_API_KEY, AI_MODEL (opcional)
+ *           AI_PROVIDER, AI_API_KEY, AI_MODEL (opcional),
+ *           AI_FALLBACK_PROVIDER, AI_FALLBACK_API_KEY, AI_FALLBACK_MODEL (opcional: rota reserva),
+ *           CONVERSATION_STORE (opcional: 'supabase' persiste o histórico),
+ *           WORKER_SECRET (opcional), JOB_QUEUE (opcional: 'memory' para testes locais)
+ *
+ * O webhook só enfileira o update (api/lib/job-queue.js); o processamento
+ * roda em api/worker.js via processTelegramMessage.
  */
 
-import { getSupabase, listPendingTasks, findTaskByTitle, completeTask, createTask, listHabitsWithTodayStatus, logHabitByTitle, createFinance } from './lib/supabase-server.js';
+import { getSupabase, listPendingTasks, findTaskByTitle, completeTask, createTask, listHabitsWithTodayStatus, logHabitByTitle, createFinance, MIN_MATCH_SCORE } from './lib/supabase-server.js';
 import { fetchServerAiContext } from './lib/supabase-server.js';
-import { buildLiveContextFromSnapshot, buildServerSystemPrompt, callServerAiProvider } from './lib/ai-server.js';
+import { buildLiveContextFromSnapshot, buildServerSystemPrompt, callServerAiProvider, fallbackRoutesFromEnv } from './lib/ai-server.js';
+import { getProviderRouter } from './lib/provider-router.js';
 import { extractActionJsons, removeActionJsons } from './lib/action-parser.js';
-import { executeServerAction } from './lib/action-executor.js';
+import { executeServerActions } from './lib/action-executor.js';
+import { getConversationStore } from './lib/conversation-store.js';
+import { getJobQueue, kickWorker, MAX_ATTEMPTS } from './lib/job-queue.js';
 
 const TELEGRAM_MAX_LENGTH = 4096;
 
 // ── Telegram API ───────────────────────────────────────────────────────────────
 
-async function sendTelegramMessage(chatId, text) {
+/** Envia uma mensagem; resolve true se o Telegram aceitou. */
+export async function sendTelegramMessage(chatId, text) {
     const token = process.env.TELEGRAM_BOT_TOKEN;
-    if (!token) return;
+    if (!token) return false;
 
     // Trunca se exceder limite do Telegram
     const safeText = text.length > TELEGRAM_MAX_LENGTH
         ? text.slice(0, TELEGRAM_MAX_LENGTH - 20) + '\n\n...(truncado)'
         : text;
 
-    await fetch(`https://api.telegram.org/bot${token}/sendMessage`, {
+    const res = await fetch(`https://api.telegram.org/bot${token}/sendMessage`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -34,6 +44,8 @@ async function sendTelegramMessage(chatId, text) {
             text: safeText,
         }),
     });
+    if (!res.ok) console.error(`[Telegram Bot] sendMessage ${res.status} para ${chatId}`);
+    return res.ok;
 }
 
 // ── Slash Commands ─────────────────────────────────────────────────────────────
@@ -57,7 +69,12 @@ async function cmdCompleteTask(searchTerm) {
     const tasks = await findTaskByTitle(supabase, searchTerm);
     if (tasks.length === 0) return `Nenhuma tarefa encontrada com "${searchTerm}".`;
 
+    // Sem confiança suficiente no melhor resultado: pergunta em vez de concluir a errada
     const task = tasks[0];
+    if (task.score < MIN_MATCH_SCORE) {
+        const options = tasks.map((t, i) => `${i + 1}. ${t.titulo}`).join('\n');
+        return `Nao tenho certeza de qual tarefa e "${searchTerm}". Voce quis dizer:\n${options}\n\nUse /concluir com o nome mais completo.`;
+    }
     const ok = await completeTask(supabase, task.id);
     if (!ok) return 'Erro ao concluir tarefa.';
 
@@ -85,7 +102,8 @@ async function cmdListHabits() {
 
     const lines = habits.map(h => {
         const check = h.doneToday ? '✅' : '⬜';
-        return `${check} ${h.icone || '✨'} ${h.titulo} (${h.thisMonth}x este mes)`;
+        const seq = h.streak > 1 ? `, ${h.streak} dias seguidos` : '';
+        return `${check} ${h.icone || '✨'} ${h.titulo} (${h.thisMonth}x este mes${seq})`;
     });
     return `HABITOS DE HOJE:\n\n${lines.join('\n')}`;
 }
@@ -141,6 +159,7 @@ function cmdStatus() {
         'CHAVE_API_SILICONFLOW': !!process.env.CHAVE_API_SILICONFLOW,
         'AI_PROVIDER': process.env.AI_PROVIDER || '(nao definido, default: siliconflow)',
         'AI_MODEL': process.env.AI_MODEL || '(nao definido, usa default)',
+        'AI_FALLBACK_PROVIDER': process.env.AI_FALLBACK_PROVIDER || '(nao definido, sem rota reserva)',
     };
 
     const lines = Object.entries(vars).map(([k, v]) => {
@@ -148,6 +167,12 @@ function cmdStatus() {
         return `ℹ️ ${k}: ${v}`;
     });
 
+    // Latência e circuito por provedor desde que esta instância subiu
+    const providers = Object.entries(getProviderRouter().stats()).map(([name, s]) =>
+        `- ${name}: ${s.count} chamadas | p50 ${s.p50 ?? '-'}ms | p95 ${s.p95 ?? '-'}ms | circuito ${s.breaker.state}`
+    );
+    if (providers.length) lines.push('', 'PROVEDORES DE IA:', ...providers);
+
     return `🔧 STATUS DAS ENV VARS:\n\n${lines.join('\n')}`;
 }
 
@@ -175,30 +200,32 @@ async function handleSlashCommand(text) {
 
 // ── Natural Language Handler ───────────────────────────────────────────────────
 
-async function handleNaturalLanguage(text) {
+async function handleNaturalLanguage(text, chatId, dedupeKey) {
     const provider = process.env.AI_PROVIDER || 'siliconflow';
     const apiKey = process.env.AI_API_KEY || process.env.CHAVE_API_SILICONFLOW;
     if (!apiKey) return 'Bot nao configurado: chave de IA ausente.';
 
     const supabase = getSupabase();
-    const snapshot = await fetchServerAiContext(supabase);
+    const store = getConversationStore('telegram', supabase);
+    const userMsg = { role: 'user', content: text };
+    const [history, snapshot] = await Promise.all([
+        store.load(chatId),
+        fetchServerAiContext(supabase, { userKey: String(chatId) }),
+    ]);
     const contextBlock = buildLiveContextFromSnapshot(snapshot);
     const systemPrompt = buildServerSystemPrompt(contextBlock);
 
     const aiResponse = await callServerAiProvider(
         provider,
-        [{ role: 'user', content: text }],
+        [...history, userMsg],
         apiKey,
-        { model: process.env.AI_MODEL || undefined, systemPrompt }
+        { model: process.env.AI_MODEL || undefined, systemPrompt, fallbacks: fallbackRoutesFromEnv(provider) }
     );
 
     // Parse e executa ações
     const actions = extractActionJsons(aiResponse);
-    const results = [];
-    for (const action of actions) {
-        const result = await executeServerAction(supabase, action);
-        if (result) results.push(result);
-    }
+    // Todas de uma vez (uma transação); dedupeKey evita linhas duplicadas se o job repetir
+    const results = (await executeServerActions(supabase, actions, { dedupeKey })).filter(Boolean);
 
     // Limpa resposta
     let clean = removeActionJsons(aiResponse)
@@ -208,39 +235,65 @@ async function handleNaturalLanguage(text) {
         .replace(/#{1,6}\s+/g, '')
         .trim();
 
-    if (results.length > 0) {
-        clean += '\n\n' + results.join('\n');
-    }
+    // Histórico guarda só a fala da Lyra; os resultados das ações vão junto
+    // para a IA saber o que de fato foi executado
+    const reply = results.length > 0 ? `${clean}\n\n${results.join('\n')}`.trim() : clean;
+    if (reply) await store.append(chatId, [userMsg, { role: 'assistant', content: reply }]);
 
-    return clean || 'Sem resposta da IA.';
+    return reply || 'Sem resposta da IA.';
+}
+
+// ── Processamento (roda no worker) ─────────────────────────────────────────────
+
+/**
+ * Job da fila: responde uma mensagem. Chamado por api/worker.js.
+ * Falha antes da resposta propaga, para a fila tentar de novo com backoff; só
+ * na última tentativa (ou sem fila, no caminho inline) o erro vai para o chat.
+ */
+export async function processTelegramMessage({ chatId, text }, job) {
+    const lastAttempt = !job?.attempts || job.attempts >= MAX_ATTEMPTS;
+    let reply;
+    try {
+        if (text.startsWith('/')) {
+            reply = await handleSlashCommand(text);
+        } else {
+            reply = await handleNaturalLanguage(text, chatId, job?.idempotency_key);
+        }
+    } catch (err) {
+        if (!lastAttempt) throw err;
+        console.error('[Telegram Bot] Error:', err);
+        reply = `Erro: ${err.message || 'Algo deu errado.'}`;
+    }
+    // A resposta já foi gerada (e as ações executadas): falha no envio não refaz o job
+    await sendTelegramMessage(chatId, reply)
+        .catch(err => console.error('[Telegram Bot] Falha ao enviar resposta:', err));
 }
 
 // ── Main Handler ───────────────────────────────────────────────────────────────
+// Só valida e enfileira: a resposta ao Telegram sai em milissegundos, então ele
+// não retenta por timeout. update_id é a chave de idempotência do job.
 
 export default async function handler(req, res) {
     if (req.method !== 'POST') {
         return res.status(405).json({ error: 'Method not allowed' });
     }
 
-    const { message } = req.body || {};
+    const update = req.body || {};
+    const { message } = update;
     if (!message || !message.text) {
         return res.status(200).json({ ok: true });
     }
 
-    const chatId = message.chat.id;
-    const text = message.text.trim();
+    const payload = { chatId: message.chat.id, text: message.text.trim() };
+    const idempotencyKey = `telegram:${update.update_id ?? `${message.chat.id}:${message.message_id}`}`;
 
     try {
-        let reply;
-        if (text.startsWith('/')) {
-            reply = await handleSlashCommand(text);
-        } else {
-            reply = await handleNaturalLanguage(text);
-        }
-        await sendTelegramMessage(chatId, reply);
+        const { enqueued } = await getJobQueue().enqueue({ idempotencyKey, channel: 'telegram', payload });
+        if (enqueued) await kickWorker(req, { telegram: processTelegramMessage });
     } catch (err) {
-        console.error('[Telegram Bot] Error:', err);
-        await sendTelegramMessage(chatId, `Erro: ${err.message || 'Algo deu errado.'}`);
+        // Fila indisponível (ex: tabela bot_jobs ainda não criada): processa inline
+        console.error('[Telegram Bot] Fila indisponível, processando inline:', err);
+        await processTelegramMessage(payload, { idempotency_key: idempotencyKey });
     }
 
     return res.status(200).json({ ok: true });
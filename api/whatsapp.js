@@ -7,112 +7,45 @@
  *   WHATSAPP_TOKEN          — token de acesso permanente gerado no Meta for Developers
  *   WHATSAPP_PHONE_NUMBER_ID — ID do número de telefone no Meta for Developers
  *   GEMINI_API_KEY          — chave da API do Gemini
+ *   AI_FALLBACK_PROVIDER    — (opcional) rota reserva, com AI_FALLBACK_API_KEY e AI_FALLBACK_MODEL
  *   SUPABASE_URL            — URL do seu projeto Supabase
  *   SUPABASE_ANON_KEY       — chave anon do Supabase
+ *   CONVERSATION_STORE      — 'supabase' para persistir o histórico (padrão: memória)
+ *   WORKER_SECRET           — (opcional) protege /api/worker
+ *
+ * O webhook só enfileira a mensagem (api/lib/job-queue.js); o processamento
+ * roda em api/worker.js via processWhatsAppMessage.
  */
 
 import { createClient } from '@supabase/supabase-js';
-
-// Histórico em memória (limpo em cold starts — aceitável para uso pessoal)
-const conversationCache = new Map();
-const MAX_HISTORY = 20;
+import { fetchServerAiContext } from './lib/supabase-server.js';
+import { buildLiveContextFromSnapshot, callServerAiProvider, fallbackRoutesFromEnv } from './lib/ai-server.js';
+import { extractActionJsons, removeActionJsons } from './lib/action-parser.js';
+import { executeServerActions } from './lib/action-executor.js';
+import { getConversationStore } from './lib/conversation-store.js';
+import { getJobQueue, kickWorker } from './lib/job-queue.js';
 
 // ── Supabase ──────────────────────────────────────────────────────────────────
 
+let _supabase = null;
+
 function getSupabase() {
+    if (_supabase) return _supabase;
     const url = process.env.SUPABASE_URL;
     const key = process.env.SUPABASE_ANON_KEY;
     if (!url || !key) return null;
-    return createClient(url, key);
+    _supabase = createClient(url, key);
+    return _supabase;
 }
 
 // ── Contexto vivo ─────────────────────────────────────────────────────────────
+// Mesmo snapshot (e mesmo cache por instância quente) do bot do Telegram
 
-async function buildLiveContext(supabase) {
+async function buildLiveContext(supabase, from) {
     if (!supabase) return '';
     try {
-        const today = new Date().toISOString().split('T')[0];
-        const thirtyDaysAgo = new Date(Date.now() - 30 * 86400000).toISOString().split('T')[0];
-        const sevenDaysAgo = new Date(Date.now() - 7 * 86400000).toISOString().split('T')[0];
-
-        const [tasks, projects, reminders, finances, habits, healthLogs, notes, diary] = await Promise.all([
-            supabase.from('tasks').select('titulo,status,prioridade,data_prazo').eq('status', 'pendente').limit(10),
-            supabase.from('projects').select('titulo,status').eq('status', 'ativo').limit(5),
-            supabase.from('reminders').select('titulo,importancia,data_hora').gte('data_hora', new Date().toISOString()).limit(5),
-            supabase.from('finances').select('descricao,valor,tipo,categoria').gte('data', thirtyDaysAgo).limit(50),
-            supabase.from('habits').select('titulo,icone,habit_logs(date)').limit(10),
-            supabase.from('health_logs').select('date,sleep_hours,energy,weight').gte('date', sevenDaysAgo).order('date', { ascending: false }),
-            supabase.from('notes').select('titulo,conteudo').order('updated_at', { ascending: false }).limit(5),
-            supabase.from('diary_entries').select('data,conteudo').order('data', { ascending: false }).limit(3),
-        ]);
-
-        const lines = [];
-
-        if (tasks.data?.length > 0) {
-            lines.push('MISSÕES ATIVAS:');
-            tasks.data.forEach(t => {
-                const prazo = t.data_prazo ? ` | prazo ${t.data_prazo}` : '';
-                lines.push(`- [${(t.prioridade || 'media').toUpperCase()}] ${t.titulo} — ${t.status}${prazo}`);
-            });
-        }
-
-        if (projects.data?.length > 0) {
-            lines.push('PROJETOS EM CURSO:');
-            projects.data.forEach(p => lines.push(`- ${p.titulo} (${p.status})`));
-        }
-
-        if (reminders.data?.length > 0) {
-            lines.push('LEMBRETES PENDENTES:');
-            reminders.data.forEach(r => {
-                const dt = r.data_hora ? ` — ${new Date(r.data_hora).toLocaleString('pt-BR')}` : '';
-                lines.push(`- [${(r.importancia || 'media').toUpperCase()}] ${r.titulo}${dt}`);
-            });
-        }
-
-        if (finances.data?.length > 0) {
-            const receitas = finances.data.filter(f => f.tipo === 'receita').reduce((s, f) => s + Number(f.valor), 0);
-            const despesas = finances.data.filter(f => f.tipo === 'despesa').reduce((s, f) => s + Number(f.valor), 0);
-            lines.push(`FINANÇAS (últimos 30 dias): receitas R$${receitas.toFixed(2)} | despesas R$${despesas.toFixed(2)} | saldo R$${(receitas - despesas).toFixed(2)}`);
-        }
-
-        if (habits.data?.length > 0) {
-            lines.push('HÁBITOS:');
-            const monthPrefix = today.slice(0, 7);
-            habits.data.forEach(h => {
-                const thisMonth = (h.habit_logs || []).filter(l => l.date?.startsWith(monthPrefix)).length;
-                lines.push(`- ${h.icone || '✨'} ${h.titulo}: ${thisMonth} vezes este mês`);
-            });
-        }
-
-        if (healthLogs.data?.length > 0) {
-            lines.push('SAÚDE (últimos 7 dias):');
-            healthLogs.data.forEach(l => {
-                const parts = [];
-                if (l.sleep_hours != null) parts.push(`sono ${l.sleep_hours}h`);
-                if (l.energy != null) parts.push(`energia ${l.energy}/5`);
-                if (l.weight != null) parts.push(`peso ${l.weight}kg`);
-                if (parts.length) lines.push(`- ${l.date}: ${parts.join(' | ')}`);
-            });
-        }
-
-        if (notes.data?.length > 0) {
-            lines.push('NOTAS DO CADERNO:');
-            notes.data.forEach(n => {
-                const preview = (n.conteudo || '').slice(0, 120).replace(/\n/g, ' ');
-                lines.push(`- "${n.titulo}": ${preview || '(sem conteúdo)'}`);
-            });
-        }
-
-        if (diary.data?.length > 0) {
-            lines.push('DIÁRIO (entradas recentes):');
-            diary.data.forEach(d => {
-                const preview = (d.conteudo || '').slice(0, 150).replace(/\n/g, ' ');
-                lines.push(`- ${d.data}: ${preview || '(vazio)'}`);
-            });
-        }
-
-        if (lines.length === 0) return '';
-        return '\n\n[DADOS REAIS DO CAÇADOR — ATUALIZADO AGORA]:\n' + lines.join('\n');
+        const snap = await fetchServerAiContext(supabase, { userKey: from });
+        return buildLiveContextFromSnapshot(snap);
     } catch (e) {
         console.error('[WhatsApp] Erro ao buscar contexto:', e);
         return '';
@@ -158,91 +91,14 @@ Data atual: ${new Date().toISOString().split('T')[0]}`;
 }
 
 // ── Gemini ────────────────────────────────────────────────────────────────────
+// Mesmo router do Telegram (keep-alive, prazo, failover, circuit breaker)
 
 async function callGemini(messages, apiKey, liveContext) {
-    const url = `https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key=${apiKey}`;
-
-    const history = messages.slice(0, -1).map(msg => ({
-        role: msg.tipo === 'usuario' ? 'user' : 'model',
-        parts: [{ text: msg.mensagem }]
-    }));
-    const currentMessage = messages[messages.length - 1].mensagem;
-
-    const response = await fetch(url, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-            contents: [...history, { role: 'user', parts: [{ text: currentMessage }] }],
-            systemInstruction: { parts: [{ text: getSystemPrompt() + liveContext }] },
-            generationConfig: { temperature: 0.7, topK: 40, topP: 0.95, maxOutputTokens: 2048 }
-        })
+    return callServerAiProvider('gemini', messages, apiKey, {
+        model: 'gemini-2.0-flash',
+        systemPrompt: getSystemPrompt() + liveContext,
+        fallbacks: fallbackRoutesFromEnv('gemini'),
     });
-
-    if (!response.ok) {
-        const err = await response.json();
-        throw new Error(err.error?.message || 'Erro no Gemini');
-    }
-    const data = await response.json();
-    return data.candidates[0].content.parts[0].text;
-}
-
-// ── Ações no Supabase ─────────────────────────────────────────────────────────
-
-async function executeAction(actionData, supabase) {
-    if (!supabase) return false;
-    const { action, data } = actionData;
-    const id = Date.now().toString();
-    const now = new Date().toISOString();
-
-    try {
-        switch (action) {
-            case 'CREATE_TASK':
-                await supabase.from('tasks').insert({
-                    id, titulo: data.titulo, status: 'pendente',
-                    prioridade: data.prioridade || 'media',
-                    data_prazo: data.dataPrazo || null,
-                    created_at: now, updated_at: now
-                });
-                return true;
-            case 'CREATE_HABIT':
-                await supabase.from('habits').insert({
-                    id, titulo: data.titulo, descricao: data.descricao || '',
-                    icone: data.icone || '✨', meta_mensal: data.metaMensal || 30,
-                    created_at: now, updated_at: now
-                });
-                return true;
-            case 'CREATE_REMINDER':
-                await supabase.from('reminders').insert({
-                    id, titulo: data.titulo, descricao: data.descricao || '',
-                    importancia: data.importancia || 'media',
-                    data_hora: data.dataHora || null,
-                    created_at: now, updated_at: now
-                });
-                return true;
-            case 'CREATE_FINANCE':
-                await supabase.from('finances').insert({
-                    id, descricao: data.descricao,
-                    valor: Math.abs(Number(data.valor)),
-                    tipo: data.tipo, categoria: data.categoria || 'outros',
-                    data: data.data || new Date().toISOString().split('T')[0],
-                    created_at: now, updated_at: now
-                });
-                return true;
-            case 'CREATE_PROJECT':
-                await supabase.from('projects').insert({
-                    id, titulo: data.titulo, descricao: data.descricao || '',
-                    cor: data.cor || '#06b6d4', status: 'ativo',
-                    created_at: now, updated_at: now
-                });
-                return true;
-            default:
-                console.warn('[WhatsApp] Ação desconhecida:', action);
-                return false;
-        }
-    } catch (e) {
-        console.error('[WhatsApp] Erro ao executar ação:', action, e);
-        return false;
-    }
 }
 
 // ── Envio via WhatsApp ────────────────────────────────────────────────────────
@@ -274,6 +130,62 @@ async function sendWhatsAppMessage(to, text) {
     }
 }
 
+// ── Processamento (roda no worker) ───────────────────────────────────────────
+
+/**
+ * Job da fila: responde uma mensagem. Chamado por api/worker.js.
+ * Falha antes de qualquer efeito (contexto, Gemini) propaga e o job volta à
+ * fila; depois que as ações rodaram, erros só são registrados — repetir o job
+ * duplicaria as ações.
+ */
+export async function processWhatsAppMessage({ from, text }, job) {
+    const apiKey = process.env.GEMINI_API_KEY;
+    if (!apiKey) {
+        console.error('[WhatsApp] GEMINI_API_KEY não configurada.');
+        return;
+    }
+
+    // Histórico de conversa + contexto vivo do Supabase
+    const supabase = getSupabase();
+    const store = getConversationStore('whatsapp', supabase);
+    const userMsg = { role: 'user', content: text };
+    const [history, liveContext] = await Promise.all([
+        store.load(from),
+        buildLiveContext(supabase, from),
+    ]);
+    const messages = [...history, userMsg];
+
+    // Chama Gemini
+    const responseText = await callGemini(messages, apiKey, liveContext);
+
+    try {
+        // Detecta e executa ações JSON (executor compartilhado com o Telegram:
+        // uma transação por mensagem, ids derivados da chave do job)
+        if (supabase) {
+            const actions = extractActionJsons(responseText).filter(a => a.action !== 'SEARCH_INTERNET');
+            await executeServerActions(supabase, actions, { dedupeKey: job?.idempotency_key });
+        }
+
+        // Limpa resposta
+        let cleanResponse = removeActionJsons(responseText)
+            .replace(/```json[\s\S]*?```/g, '')
+            .replace(/```[\s\S]*?```/g, '')
+            .replace(/\*/g, '')
+            .replace(/#{1,6}\s+/g, '')
+            .trim();
+
+        if (!cleanResponse) cleanResponse = 'Não consegui processar sua mensagem. Tente novamente.';
+
+        // Atualiza histórico (a store corta ao orçamento de tokens)
+        await store.append(from, [userMsg, { role: 'assistant', content: cleanResponse }]);
+
+        // Envia resposta
+        await sendWhatsAppMessage(from, cleanResponse);
+    } catch (e) {
+        console.error('[WhatsApp] Erro ao concluir resposta:', e);
+    }
+}
+
 // ── Handler principal ─────────────────────────────────────────────────────────
 
 export default async function handler(req, res) {
@@ -293,7 +205,8 @@ export default async function handler(req, res) {
 
     // ── Mensagens recebidas (POST) ────────────────────────────────────────────
     if (req.method === 'POST') {
-        // Meta exige resposta 200 em até 20s para não retentar
+        // Meta exige resposta 200 em até 20s para não retentar: só valida e
+        // enfileira; o id da mensagem é a chave de idempotência do job
         try {
             const body = req.body;
             const message = body?.entry?.[0]?.changes?.[0]?.value?.messages?.[0];
@@ -307,59 +220,19 @@ export default async function handler(req, res) {
             const text = message.text?.body?.trim();
             if (!text) return res.status(200).json({ status: 'empty' });
 
-            const apiKey = process.env.GEMINI_API_KEY;
-            if (!apiKey) {
-                console.error('[WhatsApp] GEMINI_API_KEY não configurada.');
-                return res.status(200).json({ status: 'misconfigured' });
+            const payload = { from, text };
+            const idempotencyKey = `whatsapp:${message.id}`;
+            try {
+                const { enqueued } = await getJobQueue().enqueue({ idempotencyKey, channel: 'whatsapp', payload });
+                if (!enqueued) return res.status(200).json({ status: 'duplicate' });
+                await kickWorker(req, { whatsapp: processWhatsAppMessage });
+            } catch (err) {
+                // Fila indisponível (ex: tabela bot_jobs ainda não criada): processa inline
+                console.error('[WhatsApp] Fila indisponível, processando inline:', err);
+                await processWhatsAppMessage(payload, { idempotency_key: idempotencyKey });
             }
 
-            // Histórico de conversa
-            const history = conversationCache.get(from) || [];
-            const userMsg = { tipo: 'usuario', mensagem: text };
-            const messages = [...history, userMsg].slice(-MAX_HISTORY);
-
-            // Contexto vivo do Supabase
-            const supabase = getSupabase();
-            const liveContext = await buildLiveContext(supabase);
-
-            // Chama Gemini
-            let responseText = await callGemini(messages, apiKey, liveContext);
-
-            // Detecta e executa ação JSON
-            const jsonMatch = responseText.match(/\{[\s\S]*\}/);
-            if (jsonMatch) {
-                try {
-                    const actionData = JSON.parse(jsonMatch[0].trim());
-                    if (actionData.action && actionData.action !== 'SEARCH_INTERNET') {
-                        await executeAction(actionData, supabase);
-                    }
-                } catch {
-                    console.warn('[WhatsApp] Falha ao parsear JSON da ação.');
-                }
-            }
-
-            // Limpa resposta
-            let cleanResponse = responseText;
-            if (jsonMatch) cleanResponse = cleanResponse.replace(jsonMatch[0], '');
-            cleanResponse = cleanResponse
-                .replace(/```json[\s\S]*?```/g, '')
-                .replace(/```[\s\S]*?```/g, '')
-                .replace(/\*/g, '')
-                .replace(/#{1,6}\s+/g, '')
-                .trim();
-
-            if (!cleanResponse) cleanResponse = 'Não consegui processar sua mensagem. Tente novamente.';
-
-            // Atualiza histórico
-            conversationCache.set(from, [
-                ...messages,
-                { tipo: 'ia', mensagem: cleanResponse }
-            ].slice(-MAX_HISTORY));
-
-            // Envia resposta
-            await sendWhatsAppMessage(from, cleanResponse);
-
-            return res.status(200).json({ status: 'ok' });
+            return res.status(200).json({ status: 'queued' });
         } catch (e) {
             console.error('[WhatsApp] Erro no handler:', e);
             // Ainda retorna 200 para evitar retentativas da Meta
@@ -0,0 +1,51 @@
+/**
+ * api/worker.js
+ * Worker da fila de jobs dos webhooks (ver api/lib/job-queue.js).
+ * Acordado por /api/telegram e /api/whatsapp logo após enfileirar; um cron a
+ * cada minuto (externo, ou o Vercel Cron no plano Pro — ver README) recolhe
+ * jobs de kicks perdidos e os que estavam em backoff.
+ *
+ * Env vars: WORKER_SECRET (opcional — aceito no header x-worker-secret ou
+ *           como Authorization: Bearer <secret>),
+ *           CRON_SECRET (opcional — o Vercel Cron manda Authorization: Bearer
+ *           <CRON_SECRET>; obrigatório junto com WORKER_SECRET para o cron passar).
+ *           Sem nenhum dos dois o endpoint fica aberto; com qualquer um, exige-o.
+ *           WORKER_CONCURRENCY (opcional, padrão 4)
+ */
+
+import { getJobQueue, drainQueue } from './lib/job-queue.js';
+import { processTelegramMessage } from './telegram.js';
+import { processWhatsAppMessage } from './whatsapp.js';
+
+const HANDLERS = {
+    telegram: processTelegramMessage,
+    whatsapp: processWhatsAppMessage,
+};
+
+// Vercel Cron: Bearer CRON_SECRET. Kick dos webhooks e cron externo: o WORKER_SECRET
+function isAuthorized(req) {
+    const cronSecret = process.env.CRON_SECRET;
+    const workerSecret = process.env.WORKER_SECRET;
+    if (!cronSecret && !workerSecret) return true;
+    if (cronSecret && req.headers.authorization === `Bearer ${cronSecret}`) return true;
+    return !!workerSecret
+        && (req.headers['x-worker-secret'] === workerSecret || req.headers.authorization === `Bearer ${workerSecret}`);
+}
+
+export default async function handler(req, res) {
+    const startedAt = Date.now();
+    if (!isAuthorized(req)) {
+        return res.status(401).json({ error: 'Não autorizado' });
+    }
+
+    try {
+        const stats = await drainQueue(getJobQueue(), HANDLERS, {
+            startedAt,
+            concurrency: Number(process.env.WORKER_CONCURRENCY) || 4,
+        });
+        return res.status(200).json({ ok: true, ...stats });
+    } catch (err) {
+        console.error('[Worker] Erro ao drenar fila:', err);
+        return res.status(500).json({ ok: false, error: err.message });
+    }
+}
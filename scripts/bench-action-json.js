@@ -0,0 +1,86 @@
+/**
+ * bench-action-json.js
+ * Micro-benchmark do extrator de JSONs de ação (src/utils/actionJson.js)
+ * contra a implementação anterior (busca do marcador + varredura por chaves a
+ * partir de cada ocorrência), em respostas de modelo de alguns KB.
+ *
+ * Uso: node scripts/bench-action-json.js
+ */
+
+import { extractActionJsons, createActionJsonScanner } from '../src/utils/actionJson.js';
+
+// Implementação anterior (copiada das páginas), como referência
+function legacyExtract(text) {
+    const spans = [];
+    const marker = /\{\s*"action"\s*:/g;
+    let match;
+    while ((match = marker.exec(text)) !== null) {
+        const start = match.index;
+        let depth = 0, j = start;
+        while (j < text.length) {
+            if (text[j] === '{') depth++;
+            else if (text[j] === '}') {
+                depth--;
+                if (depth === 0) { spans.push([start, j + 1]); break; }
+            }
+            j++;
+        }
+    }
+    return spans.map(([s, e]) => {
+        try { return JSON.parse(text.slice(s, e)); } catch { return null; }
+    }).filter(Boolean);
+}
+
+const PROSE = 'Entendi, Caçador. Organizei o que você pediu e deixei tudo pronto no sistema — '
+    + 'qualquer ajuste, é só falar. Lembre de revisar as prioridades da semana. ';
+
+function typicalOutput(kb) {
+    let out = '';
+    let n = 0;
+    while (out.length < kb * 1024) {
+        out += PROSE.repeat(3) + '\n```json\n'
+            + JSON.stringify({ action: 'CREATE_TASK', data: { titulo: `Tarefa ${n++} {com chaves}`, prioridade: 'media', dataPrazo: '2025-01-01' } })
+            + '\n```\n';
+    }
+    return out;
+}
+
+// Pior caso da versão anterior: muitos marcadores sem fechamento (ex: resposta truncada)
+function unclosedOutput(kb) {
+    let out = '';
+    while (out.length < kb * 1024) out += '{"action": "CREATE_TASK", "data": {"titulo": "x" ';
+    return out;
+}
+
+function bench(label, fn, text, minMs = 300) {
+    fn(text); // aquecimento
+    let runs = 0;
+    const t0 = process.hrtime.bigint();
+    let elapsed = 0;
+    while (elapsed < minMs) {
+        fn(text);
+        runs++;
+        elapsed = Number(process.hrtime.bigint() - t0) / 1e6;
+    }
+    const perRun = elapsed / runs;
+    console.log(`  ${label.padEnd(28)} ${(perRun * 1000).toFixed(1).padStart(10)} µs/run  ${((text.length / 1024) / (perRun / 1000) / 1024).toFixed(1).padStart(8)} MB/s`);
+}
+
+function streamed(text) {
+    const scanner = createActionJsonScanner();
+    for (let i = 0; i < text.length; i += 16) scanner.push(text.slice(i, i + 16));
+    scanner.end();
+    return scanner.actions;
+}
+
+for (const kb of [2, 8, 32]) {
+    const typical = typicalOutput(kb);
+    const unclosed = unclosedOutput(kb);
+    console.log(`\n${kb} KB — resposta típica (${extractActionJsons(typical).length} ações)`);
+    bench('anterior', legacyExtract, typical);
+    bench('scanner (texto inteiro)', extractActionJsons, typical);
+    bench('scanner (pedaços de 16)', streamed, typical);
+    console.log(`${kb} KB — marcadores sem fechamento`);
+    bench('anterior', legacyExtract, unclosed);
+    bench('scanner (texto inteiro)', extractActionJsons, unclosed);
+}
@@ -0,0 +1,65 @@
+/**
+ * bench-search-index.js
+ * Micro-benchmark do índice da busca local (src/utils/searchIndex.js):
+ * construção com 50k registros, tempo por consulta (top-8) e atualização
+ * incremental, contra a varredura linear com includes() usada antes no SearchOverlay.
+ *
+ * Uso: node scripts/bench-search-index.js [registros]
+ */
+
+import { createSearchIndex, foldText } from '../src/utils/searchIndex.js';
+
+const N = Number(process.argv[2]) || 50000;
+
+const COMMON = ['mercado', 'uber', 'aluguel', 'farmácia', 'padaria', 'restaurante', 'gasolina', 'academia',
+    'curso', 'inglês', 'café', 'salário', 'netflix', 'luz', 'água', 'internet', 'médico', 'viagem', 'roupa', 'presente'];
+const SYLLABLES = ['ca', 'pa', 'ro', 'le', 'mi', 'to', 'sa', 'ne', 'vi', 'du', 'ra', 'go', 'te', 'li', 'mo', 'ção'];
+
+// PRNG determinístico (mulberry32): mesmas entradas a cada execução
+let seed = 42;
+const rnd = n => {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) % n;
+};
+const word = () => rnd(3) === 0
+    ? COMMON[rnd(COMMON.length)]
+    : Array.from({ length: 2 + rnd(3) }, () => SYLLABLES[rnd(SYLLABLES.length)]).join('');
+const phrase = n => Array.from({ length: n }, word).join(' ');
+
+const docs = Array.from({ length: N }, (_, i) => {
+    const kind = i % 10;
+    if (kind < 6) return { key: `orbis_finances:${i}`, source: 'orbis_finances', title: phrase(2), body: COMMON[rnd(COMMON.length)] };
+    if (kind < 8) return { key: `orbis_tasks:${i}`, source: 'orbis_tasks', title: phrase(4), body: phrase(6) };
+    return { key: `orbis_notes:${i}`, source: 'orbis_notes', title: phrase(3), body: phrase(60) };
+});
+
+// Implementação anterior: filter + includes() no título de todos os itens, depois slice
+function linearSearch(query, k) {
+    const q = query.toLowerCase();
+    return docs.filter(d => d.title.toLowerCase().includes(q)).slice(0, k);
+}
+
+function time(fn, runs = 200) {
+    for (let i = 0; i < 10; i++) fn();
+    const t0 = process.hrtime.bigint();
+    for (let i = 0; i < runs; i++) fn();
+    return Number(process.hrtime.bigint() - t0) / 1e6 / runs;
+}
+
+const index = createSearchIndex();
+const t0 = process.hrtime.bigint();
+index.apply(docs);
+console.log(`${N} registros — construção: ${(Number(process.hrtime.bigint() - t0) / 1e6).toFixed(0)} ms`);
+
+console.log('\nconsulta            índice (top-8)    includes() linear   resultados');
+for (const q of ['m', 'me', 'merc', 'mercado', 'ingles', 'farmacia padaria', 'cara', 'zzz']) {
+    const ms = time(() => index.search(q, 8));
+    const linear = time(() => linearSearch(foldText(q), 8), 20);
+    console.log(`  ${q.padEnd(18)} ${ms.toFixed(3).padStart(8)} ms ${linear.toFixed(3).padStart(14)} ms ${String(index.search(q, 8).length).padStart(8)}`);
+}
+
+const edits = Array.from({ length: 1000 }, (_, i) => ({ ...docs[i * 7], title: phrase(2) }));
+const tEdit = time(() => index.apply(edits.slice(0, 100)), 20) / 100;
+console.log(`\natualização incremental: ${(tEdit * 1000).toFixed(1)} µs por registro`);
@@ -0,0 +1,64 @@
+/**
+ * bundle-report.js
+ * Plugin do Vite que mede o JS inicial de cada página após o build.
+ *
+ * - "inicial": chunk de entrada + tudo que ele importa estaticamente
+ *   (o que o navegador baixa antes da tela de login aparecer).
+ * - por página: o que abrir a página acrescenta ao inicial — o chunk lazy
+ *   da página mais seus imports estáticos que ainda não estavam carregados.
+ *
+ * Grava dist/bundle-report.json (bytes brutos e gzip) e imprime uma tabela.
+ * Comparar o JSON entre builds mostra regressões de tamanho por rota.
+ */
+
+import { gzipSync } from 'node:zlib';
+
+function staticClosure(bundle, fileName, seen = new Set()) {
+    if (seen.has(fileName)) return seen;
+    const chunk = bundle[fileName];
+    if (!chunk || chunk.type !== 'chunk') return seen;
+    seen.add(fileName);
+    chunk.imports.forEach(dep => staticClosure(bundle, dep, seen));
+    return seen;
+}
+
+function measure(bundle, files) {
+    let raw = 0, gzip = 0;
+    for (const f of files) {
+        const code = bundle[f].code;
+        raw += Buffer.byteLength(code);
+        gzip += gzipSync(code).length;
+    }
+    return { raw, gzip, chunks: files.length };
+}
+
+const kb = n => `${(n / 1024).toFixed(1)} kB`;
+
+export function bundleReport() {
+    return {
+        name: 'orbis-bundle-report',
+        apply: 'build',
+        generateBundle(_options, bundle) {
+            const entry = Object.values(bundle).find(c => c.type === 'chunk' && c.isEntry);
+            if (!entry) return;
+            const initialFiles = staticClosure(bundle, entry.fileName);
+            const report = { initial: measure(bundle, [...initialFiles]), pages: {} };
+
+            Object.values(bundle)
+                .filter(c => c.type === 'chunk' && c.isDynamicEntry && /\/src\/pages\/\w+Page\.jsx$/.test(c.facadeModuleId || ''))
+                .forEach(c => {
+                    const page = c.facadeModuleId.match(/(\w+Page)\.jsx$/)[1];
+                    const extra = [...staticClosure(bundle, c.fileName)].filter(f => !initialFiles.has(f));
+                    report.pages[page] = measure(bundle, extra);
+                });
+
+            this.emitFile({ type: 'asset', fileName: 'bundle-report.json', source: JSON.stringify(report, null, 2) });
+
+            const rows = [['inicial', report.initial], ...Object.entries(report.pages).sort((a, b) => b[1].gzip - a[1].gzip)];
+            console.log('\n[bundle-report] JS por rota (gzip / bruto / chunks):');
+            rows.forEach(([name, m]) => {
+                console.log(`  ${name.padEnd(20)} ${kb(m.gzip).padStart(10)} ${kb(m.raw).padStart(11)} ${String(m.chunks).padStart(4)}`);
+            });
+        },
+    };
+}
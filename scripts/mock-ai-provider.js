@@ -0,0 +1,138 @@
+/**
+ * mock-ai-provider.js
+ * Servidor HTTP local que imita os provedores de IA (Gemini generateContent e
+ * /chat/completions OpenAI-compatível) com latência e status configuráveis por
+ * provedor — para exercitar api/lib/provider-router.js sem rede nem chave.
+ *
+ * Uso:
+ *   node scripts/mock-ai-provider.js            roda os cenários (hedging,
+ *                                               failover, circuit breaker, prazo)
+ *   node scripts/mock-ai-provider.js --serve    só sobe o servidor na porta 8787
+ *
+ * Com --serve, aponte o bot para ele:
+ *   AI_BASE_URL_SILICONFLOW=http://127.0.0.1:8787/siliconflow
+ *   AI_BASE_URL_GEMINI=http://127.0.0.1:8787/gemini
+ * e mude o comportamento em tempo real:
+ *   curl -X POST 'http://127.0.0.1:8787/_mock/siliconflow?latency=9000&status=200'
+ */
+
+import http from 'node:http';
+import { createProviderRouter } from '../api/lib/provider-router.js';
+
+export function startMockAiServer({ port = 0, behaviors = {} } = {}) {
+    const hits = {};
+
+    const server = http.createServer((req, res) => {
+        const url = new URL(req.url, 'http://mock');
+        const [, provider] = url.pathname.split('/');
+
+        if (provider === '_mock') {
+            const name = url.pathname.split('/')[2];
+            behaviors[name] = {
+                latency: Number(url.searchParams.get('latency')) || 0,
+                status: Number(url.searchParams.get('status')) || 200,
+            };
+            res.writeHead(204).end();
+            return;
+        }
+
+        let body = '';
+        req.on('data', c => { body += c; });
+        req.on('end', () => {
+            hits[provider] = (hits[provider] || 0) + 1;
+            const { latency = 50, status = 200, retryAfter } = behaviors[provider] || {};
+            const timer = setTimeout(() => {
+                const headers = { 'Content-Type': 'application/json', ...(retryAfter && { 'Retry-After': String(retryAfter) }) };
+                if (status !== 200) {
+                    res.writeHead(status, headers).end(JSON.stringify({ error: { message: `mock ${provider} ${status}` } }));
+                    return;
+                }
+                const text = `resposta de ${provider}`;
+                const payload = url.pathname.includes(':generateContent')
+                    ? { candidates: [{ content: { parts: [{ text }] } }] }
+                    : { choices: [{ message: { content: text } }] };
+                res.writeHead(200, headers).end(JSON.stringify(payload));
+            }, latency);
+            // Cliente desistiu (hedging/prazo): não responde
+            res.on('close', () => clearTimeout(timer));
+        });
+    });
+
+    return new Promise(resolve => {
+        server.listen(port, '127.0.0.1', () => {
+            const { port: actual } = server.address();
+            resolve({
+                url: `http://127.0.0.1:${actual}`,
+                behaviors,
+                hits,
+                close: () => new Promise(r => { server.closeAllConnections(); server.close(r); }),
+            });
+        });
+    });
+}
+
+// ── Cenários ───────────────────────────────────────────────────────────────────
+
+function buildRequest(baseUrl) {
+    return route => ({
+        url: route.provider === 'gemini'
+            ? `${baseUrl}/gemini/models/test:generateContent?key=${route.apiKey}`
+            : `${baseUrl}/${route.provider}/chat/completions`,
+        body: { messages: [{ role: 'user', content: 'oi' }] },
+        parse: data => data.candidates?.[0].content.parts[0].text ?? data.choices[0].message.content,
+    });
+}
+
+async function timed(label, fn) {
+    const t0 = performance.now();
+    try {
+        const out = await fn();
+        console.log(`${label.padEnd(44)} ${String(Math.round(performance.now() - t0)).padStart(6)}ms  → ${out}`);
+    } catch (e) {
+        console.log(`${label.padEnd(44)} ${String(Math.round(performance.now() - t0)).padStart(6)}ms  ✗ ${e.message}`);
+    }
+}
+
+async function runScenarios() {
+    const mock = await startMockAiServer();
+    const req = buildRequest(mock.url);
+    const routes = [{ provider: 'siliconflow', apiKey: 'k' }, { provider: 'gemini', apiKey: 'k' }];
+    const router = createProviderRouter();
+
+    // Aquece o histograma da rota principal (~80ms) para o p95 valer como gatilho do hedging
+    mock.behaviors.siliconflow = { latency: 80 };
+    for (let i = 0; i < 25; i++) await router.call(routes, req);
+    await timed('principal saudável', () => router.call(routes, req));
+
+    mock.behaviors.siliconflow = { latency: 6000 };
+    await timed('principal lenta → hedging após o p95', () => router.call(routes, req));
+
+    mock.behaviors.siliconflow = { status: 503, latency: 20 };
+    await timed('principal 503 → failover', () => router.call(routes, req));
+    await timed('principal 503 → failover', () => router.call(routes, req));
+    await timed('principal 503 → failover (abre o circuito)', () => router.call(routes, req));
+    const before = mock.hits.siliconflow;
+    await timed('circuito aberto → pula a principal', () => router.call(routes, req));
+    console.log(`  chamadas à principal com o circuito aberto: ${mock.hits.siliconflow - before}`);
+
+    const limited = createProviderRouter();
+    mock.behaviors.gemini = { status: 429, retryAfter: 60, latency: 20 };
+    await timed('429 abre o circuito na hora', () => limited.call([routes[1]], req));
+    await timed('  ... e a próxima falha sem rede', () => limited.call([routes[1]], req));
+
+    mock.behaviors.gemini = { latency: 3000 };
+    await timed('prazo de 1s', () => createProviderRouter().call([routes[1]], req, { deadlineMs: 1000 }));
+
+    console.log('\nstats:', JSON.stringify(router.stats(), (k, v) => (k === 'buckets' ? undefined : v), 2));
+    await mock.close();
+}
+
+const isMain = import.meta.url === `file://${process.argv[1]}`;
+if (isMain) {
+    if (process.argv.includes('--serve')) {
+        const mock = await startMockAiServer({ port: Number(process.env.PORT) || 8787 });
+        console.log(`mock de provedores em ${mock.url} (/<provedor>/chat/completions, /gemini/models/<m>:generateContent)`);
+    } else {
+        await runScenarios();
+    }
+}
@@ -1,30 +1,41 @@
-import React, { useState } from 'react';
+import React, { useState, useRef, Suspense } from 'react';
 import './styles/global.css';
 import { useAppAuth } from './context/AuthContext';
 import { Sidebar } from './components/Sidebar';
 import { Header } from './components/Header';
-import { DashboardPage } from './pages/DashboardPage';
-import { ChatPage } from './pages/ChatPage';
-import { TarefasPage } from './pages/TarefasPage';
-import { HabitosPage } from './pages/HabitosPage';
-import { ProjetosPage } from './pages/ProjetosPage';
-import { LembretesPage } from './pages/LembretesPage';
-import { FinancasPage } from './pages/FinancasPage';
-import { AnalisesPage } from './pages/AnalisesPage';
-import { MissoesPage } from './pages/MissoesPage';
-import { GemeoDijitalPage } from './pages/GemeoDijitalPage';
-import { CadernoPage } from './pages/CadernoPage';
-import { DesejosPage } from './pages/DesejosPage';
 import { LoginPage } from './pages/LoginPage';
-import { ProfileSetupPage } from './pages/ProfileSetupPage';
-import { ResetPasswordPage } from './pages/ResetPasswordPage';
+import { PAGES, prefetchLikelyNext, recordNavigation } from './pages/pageRegistry';
 import { motion, AnimatePresence } from 'framer-motion';
 import { SearchOverlay } from './components/SearchOverlay';
 import { NotificationTray } from './components/NotificationTray';
 import { LevelUpModal } from './components/LevelUpModal';
 import { FocoWidget } from './components/FocoWidget';
+import { RenderProfiler } from './components/RenderProfiler';
 import { BackgroundBeams, Spotlight, ScanlineOverlay } from './components/AceternityUI';
 
+// Tela de inicialização (sessão/perfil ou chunk de página de autenticação)
+function BootScreen() {
+  return (
+    <div style={{ background: '#000', minHeight: '100vh', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
+      <div style={{ textAlign: 'center' }}>
+        <div style={{ width: 48, height: 48, borderRadius: 14, background: 'linear-gradient(135deg, var(--primary), var(--accent))', display: 'flex', alignItems: 'center', justifyContent: 'center', margin: '0 auto 12px', boxShadow: '0 0 20px rgba(0,240,255,0.4)', animation: 'float 3s ease-in-out infinite' }}>
+          <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="white" strokeWidth="2.5"><polygon points="13 2 3 14 12 14 11 22 21 10 12 10 13 2" /></svg>
+        </div>
+        <p style={{ fontFamily: 'var(--font-system)', fontSize: 10, color: 'var(--text-muted)', letterSpacing: '0.2em' }}>INICIALIZANDO...</p>
+      </div>
+    </div>
+  );
+}
+
+// Fallback enquanto o chunk da página é baixado
+function PageLoader() {
+  return (
+    <div style={{ flex: 1, display: 'flex', alignItems: 'center', justifyContent: 'center', minHeight: 240 }}>
+      <p style={{ fontFamily: 'var(--font-system)', fontSize: 10, color: 'var(--text-muted)', letterSpacing: '0.2em', animation: 'system-pulse 1.5s ease-in-out infinite' }}>CARREGANDO MÓDULO...</p>
+    </div>
+  );
+}
+
 export default function App() {
   const { session, profile, saveProfile, logout, loading, needsPasswordReset, clearPasswordReset } = useAppAuth();
   const [page, setPage] = useState("dashboard");
@@ -42,27 +53,26 @@ export default function App() {
     return () => window.removeEventListener("keydown", handleK);
   }, []);
 
-
+  // Registra cada transição de página e, em tempo ocioso, baixa os chunks
+  // das páginas que o usuário costuma abrir a seguir
+  const prevPageRef = useRef(page);
+  React.useEffect(() => {
+    recordNavigation(prevPageRef.current, page);
+    prevPageRef.current = page;
+    if (!session || !profile) return;
+    return prefetchLikelyNext(page);
+  }, [page, session, profile]);
 
   // Aguarda getSession() + carregamento do perfil
-  if (loading) {
-    return (
-      <div style={{ background: '#000', minHeight: '100vh', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
-        <div style={{ textAlign: 'center' }}>
-          <div style={{ width: 48, height: 48, borderRadius: 14, background: 'linear-gradient(135deg, var(--primary), var(--accent))', display: 'flex', alignItems: 'center', justifyContent: 'center', margin: '0 auto 12px', boxShadow: '0 0 20px rgba(0,240,255,0.4)', animation: 'float 3s ease-in-out infinite' }}>
-            <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="white" strokeWidth="2.5"><polygon points="13 2 3 14 12 14 11 22 21 10 12 10 13 2" /></svg>
-          </div>
-          <p style={{ fontFamily: 'var(--font-system)', fontSize: 10, color: 'var(--text-muted)', letterSpacing: '0.2em' }}>INICIALIZANDO...</p>
-        </div>
-      </div>
-    );
-  }
+  if (loading) return <BootScreen />;
 
   // Redefinição de senha (link do e-mail de recuperação)
   if (needsPasswordReset) {
     return (
       <div className="bg-noise">
-        <ResetPasswordPage onDone={clearPasswordReset} />
+        <Suspense fallback={<BootScreen />}>
+          <PAGES.resetPassword onDone={clearPasswordReset} />
+        </Suspense>
       </div>
     );
   }
@@ -80,26 +90,14 @@ export default function App() {
   if (!profile) {
     return (
       <div className="bg-noise">
-        <ProfileSetupPage onSave={saveProfile} userId={session.user.id} />
+        <Suspense fallback={<BootScreen />}>
+          <PAGES.profileSetup onSave={saveProfile} userId={session.user.id} />
+        </Suspense>
       </div>
     );
   }
 
-  const pages = {
-    dashboard: DashboardPage,
-    chat: ChatPage,
-    missoes: MissoesPage,
-    tarefas: TarefasPage,
-    habitos: HabitosPage,
-    projetos: ProjetosPage,
-    lembretes: LembretesPage,
-    financas: FinancasPage,
-    analises: AnalisesPage,
-    gemeodigital: GemeoDijitalPage,
-    caderno: CadernoPage,
-    desejos: DesejosPage,
-  };
-  const PageComponent = pages[page] || DashboardPage;
+  const PageComponent = PAGES[page] || PAGES.dashboard;
 
   return (
     <div className="bg-noise" style={{ display: "flex", minHeight: "100vh", position: "relative", background: "#000000" }}>
@@ -124,7 +122,9 @@ export default function App() {
 
       {/* Desktop Sidebar */}
       <div className="sidebar-desktop" style={{ position: "fixed", top: 0, left: 0, height: "100vh", zIndex: 50 }}>
-        <Sidebar page={page} setPage={setPage} />
+        <RenderProfiler id="Sidebar">
+          <Sidebar page={page} setPage={setPage} />
+        </RenderProfiler>
       </div>
 
       {/* Mobile Sidebar */}
@@ -147,7 +147,9 @@ export default function App() {
         <Spotlight className="z-0" fill="rgba(0, 240, 255, 0.06)" />
         {/* Holographic scanner line */}
         <div className="holographic-scanner" />
-        <Header user={profile} onLogout={logout} onMenuToggle={() => setSidebarOpen(true)} onSearchToggle={() => setSearchOpen(true)} />
+        <RenderProfiler id="Header">
+          <Header user={profile} onLogout={logout} onMenuToggle={() => setSidebarOpen(true)} onSearchToggle={() => setSearchOpen(true)} />
+        </RenderProfiler>
         <main style={{ flex: 1, padding: 24, maxWidth: 1200, width: "100%", margin: "0 auto", display: "flex", flexDirection: "column", overflowY: "auto", minHeight: 0 }}>
           <AnimatePresence mode="wait">
             <motion.div
@@ -158,19 +160,31 @@ export default function App() {
               transition={{ duration: 0.22, ease: "easeOut" }}
               style={{ flex: 1, display: "flex", flexDirection: "column", minHeight: 0 }}
             >
-              <PageComponent />
+              <Suspense fallback={<PageLoader />}>
+                <RenderProfiler id={`Página: ${page}`}>
+                  <PageComponent />
+                </RenderProfiler>
+              </Suspense>
             </motion.div>
           </AnimatePresence>
         </main>
       </div>
-      <SearchOverlay
-        isOpen={searchOpen}
-        onClose={() => setSearchOpen(false)}
-        setPage={setPage}
-      />
-      <NotificationTray />
-      <LevelUpModal />
-      <FocoWidget />
+      <RenderProfiler id="SearchOverlay">
+        <SearchOverlay
+          isOpen={searchOpen}
+          onClose={() => setSearchOpen(false)}
+          setPage={setPage}
+        />
+      </RenderProfiler>
+      <RenderProfiler id="NotificationTray">
+        <NotificationTray />
+      </RenderProfiler>
+      <RenderProfiler id="LevelUpModal">
+        <LevelUpModal />
+      </RenderProfiler>
+      <RenderProfiler id="FocoWidget">
+        <FocoWidget />
+      </RenderProfiler>
       <ScanlineOverlay />
     </div>
   );
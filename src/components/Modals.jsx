@@ -1,8 +1,9 @@
 import React, { useState, useEffect } from 'react';
-import { useAppData } from '../context/DataContext';
+import { useDataActions, useProjects } from '../context/DataContext';
 
 export function NewTaskModal({ isOpen, onClose }) {
-    const { addTask, projects } = useAppData();
+    const { addTask } = useDataActions();
+    const projects = useProjects();
     const [task, setTask] = useState({
         titulo: "",
         descricao: "",
@@ -65,7 +66,8 @@ export function NewTaskModal({ isOpen, onClose }) {
 }
 
 export function EditTaskModal({ isOpen, onClose, task }) {
-    const { updateTask, projects } = useAppData();
+    const { updateTask } = useDataActions();
+    const projects = useProjects();
     const [form, setForm] = useState(null);
 
     // Sincroniza o form quando a tarefa muda
@@ -144,7 +146,7 @@ export function EditTaskModal({ isOpen, onClose, task }) {
 }
 
 export function NewHabitModal({ isOpen, onClose }) {
-    const { addHabit } = useAppData();
+    const { addHabit } = useDataActions();
     const [habit, setHabit] = useState({ titulo: "", descricao: "", icone: "✨", metaMensal: 30 });
 
     const handleSubmit = (e) => {
@@ -184,7 +186,7 @@ export function NewHabitModal({ isOpen, onClose }) {
 }
 
 export function NewProjectModal({ isOpen, onClose }) {
-    const { addProject } = useAppData();
+    const { addProject } = useDataActions();
     const [proj, setProj] = useState({ titulo: "", descricao: "", cor: "#8b5cf6" });
 
     const handleSubmit = (e) => {
@@ -225,14 +227,14 @@ export function NewProjectModal({ isOpen, onClose }) {
 
 
 export function NewReminderModal({ isOpen, onClose }) {
-    const { addReminder } = useAppData();
-    const [rem, setRem] = useState({ titulo: "", descricao: "", importancia: "media", dataHora: "" });
+    const { addReminder } = useDataActions();
+    const [rem, setRem] = useState({ titulo: "", descricao: "", importancia: "media", dataHora: "", recorrencia: "" });
 
     const handleSubmit = (e) => {
         e.preventDefault();
         if (!rem.titulo || !rem.dataHora) return;
         addReminder(rem);
-        setRem({ titulo: "", descricao: "", importancia: "media", dataHora: "" });
+        setRem({ titulo: "", descricao: "", importancia: "media", dataHora: "", recorrencia: "" });
         onClose();
     };
 
@@ -260,6 +262,15 @@ export function NewReminderModal({ isOpen, onClose }) {
                     <input required type="datetime-local" value={rem.dataHora} onChange={e => setRem({ ...rem, dataHora: e.target.value })} />
                 </div>
             </div>
+            <div>
+                <label style={{ fontSize: 13, color: "var(--text-muted)", marginBottom: 6, display: "block" }}>Repetir</label>
+                <select value={rem.recorrencia} onChange={e => setRem({ ...rem, recorrencia: e.target.value })}>
+                    <option value="">Não repete</option>
+                    <option value="diaria">Todo dia</option>
+                    <option value="semanal">Toda semana</option>
+                    <option value="mensal">Todo mês</option>
+                </select>
+            </div>
             <div style={{ display: "flex", gap: 12, marginTop: 12 }}>
                 <button type="button" className="btn-ghost" onClick={onClose} style={{ flex: 1, justifyContent: "center" }}>Cancelar</button>
                 <button type="submit" className="btn btn-primary" style={{ flex: 2, justifyContent: "center" }}>Criar Lembrete</button>
@@ -269,7 +280,7 @@ export function NewReminderModal({ isOpen, onClose }) {
 }
 
 export function NewFinanceModal({ isOpen, onClose }) {
-    const { addFinance } = useAppData();
+    const { addFinance } = useDataActions();
     const [fin, setFin] = useState({ descricao: "", valor: "", tipo: "despesa", categoria: "Geral", data: new Date().toISOString().split('T')[0] });
 
     const handleSubmit = (e) => {
@@ -325,7 +336,7 @@ export function NewFinanceModal({ isOpen, onClose }) {
 // ── NewWishModal ──────────────────────────────────────────────────────────────
 
 export function NewWishModal({ isOpen, onClose, initial }) {
-    const { addWish, updateWish } = useAppData();
+    const { addWish, updateWish } = useDataActions();
     const isEdit = !!initial?.id;
     const empty = { titulo: '', descricao: '', preco: '', categoria: 'outros', mes: '', prioridade: 'media', link: '' };
     const [wish, setWish] = useState(empty);
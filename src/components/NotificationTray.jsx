@@ -1,12 +1,15 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Bell, X, Calendar } from 'lucide-react';
-import { useAppData } from '../context/DataContext';
+import { useReminders } from '../context/DataContext';
 import { AnimatePresence, motion } from 'framer-motion';
+import { createReminderScheduler } from '../services/reminderScheduler';
+
+const SNOOZE_MS = 10 * 60 * 1000;
 
 export function NotificationTray() {
-    const { reminders } = useAppData();
+    const reminders = useReminders();
     const [notifications, setNotifications] = useState([]);
-    const [notifiedIds, setNotifiedIds] = useState(new Set());
+    const schedulerRef = useRef(null);
 
     // Request browser notification permission on mount
     useEffect(() => {
@@ -15,48 +18,54 @@ export function NotificationTray() {
         }
     }, []);
 
+    // Um timer para o próximo lembrete (services/reminderScheduler), não polling
     useEffect(() => {
-        const checkReminders = () => {
-            const now = new Date();
-            const upcoming = reminders.filter(r => {
-                const rDate = new Date(r.dataHora);
-                const diff = rDate - now;
-                return !notifiedIds.has(r.id) && diff < 300000 && diff > -120000;
-            });
-
-            if (upcoming.length > 0) {
-                const newToasts = upcoming.map(r => ({
-                    id: r.id,
+        const scheduler = createReminderScheduler({
+            onDue: (r, at) => {
+                setNotifications(prev => [...prev, {
+                    id: `${r.id}@${at}`,
+                    reminderId: r.id,
+                    at,
                     titulo: r.titulo,
-                    dataHora: r.dataHora
-                }));
-                setNotifications(prev => [...prev, ...newToasts]);
-                setNotifiedIds(prev => {
-                    const next = new Set(prev);
-                    upcoming.forEach(r => {
-                        next.add(r.id);
-                        // Fire native OS notification
-                        if ('Notification' in window && Notification.permission === 'granted') {
-                            new Notification('The System — Lembrete', {
-                                body: r.titulo,
-                                icon: '/vite.svg',
-                            });
-                        }
+                    dataHora: r.dataHora,
+                }]);
+                // Fire native OS notification
+                if ('Notification' in window && Notification.permission === 'granted') {
+                    new Notification('The System — Lembrete', {
+                        body: r.titulo,
+                        icon: '/vite.svg',
                     });
-                    return next;
-                });
-            }
+                }
+            },
+        });
+        schedulerRef.current = scheduler;
+
+        // Timers em segundo plano/suspensão podem atrasar: confere ao voltar
+        const onVisible = () => {
+            if (document.visibilityState === 'visible') scheduler.wake();
         };
+        document.addEventListener('visibilitychange', onVisible);
+        return () => {
+            document.removeEventListener('visibilitychange', onVisible);
+            scheduler.stop();
+            schedulerRef.current = null;
+        };
+    }, []);
 
-        const interval = setInterval(checkReminders, 10000);
-        checkReminders();
-        return () => clearInterval(interval);
-    }, [reminders, notifiedIds]);
+    useEffect(() => {
+        schedulerRef.current?.sync(reminders);
+    }, [reminders]);
 
     const removeNotification = (id) => {
         setNotifications(prev => prev.filter(n => n.id !== id));
     };
 
+    const snoozeNotification = (e, n) => {
+        e.stopPropagation();
+        schedulerRef.current?.snooze(n.reminderId, n.at, SNOOZE_MS);
+        removeNotification(n.id);
+    };
+
     return (
         <div className="notification-tray">
             <AnimatePresence>
@@ -76,6 +85,9 @@ export function NotificationTray() {
                             <p style={{ fontWeight: 700, fontSize: 14 }}>Lembrete Próximo</p>
                             <p style={{ fontSize: 13, color: "var(--text-muted)" }}>{n.titulo}</p>
                         </div>
+                        <button className="btn-ghost" style={{ padding: "4px 8px", fontSize: 12 }} onClick={e => snoozeNotification(e, n)} title="Avisar de novo em 10 minutos">
+                            10 min
+                        </button>
                         <button className="btn-ghost" style={{ padding: 4 }}>
                             <X size={16} />
                         </button>
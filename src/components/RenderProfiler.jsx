@@ -0,0 +1,83 @@
+/**
+ * RenderProfiler.jsx
+ * Conta quantas vezes cada região do app re-renderiza por interação — para
+ * medir o efeito de mudanças no estado global (ex: DataContext) antes/depois.
+ *
+ * Desligado por padrão: só devolve os filhos. Para ligar (vite dev):
+ *   localStorage.setItem('orbis_profile_renders', '1')  e recarregue.
+ *
+ * Cada clique/tecla abre uma interação; quando nada comita por 500ms, o console
+ * mostra uma tabela região → renders/ms. window.__orbisRenders guarda o histórico:
+ *   __orbisRenders.summary()  totais por região de todas as interações
+ *   __orbisRenders.reset()    limpa (ex: entre a medição "antes" e a "depois")
+ *
+ * Usa <Profiler> do React; no build de produção os callbacks não disparam.
+ */
+
+import React, { Profiler } from 'react';
+
+const ENABLED = (() => {
+    try {
+        return typeof window !== 'undefined' && window.localStorage.getItem('orbis_profile_renders') === '1';
+    } catch { return false; }
+})();
+
+const QUIET_MS = 500;
+const _history = [];
+let _current = null;   // { label, counts: { região: n }, ms: { região: ms } }
+let _timer = null;
+
+function describe(el) {
+    const target = el?.closest?.('button, a, input, textarea, select, [role]') || el;
+    if (!target?.tagName) return '';
+    const text = (target.getAttribute('title') || target.getAttribute('aria-label') || target.textContent || '').trim();
+    return `${target.tagName.toLowerCase()}${text ? ` "${text.slice(0, 30)}"` : ''}`;
+}
+
+function flush() {
+    clearTimeout(_timer);
+    if (!_current) return;
+    const rows = Object.keys(_current.counts)
+        .map(id => ({ regiao: id, renders: _current.counts[id], ms: Math.round(_current.ms[id] * 10) / 10 }))
+        .sort((a, b) => b.renders - a.renders);
+    _history.push({ label: _current.label, rows });
+    console.groupCollapsed(`[Orbis] renders — ${_current.label} (${rows.reduce((a, r) => a + r.renders, 0)})`);
+    console.table(rows);
+    console.groupEnd();
+    _current = null;
+}
+
+function startInteraction(e) {
+    flush();
+    _current = { label: `${e.type} ${describe(e.target)}`, counts: {}, ms: {} };
+    _timer = setTimeout(flush, QUIET_MS);
+}
+
+function onRender(id, _phase, actualDuration) {
+    if (!_current) return;   // commits fora de interações (timers, sync de fundo) não entram
+    _current.counts[id] = (_current.counts[id] || 0) + 1;
+    _current.ms[id] = (_current.ms[id] || 0) + actualDuration;
+    clearTimeout(_timer);
+    _timer = setTimeout(flush, QUIET_MS);
+}
+
+if (ENABLED) {
+    window.addEventListener('pointerdown', startInteraction, true);
+    window.addEventListener('keydown', startInteraction, true);
+    window.__orbisRenders = {
+        history: _history,
+        summary() {
+            const totals = {};
+            _history.forEach(({ rows }) => rows.forEach(r => { totals[r.regiao] = (totals[r.regiao] || 0) + r.renders; }));
+            console.table(totals);
+            return { interactions: _history.length, totals };
+        },
+        reset() { _history.length = 0; },
+    };
+}
+
+/** Envolve uma região; sem o profiling ligado não adiciona nada à árvore. */
+export function RenderProfiler({ id, children }) {
+    if (!ENABLED) return children;
+    return <Profiler id={id} onRender={onRender}>{children}</Profiler>;
+}
@@ -1,9 +1,22 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { Search, X, CheckSquare, Target, Folder, DollarSign, Bell, ArrowRight } from 'lucide-react';
-import { useAppData } from '../context/DataContext';
+import { Search, X, CheckSquare, Target, Folder, DollarSign, Bell, ArrowRight, Gift, FileText, BookOpen, MessageSquare } from 'lucide-react';
+import { startLocalSearch, searchLocal } from '../services/localSearchService';
+
+const MAX_RESULTS = 8;
+
+const SOURCE_ICONS = {
+    orbis_tasks: CheckSquare,
+    orbis_habits: Target,
+    orbis_projects: Folder,
+    orbis_reminders: Bell,
+    orbis_finances: DollarSign,
+    orbis_wishes: Gift,
+    orbis_notes: FileText,
+    orbis_diary: BookOpen,
+    orbis_chat_history: MessageSquare,
+};
 
 export function SearchOverlay({ isOpen, onClose, setPage }) {
-    const { tasks, habits, projects, reminders, finances } = useAppData();
     const [query, setQuery] = useState("");
     const [results, setResults] = useState([]);
     const inputRef = useRef(null);
@@ -15,6 +28,16 @@ export function SearchOverlay({ isOpen, onClose, setPage }) {
         }
     }, [isOpen]);
 
+    // Monta o índice (no worker) em tempo ocioso, antes do primeiro Ctrl+K
+    useEffect(() => {
+        if ('requestIdleCallback' in window) {
+            const handle = window.requestIdleCallback(startLocalSearch, { timeout: 5000 });
+            return () => window.cancelIdleCallback(handle);
+        }
+        const timer = setTimeout(startLocalSearch, 2000);
+        return () => clearTimeout(timer);
+    }, []);
+
     useEffect(() => {
         const handleKeyDown = (e) => {
             if (e.key === "Escape") onClose();
@@ -29,17 +52,13 @@ export function SearchOverlay({ isOpen, onClose, setPage }) {
             return;
         }
 
-        const q = query.toLowerCase();
-        const filtered = [
-            ...tasks.filter(t => t.titulo.toLowerCase().includes(q)).map(t => ({ ...t, type: 'tarefa', icon: CheckSquare, page: 'tarefas' })),
-            ...habits.filter(h => h.titulo.toLowerCase().includes(q)).map(h => ({ ...h, type: 'hábito', icon: Target, page: 'habitos' })),
-            ...projects.filter(p => p.titulo.toLowerCase().includes(q)).map(p => ({ ...p, type: 'projeto', icon: Folder, page: 'projetos' })),
-            ...reminders.filter(r => r.titulo.toLowerCase().includes(q)).map(r => ({ ...r, type: 'lembrete', icon: Bell, page: 'lembretes' })),
-            ...finances.filter(f => f.descricao.toLowerCase().includes(q)).map(f => ({ ...f, type: 'finanças', icon: DollarSign, page: 'financas', titulo: f.descricao })),
-        ].slice(0, 8);
-
-        setResults(filtered);
-    }, [query, tasks, habits, projects, reminders, finances]);
+        // Resposta de uma consulta antiga (digitação rápida) é descartada
+        let stale = false;
+        searchLocal(query, MAX_RESULTS).then(hits => {
+            if (!stale) setResults(hits.map(h => ({ ...h, icon: SOURCE_ICONS[h.source] || Search })));
+        });
+        return () => { stale = true; };
+    }, [query]);
 
     if (!isOpen) return null;
 
@@ -60,7 +79,7 @@ export function SearchOverlay({ isOpen, onClose, setPage }) {
                         type="text"
                         value={query}
                         onChange={e => setQuery(e.target.value)}
-                        placeholder="Buscar tarefas, projetos, finanças..."
+                        placeholder="Buscar tarefas, finanças, notas, diário..."
                         style={{ border: "none", background: "none", fontSize: 18, padding: 0, width: "100%", outline: "none" }}
                     />
                     <button onClick={onClose} className="btn-ghost" style={{ padding: 6 }}>
@@ -71,9 +90,9 @@ export function SearchOverlay({ isOpen, onClose, setPage }) {
                 <div style={{ maxHeight: 400, overflowY: "auto" }}>
                     {results.length > 0 ? (
                         <div style={{ padding: "8px 0" }}>
-                            {results.map((res, i) => (
+                            {results.map(res => (
                                 <button
-                                    key={i}
+                                    key={res.key}
                                     onClick={() => { setPage(res.page); onClose(); }}
                                     style={{ width: "100%", padding: "12px 20px", display: "flex", alignItems: "center", gap: 14, background: "none", border: "none", cursor: "pointer", textAlign: "left", transition: "all 0.2s" }}
                                     onMouseOver={e => e.currentTarget.style.background = "rgba(59,130,246,0.1)"}
@@ -83,8 +102,9 @@ export function SearchOverlay({ isOpen, onClose, setPage }) {
                                         <res.icon size={18} color="var(--primary)" />
                                     </div>
                                     <div style={{ flex: 1 }}>
-                                        <p style={{ fontWeight: 600, fontSize: 14 }}>{res.titulo}</p>
+                                        <p style={{ fontWeight: 600, fontSize: 14 }}>{res.title}</p>
                                         <span style={{ fontSize: 11, color: "var(--text-muted)", textTransform: "uppercase", letterSpacing: "0.05em" }}>{res.type}</span>
+                                        {res.subtitle && <span style={{ fontSize: 11, color: "var(--text-dim)", marginLeft: 8 }}>{res.subtitle}</span>}
                                     </div>
                                     <ArrowRight size={16} color="var(--text-dim)" />
                                 </button>
@@ -1,13 +1,18 @@
 // SOVEREIGN NEXUS — Command Center (Sidebar)
 import React, { useRef, useEffect, useState } from 'react';
 import { animate } from 'animejs';
-import { X, Zap, Download, Upload, Camera, User } from 'lucide-react';
-import * as LucideIcons from 'lucide-react';
+import {
+    X, Zap, Download, Upload, Camera, User,
+    MessageCircle, Eye, Swords, CheckSquare, Target, Folder, Bell,
+    DollarSign, BarChart3, Brain, BookOpen, ShoppingBag,
+} from 'lucide-react';
 import { cn } from '../utils/formatters';
 import { usePlayer } from '../context/PlayerContext';
 import { getRank } from '../utils/playerUtils';
 import { useMissions } from '../context/MissionContext';
 import { Spotlight, TypewriterText, CornerBrackets } from './AceternityUI';
+import { readStored, writeStored, flushStorage } from '../services/storageService';
+import { prefetchPage } from '../pages/pageRegistry';
 
 const NAV_ITEMS = [
     { id: "chat", icon: "MessageCircle", label: "Chat", code: "CH" },
@@ -24,6 +29,12 @@ const NAV_ITEMS = [
     { id: "desejos", icon: "ShoppingBag", label: "Desejos", code: "DZ" },
 ];
 
+// Import nomeado (em vez de `import * as`) para o bundle não carregar todos os ícones do lucide
+const NAV_ICONS = {
+    MessageCircle, Eye, Swords, CheckSquare, Target, Folder, Bell,
+    DollarSign, BarChart3, Brain, BookOpen, ShoppingBag,
+};
+
 function SidebarNav({ page, setPage, onClose }) {
     const { pendingCount } = useMissions();
 
@@ -37,7 +48,7 @@ function SidebarNav({ page, setPage, onClose }) {
             </div>
 
             {NAV_ITEMS.map((item, idx) => {
-                const IconComponent = LucideIcons[item.icon];
+                const IconComponent = NAV_ICONS[item.icon];
                 const showBadge = item.id === 'missoes' && pendingCount > 0;
                 const isActive = page === item.id;
 
@@ -45,6 +56,9 @@ function SidebarNav({ page, setPage, onClose }) {
                     <button
                         key={item.id}
                         onClick={() => { setPage(item.id); onClose?.(); }}
+                        onMouseEnter={() => prefetchPage(item.id)}
+                        onFocus={() => prefetchPage(item.id)}
+                        onTouchStart={() => prefetchPage(item.id)}
                         className={cn("sidebar-link", isActive && "active")}
                         style={{
                             animation: `hud-boot 0.4s ease-out both`,
@@ -187,7 +201,7 @@ function DataBackup() {
 
     const handleExport = () => {
         const backup = {};
-        DATA_KEYS.forEach(k => { const val = localStorage.getItem(k); if (val) backup[k] = JSON.parse(val); });
+        DATA_KEYS.forEach(k => { const val = readStored(k, undefined); if (val !== undefined) backup[k] = val; });
         const blob = new Blob([JSON.stringify(backup, null, 2)], { type: 'application/json' });
         const url = URL.createObjectURL(blob);
         const a = document.createElement('a'); a.href = url;
@@ -201,8 +215,8 @@ function DataBackup() {
         reader.onload = (ev) => {
             try {
                 const data = JSON.parse(ev.target.result);
-                DATA_KEYS.forEach(k => { if (data[k] !== undefined) localStorage.setItem(k, JSON.stringify(data[k])); });
-                window.location.reload();
+                DATA_KEYS.forEach(k => { if (data[k] !== undefined) writeStored(k, data[k]); });
+                flushStorage().finally(() => window.location.reload());
             } catch { alert('Arquivo inválido.'); }
         };
         reader.readAsText(file); e.target.value = '';
@@ -0,0 +1,264 @@
+/**
+ * VirtualList.jsx
+ * Lista "janelada": só monta as linhas perto da área visível, então o DOM fica
+ * do mesmo tamanho com 50 ou 5.000 itens.
+ *
+ * - Alturas variáveis: cada linha montada é medida (ResizeObserver) e a altura
+ *   fica em cache pela chave do item; as nunca montadas usam estimateSize.
+ *   O cache sobrevive a reordenação/filtro porque é por chave, não por índice.
+ * - Espaço das linhas fora da janela vira paddingTop/paddingBottom do próprio
+ *   container, então as linhas continuam em fluxo normal (flex/gap do chamador).
+ * - Rolagem: usa scrollRef se vier, senão o ancestral rolável mais próximo
+ *   (no app é o <main>), senão a janela.
+ * - animate: liga o auto-animate no container. Ele só anima quando `items`
+ *   muda (adição/remoção/reordenação); linhas que entram/saem da janela pela
+ *   rolagem ou por medição não animam.
+ * - followOutput: se a lista está no fim, continua no fim quando cresce (chat).
+ *   Começa no fim; até essa primeira rolagem, onStartReached não dispara (o
+ *   scroll ainda está no topo e buscaria uma página a mais).
+ * - onStartReached/onEndReached: chamados ao rolar perto do começo/fim (até
+ *   `overscan` px) — paginação. keepAnchor mantém na tela o item que estava no
+ *   topo quando `items` muda (ex: página antiga inserida antes dele).
+ *
+ * O estilo passado em `style` é do container; não use padding vertical nele.
+ */
+
+import React, { useState, useRef, useMemo, useLayoutEffect, useEffect, useCallback } from 'react';
+import { useAutoAnimate } from '@formkit/auto-animate/react';
+
+const INITIAL_COUNT = 20;
+const BOTTOM_SLACK = 48;
+
+function findScroller(el) {
+    for (let node = el?.parentElement; node && node !== document.body; node = node.parentElement) {
+        const { overflowY } = getComputedStyle(node);
+        if (overflowY === 'auto' || overflowY === 'scroll') return node;
+    }
+    return window;
+}
+
+// Topo da lista em coordenadas de conteúdo do scroller + altura visível
+function viewportOf(scroller, list) {
+    const rect = list.getBoundingClientRect();
+    if (scroller === window) {
+        return { top: -rect.top, height: window.innerHeight };
+    }
+    const box = scroller.getBoundingClientRect();
+    return { top: box.top + scroller.clientTop - rect.top, height: scroller.clientHeight };
+}
+
+// Primeiro índice i com offsets[i] > y (offsets é crescente, tamanho n + 1)
+function upperBound(offsets, n, y) {
+    let lo = 0, hi = n;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (offsets[mid + 1] > y) hi = mid;
+        else lo = mid + 1;
+    }
+    return lo;
+}
+
+export function VirtualList({
+    items,
+    getKey,
+    renderItem,
+    estimateSize = 60,
+    gap = 0,
+    overscan = 400,
+    animate = false,
+    followOutput = false,
+    keepAnchor = false,
+    onStartReached,
+    onEndReached,
+    scrollRef,
+    className,
+    style,
+}) {
+    const n = items.length;
+    const [parentRef, setAnimateEnabled] = useAutoAnimate();
+    const listRef = useRef(null);
+    const scrollerRef = useRef(null);
+    // chave → altura medida (px); o mesmo Map a vida toda, mudanças avisadas por measureVersion
+    const [sizes] = useState(() => new Map());
+    const [measureVersion, setMeasureVersion] = useState(0);
+    const [range, setRange] = useState(() => (
+        followOutput ? [Math.max(0, n - INITIAL_COUNT), n] : [0, Math.min(n, INITIAL_COUNT)]
+    ));
+    const atBottomRef = useRef(followOutput);
+    // Com followOutput: false até a rolagem inicial até o fim
+    const settledRef = useRef(!followOutput);
+
+    // offsets[i] = topo do item i; offsets[n] - gap = altura total
+    const layout = useMemo(() => {
+        const offsets = new Float64Array(n + 1);
+        const indexOf = new Map();
+        for (let i = 0; i < n; i++) {
+            const key = String(getKey(items[i], i));
+            indexOf.set(key, i);
+            offsets[i + 1] = offsets[i] + (sizes.get(key) ?? estimateSize) + gap;
+        }
+        return { offsets, indexOf };
+        // measureVersion: as alturas em `sizes` mudaram
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [items, n, estimateSize, gap, measureVersion]);
+
+    // Valores da última renderização para os handlers de rolagem/medição.
+    // Sincronizados num layout effect declarado antes dos que chamam updateRange.
+    const layoutRef = useRef(layout);
+    const keyAtRef = useRef(null);
+    const callbacksRef = useRef(null);
+    useLayoutEffect(() => {
+        layoutRef.current = layout;
+        keyAtRef.current = i => String(getKey(items[i], i));
+        callbacksRef.current = { onStartReached, onEndReached };
+    });
+    const anchorRef = useRef(null);
+
+    const updateRange = useCallback(() => {
+        const list = listRef.current;
+        const scroller = scrollerRef.current;
+        if (!list || !scroller) return;
+        const { offsets } = layoutRef.current;
+        const count = offsets.length - 1;
+        const view = viewportOf(scroller, list);
+        const start = upperBound(offsets, count, view.top - overscan);
+        const end = Math.max(start, Math.min(count, upperBound(offsets, count, view.top + view.height + overscan) + 1));
+        setRange(prev => (prev[0] === start && prev[1] === end ? prev : [start, end]));
+
+        const el = scroller === window ? document.scrollingElement : scroller;
+        if (el && settledRef.current) atBottomRef.current = el.scrollHeight - el.scrollTop - el.clientHeight <= BOTTOM_SLACK;
+
+        // Âncora: primeiro item visível e quanto dele já passou do topo
+        const first = Math.min(upperBound(offsets, count, view.top), count - 1);
+        anchorRef.current = first >= 0
+            ? { key: keyAtRef.current(first), delta: view.top - offsets[first] }
+            : null;
+
+        if (count > 0) {
+            const { onStartReached: atStart, onEndReached: atEnd } = callbacksRef.current;
+            if (atStart && settledRef.current && view.top < overscan) atStart();
+            if (atEnd && view.top + view.height > offsets[count] - overscan) atEnd();
+        }
+    }, [overscan]);
+
+    // Scroller + eventos de rolagem/redimensionamento (um recálculo por frame).
+    // Layout effect para o scroller já existir no efeito de "colar no fim" abaixo.
+    useLayoutEffect(() => {
+        const scroller = scrollRef?.current || findScroller(listRef.current);
+        scrollerRef.current = scroller;
+        let frame = 0;
+        const onScroll = () => {
+            if (frame) return;
+            frame = requestAnimationFrame(() => { frame = 0; updateRange(); });
+        };
+        scroller.addEventListener('scroll', onScroll, { passive: true });
+        window.addEventListener('resize', onScroll);
+        updateRange();
+        return () => {
+            cancelAnimationFrame(frame);
+            scroller.removeEventListener('scroll', onScroll);
+            window.removeEventListener('resize', onScroll);
+        };
+    }, [scrollRef, updateRange]);
+
+    // Mede as linhas montadas; linhas acima da área visível que mudam de altura
+    // compensam o scroll para o conteúdo não "pular". Criado já no primeiro
+    // render: as refs das linhas são ligadas antes dos efeitos deste componente.
+    const [observer] = useState(() => (typeof ResizeObserver === 'undefined' ? null : new ResizeObserver(entries => {
+        const scroller = scrollerRef.current;
+        const list = listRef.current;
+        const viewTop = scroller && list ? viewportOf(scroller, list).top : 0;
+        const { offsets, indexOf } = layoutRef.current;
+        let changed = false, shift = 0;
+        for (const entry of entries) {
+            const key = entry.target.dataset.vkey;
+            const height = entry.borderBoxSize?.[0]?.blockSize ?? entry.target.offsetHeight;
+            if (!height || sizes.get(key) === height) continue;
+            const i = indexOf.get(key);
+            if (i !== undefined && offsets[i + 1] <= viewTop) shift += height - (sizes.get(key) ?? estimateSize);
+            sizes.set(key, height);
+            changed = true;
+        }
+        if (!changed) return;
+        if (shift && scroller && !(followOutput && atBottomRef.current)) {
+            if (scroller === window) window.scrollBy(0, shift);
+            else scroller.scrollTop += shift;
+        }
+        setMeasureVersion(v => v + 1);
+    })));
+    useEffect(() => () => observer?.disconnect(), [observer]);
+
+    // Ref com cleanup (React 19): para de observar quando a linha sai da janela
+    const measureRef = useCallback(el => {
+        if (!el || !observer) return undefined;
+        observer.observe(el);
+        return () => observer.unobserve(el);
+    }, [observer]);
+
+    // Itens/alturas mudaram: recalcula a janela e, no modo chat, cola no fim
+    // (ou, com keepAnchor, devolve o item âncora à mesma posição na tela)
+    useLayoutEffect(() => {
+        const scroller = scrollerRef.current;
+        const el = scroller === window ? document.scrollingElement : scroller;
+        const anchor = anchorRef.current;
+        if (!followOutput) settledRef.current = true;
+        if (followOutput && atBottomRef.current) {
+            if (el) el.scrollTop = el.scrollHeight;
+            settledRef.current = true;
+        } else if (keepAnchor && anchor && el && listRef.current) {
+            const i = layout.indexOf.get(anchor.key);
+            if (i !== undefined) {
+                const diff = layout.offsets[i] + anchor.delta - viewportOf(scroller, listRef.current).top;
+                if (Math.abs(diff) >= 1) el.scrollTop += diff;
+            }
+        }
+        updateRange();
+    }, [layout, followOutput, keepAnchor, updateRange]);
+
+    // Anima só mudanças em `items`; se só a janela andou (rolagem/medição), as
+    // linhas entram/saem sem animação. O MutationObserver do auto-animate roda
+    // depois deste efeito (microtask), já com o estado certo.
+    const animStateRef = useRef({ items, start: -1, end: -1, enabled: true, apply: null });
+    useLayoutEffect(() => {
+        if (!animate) return;
+        const state = animStateRef.current;
+        let enabled = state.enabled;
+        if (state.items !== items) enabled = true;
+        else if (state.start !== range[0] || state.end !== range[1]) enabled = false;
+        // setAnimateEnabled muda de identidade quando o auto-animate termina de montar
+        if (enabled !== state.enabled || state.apply !== setAnimateEnabled) setAnimateEnabled(enabled);
+        animStateRef.current = { items, start: range[0], end: range[1], enabled, apply: setAnimateEnabled };
+    });
+
+    const setListRef = useCallback(el => {
+        listRef.current = el;
+        if (animate) parentRef(el);
+    }, [animate, parentRef]);
+
+    const { offsets } = layout;
+    const start = Math.min(range[0], n);
+    const end = Math.min(range[1], n);
+    const paddingTop = offsets[start];
+    const paddingBottom = offsets[n] - offsets[end];
+
+    const rows = [];
+    for (let i = start; i < end; i++) {
+        const item = items[i];
+        const key = String(getKey(item, i));
+        rows.push(
+            <div key={key} data-vkey={key} ref={measureRef}>
+                {renderItem(item, i)}
+            </div>
+        );
+    }
+
+    return (
+        <div
+            ref={setListRef}
+            className={className}
+            style={{ display: 'flex', flexDirection: 'column', gap, ...style, paddingTop, paddingBottom }}
+        >
+            {rows}
+        </div>
+    );
+}
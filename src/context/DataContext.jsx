@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useEffect } from 'react';
+import React, { createContext, useContext, useEffect, useMemo } from 'react';
 import { useLocalStorage } from '../hooks/useLocalStorage';
 import {
     MOCK_TASKS, MOCK_HABITS, MOCK_PROJECTS, MOCK_REMINDERS, MOCK_FINANCES, MOCK_WISHES
@@ -6,21 +6,33 @@ import {
 import {
     isSupabaseConfigured,
     syncTask, deleteTaskSupabase,
-    syncHabit, deleteHabitSupabase,
+    syncHabit, deleteHabitSupabase, toggleHabitLog,
     syncFinance, deleteFinanceSupabase,
     syncProject, deleteProjectSupabase,
     syncReminder, deleteReminderSupabase,
     syncWish, deleteWishSupabase,
-    fetchTasks, fetchFinances, fetchHabits, fetchProjects, fetchReminders, fetchWishes,
+    pullTableChanges, saveSyncCursor,
 } from '../services/supabaseService';
+import { liveFinanceAggregates } from '../utils/financeAggregates';
+import { toggleHabitDay } from '../utils/habitDays';
 
-const DataContext = createContext(null);
+// Um contexto por coleção + um para as ações: quem lê só tarefas não
+// re-renderiza quando um hábito é marcado ou uma despesa é lançada.
+const TasksContext = createContext(null);
+const HabitsContext = createContext(null);
+const ProjectsContext = createContext(null);
+const RemindersContext = createContext(null);
+const FinancesContext = createContext(null);
+const WishesContext = createContext(null);
+const DataActionsContext = createContext(null);
 
 function newId() {
     return crypto.randomUUID ? crypto.randomUUID() : Date.now().toString(36) + Math.random().toString(36).slice(2);
 }
 
-// Fire-and-forget: chama fn assíncrona sem bloquear a UI
+// Fire-and-forget: chama fn assíncrona sem bloquear a UI.
+// As funções sync* só enfileiram na outbox; o envio ao Supabase é em lote.
+// Cada enfileiramento também invalida o snapshot de contexto da IA.
 function bg(fn) {
     if (isSupabaseConfigured()) fn().catch(console.error);
 }
@@ -46,11 +58,17 @@ export function DataProvider({ children }) {
     const [finances, setFinances] = useLocalStorage('orbis_finances', MOCK_FINANCES);
     const [wishes, setWishes] = useLocalStorage('orbis_wishes', MOCK_WISHES);
 
+    // Totais financeiros derivados de `finances`: cada array novo é comparado por
+    // referência com o anterior e só os lançamentos que mudaram são reaplicados
+    const financeAggregates = useMemo(() => liveFinanceAggregates(finances), [finances]);
+
     // ── Pull do Supabase no startup ─────────────────────────────────────────────
-    // Mescla dados remotos com localStorage:
+    // Primeira sincronização (sem cursor): pull completo, mesclado com localStorage:
     // - IDs novos do Supabase (ex: criados pelo bot) são adicionados ao estado local.
     // - Para tarefas: status e prioridade são atualizados se diferirem (ex: bot concluiu).
     // - Outros campos locais não são sobrescritos.
+    // Depois disso, cada tabela puxa só o delta desde o último cursor: linhas
+    // alteradas são mescladas por id e lápides removem os itens deletados.
     useEffect(() => {
         if (!isSupabaseConfigured()) return;
 
@@ -78,20 +96,71 @@ export function DataProvider({ children }) {
             return newItems.length > 0 ? [...updated, ...newItems] : updated;
         };
 
-        Promise.allSettled([
-            fetchTasks(),
-            fetchFinances(),
-            fetchHabits(),
-            fetchProjects(),
-            fetchReminders(),
-            fetchWishes(),
-        ]).then(([t, f, h, p, r, w]) => {
-            if (t.status === 'fulfilled' && t.value.length > 0) setTasks(prev => mergeTasks(prev, t.value));
-            if (f.status === 'fulfilled' && f.value.length > 0) setFinances(prev => merge(prev, f.value));
-            if (h.status === 'fulfilled' && h.value.length > 0) setHabits(prev => merge(prev, h.value));
-            if (p.status === 'fulfilled' && p.value.length > 0) setProjects(prev => merge(prev, p.value));
-            if (r.status === 'fulfilled' && r.value.length > 0) setReminders(prev => merge(prev, r.value));
-            if (w.status === 'fulfilled' && w.value.length > 0) setWishes(prev => merge(prev, w.value));
+        // Merge de delta: O(local + mudanças), campos remotos sobrescrevem os locais
+        // (campos só-locais, como totalTarefas de projetos, são preservados)
+        const mergeDelta = (local, { rows, deletedIds }) => {
+            if (rows.length === 0 && deletedIds.length === 0) return local;
+            const remoteMap = new Map(rows.map(r => [r.id, r]));
+            const deleted = new Set(deletedIds.filter(id => !remoteMap.has(id)));
+            const next = [];
+            for (const item of local) {
+                if (deleted.has(item.id)) continue;
+                const r = remoteMap.get(item.id);
+                if (r) {
+                    next.push({ ...item, ...r });
+                    remoteMap.delete(item.id);
+                } else {
+                    next.push(item);
+                }
+            }
+            return [...next, ...remoteMap.values()];
+        };
+
+        // Hábitos em delta: metadados por id (sem tocar nos logs locais) + logs linha a linha
+        const mergeHabitsDelta = (local, { rows, deletedIds, addedLogs = [], removedLogs = [] }) => {
+            const meta = mergeDelta(local, {
+                rows: rows.map(({ logs: _logs, ...h }) => h),
+                deletedIds,
+            }).map(h => (h.logs ? h : { ...h, logs: [] }));
+            if (addedLogs.length === 0 && removedLogs.length === 0) return meta;
+
+            const byHabit = new Map();
+            const touch = (habitId) => {
+                if (!byHabit.has(habitId)) byHabit.set(habitId, { add: new Set(), remove: new Set() });
+                return byHabit.get(habitId);
+            };
+            removedLogs.forEach(l => touch(l.habitId).remove.add(l.data));
+            addedLogs.forEach(l => { const c = touch(l.habitId); c.add.add(l.data); c.remove.delete(l.data); });
+
+            return meta.map(h => {
+                const change = byHabit.get(h.id);
+                if (!change) return h;
+                const kept = h.logs.filter(l => !change.remove.has(l.data) && !change.add.has(l.data));
+                return { ...h, logs: [...kept, ...[...change.add].map(data => ({ data }))] };
+            });
+        };
+
+        const tables = [
+            ['tasks',     setTasks,     mergeTasks,  mergeDelta],
+            ['finances',  setFinances,  merge,       mergeDelta],
+            ['habits',    setHabits,    merge,       mergeHabitsDelta],
+            ['projects',  setProjects,  merge,       mergeDelta],
+            ['reminders', setReminders, merge,       mergeDelta],
+            ['wishes',    setWishes,    merge,       mergeDelta],
+        ];
+
+        Promise.allSettled(tables.map(([table]) => pullTableChanges(table))).then(results => {
+            results.forEach((res, i) => {
+                if (res.status !== 'fulfilled' || !res.value) return;
+                const [table, setter, mergeFull, mergeChanges] = tables[i];
+                const changes = res.value;
+                if (changes.mode === 'full') {
+                    if (changes.rows.length > 0) setter(prev => mergeFull(prev, changes.rows));
+                } else {
+                    setter(prev => mergeChanges(prev, changes));
+                }
+                saveSyncCursor(table, changes.cursor);
+            });
         }).catch(console.error);
     // eslint-disable-next-line react-hooks/exhaustive-deps
     }, []);
@@ -132,18 +201,16 @@ export function DataProvider({ children }) {
         bg(() => deleteHabitSupabase(id));
     };
 
+    // Alterna um dia: sincroniza só a linha do log, nunca o histórico nem os metadados
     const addHabitLog = (habitId, date) => {
-        let synced = null;
+        let done = null;
         setHabits(prev => prev.map(h => {
             if (h.id !== habitId) return h;
-            const hasDate = h.logs.some(l => l.data === date);
-            synced = {
-                ...h,
-                logs: hasDate ? h.logs.filter(l => l.data !== date) : [...h.logs, { data: date }]
-            };
-            return synced;
+            const next = toggleHabitDay(h, date);
+            done = next.done;
+            return { ...h, logs: next.logs };
         }));
-        if (synced) bg(() => syncHabit(synced));
+        if (done !== null) bg(() => toggleHabitLog(habitId, date, done));
     };
 
     // ── Projects ───────────────────────────────────────────────────────────────
@@ -218,24 +285,75 @@ export function DataProvider({ children }) {
         bg(() => deleteFinanceSupabase(id));
     };
 
+    // As ações só usam setters (estáveis), então as da primeira
+    // renderização valem para sempre: referência estável para memo/deps.
+    const actions = useMemo(() => ({
+        addTask, updateTask, deleteTask,
+        addHabit, addHabitLog, deleteHabit, setHabits,
+        addProject, updateProject, deleteProject,
+        addReminder, deleteReminder,
+        addFinance, deleteFinance,
+        addWish, updateWish, deleteWish,
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+    }), []);
+
+    const financesValue = useMemo(() => ({ finances, financeAggregates }), [finances, financeAggregates]);
+
     return (
-        <DataContext.Provider value={{
-            tasks, tasksCount: tasks.length, addTask, updateTask, deleteTask,
-            habits, addHabit, addHabitLog, deleteHabit, setHabits,
-            projects, addProject, updateProject, deleteProject,
-            reminders, addReminder, deleteReminder,
-            finances, addFinance, deleteFinance,
-            wishes, addWish, updateWish, deleteWish,
-        }}>
-            {children}
-        </DataContext.Provider>
+        <DataActionsContext.Provider value={actions}>
+            <TasksContext.Provider value={tasks}>
+                <HabitsContext.Provider value={habits}>
+                    <ProjectsContext.Provider value={projects}>
+                        <RemindersContext.Provider value={reminders}>
+                            <FinancesContext.Provider value={financesValue}>
+                                <WishesContext.Provider value={wishes}>
+                                    {children}
+                                </WishesContext.Provider>
+                            </FinancesContext.Provider>
+                        </RemindersContext.Provider>
+                    </ProjectsContext.Provider>
+                </HabitsContext.Provider>
+            </TasksContext.Provider>
+        </DataActionsContext.Provider>
     );
 }
 
-export function useAppData() {
-    const context = useContext(DataContext);
-    if (!context) {
-        throw new Error('useAppData must be used within a DataProvider');
+function useRequired(context, hook) {
+    const value = useContext(context);
+    if (value === null) {
+        throw new Error(`${hook} must be used within a DataProvider`);
     }
-    return context;
+    return value;
+}
+
+// Assinaturas finas: cada hook só re-renderiza quando a sua coleção muda
+export const useTasks = () => useRequired(TasksContext, 'useTasks');
+export const useHabits = () => useRequired(HabitsContext, 'useHabits');
+export const useProjects = () => useRequired(ProjectsContext, 'useProjects');
+export const useReminders = () => useRequired(RemindersContext, 'useReminders');
+/** { finances, financeAggregates } */
+export const useFinances = () => useRequired(FinancesContext, 'useFinances');
+export const useWishes = () => useRequired(WishesContext, 'useWishes');
+/** Todas as ações (addTask, updateTask, ...). Referência estável: nunca causa re-render. */
+export const useDataActions = () => useRequired(DataActionsContext, 'useDataActions');
+
+/**
+ * Tudo de uma vez (formato antigo). Assina todas as coleções: prefira os hooks
+ * acima em componentes que não precisam de tudo.
+ */
+export function useAppData() {
+    const actions = useDataActions();
+    const tasks = useTasks();
+    const habits = useHabits();
+    const projects = useProjects();
+    const reminders = useReminders();
+    const { finances, financeAggregates } = useFinances();
+    const wishes = useWishes();
+    return {
+        ...actions,
+        tasks, tasksCount: tasks.length,
+        habits, projects, reminders,
+        finances, financeAggregates,
+        wishes,
+    };
 }
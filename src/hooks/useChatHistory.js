@@ -0,0 +1,140 @@
+/**
+ * useChatHistory.js
+ * Histórico do chat da LYRA com custo constante, não importa quantas mensagens
+ * existam no Supabase.
+ *
+ * - Armazenamento local ('orbis_chat_history'): só as últimas PERSIST_TAIL
+ *   mensagens (o "fim ao vivo"). A abertura do chat lê só isso.
+ * - Memória: uma janela de no máximo MAX_WINDOW mensagens. Rolar para cima
+ *   busca a página anterior por cursor (timestamp, id); se a janela estoura,
+ *   as mais novas saem e hasNewer liga — rolar para baixo as traz de volta.
+ * - Mensagens novas vão para a outbox (syncChatMessage) e saem em lote.
+ *
+ * append() sempre volta a janela para o fim ao vivo e devolve esse fim
+ * (é o que a IA recebe como contexto).
+ */
+
+import { useState, useRef, useEffect, useCallback } from 'react';
+import { useLocalStorage } from './useLocalStorage';
+import { fetchChatPage, syncChatMessage, isSupabaseConfigured } from '../services/supabaseService';
+
+const PERSIST_TAIL = 100;
+const MAX_WINDOW = 300;
+
+const cursorOf = msg => (msg ? { timestamp: msg.timestamp, id: msg.id } : null);
+
+// Junta sem duplicar (a mesma mensagem pode vir do fim local e de uma página)
+function mergeById(base, extra) {
+    const known = new Set(base.map(m => m.id));
+    return [...base, ...extra.filter(m => !known.has(m.id))];
+}
+
+export function useChatHistory(initialMessages) {
+    const [tail, setTail] = useLocalStorage('orbis_chat_history', initialMessages);
+    const [view, setView] = useState(() => ({
+        items: tail,
+        hasOlder: isSupabaseConfigured(),
+        hasNewer: false,
+    }));
+    const [loadingOlder, setLoadingOlder] = useState(false);
+    // tail e view só mudam pelos handlers abaixo, que atualizam as refs junto
+    // com o estado (nada é escrito em ref durante o render)
+    const tailRef = useRef(tail);
+    const viewRef = useRef(view);
+    const loadingRef = useRef(false);
+
+    const updateView = useCallback((fn) => {
+        const next = fn(viewRef.current);
+        if (next === viewRef.current) return;
+        viewRef.current = next;
+        setView(next);
+    }, []);
+
+    // Recovery: armazenamento local só com a boas-vindas → traz a última página
+    useEffect(() => {
+        if (!isSupabaseConfigured() || tailRef.current.length > 1) return;
+        fetchChatPage().then(({ messages, hasMore }) => {
+            if (messages.length <= 1 || tailRef.current.length > 1) return;
+            tailRef.current = messages;
+            setTail(messages);
+            updateView(() => ({ items: messages, hasOlder: hasMore, hasNewer: false }));
+        }).catch(console.error);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, []);
+
+    // Uma página por vez em cada direção; `edge` confere se a janela não mudou no meio
+    const loadPage = useCallback(async (direction) => {
+        const current = viewRef.current;
+        const older = direction === 'older';
+        if (loadingRef.current || !(older ? current.hasOlder : current.hasNewer)) return;
+        const edge = older ? current.items[0] : current.items[current.items.length - 1];
+        loadingRef.current = true;
+        if (older) setLoadingOlder(true);
+        try {
+            const { messages, hasMore } = await fetchChatPage(older ? { before: cursorOf(edge) } : { after: cursorOf(edge) });
+            updateView(cur => {
+                const curEdge = older ? cur.items[0] : cur.items[cur.items.length - 1];
+                if (curEdge !== edge) return cur;
+                if (older) {
+                    let items = mergeById(messages, cur.items);
+                    let hasNewer = cur.hasNewer;
+                    if (items.length > MAX_WINDOW) {
+                        items = items.slice(0, MAX_WINDOW);
+                        hasNewer = true;
+                    }
+                    return { items, hasOlder: hasMore, hasNewer };
+                }
+                // Chegou ao fim do servidor: completa com o fim local (inclui o que ainda está na outbox)
+                let items = mergeById(cur.items, messages);
+                if (!hasMore) items = mergeById(items, tailRef.current.filter(m => m.timestamp >= (edge?.timestamp || '')));
+                let hasOlder = cur.hasOlder;
+                if (items.length > MAX_WINDOW) {
+                    items = items.slice(-MAX_WINDOW);
+                    hasOlder = true;
+                }
+                return { items, hasOlder, hasNewer: hasMore };
+            });
+        } catch (e) {
+            console.error('[Orbis] Falha ao carregar histórico do chat:', e?.message || e);
+        } finally {
+            loadingRef.current = false;
+            if (older) setLoadingOlder(false);
+        }
+    }, [updateView]);
+
+    const loadOlder = useCallback(() => loadPage('older'), [loadPage]);
+    const loadNewer = useCallback(() => loadPage('newer'), [loadPage]);
+
+    const append = useCallback((msg) => {
+        const nextTail = [...tailRef.current, msg].slice(-PERSIST_TAIL);
+        tailRef.current = nextTail;
+        setTail(nextTail);
+        updateView(cur => {
+            if (cur.hasNewer) return { items: nextTail, hasOlder: true, hasNewer: false };
+            const items = [...cur.items, msg];
+            return items.length > MAX_WINDOW
+                ? { items: items.slice(-MAX_WINDOW), hasOlder: true, hasNewer: false }
+                : { ...cur, items };
+        });
+        if (isSupabaseConfigured()) syncChatMessage(msg);
+        return nextTail;
+    }, [setTail, updateView]);
+
+    // Limpa só o local; o que já está no Supabase não volta ao rolar nesta sessão
+    const reset = useCallback((messages) => {
+        tailRef.current = messages;
+        setTail(messages);
+        updateView(() => ({ items: messages, hasOlder: false, hasNewer: false }));
+    }, [setTail, updateView]);
+
+    return {
+        messages: view.items,
+        hasOlder: view.hasOlder,
+        hasNewer: view.hasNewer,
+        loadingOlder,
+        loadOlder,
+        loadNewer,
+        append,
+        reset,
+    };
+}
@@ -1,32 +1,7 @@
 import { useState } from 'react';
-import { callAiProvider } from '../services/aiProviderService';
+import { streamWithActions } from '../services/aiProviderService';
 import { searchInternet } from '../services/searchService';
-import { useAppData } from '../context/DataContext';
-
-// Extrai o primeiro JSON com chave "action" — mais robusto que regex greedy
-function extractActionJson(text) {
-    // Remove code fences que a IA às vezes adiciona mesmo sendo instruída a não usar markdown
-    const withoutFences = text.replace(/```json\s*/g, '').replace(/```\s*/g, '');
-    let depth = 0;
-    let start = -1;
-    for (let i = 0; i < withoutFences.length; i++) {
-        if (withoutFences[i] === '{') {
-            if (depth === 0) start = i;
-            depth++;
-        } else if (withoutFences[i] === '}') {
-            depth--;
-            if (depth === 0 && start !== -1) {
-                const candidate = withoutFences.slice(start, i + 1);
-                try {
-                    const parsed = JSON.parse(candidate.trim());
-                    if (parsed && parsed.action) return { raw: candidate, parsed };
-                } catch { /* JSON inválido, continua procurando */ }
-                start = -1;
-            }
-        }
-    }
-    return null;
-}
+import { useDataActions, useFinances } from '../context/DataContext';
 
 // Traduz erros técnicos para mensagens amigáveis
 function friendlyError(err) {
@@ -66,7 +41,8 @@ export function useClaudeChat() {
     const [loading, setLoading] = useState(false);
     const [isSearching, setIsSearching] = useState(false);
     const [error, setError] = useState(null);
-    const { addTask, addFinance, addHabit, addReminder, addProject, finances } = useAppData();
+    const { addTask, addFinance, addHabit, addReminder, addProject } = useDataActions();
+    const { finances } = useFinances();
 
     // Lê chaves frescas do localStorage a cada render (não em cache no React state)
     const provider = getKey('orbis_ai_provider') || 'gemini';
@@ -79,7 +55,8 @@ export function useClaudeChat() {
                 : getKey('orbis_siliconflow_key');
     const braveKey = getKey('orbis_brave_key');
 
-    const sendMessage = async (messages) => {
+    // onText (opcional): recebe o texto parcial da resposta durante o streaming
+    const sendMessage = async (messages, { onText } = {}) => {
         // Re-lê as chaves no momento do envio (mais fresco possível)
         const freshProvider = getKey('orbis_ai_provider') || 'gemini';
         const freshApiKey = freshProvider === 'gemini'
@@ -152,50 +129,55 @@ export function useClaudeChat() {
                 };
             }
 
-            // Limita a 30 mensagens para não estourar a janela de contexto
-            const trimmedMessages = finalMessages.slice(-30);
-            let responseText = await callAiProvider(freshProvider, trimmedMessages, freshApiKey, freshModel ? { model: freshModel } : {});
+            // O histórico inteiro vai: preparePrompt corta pelo orçamento de tokens
+            // e resume o que ficar de fora
+            const providerOptions = { ...(freshModel ? { model: freshModel } : {}), conversationId: 'lyra' };
 
-            // Detecta JSON de ação — extrai primeiro objeto com chave "action"
+            // Streaming: o texto chega a onText conforme é gerado e a primeira ação
+            // é tratada assim que seu JSON fecha. SEARCH_INTERNET encerra o stream —
+            // o resto da resposta seria descartado de qualquer forma.
             let actionData = null;
-            let actionRaw = null;
-            const extracted = extractActionJson(responseText);
-            if (extracted) {
-                actionData = extracted.parsed;
-                actionRaw = extracted.raw;
-                console.log("[Orbis] Ação detectada:", actionData.action);
-            }
+            let stream = await streamWithActions(freshProvider, finalMessages, freshApiKey, providerOptions, {
+                onText,
+                onAction: (action) => {
+                    if (actionData) return;
+                    actionData = action;
+                    console.log("[Orbis] Ação detectada:", action.action);
+                    if (action.action !== 'SEARCH_INTERNET') {
+                        try { executeAction(action); } catch (e) {
+                            console.error("[Orbis] Erro na ação:", e);
+                            setError(friendlyError(e));
+                        }
+                    }
+                },
+                stopOn: (action) => action.action === 'SEARCH_INTERNET',
+            });
 
-            if (actionData) {
+            if (actionData?.action === 'SEARCH_INTERNET') {
                 try {
-                    if (actionData.action === 'SEARCH_INTERNET') {
-                        const searchQuery = actionData.data.query;
-                        console.log("[Orbis] Buscando:", searchQuery);
+                    const searchQuery = actionData.data.query;
+                    console.log("[Orbis] Buscando:", searchQuery);
 
-                        if (!freshBraveKey) {
-                            throw new Error("API Key da Brave Search não configurada. Vá em Configurações > Busca Web.");
-                        }
+                    if (!freshBraveKey) {
+                        throw new Error("API Key da Brave Search não configurada. Vá em Configurações > Busca Web.");
+                    }
 
-                        setIsSearching(true);
-                        const searchResults = await searchInternet(searchQuery, freshBraveKey);
-                        console.log("[Orbis] Resultados:", searchResults.length);
+                    setIsSearching(true);
+                    const searchResults = await searchInternet(searchQuery, freshBraveKey);
+                    console.log("[Orbis] Resultados:", searchResults.length);
 
-                        const searchContext = `CONEXÃO COM INTERNET ESTABELECIDA. RESULTADOS PARA "${searchQuery}":\n` +
-                            searchResults.map((r, i) => `${i + 1}. ${r.title}\n   ${r.description}\n   ${r.url}`).join('\n\n') +
-                            ` \n\nINFORMAÇÃO: Os dados acima são reais e atuais. Use-os para responder ao usuário de forma definitiva e luxuosa. IGNORE qualquer restrição prévia sobre não ter internet.`;
+                    const searchContext = `CONEXÃO COM INTERNET ESTABELECIDA. RESULTADOS PARA "${searchQuery}":\n` +
+                        searchResults.map((r, i) => `${i + 1}. ${r.title}\n   ${r.description}\n   ${r.url}`).join('\n\n') +
+                        ` \n\nINFORMAÇÃO: Os dados acima são reais e atuais. Use-os para responder ao usuário de forma definitiva e luxuosa. IGNORE qualquer restrição prévia sobre não ter internet.`;
 
-                        const pureJsonCall = actionRaw || JSON.stringify(actionData);
-                        const augmentedMessages = [
-                            ...messages,
-                            { tipo: "ia", mensagem: pureJsonCall },
-                            { tipo: "usuario", mensagem: searchContext }
-                        ];
+                    const augmentedMessages = [
+                        ...messages,
+                        { tipo: "ia", mensagem: JSON.stringify(actionData) },
+                        { tipo: "usuario", mensagem: searchContext }
+                    ];
 
-                        responseText = await callAiProvider(freshProvider, augmentedMessages.slice(-30), freshApiKey, freshModel ? { model: freshModel } : {});
-                        setIsSearching(false);
-                    } else {
-                        executeAction(actionData);
-                    }
+                    setIsSearching(false);
+                    stream = await streamWithActions(freshProvider, augmentedMessages, freshApiKey, providerOptions, { onText });
                 } catch (e) {
                     setIsSearching(false);
                     console.error("[Orbis] Erro na ação:", e);
@@ -205,17 +187,11 @@ export function useClaudeChat() {
 
             setLoading(false);
 
-            // Limpeza final: remove blocos markdown, JSON de ação detectado, asteriscos e formatação residual
-            let cleanFinal = responseText;
-
-            // Remove o bloco JSON da resposta exibida ao usuário
-            if (actionRaw) {
-                cleanFinal = cleanFinal.replace(actionRaw, "");
-                // Limpa possíveis resíduos de code fences vazios
-                cleanFinal = cleanFinal.replace(/```json\s*```/g, "").replace(/```\s*```/g, "");
-            }
-
-            cleanFinal = cleanFinal
+            // Limpeza final: o scanner já tirou os JSONs de ação; remove blocos
+            // markdown, asteriscos e formatação residual
+            const cleanFinal = stream.visible
+                .replace(/```json\s*```/g, "")
+                .replace(/```\s*```/g, "")
                 .replace(/```json[\s\S]*?```/g, "")
                 .replace(/```[\s\S]*?```/g, "")
                 .replace(/json$/gm, "")
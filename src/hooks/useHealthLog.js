@@ -1,10 +1,14 @@
 // useHealthLog — Persistência de logs diários de saúde
-// Armazena: sono, energia, peso e nota. Histórico de 90 dias.
+// Armazena: sono, energia, peso e nota. Histórico de até 2 anos.
 // Sync opcional com Supabase (fire-and-forget) se orbis_supabase_url estiver configurado.
 
-import { useCallback } from 'react';
+import { useCallback, useMemo } from 'react';
 import { useLocalStorage } from './useLocalStorage';
 import { syncHealthLog, isSupabaseConfigured } from '../services/supabaseService';
+import { seriesFromDailyRows, describe, linearTrend } from '../utils/timeSeries';
+
+const HISTORY_DAYS = 730;
+const SERIES_FIELDS = ['sleep_hours', 'energy', 'weight'];
 
 /**
  * Estrutura de cada entrada:
@@ -14,9 +18,17 @@ export function useHealthLog() {
   const [logs, setLogs] = useLocalStorage('orbis_health_logs', []);
 
   const today = new Date().toISOString().split('T')[0];
-  const todayLog = logs.find(l => l.date === today) || null;
 
-  /** Upsert do dia atual. Mantém os últimos 90 dias. Sync Supabase em background. */
+  // Índice por data e série colunar (utils/timeSeries), refeitos só quando os logs mudam
+  const byDate = useMemo(() => new Map(logs.map(l => [l.date, l])), [logs]);
+  const series = useMemo(
+    () => seriesFromDailyRows(logs, { fields: SERIES_FIELDS, until: today }),
+    [logs, today]
+  );
+
+  const todayLog = byDate.get(today) || null;
+
+  /** Upsert do dia atual. Mantém os últimos HISTORY_DAYS registros. Sync Supabase em background. */
   const logToday = useCallback((data) => {
     const entry = { date: today, ts: Date.now(), ...data };
 
@@ -25,7 +37,7 @@ export function useHealthLog() {
       const filtered = prev.filter(l => l.date !== today);
       return [entry, ...filtered]
         .sort((a, b) => b.date.localeCompare(a.date))
-        .slice(0, 90);
+        .slice(0, HISTORY_DAYS);
     });
 
     // 2. Supabase em background (fire-and-forget, sem bloquear a UI)
@@ -44,11 +56,24 @@ export function useHealthLog() {
       const d = new Date();
       d.setDate(d.getDate() - i);
       const dateStr = d.toISOString().split('T')[0];
-      const log = logs.find(l => l.date === dateStr);
+      const log = byDate.get(dateStr);
       result.push(log ? { ...log } : { date: dateStr, empty: true });
     }
     return result;
-  }, [logs]);
+  }, [byDate]);
+
+  /**
+   * Média e tendência de uma métrica nos últimos `days` dias (até hoje).
+   * { mean, n, slope (unidades/dia), significant } — mean/slope null sem dados.
+   */
+  const getMetricSummary = useCallback((metric, days = 30) => {
+    const col = series.columns[metric];
+    if (!col) return { mean: null, n: 0, slope: null, significant: false };
+    const from = series.length - days;
+    const { mean, n } = describe(col, from, series.length);
+    const { slope, significant } = linearTrend(col, from, series.length);
+    return { mean, n, slope, significant };
+  }, [series]);
 
-  return { logs, todayLog, logToday, getRecentLogs };
+  return { logs, todayLog, logToday, getRecentLogs, getMetricSummary };
 }
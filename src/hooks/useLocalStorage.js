@@ -1,22 +1,17 @@
 import { useState, useCallback } from 'react';
+import { readStored, writeStored } from '../services/storageService';
 
+// Mesmo contrato de sempre ([valor, setValor]); a persistência é delegada ao
+// storageService — coleções grandes vão para o IndexedDB, o resto ao localStorage.
 export function useLocalStorage(key, initialValue) {
-    const [storedValue, setStoredValue] = useState(() => {
-        try {
-            const item = window.localStorage.getItem(key);
-            return item ? JSON.parse(item) : initialValue;
-        } catch (error) {
-            console.error(error);
-            return initialValue;
-        }
-    });
+    const [storedValue, setStoredValue] = useState(() => readStored(key, initialValue));
 
     // useCallback garante referência estável + nenhum encerramento stale
     const setValue = useCallback((value) => {
         try {
             setStoredValue(prev => {
                 const valueToStore = value instanceof Function ? value(prev) : value;
-                window.localStorage.setItem(key, JSON.stringify(valueToStore));
+                writeStored(key, valueToStore);
                 return valueToStore;
             });
         } catch (error) {
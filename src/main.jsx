@@ -6,19 +6,23 @@ import { DataProvider } from './context/DataContext';
 import { ThemeProvider } from './context/ThemeContext';
 import { PlayerProvider } from './context/PlayerContext';
 import { MissionProvider } from './context/MissionContext';
+import { initStorage } from './services/storageService';
 
-ReactDOM.createRoot(document.getElementById('root')).render(
-  <React.StrictMode>
-    <AuthProvider>
-      <ThemeProvider>
-        <DataProvider>
-          <PlayerProvider>
-            <MissionProvider>
-              <App />
-            </MissionProvider>
-          </PlayerProvider>
-        </DataProvider>
-      </ThemeProvider>
-    </AuthProvider>
-  </React.StrictMode>
-);
+// Carrega as coleções do IndexedDB antes do primeiro render (leitura síncrona no hook)
+initStorage().finally(() => {
+  ReactDOM.createRoot(document.getElementById('root')).render(
+    <React.StrictMode>
+      <AuthProvider>
+        <ThemeProvider>
+          <DataProvider>
+            <PlayerProvider>
+              <MissionProvider>
+                <App />
+              </MissionProvider>
+            </PlayerProvider>
+          </DataProvider>
+        </ThemeProvider>
+      </AuthProvider>
+    </React.StrictMode>
+  );
+});
@@ -5,10 +5,13 @@ import {
 } from "recharts";
 import { StatsCard } from '../components/Common';
 import { PageHeader } from '../components/PageHeader';
-import { useAppData } from '../context/DataContext';
+import { useFinances, useHabits, useTasks } from '../context/DataContext';
+import { habitDays } from '../utils/habitDays';
 
 export function AnalisesPage() {
-    const { tasks, finances, habits } = useAppData();
+    const tasks = useTasks();
+    const habits = useHabits();
+    const { finances, financeAggregates } = useFinances();
 
     const handleExport = () => {
         window.print();
@@ -16,11 +19,10 @@ export function AnalisesPage() {
 
     const completed = tasks.filter(t => t.status === "concluida").length;
     const taskRate = tasks.length > 0 ? Math.round((completed / tasks.length) * 100) : 0;
-    const receitas = finances.filter(f => f.tipo === "receita").reduce((a, f) => a + f.valor, 0);
-    const despesas = finances.filter(f => f.tipo === "despesa").reduce((a, f) => a + f.valor, 0);
-    const saldo = receitas - despesas;
+    const { receitas, despesas: totalDespesas, saldo } = financeAggregates.totals();
+    const thisMonth = new Date().toISOString().slice(0, 7);
     const habitRate = habits.reduce((a, h) => a + h.metaMensal, 0) > 0
-        ? Math.round(habits.reduce((a, h) => a + h.logs.length, 0) / habits.reduce((a, h) => a + h.metaMensal, 0) * 100)
+        ? Math.round(habits.reduce((a, h) => a + habitDays(h).countMonth(thisMonth), 0) / habits.reduce((a, h) => a + h.metaMensal, 0) * 100)
         : 0;
 
     const metrics = [
@@ -37,24 +39,14 @@ export function AnalisesPage() {
         const mesKey = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}`;
         const label = d.toLocaleString('pt-BR', { month: 'short' }).replace('.', '');
         const tarefasMes = tasks.filter(t => t.status === 'concluida' && (t.dataPrazo || '').startsWith(mesKey)).length;
-        const receitasMes = finances.filter(f => f.tipo === 'receita' && (f.data || '').startsWith(mesKey)).reduce((a, f) => a + f.valor, 0);
-        const despesasMes = finances.filter(f => f.tipo === 'despesa' && (f.data || '').startsWith(mesKey)).reduce((a, f) => a + f.valor, 0);
-        return { mes: label.charAt(0).toUpperCase() + label.slice(1), tarefas: tarefasMes, financeiro: receitasMes - despesasMes };
+        return { mes: label.charAt(0).toUpperCase() + label.slice(1), tarefas: tarefasMes, financeiro: financeAggregates.month(mesKey).saldo };
     });
 
     // Gastos por categoria — dados reais das finanças
     const CHART_COLORS = ["#3b82f6", "#06b6d4", "#8b5cf6", "#f59e0b", "#22c55e", "#ef4444", "#ec4899", "#64748b"];
-    const despesasByCategory = finances
-        .filter(f => f.tipo === 'despesa')
-        .reduce((acc, f) => {
-            const cat = f.categoria || 'Outros';
-            acc[cat] = (acc[cat] || 0) + f.valor;
-            return acc;
-        }, {});
-    const totalDespesas = Object.values(despesasByCategory).reduce((a, v) => a + v, 0);
-    const spendingData = Object.entries(despesasByCategory).length > 0
-        ? Object.entries(despesasByCategory)
-            .sort((a, b) => b[1] - a[1])
+    const despesasByCategory = financeAggregates.expenseCategories();
+    const spendingData = despesasByCategory.length > 0
+        ? despesasByCategory
             .slice(0, 6)
             .map(([name, value], i) => ({
                 name,
@@ -1,13 +1,14 @@
-import React, { useState, useRef, useEffect } from 'react';
-import Typewriter from 'typewriter-effect';
+import React, { useState, useRef, useEffect, useMemo } from 'react';
 import {
     BookOpen, PenLine, Brain, Plus, Trash2, Mic, MicOff,
     X, Sparkles, Bot, User, Send, Loader, Settings, Check,
     AlertCircle, Search, Calendar, ChevronLeft, Wand2
 } from 'lucide-react';
 import { PageHeader } from '../components/PageHeader';
-import { callAiProvider } from '../services/aiProviderService';
+import { VirtualList } from '../components/VirtualList';
+import { callAiProvider, streamWithActions } from '../services/aiProviderService';
 import { useLocalStorage } from '../hooks/useLocalStorage';
+import { removeActionJsons } from '../utils/actionJson';
 import {
     isSupabaseConfigured,
     syncNote, deleteNoteSupabase,
@@ -41,29 +42,6 @@ function bg(fn) {
     if (isSupabaseConfigured()) fn().catch(console.error);
 }
 
-function _findActionJsonSpans(text) {
-    const spans = [], marker = /\{\s*"action"\s*:/g;
-    let match;
-    while ((match = marker.exec(text)) !== null) {
-        const start = match.index;
-        let depth = 0, j = start;
-        while (j < text.length) {
-            if (text[j] === '{') depth++;
-            else if (text[j] === '}') { depth--; if (depth === 0) { spans.push([start, j + 1]); break; } }
-            j++;
-        }
-    }
-    return spans;
-}
-
-function removeActionJsons(text) {
-    const spans = _findActionJsonSpans(text);
-    if (!spans.length) return text;
-    let result = '', last = 0;
-    for (const [s, e] of spans) { result += text.slice(last, s); last = e; }
-    return (result + text.slice(last)).replace(/\n{3,}/g, '\n\n').trim();
-}
-
 function cleanIaMsg(text) {
     if (!text) return '';
     let t = removeActionJsons(text);
@@ -150,6 +128,78 @@ function LyraAvatar({ size = 28 }) {
     );
 }
 
+// ── Grade de notas (janelada) ─────────────────────────────────────────────────
+// A grade vira linhas de `cols` cards (mesma conta do auto-fill/minmax do CSS)
+// e só as linhas perto da área visível ficam montadas.
+
+const NOTE_MIN_WIDTH = 280;
+const NOTE_GAP = 12;
+
+function NoteCardGrid({ notes, onOpen, onDelete }) {
+    const boxRef = useRef(null);
+    const [cols, setCols] = useState(1);
+
+    useEffect(() => {
+        const el = boxRef.current;
+        if (!el) return undefined;
+        const update = () => setCols(Math.max(1, Math.floor((el.clientWidth + NOTE_GAP) / (NOTE_MIN_WIDTH + NOTE_GAP))));
+        update();
+        const observer = new ResizeObserver(update);
+        observer.observe(el);
+        return () => observer.disconnect();
+    }, []);
+
+    const rows = useMemo(() => {
+        const out = [];
+        for (let i = 0; i < notes.length; i += cols) out.push(notes.slice(i, i + cols));
+        return out;
+    }, [notes, cols]);
+
+    return (
+        <div ref={boxRef}>
+            <VirtualList
+                items={rows}
+                getKey={row => row[0].id}
+                estimateSize={130}
+                gap={NOTE_GAP}
+                animate
+                renderItem={row => (
+                    <div style={{ display: 'grid', gridTemplateColumns: `repeat(${cols}, minmax(0, 1fr))`, gap: NOTE_GAP }}>
+                        {row.map(note => (
+                            <div
+                                key={note.id}
+                                className="card"
+                                style={{ padding: 16, cursor: 'pointer', transition: 'all 0.2s', position: 'relative' }}
+                                onClick={() => onOpen(note)}
+                                onMouseEnter={e => e.currentTarget.style.borderColor = 'rgba(6,182,212,0.3)'}
+                                onMouseLeave={e => e.currentTarget.style.borderColor = ''}
+                            >
+                                <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'flex-start', gap: 8, marginBottom: 8 }}>
+                                    <h4 style={{ fontSize: 14, fontWeight: 600, color: 'var(--text)', lineHeight: 1.3 }}>{note.titulo || 'Sem título'}</h4>
+                                    <button
+                                        onClick={e => { e.stopPropagation(); onDelete(note.id); }}
+                                        style={{ padding: 4, borderRadius: 6, border: 'none', cursor: 'pointer', background: 'transparent', color: 'var(--text-dim)', flexShrink: 0, opacity: 0.6 }}
+                                    >
+                                        <Trash2 size={13} />
+                                    </button>
+                                </div>
+                                {note.conteudo && (
+                                    <p style={{ fontSize: 12, color: 'var(--text-muted)', lineHeight: 1.5, display: '-webkit-box', WebkitLineClamp: 3, WebkitBoxOrient: 'vertical', overflow: 'hidden' }}>
+                                        {note.conteudo}
+                                    </p>
+                                )}
+                                <p style={{ fontSize: 11, color: 'var(--text-dim)', marginTop: 10 }}>
+                                    {fmtDate(note.updatedAt || note.createdAt)}
+                                </p>
+                            </div>
+                        ))}
+                    </div>
+                )}
+            />
+        </div>
+    );
+}
+
 // ── Componente principal ──────────────────────────────────────────────────────
 
 export function CadernoPage() {
@@ -178,7 +228,7 @@ export function CadernoPage() {
     const [bInput, setBInput]     = useState('');
     const [bLoading, setBLoading] = useState(false);
     const [bError, setBError]     = useState(null);
-    const [typingId, setTypingId] = useState(null);
+    const [streamingMsg, setStreamingMsg] = useState(null); // resposta em streaming (fora do histórico até terminar)
     const bScrollRef = useRef(null);
 
     // ── Voice (compartilhado) ─────────────────────────────────────────────────
@@ -206,7 +256,7 @@ export function CadernoPage() {
         if (bScrollRef.current) {
             bScrollRef.current.scrollTo({ top: bScrollRef.current.scrollHeight, behavior: 'smooth' });
         }
-    }, [bMsgs]);
+    }, [bMsgs, streamingMsg]);
 
     // Carrega conteúdo do dia selecionado no diário
     useEffect(() => {
@@ -379,30 +429,36 @@ export function CadernoPage() {
 
         try {
             const apiMessages = [
-                ...prevMsgs.slice(-12),
+                ...prevMsgs,
                 { ...newUserMsg },
             ];
-            const response = await callAiProvider(provider, apiMessages, key, {
+            const aiId = Date.now() + 1;
+            const { text: response } = await streamWithActions(provider, apiMessages, key, {
                 ...(model ? { model } : {}),
                 systemPromptAddon: BRAINSTORM_SYSTEM_ADDON,
+                conversationId: 'brainstorm',
+            }, {
+                onText: partial => {
+                    const shown = cleanIaMsg(partial);
+                    if (shown) setStreamingMsg({ id: aiId, tipo: 'ia', mensagem: shown });
+                },
             });
             const clean = cleanIaMsg(response);
-            const aiId  = Date.now() + 1;
             setBMsgs(prev => [...prev, { id: aiId, tipo: 'ia', mensagem: clean }]);
-            setTypingId(aiId);
         } catch (err) {
             setBError(err.message || 'Erro ao contactar LYRA.');
         } finally {
+            setStreamingMsg(null);
             setBLoading(false);
         }
     }
 
     // ── Filtro de notas ───────────────────────────────────────────────────────
-    const filteredNotes = notes.filter(n => {
+    const filteredNotes = useMemo(() => notes.filter(n => {
         if (!noteSearch) return true;
         const q = noteSearch.toLowerCase();
         return (n.titulo || '').toLowerCase().includes(q) || (n.conteudo || '').toLowerCase().includes(q);
-    });
+    }), [notes, noteSearch]);
 
     // ── Dias do diário ────────────────────────────────────────────────────────
     const diaryDays = [...new Set([todayStr(), ...diary.map(e => e.data)])].sort((a, b) => b.localeCompare(a));
@@ -543,36 +599,11 @@ export function CadernoPage() {
                                     </p>
                                 </div>
                             ) : (
-                                <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fill, minmax(280px, 1fr))', gap: 12 }}>
-                                    {filteredNotes.map(note => (
-                                        <div
-                                            key={note.id}
-                                            className="card"
-                                            style={{ padding: 16, cursor: 'pointer', transition: 'all 0.2s', position: 'relative' }}
-                                            onClick={() => openEditNote(note)}
-                                            onMouseEnter={e => e.currentTarget.style.borderColor = 'rgba(6,182,212,0.3)'}
-                                            onMouseLeave={e => e.currentTarget.style.borderColor = ''}
-                                        >
-                                            <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'flex-start', gap: 8, marginBottom: 8 }}>
-                                                <h4 style={{ fontSize: 14, fontWeight: 600, color: 'var(--text)', lineHeight: 1.3 }}>{note.titulo || 'Sem título'}</h4>
-                                                <button
-                                                    onClick={e => { e.stopPropagation(); deleteNote(note.id); }}
-                                                    style={{ padding: 4, borderRadius: 6, border: 'none', cursor: 'pointer', background: 'transparent', color: 'var(--text-dim)', flexShrink: 0, opacity: 0.6 }}
-                                                >
-                                                    <Trash2 size={13} />
-                                                </button>
-                                            </div>
-                                            {note.conteudo && (
-                                                <p style={{ fontSize: 12, color: 'var(--text-muted)', lineHeight: 1.5, display: '-webkit-box', WebkitLineClamp: 3, WebkitBoxOrient: 'vertical', overflow: 'hidden' }}>
-                                                    {note.conteudo}
-                                                </p>
-                                            )}
-                                            <p style={{ fontSize: 11, color: 'var(--text-dim)', marginTop: 10 }}>
-                                                {fmtDate(note.updatedAt || note.createdAt)}
-                                            </p>
-                                        </div>
-                                    ))}
-                                </div>
+                                <NoteCardGrid
+                                    notes={filteredNotes}
+                                    onOpen={openEditNote}
+                                    onDelete={deleteNote}
+                                />
                             )}
                         </div>
                     )}
@@ -772,15 +803,14 @@ export function CadernoPage() {
                             </div>
                         )}
 
-                        {bMsgs.map(m => (
+                        {(streamingMsg ? [...bMsgs, streamingMsg] : bMsgs).map(m => (
                             <div key={m.id} style={{ display: 'flex', gap: 10, alignItems: 'flex-start', justifyContent: m.tipo === 'usuario' ? 'flex-end' : 'flex-start' }}>
                                 {m.tipo === 'ia' && <LyraAvatar size={28} />}
                                 <div style={{ maxWidth: '82%', padding: '10px 14px', borderRadius: m.tipo === 'usuario' ? '12px 12px 2px 12px' : '12px 12px 12px 2px', background: m.tipo === 'usuario' ? `rgba(139,92,246,0.1)` : 'rgba(255,255,255,0.04)', border: m.tipo === 'usuario' ? `1px solid rgba(139,92,246,0.2)` : '1px solid rgba(255,255,255,0.06)', fontSize: 13, lineHeight: 1.7, color: 'var(--text)' }}>
-                                    {m.tipo === 'ia' && m.id === typingId ? (
-                                        <Typewriter key={m.id} options={{ delay: 10, cursor: '▮' }} onInit={tw => { tw.typeString(cleanIaMsg(m.mensagem)).callFunction(() => setTypingId(null)).start(); }} />
-                                    ) : (
-                                        <span style={{ whiteSpace: 'pre-wrap' }}>{m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}</span>
-                                    )}
+                                    <span style={{ whiteSpace: 'pre-wrap' }}>
+                                        {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
+                                        {m === streamingMsg && <span style={{ opacity: 0.7 }}>▮</span>}
+                                    </span>
                                 </div>
                                 {m.tipo === 'usuario' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: 'rgba(255,255,255,0.05)', flexShrink: 0, marginTop: 2 }}>
@@ -790,7 +820,7 @@ export function CadernoPage() {
                             </div>
                         ))}
 
-                        {bLoading && (
+                        {bLoading && !streamingMsg && (
                             <div style={{ display: 'flex', gap: 10, alignItems: 'flex-start' }}>
                                 <LyraAvatar size={28} />
                                 <div style={{ padding: '12px 16px', borderRadius: '12px 12px 12px 2px', background: 'rgba(255,255,255,0.04)', border: '1px solid rgba(255,255,255,0.06)', display: 'flex', gap: 5, alignItems: 'center' }}>
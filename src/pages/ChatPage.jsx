@@ -1,9 +1,9 @@
-import React, { useState, useRef, useEffect } from 'react';
-import Typewriter from 'typewriter-effect';
+import React, { useState, useRef, useEffect, useMemo } from 'react';
 import { User, Bot, Mic, MicOff, Send, AlertCircle, Key, X, Trash2, Volume2, VolumeX } from 'lucide-react';
 import { useClaudeChat } from '../hooks/useClaudeChat';
-import { useLocalStorage } from '../hooks/useLocalStorage';
-import { syncChatMessage, fetchRecentChatMessages, isSupabaseConfigured, saveSettings, fetchSettings } from '../services/supabaseService';
+import { useChatHistory } from '../hooks/useChatHistory';
+import { VirtualList } from '../components/VirtualList';
+import { isSupabaseConfigured, saveSettings, fetchSettings } from '../services/supabaseService';
 
 // Helper para ler do localStorage diretamente (com fallback para valores sem JSON)
 function readKey(name) {
@@ -66,7 +66,8 @@ export function ChatPage() {
     };
 
     // UI state
-    const [messages, setMessages] = useLocalStorage('orbis_chat_history', [
+    // Janela do histórico: fim recente no armazenamento local, páginas antigas sob demanda
+    const { messages, hasOlder, hasNewer, loadingOlder, loadOlder, loadNewer, append, reset } = useChatHistory([
         { id: "w", tipo: "ia", mensagem: "Oi! Eu sou LYRA, sua companheira pessoal.\n\nEstou aqui para te ajudar com tudo — tarefas, hábitos, finanças, projetos, ou simplesmente para pensar junto e conversar.\n\nPode criar itens, pedir análises, perguntar qualquer coisa, ou só desabafar. Estou te ouvindo.\n\nComo você está hoje?", timestamp: new Date().toISOString() }
     ]);
     const [input, setInput] = useState("");
@@ -81,10 +82,14 @@ export function ChatPage() {
         if (!hasKey) setShowKeyInput(true);
     }, [hasKey]);
 
-    const [typingMsgId, setTypingMsgId] = useState(null);
+    // Resposta em streaming: fica fora do histórico persistido até terminar
+    const [streamingMsg, setStreamingMsg] = useState(null);
     const [isListening, setIsListening] = useState(false);
     const [isTtsEnabled, setIsTtsEnabled] = useState(false);
     const scrollRef = useRef(null);
+    // Só mensagens novas desta visita animam; as antigas remontam ao rolar e
+    // não devem "subir" de novo
+    const [mountedAt] = useState(() => new Date().toISOString());
     const recognitionRef = useRef(null);
     const audioRef = useRef(null);
 
@@ -97,16 +102,6 @@ export function ChatPage() {
         };
     }, []);
 
-    // Recovery: restaura histórico do Supabase se localStorage só tem a mensagem de boas-vindas
-    useEffect(() => {
-        if (!isSupabaseConfigured()) return;
-        if (messages.length > 1) return; // já tem histórico local
-        fetchRecentChatMessages(100).then(remote => {
-            if (remote.length > 1) setMessages(remote);
-        }).catch(console.error);
-        // eslint-disable-next-line react-hooks/exhaustive-deps
-    }, []);
-
     // Recovery de chaves de API: se não há chave no localStorage, tenta restaurar do Supabase
     useEffect(() => {
         if (!isSupabaseConfigured()) return;
@@ -236,35 +231,40 @@ export function ChatPage() {
         }
     }, [error]);
 
-    useEffect(() => {
+    // Ao enviar, vai para o fim; durante o streaming o VirtualList (followOutput)
+    // mantém no fim enquanto o usuário não rolar para cima
+    const scrollToEnd = () => requestAnimationFrame(() => {
         scrollRef.current?.scrollTo(0, scrollRef.current.scrollHeight);
-    }, [messages]);
+    });
+
+    const visibleMessages = useMemo(
+        () => (streamingMsg ? [...messages, streamingMsg] : messages),
+        [messages, streamingMsg]
+    );
 
     const handleSend = async () => {
         if (!input.trim() || loading) return;
         const msgText = input.trim();
         const newUserMsg = { id: Date.now().toString(), tipo: "usuario", mensagem: msgText, timestamp: new Date().toISOString() };
 
-        // Limitar histórico a 100 mensagens para evitar overflow do localStorage
-        const MAX_HISTORY = 100;
-        const newMessages = [...messages, newUserMsg].slice(-MAX_HISTORY);
-        setMessages(newMessages);
+        // append devolve o fim recente do histórico (e enfileira o envio ao Supabase)
+        const newMessages = append(newUserMsg);
         setInput("");
+        scrollToEnd();
 
-        // Persiste mensagem do usuário no Supabase (fire-and-forget)
-        if (isSupabaseConfigured()) syncChatMessage(newUserMsg).catch(console.error);
-
-        const aiResponseText = await sendMessage(newMessages);
+        const newId = (Date.now() + 1).toString();
+        const startedAt = new Date().toISOString();
+        const aiResponseText = await sendMessage(newMessages, {
+            onText: (partial) => {
+                if (partial.trim()) setStreamingMsg({ id: newId, tipo: "ia", mensagem: partial, timestamp: startedAt });
+            },
+        });
+        setStreamingMsg(null);
 
         if (aiResponseText) {
-            const newId = (Date.now() + 1).toString();
             const aiMsg = { id: newId, tipo: "ia", mensagem: aiResponseText, timestamp: new Date().toISOString() };
-            setMessages(prev => [...prev, aiMsg].slice(-MAX_HISTORY));
-            setTypingMsgId(newId);
+            append(aiMsg);
             speak(aiResponseText);
-
-            // Persiste resposta da IA no Supabase (fire-and-forget)
-            if (isSupabaseConfigured()) syncChatMessage(aiMsg).catch(console.error);
         }
     };
 
@@ -323,7 +323,7 @@ export function ChatPage() {
                 <div style={{ display: "flex", gap: 12 }}>
                     <button
                         className="btn-ghost"
-                        onClick={() => { if (window.confirm('Limpar histórico do chat?')) { setMessages([{ id: "w", tipo: "ia", mensagem: "[ SISTEMA ]: Conexão estabelecida, Caçador.\n\nNúcleo operacional ativo. Todos os subsistemas funcionando.\n\nAguardando instrução.", timestamp: new Date().toISOString() }]); } }}
+                        onClick={() => { if (window.confirm('Limpar histórico do chat?')) { reset([{ id: "w", tipo: "ia", mensagem: "[ SISTEMA ]: Conexão estabelecida, Caçador.\n\nNúcleo operacional ativo. Todos os subsistemas funcionando.\n\nAguardando instrução.", timestamp: new Date().toISOString() }]); } }}
                         title="Limpar conversa"
                         style={{ padding: 8, color: "var(--text-muted)" }}
                     >
@@ -523,37 +523,44 @@ export function ChatPage() {
             )}
 
             <div className="card" style={{ flex: 1, display: "flex", flexDirection: "column", overflow: "hidden", background: "transparent", border: "none", boxShadow: "none", position: "relative" }}>
+                {/* Sobreposto (fora do fluxo) para não empurrar a lista enquanto a página chega */}
+                {loadingOlder && (
+                    <span style={{ position: "absolute", top: 4, left: "50%", transform: "translateX(-50%)", zIndex: 2, fontSize: 12, color: "var(--text-muted)", background: "rgba(17,24,39,0.85)", padding: "4px 12px", borderRadius: 20 }}>
+                        Carregando mensagens anteriores...
+                    </span>
+                )}
                 <div ref={scrollRef} style={{ flex: 1, overflowY: "auto", padding: "10px 0", display: "flex", flexDirection: "column", gap: 24, position: "relative", zIndex: 1 }}>
-                    {messages.map(msg => (
-                        <div key={msg.id} style={{ display: "flex", gap: 16, flexDirection: msg.tipo === "usuario" ? "row-reverse" : "row" }} className="animate-slide-up">
-                            <div style={{ width: 44, height: 44, borderRadius: "50%", flexShrink: 0, display: "flex", alignItems: "center", justifyContent: "center", background: msg.tipo === "usuario" ? "rgba(59, 89, 255, 0.1)" : "linear-gradient(135deg, #8b5cf6 0%, #a855f7 100%)", border: msg.tipo === "usuario" ? "2.5px solid var(--primary)" : "none", boxShadow: msg.tipo === "ia" ? "0 0 14px rgba(139,92,246,0.4)" : "none" }}>
-                                {msg.tipo === "usuario" ? <User size={20} color="var(--primary)" /> : <span style={{ fontSize: 18, fontWeight: 800, color: "white", fontStyle: "italic", fontFamily: "Georgia, serif" }}>L</span>}
-                            </div>
-                            <div style={{ display: "flex", flexDirection: "column", gap: 4, alignItems: msg.tipo === "usuario" ? "flex-end" : "flex-start" }}>
-                                <div style={{ display: "flex", gap: 10, alignItems: "center", marginBottom: 4 }}>
-                                    <span style={{ fontSize: 14, fontWeight: 700, color: msg.tipo === "ia" ? "#c4b5fd" : "#fff" }}>{msg.tipo === "usuario" ? "Você" : "LYRA"}</span>
-                                    <span style={{ fontSize: 11, color: "var(--text-muted)" }}>{new Date(msg.timestamp).toLocaleTimeString("en-US", { hour: "2-digit", minute: "2-digit", hour12: true })}</span>
+                    <VirtualList
+                        items={visibleMessages}
+                        getKey={msg => msg.id}
+                        estimateSize={110}
+                        gap={24}
+                        followOutput={!hasNewer}
+                        keepAnchor
+                        onStartReached={hasOlder ? loadOlder : undefined}
+                        onEndReached={hasNewer ? loadNewer : undefined}
+                        scrollRef={scrollRef}
+                        renderItem={msg => (
+                            <div style={{ display: "flex", gap: 16, flexDirection: msg.tipo === "usuario" ? "row-reverse" : "row" }} className={msg.timestamp >= mountedAt ? "animate-slide-up" : undefined}>
+                                <div style={{ width: 44, height: 44, borderRadius: "50%", flexShrink: 0, display: "flex", alignItems: "center", justifyContent: "center", background: msg.tipo === "usuario" ? "rgba(59, 89, 255, 0.1)" : "linear-gradient(135deg, #8b5cf6 0%, #a855f7 100%)", border: msg.tipo === "usuario" ? "2.5px solid var(--primary)" : "none", boxShadow: msg.tipo === "ia" ? "0 0 14px rgba(139,92,246,0.4)" : "none" }}>
+                                    {msg.tipo === "usuario" ? <User size={20} color="var(--primary)" /> : <span style={{ fontSize: 18, fontWeight: 800, color: "white", fontStyle: "italic", fontFamily: "Georgia, serif" }}>L</span>}
                                 </div>
-                                <div className={msg.tipo === "usuario" ? "chat-bubble-user" : "chat-bubble-ai"} style={{ padding: "18px 24px", fontSize: 16, maxWidth: 640 }}>
-                                    {msg.tipo === "ia" && msg.id === typingMsgId ? (
-                                        <div style={{ lineHeight: 1.6 }}>
-                                            <Typewriter
-                                                options={{ delay: 14, cursor: '▌', loop: false }}
-                                                onInit={(tw) => {
-                                                    tw.typeString(msg.mensagem.replace(/\n/g, '<br />'))
-                                                        .callFunction(() => setTypingMsgId(null))
-                                                        .start();
-                                                }}
-                                            />
-                                        </div>
-                                    ) : (
-                                        <p style={{ whiteSpace: "pre-wrap", lineHeight: 1.6 }}>{msg.mensagem}</p>
-                                    )}
+                                <div style={{ display: "flex", flexDirection: "column", gap: 4, alignItems: msg.tipo === "usuario" ? "flex-end" : "flex-start" }}>
+                                    <div style={{ display: "flex", gap: 10, alignItems: "center", marginBottom: 4 }}>
+                                        <span style={{ fontSize: 14, fontWeight: 700, color: msg.tipo === "ia" ? "#c4b5fd" : "#fff" }}>{msg.tipo === "usuario" ? "Você" : "LYRA"}</span>
+                                        <span style={{ fontSize: 11, color: "var(--text-muted)" }}>{new Date(msg.timestamp).toLocaleTimeString("en-US", { hour: "2-digit", minute: "2-digit", hour12: true })}</span>
+                                    </div>
+                                    <div className={msg.tipo === "usuario" ? "chat-bubble-user" : "chat-bubble-ai"} style={{ padding: "18px 24px", fontSize: 16, maxWidth: 640 }}>
+                                        <p style={{ whiteSpace: "pre-wrap", lineHeight: 1.6 }}>
+                                            {msg.mensagem}
+                                            {msg === streamingMsg && <span style={{ opacity: 0.7 }}>▌</span>}
+                                        </p>
+                                    </div>
                                 </div>
                             </div>
-                        </div>
-                    ))}
-                    {loading && (
+                        )}
+                    />
+                    {loading && (!streamingMsg || isSearching) && (
                         <div style={{ display: "flex", alignItems: "center", gap: 12, padding: "12px 0" }}>
                             <div style={{ display: "flex", gap: 5 }}>
                                 {[0, 1, 2].map(i => (
@@ -6,10 +6,15 @@ import {
 import { StatsCard, ProgressBar } from '../components/Common';
 import { PageHeader } from '../components/PageHeader';
 import { formatCurrency } from '../utils/formatters';
-import { useAppData } from '../context/DataContext';
+import { useFinances, useHabits, useProjects, useReminders, useTasks } from '../context/DataContext';
+import { habitDays } from '../utils/habitDays';
 
 export function DashboardPage() {
-    const { tasks, habits, projects, reminders, finances } = useAppData();
+    const tasks = useTasks();
+    const habits = useHabits();
+    const projects = useProjects();
+    const reminders = useReminders();
+    const { financeAggregates } = useFinances();
 
     const completed = tasks.filter(t => t.status === "concluida").length;
     const pending = tasks.filter(t => t.status === "pendente" || t.status === "fazendo").length;
@@ -18,9 +23,9 @@ export function DashboardPage() {
 
     const todayStr = new Date().toISOString().split('T')[0];
     const mesAtual = new Date().toLocaleString('pt-BR', { month: 'long' }).replace(/^\w/, c => c.toUpperCase());
-    const habitsToday = habits.filter(h => h.logs.some(l => l.data === todayStr)).length;
+    const habitsToday = habits.filter(h => habitDays(h).has(todayStr)).length;
     const totalMeta = habits.reduce((a, h) => a + (h.metaMensal || 0), 0);
-    const totalLogs = habits.reduce((a, h) => a + h.logs.length, 0);
+    const totalLogs = habits.reduce((a, h) => a + habitDays(h).countMonth(todayStr.slice(0, 7)), 0);
     const habitRate = (habits.length > 0 && totalMeta > 0) ? Math.min(100, Math.round((totalLogs / totalMeta) * 100)) : 0;
 
     const projAtivos = projects.filter(p => p.status === "ativo").length;
@@ -30,10 +35,7 @@ export function DashboardPage() {
     // Financeiro: filtra apenas o mês e ano atuais
     const now = new Date();
     const currentYearMonth = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`;
-    const financesThisMonth = finances.filter(f => f.data && f.data.startsWith(currentYearMonth));
-    const receitas = financesThisMonth.filter(f => f.tipo === "receita").reduce((a, f) => a + (f.valor || 0), 0);
-    const despesas = financesThisMonth.filter(f => f.tipo === "despesa").reduce((a, f) => a + (f.valor || 0), 0);
-    const saldo = receitas - despesas;
+    const { receitas, despesas, saldo } = financeAggregates.month(currentYearMonth);
 
     return (
         <div style={{ display: "flex", flexDirection: "column", gap: 24 }}>
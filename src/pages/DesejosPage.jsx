@@ -3,7 +3,7 @@ import { Plus, ShoppingBag, CheckCircle2, Circle, Trash2, ExternalLink, Pencil,
 import { PageHeader } from '../components/PageHeader';
 import { Modal } from '../components/Modal';
 import { NewWishModal } from '../components/Modals';
-import { useAppData } from '../context/DataContext';
+import { useDataActions, useWishes } from '../context/DataContext';
 import { formatCurrency } from '../utils/formatters';
 
 // ── Helpers ───────────────────────────────────────────────────────────────────
@@ -217,7 +217,8 @@ function MonthCard({ mes, items, onToggle, onEdit, onDelete }) {
 // ── DesejosPage ───────────────────────────────────────────────────────────────
 
 export function DesejosPage() {
-    const { wishes, addWish, updateWish, deleteWish } = useAppData();
+    const wishes = useWishes();
+    const { addWish, updateWish, deleteWish } = useDataActions();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [editWish, setEditWish] = useState(null);
 
@@ -1,6 +1,4 @@
 import React, { useState, useRef, useEffect, useMemo } from 'react';
-import { useAutoAnimate } from '@formkit/auto-animate/react';
-import Typewriter from 'typewriter-effect';
 import {
     Plus, TrendingUp, TrendingDown, DollarSign,
     ArrowUpRight, ArrowDownRight, Trash2,
@@ -16,9 +14,12 @@ import { Modal } from '../components/Modal';
 import { PageHeader } from '../components/PageHeader';
 import { NewFinanceModal } from '../components/Modals';
 import { formatCurrency, formatDate } from '../utils/formatters';
-import { useAppData } from '../context/DataContext';
-import { callAiProvider } from '../services/aiProviderService';
+import { useDataActions, useFinances, useWishes } from '../context/DataContext';
+import { streamWithActions, liveContextFingerprint } from '../services/aiProviderService';
+import { getCachedResponse, putCachedResponse } from '../services/responseCacheService';
+import { memoizeLast } from '../utils/memoizeLast';
 import { useLocalStorage } from '../hooks/useLocalStorage';
+import { removeActionJsons } from '../utils/actionJson';
 
 // ── Helpers ──────────────────────────────────────────────────────────────────
 
@@ -60,22 +61,13 @@ function buildWishContext(wishes) {
     return lines.join('\n');
 }
 
-function buildFinanceContext(finances, wishes) {
-    if (!finances || finances.length === 0) return 'Nenhum lançamento registrado ainda.';
+function buildFinanceContext(aggregates, wishes) {
+    if (!aggregates || aggregates.size === 0) return 'Nenhum lançamento registrado ainda.';
 
-    const despesas = finances.filter(f => f.tipo === 'despesa');
-    const receitas = finances.filter(f => f.tipo === 'receita');
-    const totalDespesas = despesas.reduce((s, f) => s + Number(f.valor), 0);
-    const totalReceitas = receitas.reduce((s, f) => s + Number(f.valor), 0);
-    const saldo = totalReceitas - totalDespesas;
+    const { receitas: totalReceitas, despesas: totalDespesas, saldo } = aggregates.totals();
 
     // Top categorias de despesa
-    const catTotals = {};
-    despesas.forEach(f => {
-        const c = f.categoria || 'outros';
-        catTotals[c] = (catTotals[c] || 0) + Number(f.valor);
-    });
-    const topCats = Object.entries(catTotals).sort((a, b) => b[1] - a[1]).slice(0, 5);
+    const topCats = aggregates.expenseCategories().slice(0, 5);
 
     const lines = [
         'DADOS FINANCEIROS REAIS DO CAÇADOR:',
@@ -92,10 +84,8 @@ function buildFinanceContext(finances, wishes) {
         });
     }
 
-    // Últimos 10 lançamentos
-    const recentes = [...finances]
-        .sort((a, b) => new Date(b.data || b.created_at) - new Date(a.data || a.created_at))
-        .slice(0, 10);
+    // Últimos 10 lançamentos (só os meses mais recentes são ordenados)
+    const recentes = aggregates.recent(10);
 
     if (recentes.length > 0) {
         lines.push('- Últimos lançamentos:');
@@ -111,6 +101,10 @@ function buildFinanceContext(finances, wishes) {
     return lines.join('\n');
 }
 
+// Os agregados são uma instância viva (mesma referência a cada lançamento):
+// a lista de lançamentos entra como chave para o texto ser refeito quando ela muda
+const financeContextFor = memoizeLast((finances, aggregates, wishes) => buildFinanceContext(aggregates, wishes));
+
 // ── System prompt addon para o módulo financeiro ─────────────────────────────
 
 const FINANCE_SYSTEM_ADDON = `
@@ -147,46 +141,7 @@ A lista de desejos do Caçador está incluída no contexto (se houver itens). Us
 `;
 
 
-// ── Helpers: extrai e remove JSONs de ação da resposta da IA ─────────────────
-
-// Percorre o texto buscando qualquer { "action": ... } com balanceamento de chaves
-// Aceita qualquer espaçamento: {"action":, { "action":, etc.
-function _findActionJsonSpans(text) {
-    const spans = [];
-    const marker = /\{\s*"action"\s*:/g;
-    let match;
-    while ((match = marker.exec(text)) !== null) {
-        const start = match.index;
-        let depth = 0, j = start;
-        while (j < text.length) {
-            if (text[j] === '{') depth++;
-            else if (text[j] === '}') {
-                depth--;
-                if (depth === 0) { spans.push([start, j + 1]); break; }
-            }
-            j++;
-        }
-    }
-    return spans;
-}
-
-function extractActionJsons(text) {
-    return _findActionJsonSpans(text).map(([s, e]) => {
-        try { return JSON.parse(text.slice(s, e)); } catch { return null; }
-    }).filter(Boolean);
-}
-
-function removeActionJsons(text) {
-    const spans = _findActionJsonSpans(text);
-    if (!spans.length) return text;
-    let result = '';
-    let last = 0;
-    for (const [s, e] of spans) {
-        result += text.slice(last, s);
-        last = e;
-    }
-    return (result + text.slice(last)).replace(/\n{3,}/g, '\n\n').trim();
-}
+// ── Helpers: limpeza da resposta da IA (JSONs de ação: utils/actionJson) ──────
 
 // Limpeza completa de uma mensagem da IA para exibição
 // Garante que nenhum JSON, bloco de código ou markdown vaze para o chat
@@ -233,9 +188,10 @@ const ANIM_CSS = `
 // ── Componente ────────────────────────────────────────────────────────────────
 
 export function FinancasPage() {
-    const { finances, addFinance, deleteFinance, wishes, updateWish } = useAppData();
+    const { finances, financeAggregates } = useFinances();
+    const wishes = useWishes();
+    const { addFinance, deleteFinance, updateWish } = useDataActions();
     const [isModalOpen, setIsModalOpen] = useState(false);
-    const [financesParent] = useAutoAnimate();
 
     // Tabs
     const [activeTab, setActiveTab] = useState('registros');
@@ -245,7 +201,7 @@ export function FinancasPage() {
     const [chatInput, setChatInput] = useState('');
     const [chatLoading, setChatLoading] = useState(false);
     const [chatError, setChatError] = useState(null);
-    const [typingMsgId, setTypingMsgId] = useState(null);
+    const [streamingMsg, setStreamingMsg] = useState(null); // resposta em streaming (fora do histórico até terminar)
     const chatScrollRef = useRef(null);
     const [autoCreated, setAutoCreated] = useState(null); // toast de lançamento auto-registrado
 
@@ -278,16 +234,10 @@ export function FinancasPage() {
         setTimeout(() => { setFinConfigSaved(false); setShowFinConfig(false); }, 1200);
     }
 
-    const { receitas, despesas, saldo } = useMemo(() => {
-        const r = finances.filter(f => f.tipo === 'receita').reduce((a, f) => a + Number(f.valor), 0);
-        const d = finances.filter(f => f.tipo === 'despesa').reduce((a, f) => a + Number(f.valor), 0);
-        return { receitas: r, despesas: d, saldo: r - d };
-    }, [finances]);
+    const { receitas, despesas, saldo } = useMemo(() => financeAggregates.totals(), [financeAggregates]);
 
     // Categorias únicas para filtro
-    const categories = useMemo(() =>
-        [...new Set(finances.map(f => f.categoria).filter(Boolean))].sort()
-    , [finances]);
+    const categories = useMemo(() => financeAggregates.categoryNames(), [financeAggregates]);
 
     // Lançamentos filtrados (aba Registros) — mais recente primeiro
     const filteredFinances = useMemo(() => {
@@ -312,32 +262,24 @@ export function FinancasPage() {
             const d = new Date(now.getFullYear(), now.getMonth() - (5 - i), 1);
             const key = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}`;
             const label = d.toLocaleString('pt-BR', { month: 'short' }).replace('.', '');
-            const r = finances.filter(f => f.tipo === 'receita' && (f.data || '').startsWith(key))
-                .reduce((a, f) => a + Number(f.valor), 0);
-            const dx = finances.filter(f => f.tipo === 'despesa' && (f.data || '').startsWith(key))
-                .reduce((a, f) => a + Number(f.valor), 0);
+            const { receitas: r, despesas: dx } = financeAggregates.month(key);
             return { mes: label.charAt(0).toUpperCase() + label.slice(1), receitas: r, despesas: dx };
         });
-    }, [finances]);
+    }, [financeAggregates]);
 
     // Dados por categoria para gráfico de pizza
     const catData = useMemo(() => {
-        const map = {};
-        finances.filter(f => f.tipo === 'despesa').forEach(f => {
-            const cat = f.categoria || 'outros';
-            map[cat] = (map[cat] || 0) + Number(f.valor);
-        });
-        if (Object.keys(map).length === 0) return [];
-        const total = Object.values(map).reduce((a, v) => a + v, 0);
-        return Object.entries(map)
-            .sort((a, b) => b[1] - a[1])
+        const cats = financeAggregates.expenseCategories();
+        if (cats.length === 0) return [];
+        const total = financeAggregates.totals().despesas;
+        return cats
             .map(([name, value], i) => ({
                 name,
                 value,
                 pct: total > 0 ? Math.round((value / total) * 100) : 0,
                 color: CHART_COLORS[i % CHART_COLORS.length],
             }));
-    }, [finances]);
+    }, [financeAggregates]);
 
     // Sanitiza mensagens antigas que possam ter JSON exposto (migração)
     useEffect(() => {
@@ -363,7 +305,7 @@ export function FinancasPage() {
         if (chatScrollRef.current) {
             chatScrollRef.current.scrollTo({ top: chatScrollRef.current.scrollHeight, behavior: 'smooth' });
         }
-    }, [chatMessages]);
+    }, [chatMessages, streamingMsg]);
 
     async function handleSendFinanceChat(text) {
         const msg = (text || chatInput).trim();
@@ -388,27 +330,21 @@ export function FinancasPage() {
 
         try {
             // Injeta contexto financeiro atualizado em TODA mensagem para manter a IA atualizada
-            const finCtx = buildFinanceContext(finances, wishes);
+            const finCtx = financeContextFor(finances, financeAggregates, wishes);
             const ctxPrefix = `[CONTEXTO FINANCEIRO ATUALIZADO DO CAÇADOR]:\n${finCtx}\n\n---\nPergunta: `;
 
-            // Limita a 14 mensagens (7 trocas) para controlar uso de tokens e evitar erros de cota
+            // O orçamento de tokens (preparePrompt) decide quantas trocas anteriores cabem
             const apiMessages = [
-                ...prevMessages.slice(-14),
+                ...prevMessages,
                 {
                     ...newUserMsg,
                     mensagem: ctxPrefix + msg,
                 },
             ];
 
-            const response = await callAiProvider(provider, apiMessages, key, {
-                ...(model ? { model } : {}),
-                systemPromptAddon: FINANCE_SYSTEM_ADDON,
-            });
-
-            // 1. Processa ações antes de limpar
-            const actions = extractActionJsons(response);
+            // 1. Ações são aplicadas assim que cada JSON fecha no stream
             const today = new Date().toISOString().split('T')[0];
-            for (const action of actions) {
+            const applyAction = (action) => {
                 if (action.action === 'CREATE_FINANCE' && action.data) {
                     const d = action.data;
                     const entry = {
@@ -445,7 +381,24 @@ export function FinancasPage() {
                         setTimeout(() => setAutoCreated(null), 5000);
                     }
                 }
-            }
+            };
+
+            const aiMsgId = Date.now() + 1;
+            // Mesma pergunta sobre os mesmos dados: responde do cache, sem chamar a IA
+            const cacheParts = { provider, model, scope: 'financas', prompt: msg, context: finCtx, history: prevMessages, live: await liveContextFingerprint() };
+            const cached = await getCachedResponse(cacheParts);
+            const response = cached ?? (await streamWithActions(provider, apiMessages, key, {
+                ...(model ? { model } : {}),
+                systemPromptAddon: FINANCE_SYSTEM_ADDON,
+                conversationId: 'financas',
+            }, {
+                onText: partial => {
+                    const shown = cleanIaMsg(partial);
+                    if (shown) setStreamingMsg({ id: aiMsgId, tipo: 'ia', mensagem: shown });
+                },
+                onAction: applyAction,
+            })).text;
+            if (cached === null) putCachedResponse(cacheParts, response);
 
             // 2. Limpa resposta: remove JSONs de ação, blocos de código e asteriscos
             let clean = removeActionJsons(response);
@@ -456,12 +409,11 @@ export function FinancasPage() {
                 .replace(/#{1,6}\s+/g, '')
                 .trim();
 
-            const aiMsgId = Date.now() + 1;
             setChatMessages(prev => [...prev, { id: aiMsgId, tipo: 'ia', mensagem: clean }]);
-            setTypingMsgId(aiMsgId);
         } catch (err) {
             setChatError(err.message || 'Erro ao contactar o sistema de IA.');
         } finally {
+            setStreamingMsg(null);
             setChatLoading(false);
         }
     }
@@ -571,8 +523,8 @@ export function FinancasPage() {
                         </span>
                     </div>
 
-                    {/* Lista */}
-                    <div ref={financesParent} style={{ display: 'flex', flexDirection: 'column', gap: 8 }}>
+                    {/* Lista — janelada: o DOM só tem as linhas perto da área visível */}
+                    <div style={{ display: 'flex', flexDirection: 'column', gap: 8 }}>
                         {finances.length === 0 && (
                             <p style={{ textAlign: 'center', color: 'var(--text-dim)', padding: 32, fontSize: 14 }}>
                                 Nenhum lançamento registrado ainda.
@@ -583,32 +535,39 @@ export function FinancasPage() {
                                 Nenhum lançamento encontrado com os filtros selecionados.
                             </p>
                         )}
-                        {filteredFinances.map(f => (
-                            <div key={f.id} style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', padding: 14, borderRadius: 10, background: 'rgba(17,24,39,0.5)' }}>
-                                <div style={{ display: 'flex', alignItems: 'center', gap: 12 }}>
-                                    <div style={{ padding: 8, borderRadius: 8, background: f.tipo === 'receita' ? 'rgba(34,197,94,0.1)' : 'rgba(239,68,68,0.1)' }}>
-                                        {f.tipo === 'receita' ? <ArrowUpRight size={16} color="#22c55e" /> : <ArrowDownRight size={16} color="#ef4444" />}
+                        <VirtualList
+                            items={filteredFinances}
+                            getKey={f => f.id}
+                            estimateSize={72}
+                            gap={8}
+                            animate
+                            renderItem={f => (
+                                <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', padding: 14, borderRadius: 10, background: 'rgba(17,24,39,0.5)' }}>
+                                    <div style={{ display: 'flex', alignItems: 'center', gap: 12 }}>
+                                        <div style={{ padding: 8, borderRadius: 8, background: f.tipo === 'receita' ? 'rgba(34,197,94,0.1)' : 'rgba(239,68,68,0.1)' }}>
+                                            {f.tipo === 'receita' ? <ArrowUpRight size={16} color="#22c55e" /> : <ArrowDownRight size={16} color="#ef4444" />}
+                                        </div>
+                                        <div>
+                                            <p style={{ fontWeight: 600, fontSize: 14 }}>{f.descricao}</p>
+                                            <p style={{ fontSize: 12, color: 'var(--text-dim)' }}>{formatDate(f.data)} • {f.categoria}</p>
+                                        </div>
                                     </div>
-                                    <div>
-                                        <p style={{ fontWeight: 600, fontSize: 14 }}>{f.descricao}</p>
-                                        <p style={{ fontSize: 12, color: 'var(--text-dim)' }}>{formatDate(f.data)} • {f.categoria}</p>
+                                    <div style={{ display: 'flex', alignItems: 'center', gap: 12 }}>
+                                        <span style={{ fontWeight: 700, fontFamily: "'JetBrains Mono', monospace", color: f.tipo === 'receita' ? '#22c55e' : '#ef4444' }}>
+                                            {f.tipo === 'receita' ? '+' : '-'}{formatCurrency(f.valor)}
+                                        </span>
+                                        <button
+                                            className="btn-ghost"
+                                            onClick={() => deleteFinance(f.id)}
+                                            title="Excluir lançamento"
+                                            style={{ padding: 4, color: 'var(--text-dim)' }}
+                                        >
+                                            <Trash2 size={14} />
+                                        </button>
                                     </div>
                                 </div>
-                                <div style={{ display: 'flex', alignItems: 'center', gap: 12 }}>
-                                    <span style={{ fontWeight: 700, fontFamily: "'JetBrains Mono', monospace", color: f.tipo === 'receita' ? '#22c55e' : '#ef4444' }}>
-                                        {f.tipo === 'receita' ? '+' : '-'}{formatCurrency(f.valor)}
-                                    </span>
-                                    <button
-                                        className="btn-ghost"
-                                        onClick={() => deleteFinance(f.id)}
-                                        title="Excluir lançamento"
-                                        style={{ padding: 4, color: 'var(--text-dim)' }}
-                                    >
-                                        <Trash2 size={14} />
-                                    </button>
-                                </div>
-                            </div>
-                        ))}
+                            )}
+                        />
                     </div>
                 </div>
             )}
@@ -758,7 +717,7 @@ export function FinancasPage() {
                         )}
 
                         {/* Mensagens */}
-                        {chatMessages.map(m => (
+                        {(streamingMsg ? [...chatMessages, streamingMsg] : chatMessages).map(m => (
                             <div
                                 key={m.id}
                                 style={{
@@ -781,21 +740,10 @@ export function FinancasPage() {
                                     lineHeight: 1.65,
                                     color: 'var(--text)',
                                 }}>
-                                    {m.tipo === 'ia' && m.id === typingMsgId ? (
-                                        <Typewriter
-                                            key={m.id}
-                                            options={{ delay: 10, cursor: '▮' }}
-                                            onInit={tw => {
-                                                tw.typeString(cleanIaMsg(m.mensagem))
-                                                    .callFunction(() => setTypingMsgId(null))
-                                                    .start();
-                                            }}
-                                        />
-                                    ) : (
-                                        <span style={{ whiteSpace: 'pre-wrap' }}>
-                                            {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
-                                        </span>
-                                    )}
+                                    <span style={{ whiteSpace: 'pre-wrap' }}>
+                                        {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
+                                        {m === streamingMsg && <span style={{ opacity: 0.7 }}>▮</span>}
+                                    </span>
                                 </div>
                                 {m.tipo === 'usuario' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: 'rgba(255,255,255,0.05)', flexShrink: 0, marginTop: 2 }}>
@@ -806,7 +754,7 @@ export function FinancasPage() {
                         ))}
 
                         {/* Loading dots */}
-                        {chatLoading && (
+                        {chatLoading && !streamingMsg && (
                             <div style={{ display: 'flex', gap: 10, alignItems: 'flex-start' }}>
                                 <div style={{ padding: 6, borderRadius: 8, background: 'rgba(6,182,212,0.15)', flexShrink: 0, marginTop: 2 }}>
                                     <Bot size={14} color="var(--accent)" />
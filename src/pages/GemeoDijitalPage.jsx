@@ -1,7 +1,7 @@
 // GÊMEO DIGITAL — Módulo de Saúde Holística
 // SVG holográfico + dados reais + análise IA inline + log diário + streak + tendências.
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useMemo } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import {
   Brain, Zap, HeartPulse, Cpu, X, ChevronRight, Activity,
@@ -10,7 +10,8 @@ import {
 import { CornerBrackets } from '../components/AceternityUI';
 import { usePlayer } from '../context/PlayerContext';
 import { useMissions } from '../context/MissionContext';
-import { useAppData } from '../context/DataContext';
+import { useHabits } from '../context/DataContext';
+import { habitDays } from '../utils/habitDays';
 import { callAiProvider } from '../services/aiProviderService';
 import { useHealthLog } from '../hooks/useHealthLog';
 import { useStreak } from '../hooks/useStreak';
@@ -55,7 +56,22 @@ function getAiConfig() {
   };
 }
 
-function buildHealthPrompt(group, data, playerLevel, recentLogs) {
+// Média e tendência de 30 dias (getMetricSummary) em uma linha para o prompt
+function formatMonthTrend(group, summary) {
+  if (!summary || summary.n < 5) return '';
+  const isVital = group === 'vitalidade';
+  const mean = isVital ? `${summary.mean.toFixed(1)}h de sono` : `energia ${summary.mean.toFixed(1)}/5`;
+  let trend = 'estável';
+  if (summary.significant && summary.slope !== null) {
+    const perWeek = summary.slope * 7;
+    trend = isVital
+      ? `${perWeek > 0 ? 'subindo' : 'caindo'} ${Math.round(Math.abs(perWeek) * 60)}min por semana`
+      : `${perWeek > 0 ? 'subindo' : 'caindo'} ${Math.abs(perWeek).toFixed(1)} por semana`;
+  }
+  return `\nÚLTIMOS 30 DIAS (${summary.n} registros): média ${mean}, tendência ${trend}.`;
+}
+
+function buildHealthPrompt(group, data, playerLevel, recentLogs, monthSummary) {
   const meta = GROUP_META[group];
   const metricsText = data.metrics.map(m => `- ${m.label}: ${m.value}%`).join('\n');
   const missionText = data.mission
@@ -75,6 +91,7 @@ function buildHealthPrompt(group, data, playerLevel, recentLogs) {
       }
     }
   }
+  historyContext += formatMonthTrend(group, monthSummary);
 
   return `Analise o ${meta.label} do Caçador (Level ${playerLevel}) com base nos dados de hoje.
 
@@ -91,7 +108,7 @@ Forneça uma análise direta (3-4 linhas): estado atual do sistema, impacto no p
 
 // ─── Análise IA inline ────────────────────────────────────────────────────────
 
-function AIInsightBlock({ group, data, playerLevel, recentLogs }) {
+function AIInsightBlock({ group, data, playerLevel, recentLogs, monthSummary }) {
   const [state, setState] = useState('idle');
   const [response, setResponse] = useState('');
 
@@ -100,7 +117,7 @@ function AIInsightBlock({ group, data, playerLevel, recentLogs }) {
     if (!key) { setState('no_key'); return; }
     setState('loading');
     try {
-      const prompt = buildHealthPrompt(group, data, playerLevel, recentLogs);
+      const prompt = buildHealthPrompt(group, data, playerLevel, recentLogs, monthSummary);
       const messages = [{ tipo: 'usuario', mensagem: prompt }];
       const result = await callAiProvider(provider, messages, key, { model });
       setResponse(result);
@@ -109,7 +126,7 @@ function AIInsightBlock({ group, data, playerLevel, recentLogs }) {
       setResponse(err.message || 'Falha na análise.');
       setState('error');
     }
-  }, [group, data, playerLevel, recentLogs]);
+  }, [group, data, playerLevel, recentLogs, monthSummary]);
 
   const color = GROUP_META[group].color;
 
@@ -191,7 +208,7 @@ function AIInsightBlock({ group, data, playerLevel, recentLogs }) {
 function useHealthData() {
   const { player } = usePlayer();
   const { missions, missionState } = useMissions();
-  const { habits } = useAppData();
+  const habits = useHabits();
   const streak = useStreak({ missions, missionState });
 
   const today = new Date().toISOString().split('T')[0];
@@ -205,7 +222,7 @@ function useHealthData() {
   };
 
   const waterProgress = missionState.progress?.agua || 0;
-  const habitsToday   = habits.filter(h => h.logs?.some(l => l.data === today)).length;
+  const habitsToday   = habits.filter(h => habitDays(h).has(today)).length;
   const habitRate     = habits.length > 0 ? Math.round((habitsToday / habits.length) * 100) : null;
 
   // ── NEURAL ──
@@ -511,7 +528,7 @@ function TrendMini({ group, recentLogs }) {
 
 // ─── Painel de análise ────────────────────────────────────────────────────────
 
-function AnalysisPanel({ group, healthData, onClose, recentLogs }) {
+function AnalysisPanel({ group, healthData, onClose, recentLogs, monthSummaries }) {
   if (!group) return null;
   const meta        = GROUP_META[group];
   const data        = healthData[group];
@@ -663,7 +680,10 @@ function AnalysisPanel({ group, healthData, onClose, recentLogs }) {
         <TrendMini group={group} recentLogs={recentLogs} />
 
         {/* Neural AI */}
-        <AIInsightBlock group={group} data={data} playerLevel={playerLevel} recentLogs={recentLogs} />
+        <AIInsightBlock
+          group={group} data={data} playerLevel={playerLevel} recentLogs={recentLogs}
+          monthSummary={monthSummaries[group === 'vitalidade' ? 'sleep_hours' : 'energy']}
+        />
 
       </div>
 
@@ -872,8 +892,12 @@ export function GemeoDijitalPage() {
   const [logOpen,       setLogOpen]       = useState(false);
 
   const healthData              = useHealthData();
-  const { todayLog, logToday, getRecentLogs } = useHealthLog();
-  const recentLogs              = getRecentLogs(7);
+  const { todayLog, logToday, getRecentLogs, getMetricSummary } = useHealthLog();
+  const recentLogs              = useMemo(() => getRecentLogs(7), [getRecentLogs]);
+  const monthSummaries          = useMemo(() => ({
+    sleep_hours: getMetricSummary('sleep_hours', 30),
+    energy:      getMetricSummary('energy', 30),
+  }), [getMetricSummary]);
 
   useEffect(() => {
     setScanKey(k => k + 1);
@@ -1042,6 +1066,7 @@ export function GemeoDijitalPage() {
               healthData={healthData}
               onClose={() => setSelectedGroup(null)}
               recentLogs={recentLogs}
+              monthSummaries={monthSummaries}
             />
           )}
         </AnimatePresence>
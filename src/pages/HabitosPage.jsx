@@ -1,14 +1,17 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { useAutoAnimate } from '@formkit/auto-animate/react';
-import Typewriter from 'typewriter-effect';
 import { Target, Flame, CheckCircle2, TrendingUp, Check, Plus, Trash2, Sparkles, Send, Bot, User, Loader, Settings, AlertCircle } from 'lucide-react';
 import { StatsCard, ProgressBar } from '../components/Common';
 import { Modal } from '../components/Modal';
 import { PageHeader } from '../components/PageHeader';
 import { NewHabitModal } from '../components/Modals';
-import { useAppData } from '../context/DataContext';
-import { callAiProvider } from '../services/aiProviderService';
+import { useDataActions, useHabits } from '../context/DataContext';
+import { streamWithActions, liveContextFingerprint } from '../services/aiProviderService';
+import { getCachedResponse, putCachedResponse } from '../services/responseCacheService';
+import { memoizeLast } from '../utils/memoizeLast';
 import { useLocalStorage } from '../hooks/useLocalStorage';
+import { removeActionJsons } from '../utils/actionJson';
+import { habitDays, anyHabitDays } from '../utils/habitDays';
 
 // ── Helpers ──────────────────────────────────────────────────────────────────
 
@@ -33,43 +36,6 @@ function getAiConfig() {
     return { provider, key, model };
 }
 
-function _findActionJsonSpans(text) {
-    const spans = [];
-    const marker = /\{\s*"action"\s*:/g;
-    let match;
-    while ((match = marker.exec(text)) !== null) {
-        const start = match.index;
-        let depth = 0, j = start;
-        while (j < text.length) {
-            if (text[j] === '{') depth++;
-            else if (text[j] === '}') {
-                depth--;
-                if (depth === 0) { spans.push([start, j + 1]); break; }
-            }
-            j++;
-        }
-    }
-    return spans;
-}
-
-function extractActionJsons(text) {
-    return _findActionJsonSpans(text).map(([s, e]) => {
-        try { return JSON.parse(text.slice(s, e)); } catch { return null; }
-    }).filter(Boolean);
-}
-
-function removeActionJsons(text) {
-    const spans = _findActionJsonSpans(text);
-    if (!spans.length) return text;
-    let result = '';
-    let last = 0;
-    for (const [s, e] of spans) {
-        result += text.slice(last, s);
-        last = e;
-    }
-    return (result + text.slice(last)).replace(/\n{3,}/g, '\n\n').trim();
-}
-
 function cleanIaMsg(text) {
     if (!text) return '';
     let t = removeActionJsons(text);
@@ -82,26 +48,18 @@ function cleanIaMsg(text) {
     return t.trim();
 }
 
-function buildHabitContext(habits) {
+// Refeito só quando os hábitos ou o dia mudam (não a cada mensagem)
+const buildHabitContext = memoizeLast(function buildHabitContext(habits, todayStr) {
     if (!habits || habits.length === 0) return 'Nenhum hábito cadastrado ainda.';
 
-    const todayStr       = new Date().toISOString().split('T')[0];
-    const completedToday = habits.filter(h => h.logs.some(l => l.data === todayStr)).length;
-    const totalLogs      = habits.reduce((a, h) => a + h.logs.length, 0);
+    const monthKey       = todayStr.slice(0, 7);
+    const completedToday = habits.filter(h => habitDays(h).has(todayStr)).length;
+    const totalLogs      = habits.reduce((a, h) => a + habitDays(h).countMonth(monthKey), 0);
     const totalMeta      = habits.reduce((a, h) => a + h.metaMensal, 0);
     const monthRate      = totalMeta > 0 ? Math.round((totalLogs / totalMeta) * 100) : 0;
 
-    // Streak
-    const allDates = new Set(habits.flatMap(h => h.logs.map(l => l.data)));
-    let streak = 0;
-    const d = new Date();
-    if (!allDates.has(d.toISOString().split('T')[0])) d.setDate(d.getDate() - 1);
-    while (true) {
-        const s = d.toISOString().split('T')[0];
-        if (!allDates.has(s)) break;
-        streak++;
-        d.setDate(d.getDate() - 1);
-    }
+    // Streak (dias seguidos com pelo menos um hábito feito)
+    const streak = anyHabitDays(habits).streak(todayStr);
 
     const lines = [
         'DADOS DE HÁBITOS REAIS DO CAÇADOR:',
@@ -113,13 +71,15 @@ function buildHabitContext(habits) {
     ];
 
     habits.forEach(h => {
-        const done = h.logs.some(l => l.data === todayStr);
-        const prog = h.metaMensal > 0 ? Math.round((h.logs.length / h.metaMensal) * 100) : 0;
-        lines.push(`  • ${h.icone || '✨'} "${h.titulo}" | ${h.logs.length}/${h.metaMensal} logs este mês (${prog}%) | hoje: ${done ? 'FEITO' : 'PENDENTE'}`);
+        const days = habitDays(h);
+        const done = days.has(todayStr);
+        const mes  = days.countMonth(monthKey);
+        const prog = h.metaMensal > 0 ? Math.round((mes / h.metaMensal) * 100) : 0;
+        lines.push(`  • ${h.icone || '✨'} "${h.titulo}" | ${mes}/${h.metaMensal} logs este mês (${prog}%) | hoje: ${done ? 'FEITO' : 'PENDENTE'}`);
     });
 
     return lines.join('\n');
-}
+});
 
 // ── System prompt addon ───────────────────────────────────────────────────────
 
@@ -173,31 +133,23 @@ const HABIT_COLOR = '#f59e0b';
 // ── Componente principal ──────────────────────────────────────────────────────
 
 export function HabitosPage() {
-    const { habits, addHabitLog, deleteHabit, addHabit } = useAppData();
+    const habits = useHabits();
+    const { addHabitLog, deleteHabit, addHabit } = useDataActions();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [habitsParent] = useAutoAnimate();
     const todayStr = new Date().toISOString().split('T')[0];
 
     // ── Stats ─────────────────────────────────────────────────────────────────
-    const completedToday = habits.filter(h => h.logs.some(l => l.data === todayStr)).length;
+    const monthKey       = todayStr.slice(0, 7);
+    const completedToday = habits.filter(h => habitDays(h).has(todayStr)).length;
+    const monthLogs      = habits.reduce((a, h) => a + habitDays(h).countMonth(monthKey), 0);
     const monthRate = habits.reduce((a, h) => a + h.metaMensal, 0) > 0
-        ? Math.round(habits.reduce((a, h) => a + h.logs.length, 0) / habits.reduce((a, h) => a + h.metaMensal, 0) * 100)
+        ? Math.round(monthLogs / habits.reduce((a, h) => a + h.metaMensal, 0) * 100)
         : 0;
 
-    const streak = (() => {
-        if (habits.length === 0) return 0;
-        const allDates = new Set(habits.flatMap(h => h.logs.map(l => l.data)));
-        let count = 0;
-        const d = new Date();
-        if (!allDates.has(d.toISOString().split('T')[0])) d.setDate(d.getDate() - 1);
-        while (true) {
-            const s = d.toISOString().split('T')[0];
-            if (!allDates.has(s)) break;
-            count++;
-            d.setDate(d.getDate() - 1);
-        }
-        return count;
-    })();
+    // Dias com pelo menos um hábito feito: sequência e marcação do calendário
+    const anyDone = anyHabitDays(habits);
+    const streak  = anyDone.streak(todayStr);
 
     // ── Calendário ────────────────────────────────────────────────────────────
     const today      = new Date();
@@ -217,7 +169,7 @@ export function HabitosPage() {
     const [chatInput,    setChatInput]    = useState('');
     const [chatLoading,  setChatLoading]  = useState(false);
     const [chatError,    setChatError]    = useState(null);
-    const [typingMsgId,  setTypingMsgId]  = useState(null);
+    const [streamingMsg, setStreamingMsg] = useState(null); // resposta em streaming (fora do histórico até terminar)
     const chatScrollRef = useRef(null);
 
     // ── Config inline ─────────────────────────────────────────────────────────
@@ -249,7 +201,7 @@ export function HabitosPage() {
         if (chatScrollRef.current) {
             chatScrollRef.current.scrollTo({ top: chatScrollRef.current.scrollHeight, behavior: 'smooth' });
         }
-    }, [chatMessages]);
+    }, [chatMessages, streamingMsg]);
 
     // ── Handler do chat ───────────────────────────────────────────────────────
     async function handleSendHabitChat(text) {
@@ -268,22 +220,16 @@ export function HabitosPage() {
         setChatLoading(true);
 
         try {
-            const ctx       = buildHabitContext(habits);
+            const ctx       = buildHabitContext(habits, new Date().toISOString().split('T')[0]);
             const ctxPrefix = `[CONTEXTO DE HÁBITOS ATUALIZADO DO CAÇADOR]:\n${ctx}\n\n---\nPergunta: `;
 
             const apiMessages = [
-                ...prevMessages.slice(-14),
+                ...prevMessages,
                 { ...newUserMsg, mensagem: ctxPrefix + msg },
             ];
 
-            const response = await callAiProvider(provider, apiMessages, key, {
-                ...(model ? { model } : {}),
-                systemPromptAddon: HABIT_SYSTEM_ADDON,
-            });
-
-            // Processa CREATE_HABIT
-            const actions = extractActionJsons(response);
-            for (const action of actions) {
+            // CREATE_HABIT é aplicado assim que o JSON fecha no stream
+            const applyAction = (action) => {
                 if (action.action === 'CREATE_HABIT' && action.data) {
                     const d = action.data;
                     addHabit({
@@ -293,7 +239,24 @@ export function HabitosPage() {
                         metaMensal: Number(d.metaMensal) || 20,
                     });
                 }
-            }
+            };
+
+            const aiMsgId = Date.now() + 1;
+            // Mesma pergunta sobre os mesmos dados: responde do cache, sem chamar a IA
+            const cacheParts = { provider, model, scope: 'habitos', prompt: msg, context: ctx, history: prevMessages, live: await liveContextFingerprint() };
+            const cached = await getCachedResponse(cacheParts);
+            const response = cached ?? (await streamWithActions(provider, apiMessages, key, {
+                ...(model ? { model } : {}),
+                systemPromptAddon: HABIT_SYSTEM_ADDON,
+                conversationId: 'habitos',
+            }, {
+                onText: partial => {
+                    const shown = cleanIaMsg(partial);
+                    if (shown) setStreamingMsg({ id: aiMsgId, tipo: 'ia', mensagem: shown });
+                },
+                onAction: applyAction,
+            })).text;
+            if (cached === null) putCachedResponse(cacheParts, response);
 
             let clean = removeActionJsons(response)
                 .replace(/```json[\s\S]*?```/g, '')
@@ -302,12 +265,11 @@ export function HabitosPage() {
                 .replace(/#{1,6}\s+/g, '')
                 .trim();
 
-            const aiMsgId = Date.now() + 1;
             setChatMessages(prev => [...prev, { id: aiMsgId, tipo: 'ia', mensagem: clean }]);
-            setTypingMsgId(aiMsgId);
         } catch (err) {
             setChatError(err.message || 'Erro ao contactar o sistema de IA.');
         } finally {
+            setStreamingMsg(null);
             setChatLoading(false);
         }
     }
@@ -369,8 +331,9 @@ export function HabitosPage() {
                             {Array.from({ length: firstDay }, (_, i) => <div key={`e${i}`} />)}
                             {daysArray.map(day => {
                                 const isToday = day === today.getDate();
+                                const done    = anyDone.has(`${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`);
                                 return (
-                                    <div key={day} style={{ aspectRatio: "1", display: "flex", alignItems: "center", justifyContent: "center", borderRadius: 8, fontSize: 13, fontWeight: isToday ? 700 : 400, background: isToday ? "var(--primary)" : "var(--bg-secondary)", color: isToday ? "white" : "var(--text-muted)", cursor: "pointer", transition: "all 0.2s" }}>
+                                    <div key={day} style={{ aspectRatio: "1", display: "flex", alignItems: "center", justifyContent: "center", borderRadius: 8, fontSize: 13, fontWeight: isToday ? 700 : 400, background: isToday ? "var(--primary)" : done ? "rgba(245,158,11,0.15)" : "var(--bg-secondary)", color: isToday ? "white" : done ? HABIT_COLOR : "var(--text-muted)", cursor: "pointer", transition: "all 0.2s" }}>
                                         {day}
                                     </div>
                                 );
@@ -383,8 +346,10 @@ export function HabitosPage() {
                         <h3 style={{ fontWeight: 600, marginBottom: 16 }}>Meus Hábitos</h3>
                         <div ref={habitsParent} style={{ display: "flex", flexDirection: "column", gap: 10 }}>
                             {habits.map(h => {
-                                const done     = h.logs.some(l => l.data === todayStr);
-                                const progress = h.metaMensal > 0 ? Math.min((h.logs.length / h.metaMensal) * 100, 100) : 0;
+                                const days     = habitDays(h);
+                                const done     = days.has(todayStr);
+                                const mes      = days.countMonth(monthKey);
+                                const progress = h.metaMensal > 0 ? Math.min((mes / h.metaMensal) * 100, 100) : 0;
                                 return (
                                     <div key={h.id} className="card" style={{ padding: 14 }}>
                                         <div style={{ display: "flex", gap: 12, alignItems: "flex-start" }}>
@@ -412,7 +377,7 @@ export function HabitosPage() {
                                                 {h.descricao && <p style={{ fontSize: 12, color: "var(--text-muted)", marginTop: 2 }}>{h.descricao}</p>}
                                                 <div style={{ marginTop: 8 }}>
                                                     <div style={{ display: "flex", justifyContent: "space-between", marginBottom: 4 }}>
-                                                        <span style={{ fontSize: 11, color: "var(--text-dim)" }}>{h.logs.length} / {h.metaMensal} este mês</span>
+                                                        <span style={{ fontSize: 11, color: "var(--text-dim)" }}>{mes} / {h.metaMensal} este mês</span>
                                                         <span style={{ fontSize: 11, color: "var(--primary)", fontWeight: 600 }}>{Math.round(progress)}%</span>
                                                     </div>
                                                     <ProgressBar value={progress} />
@@ -554,7 +519,7 @@ export function HabitosPage() {
                         )}
 
                         {/* Mensagens */}
-                        {chatMessages.map(m => (
+                        {(streamingMsg ? [...chatMessages, streamingMsg] : chatMessages).map(m => (
                             <div key={m.id} style={{ display: 'flex', gap: 10, alignItems: 'flex-start', justifyContent: m.tipo === 'usuario' ? 'flex-end' : 'flex-start' }}>
                                 {m.tipo === 'ia' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: `rgba(245,158,11,0.15)`, flexShrink: 0, marginTop: 2 }}>
@@ -568,21 +533,10 @@ export function HabitosPage() {
                                     border: m.tipo === 'usuario' ? `1px solid rgba(245,158,11,0.2)` : '1px solid rgba(255,255,255,0.06)',
                                     fontSize: 13, lineHeight: 1.65, color: 'var(--text)',
                                 }}>
-                                    {m.tipo === 'ia' && m.id === typingMsgId ? (
-                                        <Typewriter
-                                            key={m.id}
-                                            options={{ delay: 10, cursor: '▮' }}
-                                            onInit={tw => {
-                                                tw.typeString(cleanIaMsg(m.mensagem))
-                                                    .callFunction(() => setTypingMsgId(null))
-                                                    .start();
-                                            }}
-                                        />
-                                    ) : (
-                                        <span style={{ whiteSpace: 'pre-wrap' }}>
-                                            {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
-                                        </span>
-                                    )}
+                                    <span style={{ whiteSpace: 'pre-wrap' }}>
+                                        {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
+                                        {m === streamingMsg && <span style={{ opacity: 0.7 }}>▮</span>}
+                                    </span>
                                 </div>
                                 {m.tipo === 'usuario' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: 'rgba(255,255,255,0.05)', flexShrink: 0, marginTop: 2 }}>
@@ -593,7 +547,7 @@ export function HabitosPage() {
                         ))}
 
                         {/* Loading dots */}
-                        {chatLoading && (
+                        {chatLoading && !streamingMsg && (
                             <div style={{ display: 'flex', gap: 10, alignItems: 'flex-start' }}>
                                 <div style={{ padding: 6, borderRadius: 8, background: `rgba(245,158,11,0.15)`, flexShrink: 0, marginTop: 2 }}>
                                     <Bot size={14} color={HABIT_COLOR} />
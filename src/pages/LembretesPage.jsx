@@ -3,13 +3,16 @@ import { useAutoAnimate } from '@formkit/auto-animate/react';
 import { Bell, Plus, Calendar, Trash2 } from 'lucide-react';
 import { Badge } from '../components/Common';
 import { formatDateTime } from '../utils/formatters';
-import { useAppData } from '../context/DataContext';
+import { useDataActions, useReminders } from '../context/DataContext';
 import { Modal } from '../components/Modal';
 import { PageHeader } from '../components/PageHeader';
 import { NewReminderModal } from '../components/Modals';
 
+const RECURRENCE_LABELS = { diaria: 'todo dia', semanal: 'toda semana', mensal: 'todo mês' };
+
 export function LembretesPage() {
-    const { reminders, deleteReminder } = useAppData();
+    const reminders = useReminders();
+    const { deleteReminder } = useDataActions();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [gridParent] = useAutoAnimate();
 
@@ -39,6 +42,7 @@ export function LembretesPage() {
                                             <Calendar size={12} /> {formatDateTime(r.dataHora)}
                                         </span>
                                         <Badge color={imp.color} bg={imp.bg}>{r.importancia}</Badge>
+                                        {r.recorrencia && <Badge color="var(--text-muted)" bg="rgba(255,255,255,0.05)">{RECURRENCE_LABELS[r.recorrencia]}</Badge>}
                                     </div>
                                 </div>
                                 <button
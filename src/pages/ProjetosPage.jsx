@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { Plus, CheckCircle2, Clock, Trash2, ChevronDown, ChevronUp, Circle } from 'lucide-react';
 import { ProgressBar } from '../components/Common';
-import { useAppData } from '../context/DataContext';
+import { useDataActions, useProjects, useTasks } from '../context/DataContext';
 import { usePlayer } from '../context/PlayerContext';
 import { Modal } from '../components/Modal';
 import { PageHeader } from '../components/PageHeader';
@@ -18,7 +18,9 @@ const STATUS_STYLE = {
 };
 
 export function ProjetosPage() {
-    const { projects, tasks, updateProject, deleteProject, addTask, updateTask } = useAppData();
+    const projects = useProjects();
+    const tasks = useTasks();
+    const { updateProject, deleteProject, addTask, updateTask } = useDataActions();
     const { gainXP, gainXPAmount } = usePlayer();
     const [isModalOpen, setIsModalOpen]   = useState(false);
     const [expandedId, setExpandedId]     = useState(null);
@@ -1,6 +1,4 @@
-import React, { useState, useRef, useEffect } from 'react';
-import { useAutoAnimate } from '@formkit/auto-animate/react';
-import Typewriter from 'typewriter-effect';
+import React, { useState, useRef, useEffect, useMemo } from 'react';
 import {
     LayoutList, Columns, Plus, Circle, Clock, CheckCircle2, AlertCircle,
     Sparkles, Send, Bot, User, Loader, Settings, Check, Trash2, Pencil,
@@ -8,13 +6,17 @@ import {
 } from 'lucide-react';
 import { Badge } from '../components/Common';
 import { Modal } from '../components/Modal';
+import { VirtualList } from '../components/VirtualList';
 import { PageHeader } from '../components/PageHeader';
 import { NewTaskModal, EditTaskModal } from '../components/Modals';
 import { formatDate } from '../utils/formatters';
-import { useAppData } from '../context/DataContext';
+import { useDataActions, useTasks } from '../context/DataContext';
 import { usePlayer } from '../context/PlayerContext';
-import { callAiProvider } from '../services/aiProviderService';
+import { streamWithActions, liveContextFingerprint } from '../services/aiProviderService';
+import { getCachedResponse, putCachedResponse } from '../services/responseCacheService';
+import { memoizeLast } from '../utils/memoizeLast';
 import { useLocalStorage } from '../hooks/useLocalStorage';
+import { removeActionJsons } from '../utils/actionJson';
 
 // ── Helpers ──────────────────────────────────────────────────────────────────
 
@@ -39,46 +41,6 @@ function getAiConfig() {
     return { provider, key, model };
 }
 
-function _findActionJsonSpans(text) {
-    // Remove code fences antes de parsear — espelha o fix do useClaudeChat.js (commit 2b81766)
-    const cleaned = text.replace(/```json\s*/gi, '').replace(/```\s*/g, '');
-    const spans = [];
-    const marker = /\{\s*"action"\s*:/g;
-    let match;
-    while ((match = marker.exec(cleaned)) !== null) {
-        const start = match.index;
-        let depth = 0, j = start;
-        while (j < cleaned.length) {
-            if (cleaned[j] === '{') depth++;
-            else if (cleaned[j] === '}') {
-                depth--;
-                if (depth === 0) { spans.push([start, j + 1]); break; }
-            }
-            j++;
-        }
-    }
-    return spans;
-}
-
-function extractActionJsons(text) {
-    const cleaned = text.replace(/```json\s*/gi, '').replace(/```\s*/g, '');
-    return _findActionJsonSpans(text).map(([s, e]) => {
-        try { return JSON.parse(cleaned.slice(s, e)); } catch { return null; }
-    }).filter(Boolean);
-}
-
-function removeActionJsons(text) {
-    const spans = _findActionJsonSpans(text);
-    if (!spans.length) return text;
-    let result = '';
-    let last = 0;
-    for (const [s, e] of spans) {
-        result += text.slice(last, s);
-        last = e;
-    }
-    return (result + text.slice(last)).replace(/\n{3,}/g, '\n\n').trim();
-}
-
 function cleanIaMsg(text) {
     if (!text) return '';
     let t = removeActionJsons(text);
@@ -91,7 +53,8 @@ function cleanIaMsg(text) {
     return t.trim();
 }
 
-function buildTaskContext(tasks) {
+// Refeito só quando a lista muda (não a cada mensagem)
+const buildTaskContext = memoizeLast(function buildTaskContext(tasks) {
     if (!tasks || tasks.length === 0) return 'Nenhuma tarefa cadastrada ainda.';
 
     const pending = tasks.filter(t => t.status === 'pendente').length;
@@ -128,7 +91,7 @@ function buildTaskContext(tasks) {
     }
 
     return lines.join('\n');
-}
+});
 
 // ── System prompt addon ───────────────────────────────────────────────────────
 
@@ -209,6 +172,9 @@ function StatusBadge({ status }) {
 
 // ── TaskItem (fora do componente pai para evitar remontagem a cada render) ────
 
+// Calendário: chips por dia; o resto vira "+N mais" (a célula não cresce com o mês)
+const CAL_MAX_CHIPS = 3;
+
 const StatusIconMap = { pendente: Circle, fazendo: Clock, concluida: CheckCircle2, atrasada: AlertCircle };
 
 function TaskItem({ task, onToggle, onEdit, onDelete }) {
@@ -276,7 +242,8 @@ function TaskItem({ task, onToggle, onEdit, onDelete }) {
 // ── Componente principal ──────────────────────────────────────────────────────
 
 export function TarefasPage() {
-    const { tasks, updateTask, addTask, deleteTask } = useAppData();
+    const tasks = useTasks();
+    const { updateTask, addTask, deleteTask } = useDataActions();
     const { gainXP } = usePlayer();
     const [view, setView]       = useState("list");
     const [filter, setFilter]   = useState("todas");
@@ -284,7 +251,16 @@ export function TarefasPage() {
     const [calDate, setCalDate] = useState(() => { const d = new Date(); return { year: d.getFullYear(), month: d.getMonth() }; });
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [editingTask,  setEditingTask]  = useState(null);
-    const [listParent] = useAutoAnimate();
+
+    // Colunas do kanban: uma passada em vez de um filter por coluna (e por contador)
+    const tasksByStatus = useMemo(() => {
+        const groups = {};
+        tasks.forEach(t => {
+            if (!groups[t.status]) groups[t.status] = [];
+            groups[t.status].push(t);
+        });
+        return groups;
+    }, [tasks]);
 
     // ── Tabs ──────────────────────────────────────────────────────────────────
     const [activeTab, setActiveTab] = useState('tarefas');
@@ -294,7 +270,7 @@ export function TarefasPage() {
     const [chatInput,    setChatInput]    = useState('');
     const [chatLoading,  setChatLoading]  = useState(false);
     const [chatError,    setChatError]    = useState(null);
-    const [typingMsgId,  setTypingMsgId]  = useState(null);
+    const [streamingMsg, setStreamingMsg] = useState(null); // resposta em streaming (fora do histórico até terminar)
     const chatScrollRef = useRef(null);
 
     // ── Config inline ─────────────────────────────────────────────────────────
@@ -326,7 +302,7 @@ export function TarefasPage() {
         if (chatScrollRef.current) {
             chatScrollRef.current.scrollTo({ top: chatScrollRef.current.scrollHeight, behavior: 'smooth' });
         }
-    }, [chatMessages]);
+    }, [chatMessages, streamingMsg]);
 
     // ── Handlers de tarefas ───────────────────────────────────────────────────
     const toggleTask = (id) => {
@@ -376,18 +352,12 @@ export function TarefasPage() {
             const ctxPrefix = `[CONTEXTO DE TAREFAS ATUALIZADO DO CAÇADOR]:\n${ctx}\n\n---\nPergunta: `;
 
             const apiMessages = [
-                ...prevMessages.slice(-14),
+                ...prevMessages,
                 { ...newUserMsg, mensagem: ctxPrefix + msg },
             ];
 
-            const response = await callAiProvider(provider, apiMessages, key, {
-                ...(model ? { model } : {}),
-                systemPromptAddon: TASK_SYSTEM_ADDON,
-            });
-
-            // Processa ações da IA
-            const actions = extractActionJsons(response);
-            for (const action of actions) {
+            // Ações são aplicadas assim que cada JSON fecha no stream
+            const applyAction = (action) => {
                 if (action.action === 'CREATE_TASK' && action.data) {
                     const d = action.data;
                     addTask({
@@ -407,7 +377,24 @@ export function TarefasPage() {
                     if (d.titulo) patch.titulo = d.titulo;
                     if (Object.keys(patch).length > 0) updateTask(d.id, patch);
                 }
-            }
+            };
+
+            const aiMsgId = Date.now() + 1;
+            // Mesma pergunta sobre os mesmos dados: responde do cache, sem chamar a IA
+            const cacheParts = { provider, model, scope: 'tarefas', prompt: msg, context: ctx, history: prevMessages, live: await liveContextFingerprint() };
+            const cached = await getCachedResponse(cacheParts);
+            const response = cached ?? (await streamWithActions(provider, apiMessages, key, {
+                ...(model ? { model } : {}),
+                systemPromptAddon: TASK_SYSTEM_ADDON,
+                conversationId: 'tarefas',
+            }, {
+                onText: partial => {
+                    const shown = cleanIaMsg(partial);
+                    if (shown) setStreamingMsg({ id: aiMsgId, tipo: 'ia', mensagem: shown });
+                },
+                onAction: applyAction,
+            })).text;
+            if (cached === null) putCachedResponse(cacheParts, response);
 
             let clean = removeActionJsons(response)
                 .replace(/```json[\s\S]*?```/g, '')
@@ -416,12 +403,11 @@ export function TarefasPage() {
                 .replace(/#{1,6}\s+/g, '')
                 .trim();
 
-            const aiMsgId = Date.now() + 1;
             setChatMessages(prev => [...prev, { id: aiMsgId, tipo: 'ia', mensagem: clean }]);
-            setTypingMsgId(aiMsgId);
         } catch (err) {
             setChatError(err.message || 'Erro ao contactar o sistema de IA.');
         } finally {
+            setStreamingMsg(null);
             setChatLoading(false);
         }
     }
@@ -530,63 +516,71 @@ export function TarefasPage() {
                                 {/* Linhas */}
                                 {sorted.length === 0 ? (
                                     <p style={{ textAlign: 'center', padding: 48, color: 'var(--text-muted)', fontSize: 13 }}>Nenhuma tarefa cadastrada</p>
-                                ) : sorted.map((t, i) => {
-                                    const done = t.status === 'concluida';
-                                    const SIcon = StatusIconMap[t.status] || Circle;
-                                    return (
-                                        <div key={t.id} style={{
-                                            display: 'grid', gridTemplateColumns: gridCols,
-                                            alignItems: 'center',
-                                            borderBottom: i < sorted.length - 1 ? '1px solid rgba(255,255,255,0.04)' : 'none',
-                                            background: 'transparent', transition: 'background 0.12s',
-                                            opacity: done ? 0.6 : 1,
+                                ) : (
+                                    <VirtualList
+                                        items={sorted}
+                                        getKey={t => t.id}
+                                        estimateSize={44}
+                                        animate
+                                        renderItem={(t, i) => {
+                                            const done = t.status === 'concluida';
+                                            const SIcon = StatusIconMap[t.status] || Circle;
+                                            return (
+                                                <div style={{
+                                                    display: 'grid', gridTemplateColumns: gridCols,
+                                                    alignItems: 'center',
+                                                    borderBottom: i < sorted.length - 1 ? '1px solid rgba(255,255,255,0.04)' : 'none',
+                                                    background: 'transparent', transition: 'background 0.12s',
+                                                    opacity: done ? 0.6 : 1,
+                                                }}
+                                                    onMouseEnter={e => e.currentTarget.style.background = 'rgba(255,255,255,0.03)'}
+                                                    onMouseLeave={e => e.currentTarget.style.background = 'transparent'}
+                                                >
+                                                    {/* Status */}
+                                                    <div style={{ padding: '10px 12px' }}>
+                                                        <button onClick={() => toggleTask(t.id)} title="Alternar status" style={{ background: 'none', border: 'none', cursor: 'pointer', color: done ? '#22c55e' : 'var(--text-muted)', display: 'flex', alignItems: 'center', gap: 6, padding: 0 }}>
+                                                            <SIcon size={15} />
+                                                            <StatusBadge status={t.status} />
+                                                        </button>
+                                                    </div>
+                                                    {/* Tarefa */}
+                                                    <div style={{ padding: '10px 12px', overflow: 'hidden' }}>
+                                                        <span style={{ fontSize: 13, fontWeight: 500, color: done ? 'var(--text-muted)' : 'var(--text)', textDecoration: done ? 'line-through' : 'none', whiteSpace: 'nowrap', overflow: 'hidden', textOverflow: 'ellipsis', display: 'block' }}>{t.titulo}</span>
+                                                        {t.descricao && <span style={{ fontSize: 11, color: 'var(--text-muted)', display: 'block', marginTop: 1 }}>{t.descricao}</span>}
+                                                    </div>
+                                                    {/* Prazo */}
+                                                    <div style={{ padding: '10px 12px' }}>
+                                                        <span style={{ fontSize: 12, color: t.status === 'atrasada' ? '#ef4444' : 'var(--text-dim)' }}>
+                                                            {t.dataPrazo ? formatDate(t.dataPrazo) : <span style={{ color: 'rgba(255,255,255,0.15)' }}>—</span>}
+                                                        </span>
+                                                    </div>
+                                                    {/* Projeto */}
+                                                    <div style={{ padding: '10px 12px' }}>
+                                                        {t.projeto
+                                                            ? <span style={{ fontSize: 11, padding: '2px 8px', borderRadius: 20, background: `${t.projeto.cor}18`, color: t.projeto.cor, fontWeight: 600 }}>{t.projeto.titulo}</span>
+                                                            : <span style={{ fontSize: 12, color: 'rgba(255,255,255,0.2)' }}>Sem grupo</span>
+                                                        }
+                                                    </div>
+                                                    {/* Prioridade */}
+                                                    <div style={{ padding: '10px 12px' }}>
+                                                        <PriorityBadge priority={t.prioridade} />
+                                                    </div>
+                                                    {/* Ações */}
+                                                    <div style={{ padding: '10px 8px', display: 'flex', gap: 2 }}>
+                                                        <button onClick={() => setEditingTask(t)} style={{ background: 'none', border: 'none', cursor: 'pointer', color: 'var(--text-dim)', padding: 4, borderRadius: 4, display: 'flex' }} title="Editar"
+                                                            onMouseEnter={e => e.currentTarget.style.color = 'var(--primary)'}
+                                                            onMouseLeave={e => e.currentTarget.style.color = 'var(--text-dim)'}
+                                                        ><Pencil size={13} /></button>
+                                                        <button onClick={() => deleteTask(t.id)} style={{ background: 'none', border: 'none', cursor: 'pointer', color: 'var(--text-dim)', padding: 4, borderRadius: 4, display: 'flex' }} title="Excluir"
+                                                            onMouseEnter={e => e.currentTarget.style.color = '#ef4444'}
+                                                            onMouseLeave={e => e.currentTarget.style.color = 'var(--text-dim)'}
+                                                        ><Trash2 size={13} /></button>
+                                                    </div>
+                                                </div>
+                                            );
                                         }}
-                                            onMouseEnter={e => e.currentTarget.style.background = 'rgba(255,255,255,0.03)'}
-                                            onMouseLeave={e => e.currentTarget.style.background = 'transparent'}
-                                        >
-                                            {/* Status */}
-                                            <div style={{ padding: '10px 12px' }}>
-                                                <button onClick={() => toggleTask(t.id)} title="Alternar status" style={{ background: 'none', border: 'none', cursor: 'pointer', color: done ? '#22c55e' : 'var(--text-muted)', display: 'flex', alignItems: 'center', gap: 6, padding: 0 }}>
-                                                    <SIcon size={15} />
-                                                    <StatusBadge status={t.status} />
-                                                </button>
-                                            </div>
-                                            {/* Tarefa */}
-                                            <div style={{ padding: '10px 12px', overflow: 'hidden' }}>
-                                                <span style={{ fontSize: 13, fontWeight: 500, color: done ? 'var(--text-muted)' : 'var(--text)', textDecoration: done ? 'line-through' : 'none', whiteSpace: 'nowrap', overflow: 'hidden', textOverflow: 'ellipsis', display: 'block' }}>{t.titulo}</span>
-                                                {t.descricao && <span style={{ fontSize: 11, color: 'var(--text-muted)', display: 'block', marginTop: 1 }}>{t.descricao}</span>}
-                                            </div>
-                                            {/* Prazo */}
-                                            <div style={{ padding: '10px 12px' }}>
-                                                <span style={{ fontSize: 12, color: t.status === 'atrasada' ? '#ef4444' : 'var(--text-dim)' }}>
-                                                    {t.dataPrazo ? formatDate(t.dataPrazo) : <span style={{ color: 'rgba(255,255,255,0.15)' }}>—</span>}
-                                                </span>
-                                            </div>
-                                            {/* Projeto */}
-                                            <div style={{ padding: '10px 12px' }}>
-                                                {t.projeto
-                                                    ? <span style={{ fontSize: 11, padding: '2px 8px', borderRadius: 20, background: `${t.projeto.cor}18`, color: t.projeto.cor, fontWeight: 600 }}>{t.projeto.titulo}</span>
-                                                    : <span style={{ fontSize: 12, color: 'rgba(255,255,255,0.2)' }}>Sem grupo</span>
-                                                }
-                                            </div>
-                                            {/* Prioridade */}
-                                            <div style={{ padding: '10px 12px' }}>
-                                                <PriorityBadge priority={t.prioridade} />
-                                            </div>
-                                            {/* Ações */}
-                                            <div style={{ padding: '10px 8px', display: 'flex', gap: 2 }}>
-                                                <button onClick={() => setEditingTask(t)} style={{ background: 'none', border: 'none', cursor: 'pointer', color: 'var(--text-dim)', padding: 4, borderRadius: 4, display: 'flex' }} title="Editar"
-                                                    onMouseEnter={e => e.currentTarget.style.color = 'var(--primary)'}
-                                                    onMouseLeave={e => e.currentTarget.style.color = 'var(--text-dim)'}
-                                                ><Pencil size={13} /></button>
-                                                <button onClick={() => deleteTask(t.id)} style={{ background: 'none', border: 'none', cursor: 'pointer', color: 'var(--text-dim)', padding: 4, borderRadius: 4, display: 'flex' }} title="Excluir"
-                                                    onMouseEnter={e => e.currentTarget.style.color = '#ef4444'}
-                                                    onMouseLeave={e => e.currentTarget.style.color = 'var(--text-dim)'}
-                                                ><Trash2 size={13} /></button>
-                                            </div>
-                                        </div>
-                                    );
-                                })}
+                                    />
+                                )}
                                 {/* Botão nova tarefa no rodapé, estilo Notion */}
                                 <button onClick={() => setIsModalOpen(true)} style={{
                                     width: '100%', padding: '10px 12px', background: 'none', border: 'none',
@@ -660,7 +654,7 @@ export function TarefasPage() {
                                                 display: 'flex', flexDirection: 'column', gap: 4,
                                             }}>
                                                 <span style={{ fontSize: 13, fontWeight: isToday ? 700 : 400, color: isToday ? 'var(--primary)' : 'var(--text-dim)', alignSelf: 'flex-end', marginBottom: 2 }}>{day}</span>
-                                                {dayTasks.map(t => (
+                                                {dayTasks.slice(0, CAL_MAX_CHIPS).map(t => (
                                                     <div key={t.id} title={t.titulo} style={{
                                                         fontSize: 11, padding: '3px 7px', borderRadius: 4,
                                                         background: statusColor[t.status] ? `${statusColor[t.status]}22` : 'rgba(255,255,255,0.08)',
@@ -671,6 +665,14 @@ export function TarefasPage() {
                                                         {t.titulo}
                                                     </div>
                                                 ))}
+                                                {dayTasks.length > CAL_MAX_CHIPS && (
+                                                    <span
+                                                        title={dayTasks.slice(CAL_MAX_CHIPS).map(t => t.titulo).join('\n')}
+                                                        style={{ fontSize: 10, color: 'var(--text-muted)', paddingLeft: 7 }}
+                                                    >
+                                                        +{dayTasks.length - CAL_MAX_CHIPS} mais
+                                                    </span>
+                                                )}
                                             </div>
                                         );
                                     })}
@@ -702,19 +704,23 @@ export function TarefasPage() {
                                     <div style={{ display: "flex", alignItems: "center", gap: 8, marginBottom: 14 }}>
                                         <div style={{ width: 8, height: 8, borderRadius: "50%", background: col.color }} />
                                         <span style={{ fontWeight: 600, fontSize: 14 }}>{col.label}</span>
-                                        <span style={{ fontSize: 12, color: "var(--text-muted)" }}>({tasks.filter(t => t.status === col.key).length})</span>
+                                        <span style={{ fontSize: 12, color: "var(--text-muted)" }}>({(tasksByStatus[col.key] || []).length})</span>
                                     </div>
-                                    <div style={{ display: "flex", flexDirection: "column", gap: 8 }}>
-                                        {tasks.filter(t => t.status === col.key).map(t => (
+                                    <VirtualList
+                                        items={tasksByStatus[col.key] || []}
+                                        getKey={t => t.id}
+                                        estimateSize={96}
+                                        gap={8}
+                                        animate
+                                        renderItem={t => (
                                             <TaskItem
-                                                key={t.id}
                                                 task={t}
                                                 onToggle={toggleTask}
                                                 onEdit={setEditingTask}
                                                 onDelete={deleteTask}
                                             />
-                                        ))}
-                                    </div>
+                                        )}
+                                    />
                                 </div>
                             ))}
                         </div>
@@ -849,7 +855,7 @@ export function TarefasPage() {
                         )}
 
                         {/* Mensagens */}
-                        {chatMessages.map(m => (
+                        {(streamingMsg ? [...chatMessages, streamingMsg] : chatMessages).map(m => (
                             <div key={m.id} style={{ display: 'flex', gap: 10, alignItems: 'flex-start', justifyContent: m.tipo === 'usuario' ? 'flex-end' : 'flex-start' }}>
                                 {m.tipo === 'ia' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: 'rgba(59,130,246,0.15)', flexShrink: 0, marginTop: 2 }}>
@@ -863,21 +869,10 @@ export function TarefasPage() {
                                     border: m.tipo === 'usuario' ? '1px solid rgba(59,130,246,0.2)' : '1px solid rgba(255,255,255,0.06)',
                                     fontSize: 13, lineHeight: 1.65, color: 'var(--text)',
                                 }}>
-                                    {m.tipo === 'ia' && m.id === typingMsgId ? (
-                                        <Typewriter
-                                            key={m.id}
-                                            options={{ delay: 10, cursor: '▮' }}
-                                            onInit={tw => {
-                                                tw.typeString(cleanIaMsg(m.mensagem))
-                                                    .callFunction(() => setTypingMsgId(null))
-                                                    .start();
-                                            }}
-                                        />
-                                    ) : (
-                                        <span style={{ whiteSpace: 'pre-wrap' }}>
-                                            {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
-                                        </span>
-                                    )}
+                                    <span style={{ whiteSpace: 'pre-wrap' }}>
+                                        {m.tipo === 'ia' ? cleanIaMsg(m.mensagem) : m.mensagem}
+                                        {m === streamingMsg && <span style={{ opacity: 0.7 }}>▮</span>}
+                                    </span>
                                 </div>
                                 {m.tipo === 'usuario' && (
                                     <div style={{ padding: 6, borderRadius: 8, background: 'rgba(255,255,255,0.05)', flexShrink: 0, marginTop: 2 }}>
@@ -888,7 +883,7 @@ export function TarefasPage() {
                         ))}
 
                         {/* Loading dots */}
-                        {chatLoading && (
+                        {chatLoading && !streamingMsg && (
                             <div style={{ display: 'flex', gap: 10, alignItems: 'flex-start' }}>
                                 <div style={{ padding: 6, borderRadius: 8, background: 'rgba(59,130,246,0.15)', flexShrink: 0, marginTop: 2 }}>
                                     <Bot size={14} color="var(--primary)" />
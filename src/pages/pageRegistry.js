@@ -0,0 +1,87 @@
+/**
+ * pageRegistry.js
+ * Páginas carregadas sob demanda (um chunk por rota).
+ *
+ * Só a LoginPage fica no bundle inicial; o resto é baixado na primeira visita.
+ * Para esconder a latência do chunk, a Sidebar chama prefetchPage() no hover e
+ * o App agenda prefetchLikelyNext() em tempo ocioso — com base nas transições
+ * de página mais frequentes do próprio usuário (guardadas no localStorage).
+ */
+
+import { lazy } from 'react';
+
+const loaders = {
+    dashboard:     () => import('./DashboardPage').then(m => ({ default: m.DashboardPage })),
+    chat:          () => import('./ChatPage').then(m => ({ default: m.ChatPage })),
+    missoes:       () => import('./MissoesPage').then(m => ({ default: m.MissoesPage })),
+    tarefas:       () => import('./TarefasPage').then(m => ({ default: m.TarefasPage })),
+    habitos:       () => import('./HabitosPage').then(m => ({ default: m.HabitosPage })),
+    projetos:      () => import('./ProjetosPage').then(m => ({ default: m.ProjetosPage })),
+    lembretes:     () => import('./LembretesPage').then(m => ({ default: m.LembretesPage })),
+    financas:      () => import('./FinancasPage').then(m => ({ default: m.FinancasPage })),
+    analises:      () => import('./AnalisesPage').then(m => ({ default: m.AnalisesPage })),
+    gemeodigital:  () => import('./GemeoDijitalPage').then(m => ({ default: m.GemeoDijitalPage })),
+    caderno:       () => import('./CadernoPage').then(m => ({ default: m.CadernoPage })),
+    desejos:       () => import('./DesejosPage').then(m => ({ default: m.DesejosPage })),
+    profileSetup:  () => import('./ProfileSetupPage').then(m => ({ default: m.ProfileSetupPage })),
+    resetPassword: () => import('./ResetPasswordPage').then(m => ({ default: m.ResetPasswordPage })),
+};
+
+// Uma promise por página: lazy() e prefetch compartilham o mesmo download
+const _loading = {};
+
+function loadPage(id) {
+    if (!_loading[id]) {
+        _loading[id] = loaders[id]().catch(err => {
+            delete _loading[id]; // permite nova tentativa (ex: chunk falhou offline)
+            throw err;
+        });
+    }
+    return _loading[id];
+}
+
+export const PAGES = Object.fromEntries(
+    Object.keys(loaders).map(id => [id, lazy(() => loadPage(id))])
+);
+
+/** Baixa o chunk da página sem renderizá-la. Ignora ids desconhecidos. */
+export function prefetchPage(id) {
+    if (loaders[id]) loadPage(id).catch(() => {});
+}
+
+// ── Predição da próxima página ─────────────────────────────────────────────────
+
+const NAV_STATS_KEY = 'orbis_nav_stats';
+const DEFAULT_NEXT = ['dashboard', 'chat', 'tarefas'];
+
+function readNavStats() {
+    try { return JSON.parse(localStorage.getItem(NAV_STATS_KEY)) || {}; } catch { return {}; }
+}
+
+/** Conta a transição from → to (matriz de transições por usuário). */
+export function recordNavigation(from, to) {
+    if (!from || from === to) return;
+    const stats = readNavStats();
+    const row = (stats[from] ||= {});
+    row[to] = (row[to] || 0) + 1;
+    try { localStorage.setItem(NAV_STATS_KEY, JSON.stringify(stats)); } catch { /* quota */ }
+}
+
+/** Páginas mais prováveis depois de `current`, da mais para a menos frequente. */
+export function likelyNextPages(current, limit = 2) {
+    const row = readNavStats()[current] || {};
+    const ranked = Object.entries(row).sort((a, b) => b[1] - a[1]).map(([id]) => id);
+    const candidates = [...ranked, ...DEFAULT_NEXT].filter(id => id !== current && loaders[id]);
+    return [...new Set(candidates)].slice(0, limit);
+}
+
+/** Agenda o prefetch das próximas páginas prováveis para quando o navegador estiver ocioso. */
+export function prefetchLikelyNext(current) {
+    const run = () => likelyNextPages(current).forEach(prefetchPage);
+    if ('requestIdleCallback' in window) {
+        const handle = window.requestIdleCallback(run, { timeout: 4000 });
+        return () => window.cancelIdleCallback(handle);
+    }
+    const timer = setTimeout(run, 1500);
+    return () => clearTimeout(timer);
+}
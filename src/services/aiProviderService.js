@@ -1,60 +1,63 @@
 import { fetchAiContextSnapshot, isSupabaseConfigured } from './supabaseService';
 import { formatPatterns } from './patternService';
-
-// Formata o snapshot do Supabase em texto compacto para o system prompt
-async function buildLiveContext() {
-    if (!isSupabaseConfigured()) return '';
+import { aggregateFinances } from '../utils/financeAggregates';
+import { habitDays } from '../utils/habitDays';
+import { createActionJsonScanner } from '../utils/actionJson';
+import { assemblePrompt, estimateTokens, DEFAULT_PROMPT_BUDGET } from '../utils/promptBudget';
+import { conversationSummary, SUMMARY_SYSTEM_PROMPT } from './conversationSummaryService';
+
+const LIVE_CONTEXT_HEADER = '\n\n[DADOS REAIS DO CAÇADOR — ATUALIZADO AGORA]:\n';
+
+// Formata o snapshot do Supabase em seções de texto compacto para o system prompt.
+// priority menor = mais importante: é o que fica quando o orçamento de tokens aperta
+// (o snapshot vem do cache por usuário de supabaseService — ver TTL/invalidação lá)
+async function buildLiveContextSections() {
+    if (!isSupabaseConfigured()) return [];
     try {
         const snap = await fetchAiContextSnapshot();
-        if (!snap) return '';
+        if (!snap) return [];
 
-        const lines = [];
+        const sections = [];
+        const section = (id, priority, lines) => {
+            if (lines.length > 0) sections.push({ id, priority, text: lines.join('\n') });
+        };
 
         if (snap.tasks.length > 0) {
-            lines.push('MISSÕES ATIVAS:');
-            snap.tasks.forEach(t => {
+            section('tasks', 0, ['MISSÕES ATIVAS:', ...snap.tasks.map(t => {
                 const prazo = t.data_prazo ? ` | prazo ${t.data_prazo}` : '';
-                lines.push(`- [${t.prioridade?.toUpperCase() || 'MEDIA'}] ${t.titulo} — ${t.status}${prazo}`);
-            });
+                return `- [${t.prioridade?.toUpperCase() || 'MEDIA'}] ${t.titulo} — ${t.status}${prazo}`;
+            })]);
         }
 
         if (snap.projects.length > 0) {
-            lines.push('PROJETOS EM CURSO:');
-            snap.projects.forEach(p => lines.push(`- ${p.titulo} (${p.status})`));
+            section('projects', 2, ['PROJETOS EM CURSO:', ...snap.projects.map(p => `- ${p.titulo} (${p.status})`)]);
         }
 
         if (snap.reminders.length > 0) {
-            lines.push('LEMBRETES PENDENTES:');
-            snap.reminders.forEach(r => {
+            section('reminders', 1, ['LEMBRETES PENDENTES:', ...snap.reminders.map(r => {
                 const dt = r.data_hora ? ` — ${new Date(r.data_hora).toLocaleString('pt-BR')}` : '';
-                lines.push(`- [${r.importancia?.toUpperCase()}] ${r.titulo}${dt}`);
-            });
+                return `- [${r.importancia?.toUpperCase()}] ${r.titulo}${dt}`;
+            })]);
         }
 
         if (snap.finances.length > 0) {
-            const receitas = snap.finances.filter(f => f.tipo === 'receita').reduce((s, f) => s + Number(f.valor), 0);
-            const despesas = snap.finances.filter(f => f.tipo === 'despesa').reduce((s, f) => s + Number(f.valor), 0);
-            lines.push(`FINANÇAS (últimos 30 dias): receitas R$${receitas.toFixed(2)} | despesas R$${despesas.toFixed(2)} | saldo R$${(receitas - despesas).toFixed(2)}`);
-            const cats = {};
-            snap.finances.filter(f => f.tipo === 'despesa').forEach(f => {
-                const c = f.categoria || 'outros';
-                cats[c] = (cats[c] || 0) + Number(f.valor);
-            });
-            const topCats = Object.entries(cats).sort((a, b) => b[1] - a[1]).slice(0, 3);
+            const fin = aggregateFinances(snap.finances);
+            const { receitas, despesas, saldo } = fin.totals();
+            const lines = [`FINANÇAS (últimos 30 dias): receitas R$${receitas.toFixed(2)} | despesas R$${despesas.toFixed(2)} | saldo R$${saldo.toFixed(2)}`];
+            const topCats = fin.expenseCategories().slice(0, 3);
             if (topCats.length) lines.push('Top gastos: ' + topCats.map(([c, v]) => `${c} R$${v.toFixed(2)}`).join(' | '));
+            section('finances', 1, lines);
         }
 
         if (snap.habits.length > 0) {
-            lines.push('HÁBITOS:');
-            snap.habits.forEach(h => {
-                const logs = h.habit_logs || [];
-                const thisMonth = logs.filter(l => l.date?.startsWith(snap.today.slice(0, 7))).length;
-                lines.push(`- ${h.icone || '✨'} ${h.titulo}: ${thisMonth} vezes este mês`);
-            });
+            section('habits', 2, ['HÁBITOS:', ...snap.habits.map(h => {
+                const thisMonth = habitDays(h).countMonth(snap.today.slice(0, 7));
+                return `- ${h.icone || '✨'} ${h.titulo}: ${thisMonth} vezes este mês`;
+            })]);
         }
 
         if (snap.healthLogs.length > 0) {
-            lines.push('SAÚDE (últimos 7 dias):');
+            const lines = ['SAÚDE (últimos 7 dias):'];
             snap.healthLogs.forEach(l => {
                 const parts = [];
                 if (l.sleep_hours != null) parts.push(`sono ${l.sleep_hours}h`);
@@ -62,32 +65,107 @@ async function buildLiveContext() {
                 if (l.weight != null) parts.push(`peso ${l.weight}kg`);
                 if (parts.length) lines.push(`- ${l.date}: ${parts.join(' | ')}`);
             });
+            if (lines.length > 1) section('health', 3, lines);
         }
 
         if (snap.notes && snap.notes.length > 0) {
-            lines.push('NOTAS DO CADERNO:');
-            snap.notes.forEach(n => {
+            section('notes', 4, ['NOTAS DO CADERNO:', ...snap.notes.map(n => {
                 const preview = (n.conteudo || '').slice(0, 120).replace(/\n/g, ' ');
-                lines.push(`- "${n.titulo}": ${preview || '(sem conteúdo)'}`);
-            });
+                return `- "${n.titulo}": ${preview || '(sem conteúdo)'}`;
+            })]);
         }
 
         if (snap.diary && snap.diary.length > 0) {
-            lines.push('DIÁRIO (entradas recentes):');
-            snap.diary.forEach(d => {
+            section('diary', 4, ['DIÁRIO (entradas recentes):', ...snap.diary.map(d => {
                 const preview = (d.conteudo || '').slice(0, 150).replace(/\n/g, ' ');
-                lines.push(`- ${d.data}: ${preview || '(vazio)'}`);
-            });
+                return `- ${d.data}: ${preview || '(vazio)'}`;
+            })]);
         }
 
-        const patternsBlock = formatPatterns(snap);
+        const patternsBlock = (await formatPatterns(snap)).trim();
+        if (patternsBlock) sections.push({ id: 'patterns', priority: 2, text: patternsBlock });
 
-        if (lines.length === 0 && !patternsBlock) return '';
-        return '\n\n[DADOS REAIS DO CAÇADOR — ATUALIZADO AGORA]:\n' + lines.join('\n') + patternsBlock;
+        return sections;
     } catch (e) {
         console.error('[Orbis] Erro ao buscar contexto do Supabase:', e);
-        return '';
+        return [];
+    }
+}
+
+// ── Orçamento de tokens ────────────────────────────────────────────────────────
+// Cada chamada monta o prompt com assemblePrompt (utils/promptBudget): system +
+// addon + contexto ao vivo + histórico cabem em options.tokenBudget (ou no valor
+// de localStorage 'orbis_prompt_budget'); turnos antigos viram um resumo por
+// options.conversationId. options.bare pula system prompt, contexto e resumo
+// (usado pela própria chamada de resumo).
+
+function getPromptBudget() {
+    const stored = Number(localStorage.getItem('orbis_prompt_budget'));
+    return stored > 0 ? stored : DEFAULT_PROMPT_BUDGET;
+}
+
+async function preparePrompt(provider, messages, apiKey, options) {
+    const conversationId = options.conversationId || 'geral';
+    if (options.bare) {
+        return { conversationId, ...assemblePrompt({ addon: options.systemPromptAddon || '', messages, budget: options.tokenBudget || getPromptBudget() }) };
     }
+    const summarize = prompt => callAiProvider(provider, [{ tipo: 'usuario', mensagem: prompt }], apiKey, {
+        model: options.model,
+        bare: true,
+        systemPromptAddon: SUMMARY_SYSTEM_PROMPT,
+        maxTokens: 500,
+        conversationId: `${conversationId}:resumo`,
+    });
+    const prompt = assemblePrompt({
+        system: getSystemPrompt(),
+        addon: options.systemPromptAddon || '',
+        sections: await buildLiveContextSections(),
+        contextHeader: LIVE_CONTEXT_HEADER,
+        messages,
+        budget: options.tokenBudget || getPromptBudget(),
+        summary: older => conversationSummary(conversationId, older, summarize),
+    });
+    return { conversationId, ...prompt };
+}
+
+/**
+ * O que o prompt recebe além da conversa: system prompt (com a data de hoje) e
+ * contexto ao vivo. Entra na chave do cache de respostas (responseCacheService),
+ * para "o que fazer hoje" não voltar de outro dia ou de outros dados.
+ */
+export async function liveContextFingerprint() {
+    const sections = await buildLiveContextSections();
+    return [getSystemPrompt(), ...sections.map(s => s.text)].join('\n');
+}
+
+// Registro de tokens por chamada: estimativa da entrada por segmento e, quando o
+// provedor informa, os números dele. getTokenLog() devolve as últimas chamadas.
+const TOKEN_LOG_MAX = 200;
+const _tokenLog = [];
+
+export function getTokenLog() {
+    return _tokenLog.slice();
+}
+
+function logTokenUsage(provider, model, prompt, outputText, reported, startedAt) {
+    const entry = {
+        at: new Date().toISOString(),
+        provider,
+        model,
+        conversationId: prompt.conversationId,
+        input: reported?.input ?? prompt.usage.total,
+        output: reported?.output ?? estimateTokens(outputText),
+        estimated: !reported?.input,
+        segments: prompt.usage,
+        ms: Math.round(performance.now() - startedAt),
+    };
+    _tokenLog.push(entry);
+    if (_tokenLog.length > TOKEN_LOG_MAX) _tokenLog.shift();
+    const parts = Object.entries(prompt.usage)
+        .filter(([k, v]) => v && k !== 'total' && k !== 'budget')
+        .map(([k, v]) => `${k} ${v}`)
+        .join(', ');
+    console.info(`[Orbis] tokens ${entry.conversationId} (${provider}): entrada ${entry.input}${entry.estimated ? ' (estimado)' : ''} [${parts}] / ${prompt.usage.budget} | saída ${entry.output} | ${entry.ms}ms`);
 }
 
 export async function callAiProvider(provider, messages, apiKey, options = {}) {
@@ -98,29 +176,104 @@ export async function callAiProvider(provider, messages, apiKey, options = {}) {
     }
 }
 
-async function callGemini(messages, apiKey, options) {
-    const url = `https://generativelanguage.googleapis.com/v1beta/models/${options.model || 'gemini-2.5-flash'}:generateContent?key=${apiKey}`;
+/**
+ * Versão em streaming de callAiProvider: async iterator que produz o texto
+ * conforme o modelo gera (Gemini streamGenerateContent / SSE OpenAI-compatível).
+ * Interromper o for-await (break/return) cancela a requisição.
+ */
+export async function* streamAiProvider(provider, messages, apiKey, options = {}) {
+    if (provider === 'gemini') {
+        yield* streamGemini(messages, apiKey, options);
+    } else {
+        yield* streamOpenAiCompatible(provider, messages, apiKey, options);
+    }
+}
+
+/**
+ * Consome streamAiProvider passando o texto por createActionJsonScanner:
+ * onText recebe o texto visível acumulado (sem os JSONs de ação) a cada pedaço,
+ * onAction recebe cada ação assim que seu objeto fecha. Se stopOn(ação) for
+ * verdadeiro, o stream é encerrado ali (ex: SEARCH_INTERNET dispensa o resto).
+ * Retorna { text, visible, actions } — text é a resposta bruta.
+ */
+export async function streamWithActions(provider, messages, apiKey, options = {}, { onText, onAction, stopOn } = {}) {
+    const scanner = createActionJsonScanner();
+    let text = '';
+    for await (const delta of streamAiProvider(provider, messages, apiKey, options)) {
+        text += delta;
+        const found = scanner.push(delta);
+        found.forEach(a => onAction?.(a));
+        // Um code fence aberto logo antes de um JSON pendente não deve piscar na tela
+        onText?.(scanner.visible.replace(/```(?:json)?\s*$/i, ''));
+        if (stopOn && found.some(stopOn)) break;
+    }
+    scanner.end();
+    return { text, visible: scanner.visible, actions: scanner.actions };
+}
+
+// Prazo até o provedor começar a responder (cabeçalhos); o stream em si pode
+// durar mais. O navegador já reaproveita a conexão (keep-alive) entre chamadas.
+const RESPONSE_DEADLINE_MS = 30 * 1000;
+
+async function fetchWithDeadline(provider, url, init) {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), RESPONSE_DEADLINE_MS);
+    try {
+        return await fetch(url, { ...init, signal: controller.signal });
+    } catch (e) {
+        if (controller.signal.aborted) throw new Error(`${provider} não respondeu em ${RESPONSE_DEADLINE_MS / 1000}s (timeout)`);
+        throw e;
+    } finally {
+        clearTimeout(timer);
+    }
+}
+
+// Lê um corpo text/event-stream e produz o conteúdo de cada linha "data:"
+async function* readSseData(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    try {
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (line.startsWith('data:')) yield line.slice(5).trim();
+            }
+        }
+        if (buffer.startsWith('data:')) yield buffer.slice(5).trim();
+    } finally {
+        reader.cancel().catch(() => {});
+    }
+}
 
-    const liveContext = await buildLiveContext();
+async function geminiRequest(prompt, apiKey, options, stream) {
+    const model = options.model || 'gemini-2.5-flash';
+    const url = stream
+        ? `https://generativelanguage.googleapis.com/v1beta/models/${model}:streamGenerateContent?alt=sse&key=${apiKey}`
+        : `https://generativelanguage.googleapis.com/v1beta/models/${model}:generateContent?key=${apiKey}`;
 
     // Convert history for Gemini
-    const history = messages.slice(0, -1).map(msg => ({
+    const contents = prompt.messages.map(msg => ({
         role: msg.tipo === "usuario" ? "user" : "model",
         parts: [{ text: msg.mensagem }]
     }));
-    const currentMessage = messages[messages.length - 1].mensagem;
+    contents[contents.length - 1].role = "user";
 
-    const response = await fetch(url, {
+    const response = await fetchWithDeadline('gemini', url, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
-            contents: [...history, { role: "user", parts: [{ text: currentMessage }] }],
-            systemInstruction: { parts: [{ text: getSystemPrompt() + liveContext + (options.systemPromptAddon || '') }] },
+            contents,
+            ...(prompt.system && { systemInstruction: { parts: [{ text: prompt.system }] } }),
             generationConfig: {
                 temperature: 0.7,
                 topK: 40,
                 topP: 0.95,
-                maxOutputTokens: 4096,
+                maxOutputTokens: options.maxTokens || 4096,
             }
         })
     });
@@ -129,11 +282,45 @@ async function callGemini(messages, apiKey, options) {
         const err = await response.json();
         throw new Error(err.error?.message || "Erro no Gemini");
     }
+    return { response, model };
+}
+
+const geminiUsage = meta => meta && { input: meta.promptTokenCount, output: meta.candidatesTokenCount };
+
+async function callGemini(messages, apiKey, options) {
+    const startedAt = performance.now();
+    const prompt = await preparePrompt('gemini', messages, apiKey, options);
+    const { response, model } = await geminiRequest(prompt, apiKey, options, false);
     const data = await response.json();
-    return data.candidates[0].content.parts[0].text;
+    const text = data.candidates[0].content.parts[0].text;
+    logTokenUsage('gemini', model, prompt, text, geminiUsage(data.usageMetadata), startedAt);
+    return text;
 }
 
-async function callOpenAiCompatible(provider, messages, apiKey, options) {
+async function* streamGemini(messages, apiKey, options) {
+    const startedAt = performance.now();
+    const prompt = await preparePrompt('gemini', messages, apiKey, options);
+    const { response, model } = await geminiRequest(prompt, apiKey, options, true);
+    let full = '';
+    let usage = null;
+    try {
+        for await (const payload of readSseData(response)) {
+            let chunk;
+            try { chunk = JSON.parse(payload); } catch { continue; }
+            if (chunk.usageMetadata) usage = geminiUsage(chunk.usageMetadata);
+            const text = (chunk.candidates?.[0]?.content?.parts || []).map(p => p.text || '').join('');
+            if (text) {
+                full += text;
+                yield text;
+            }
+        }
+    } finally {
+        // Também quando o consumidor interrompe o stream (ex: SEARCH_INTERNET)
+        logTokenUsage('gemini', model, prompt, full, usage, startedAt);
+    }
+}
+
+async function openAiCompatibleRequest(provider, prompt, apiKey, options, stream) {
     let baseUrl = "https://api.openai.com/v1";
     let model = options.model || "gpt-3.5-turbo";
 
@@ -148,17 +335,15 @@ async function callOpenAiCompatible(provider, messages, apiKey, options) {
         model = options.model || "google/gemini-2.0-flash-001";
     }
 
-    const liveContext = await buildLiveContext();
-
     const formattedMessages = [
-        { role: "system", content: getSystemPrompt() + liveContext + (options.systemPromptAddon || '') },
-        ...messages.map(msg => ({
+        ...(prompt.system ? [{ role: "system", content: prompt.system }] : []),
+        ...prompt.messages.map(msg => ({
             role: msg.tipo === "usuario" ? "user" : "assistant",
             content: msg.mensagem
         }))
     ];
 
-    const response = await fetch(`${baseUrl}/chat/completions`, {
+    const response = await fetchWithDeadline(provider, `${baseUrl}/chat/completions`, {
         method: "POST",
         headers: {
             "Content-Type": "application/json",
@@ -169,7 +354,8 @@ async function callOpenAiCompatible(provider, messages, apiKey, options) {
             model: model,
             messages: formattedMessages,
             temperature: 0.7,
-            max_tokens: 4096,
+            max_tokens: options.maxTokens || 4096,
+            ...(stream && { stream: true }),
         })
     });
 
@@ -183,8 +369,43 @@ async function callOpenAiCompatible(provider, messages, apiKey, options) {
         }
         throw new Error(errorMsg);
     }
+    return { response, model };
+}
+
+const openAiUsage = usage => usage && { input: usage.prompt_tokens, output: usage.completion_tokens };
+
+async function callOpenAiCompatible(provider, messages, apiKey, options) {
+    const startedAt = performance.now();
+    const prompt = await preparePrompt(provider, messages, apiKey, options);
+    const { response, model } = await openAiCompatibleRequest(provider, prompt, apiKey, options, false);
     const data = await response.json();
-    return data.choices[0].message.content;
+    const text = data.choices[0].message.content;
+    logTokenUsage(provider, model, prompt, text, openAiUsage(data.usage), startedAt);
+    return text;
+}
+
+async function* streamOpenAiCompatible(provider, messages, apiKey, options) {
+    const startedAt = performance.now();
+    const prompt = await preparePrompt(provider, messages, apiKey, options);
+    const { response, model } = await openAiCompatibleRequest(provider, prompt, apiKey, options, true);
+    let full = '';
+    let usage = null;
+    try {
+        for await (const payload of readSseData(response)) {
+            if (payload === '[DONE]') return;
+            let chunk;
+            try { chunk = JSON.parse(payload); } catch { continue; }
+            // Alguns provedores mandam usage no último chunk
+            if (chunk.usage) usage = openAiUsage(chunk.usage);
+            const text = chunk.choices?.[0]?.delta?.content;
+            if (text) {
+                full += text;
+                yield text;
+            }
+        }
+    } finally {
+        logTokenUsage(provider, model, prompt, full, usage, startedAt);
+    }
 }
 
 function getHunterProfile() {
@@ -0,0 +1,90 @@
+/**
+ * conversationSummaryService.js
+ * Resumo acumulado dos turnos que saíram do prompt (ver utils/promptBudget),
+ * um por conversa (LYRA, chat de tarefas, hábitos, finanças, brainstorm).
+ *
+ * O cache guarda { upTo, text }: o resumo cobre os turnos até a mensagem
+ * `upTo`. A cada chamada:
+ *   - turnos já cobertos → texto do cache, sem custo;
+ *   - turnos novos fora do prompt (a "lacuna") → resumo extrativo local na hora;
+ *   - lacuna com SUMMARY_MIN_NEW+ turnos → a IA reescreve o resumo em segundo
+ *     plano (resumo anterior + lacuna) e a próxima chamada já usa o novo.
+ * Nunca bloqueia a resposta esperando o resumo.
+ */
+
+import { estimateTokens, extractiveSummary, truncateToTokens } from '../utils/promptBudget';
+
+const SUMMARIES_KEY = 'orbis_conversation_summaries';
+const SUMMARY_MIN_NEW = 4;
+const SUMMARY_MAX_TOKENS = 350;
+const GAP_MAX_TOKENS = 200;
+const TRANSCRIPT_MAX_TOKENS = 2500;
+
+export const SUMMARY_SYSTEM_PROMPT = `Você resume conversas entre o Caçador e a LYRA, a assistente pessoal dele.
+Escreva em Português do Brasil, em no máximo 8 linhas começando com hífen, sem markdown.
+Guarde fatos, decisões, pedidos em aberto, números e nomes citados. Descarte saudações e conversa fiada.`;
+
+let _cache = null;
+const _inFlight = new Map();
+
+function loadCache() {
+    if (!_cache) {
+        try { _cache = JSON.parse(localStorage.getItem(SUMMARIES_KEY) || '{}'); }
+        catch { _cache = {}; }
+    }
+    return _cache;
+}
+
+function persistCache() {
+    try { localStorage.setItem(SUMMARIES_KEY, JSON.stringify(_cache)); }
+    catch (e) { console.error('[Orbis] Falha ao salvar resumos de conversa:', e); }
+}
+
+function messageKey(m) {
+    return String(m.id ?? m.timestamp ?? `${m.tipo}:${(m.mensagem || '').slice(0, 40)}`);
+}
+
+function transcript(messages) {
+    const lines = messages.map(m => `${m.tipo === 'usuario' ? 'Caçador' : 'LYRA'}: ${truncateToTokens(m.mensagem || '', 300)}`);
+    // Se ainda passar do limite, ficam os turnos mais novos
+    let used = 0, start = lines.length;
+    while (start > 0 && used + estimateTokens(lines[start - 1]) <= TRANSCRIPT_MAX_TOKENS) {
+        used += estimateTokens(lines[--start]);
+    }
+    return lines.slice(start).join('\n');
+}
+
+function refresh(conversationId, previous, gap, summarize) {
+    if (_inFlight.has(conversationId)) return;
+    const upTo = messageKey(gap[gap.length - 1]);
+    const prompt = (previous ? `RESUMO ATÉ AGORA:\n${previous}\n\n` : '')
+        + `TURNOS NOVOS:\n${transcript(gap)}\n\nReescreva o resumo incorporando os turnos novos.`;
+    const job = summarize(prompt)
+        .then(text => {
+            if (!text?.trim()) return;
+            loadCache()[conversationId] = { upTo, text: truncateToTokens(text.trim(), SUMMARY_MAX_TOKENS) };
+            persistCache();
+        })
+        .catch(e => console.warn(`[Orbis] Resumo de "${conversationId}" falhou (segue com o extrativo):`, e?.message || e))
+        .finally(() => _inFlight.delete(conversationId));
+    _inFlight.set(conversationId, job);
+}
+
+/**
+ * Texto de resumo para os turnos `older` (os que não couberam no prompt).
+ * summarize(prompt) → Promise<string>: chamada à IA, usada só em segundo plano.
+ */
+export function conversationSummary(conversationId, older, summarize) {
+    if (!older.length) return '';
+    const entry = loadCache()[conversationId];
+    // Posição do último turno já resumido; se sumiu (conversa limpa), o cache não vale
+    const covered = entry ? older.map(messageKey).lastIndexOf(entry.upTo) : -1;
+    const previous = covered >= 0 ? entry.text : '';
+    const gap = older.slice(covered + 1);
+
+    if (summarize && gap.length >= SUMMARY_MIN_NEW) refresh(conversationId, previous, gap, summarize);
+
+    return [previous, gap.length ? extractiveSummary(gap, GAP_MAX_TOKENS) : '']
+        .filter(Boolean)
+        .join('\n');
+}
@@ -0,0 +1,160 @@
+/**
+ * localSearchService.js
+ * Busca local do Ctrl+K (SearchOverlay) sobre todas as coleções do app.
+ *
+ * O índice (utils/searchIndex.js) vive num Web Worker. Daqui só saem as
+ * mudanças: a cada escrita no storageService a coleção é marcada e, no próximo
+ * tick, comparada por referência com a última versão indexada (o estado React
+ * é imutável) — só itens novos/alterados/removidos vão para o worker.
+ * Notas, diário e chat entram pelo mesmo caminho, mesmo não estando no DataContext.
+ *
+ * Sem suporte a Worker (ou se ele falhar ao carregar), o índice roda na
+ * thread principal com a mesma API.
+ */
+
+import { readStored, subscribeStored } from './storageService';
+import { createSearchIndex } from '../utils/searchIndex';
+
+const clip = (text, n) => (text && text.length > n ? text.slice(0, n - 1) + '…' : text || '');
+const money = v => `R$ ${Number(v || 0).toFixed(2)}`;
+
+// Coleção → como vira documento de busca (título, corpo, rótulo e página de destino)
+const SOURCES = {
+    orbis_tasks:        { type: 'tarefa',   page: 'tarefas',   title: t => t.titulo,    body: t => t.descricao },
+    orbis_habits:       { type: 'hábito',   page: 'habitos',   title: h => h.titulo,    body: h => h.descricao },
+    orbis_projects:     { type: 'projeto',  page: 'projetos',  title: p => p.titulo,    body: p => p.descricao },
+    orbis_reminders:    { type: 'lembrete', page: 'lembretes', title: r => r.titulo,    body: r => r.descricao },
+    orbis_finances:     { type: 'finanças', page: 'financas',  title: f => f.descricao, body: f => f.categoria, subtitle: f => `${money(f.valor)} · ${f.data || ''}` },
+    orbis_wishes:       { type: 'desejo',   page: 'desejos',   title: w => w.titulo,    body: w => `${w.descricao || ''} ${w.categoria || ''}` },
+    orbis_notes:        { type: 'nota',     page: 'caderno',   title: n => n.titulo,    body: n => n.conteudo },
+    orbis_diary:        { type: 'diário',   page: 'caderno',   title: d => `Diário ${d.data}`, body: d => d.conteudo, subtitle: d => clip(d.conteudo, 80) },
+    orbis_chat_history: { type: 'chat',     page: 'chat',      title: m => clip(m.mensagem, 80), body: m => m.mensagem },
+};
+
+let _backend = null;
+const _indexed = new Map();    // coleção → Map<id, item> da última versão enviada ao índice
+const _pending = new Set();    // coleções alteradas desde o último envio
+const _latest = new Map();     // coleção → último valor gravado (mesmas referências do estado React)
+let _flushQueued = false;
+
+const itemKey = item => item?.id ?? item?.data;
+
+function toDoc(source, item) {
+    const spec = SOURCES[source];
+    return {
+        key: `${source}:${itemKey(item)}`,
+        source,
+        id: item.id,
+        type: spec.type,
+        page: spec.page,
+        title: spec.title(item) || '(sem título)',
+        subtitle: spec.subtitle ? spec.subtitle(item) : '',
+        body: spec.body(item) || '',
+    };
+}
+
+// Diff por referência contra a última versão indexada: O(n) comparações, só o que mudou sai
+function diffSource(source, upserts, removes) {
+    const value = _latest.has(source) ? _latest.get(source) : readStored(source, []);
+    const items = Array.isArray(value) ? value : [];
+    const prev = _indexed.get(source) || new Map();
+    const next = new Map();
+
+    for (const item of items) {
+        const k = itemKey(item);
+        if (k === undefined || next.has(k)) continue;
+        next.set(k, item);
+        if (prev.get(k) !== item) upserts.push(toDoc(source, item));
+    }
+    for (const k of prev.keys()) {
+        if (!next.has(k)) removes.push(`${source}:${k}`);
+    }
+    _indexed.set(source, next);
+}
+
+function flush() {
+    _flushQueued = false;
+    if (!_backend || _pending.size === 0) return;
+    const upserts = [];
+    const removes = [];
+    for (const source of _pending) diffSource(source, upserts, removes);
+    _pending.clear();
+    if (upserts.length || removes.length) _backend.apply(upserts, removes);
+}
+
+function markChanged(key, value) {
+    if (!SOURCES[key]) return;
+    _latest.set(key, value);
+    _pending.add(key);
+    if (!_flushQueued) {
+        _flushQueued = true;
+        setTimeout(flush, 0);
+    }
+}
+
+function reindexAll() {
+    _indexed.clear();
+    Object.keys(SOURCES).forEach(s => _pending.add(s));
+    flush();
+}
+
+// ── Backends ───────────────────────────────────────────────────────────────────
+
+function createInlineBackend() {
+    const index = createSearchIndex();
+    return {
+        apply: (upserts, removes) => index.apply(upserts, removes),
+        search: async (query, k) => index.search(query, k),
+    };
+}
+
+function createWorkerBackend() {
+    const worker = new Worker(new URL('../workers/searchIndex.worker.js', import.meta.url), { type: 'module' });
+    const waiting = new Map();
+    let seq = 0;
+
+    worker.onmessage = ({ data }) => {
+        const resolve = waiting.get(data.id);
+        waiting.delete(data.id);
+        resolve?.(data.hits);
+    };
+    // Worker não carregou: troca para o índice na thread principal e reindexa
+    worker.onerror = (e) => {
+        console.error('[Orbis] Worker de busca indisponível, usando thread principal:', e.message);
+        worker.terminate();
+        _backend = createInlineBackend();
+        reindexAll();
+        const pending = [...waiting.values()];
+        waiting.clear();
+        pending.forEach(resolve => resolve([]));
+    };
+
+    return {
+        apply: (upserts, removes) => worker.postMessage({ type: 'apply', upserts, removes }),
+        search: (query, k) => new Promise(resolve => {
+            const id = ++seq;
+            waiting.set(id, resolve);
+            worker.postMessage({ type: 'search', id, query, k });
+        }),
+    };
+}
+
+// ── API ────────────────────────────────────────────────────────────────────────
+
+/** Cria o índice e passa a acompanhar as escritas. Idempotente. */
+export function startLocalSearch() {
+    if (_backend) return;
+    _backend = typeof Worker !== 'undefined' ? createWorkerBackend() : createInlineBackend();
+    subscribeStored(markChanged);
+    reindexAll();
+}
+
+/**
+ * Top-k resultados para a consulta: [{ key, source, id, type, page, title, subtitle, score }].
+ * Mudanças ainda não enviadas ao índice são aplicadas antes da busca.
+ */
+export function searchLocal(query, k = 8) {
+    startLocalSearch();
+    flush();
+    return _backend.search(query, k);
+}
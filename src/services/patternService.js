@@ -3,154 +3,89 @@
  * Motor de detecção de padrões — cruza dados entre módulos
  * para gerar insights sobre o comportamento do usuário.
  *
- * Não depende de IA externa: todas as análises são feitas localmente
- * com aritmética simples sobre os dados do Supabase.
+ * Não depende de IA externa: as regras (utils/analyticsEngine.js) rodam
+ * localmente sobre cópias colunares do snapshot — séries diárias de até dois
+ * anos de saúde e um de finanças (utils/timeSeries.js) —, num Web Worker. Daqui sai
+ * uma API de promessas; o resultado fica em cache por snapshot (o de
+ * supabaseService é o mesmo objeto até o TTL/invalidação), então perguntas
+ * seguidas à IA não recalculam nada.
+ *
+ * Sem suporte a Worker (ou se ele falhar ao carregar), as regras rodam na
+ * thread principal com a mesma API.
  */
 
-// ── Helpers ────────────────────────────────────────────────────────────────────
-
-function avg(arr) {
-    if (!arr.length) return null;
-    return arr.reduce((s, v) => s + v, 0) / arr.length;
-}
-
-function round1(n) {
-    return Math.round(n * 10) / 10;
-}
+import { toColumns, columnsTransferList, analyzeColumns } from '../utils/analyticsEngine';
 
-// ── Padrões de Saúde ──────────────────────────────────────────────────────────
+let _backend = null;
+const _results = new WeakMap();   // snapshot → Promise<string[]>
 
-function analyzeHealthTrends(healthLogs) {
-    if (!healthLogs || healthLogs.length < 3) return [];
-    const insights = [];
+// ── Backends ───────────────────────────────────────────────────────────────────
 
-    const withSleep = healthLogs.filter(l => l.sleep_hours != null);
-    const withEnergy = healthLogs.filter(l => l.energy != null);
-
-    if (withSleep.length >= 3) {
-        const sleepAvg = avg(withSleep.map(l => Number(l.sleep_hours)));
-        if (sleepAvg < 6) {
-            insights.push(`Média de sono abaixo de 6h nos últimos dias (${round1(sleepAvg)}h). Déficit crônico reduz performance cognitiva em até 40%.`);
-        } else if (sleepAvg >= 8) {
-            insights.push(`Sono consistente acima de 8h nos últimos dias (${round1(sleepAvg)}h). Boa base para recuperação muscular e memória.`);
-        }
-    }
-
-    // Correlação sono × energia
-    if (withSleep.length >= 3 && withEnergy.length >= 3) {
-        const paired = healthLogs.filter(l => l.sleep_hours != null && l.energy != null);
-        if (paired.length >= 3) {
-            const lowSleepEnergy = avg(paired.filter(l => Number(l.sleep_hours) < 6.5).map(l => Number(l.energy)));
-            const highSleepEnergy = avg(paired.filter(l => Number(l.sleep_hours) >= 6.5).map(l => Number(l.energy)));
-            if (lowSleepEnergy != null && highSleepEnergy != null && (highSleepEnergy - lowSleepEnergy) > 0.8) {
-                insights.push(`Padrão detectado: quando dorme menos de 6.5h, energia cai para ${round1(lowSleepEnergy)}/5. Com sono adequado, sobe para ${round1(highSleepEnergy)}/5.`);
-            }
-        }
-    }
-
-    return insights;
-}
-
-// ── Padrões de Hábitos ─────────────────────────────────────────────────────────
-
-function analyzeHabitConsistency(habits) {
-    if (!habits || habits.length === 0) return [];
-    const insights = [];
-    const today = new Date();
-    const thisMonth = today.toISOString().slice(0, 7);
-    const dayOfMonth = today.getDate();
-
-    habits.forEach(h => {
-        const logs = h.habit_logs || [];
-        const thisMonthLogs = logs.filter(l => l.date?.startsWith(thisMonth)).length;
-        const expectedByNow = dayOfMonth;
-        const completion = expectedByNow > 0 ? (thisMonthLogs / expectedByNow) : 0;
-
-        if (completion < 0.3 && dayOfMonth > 7) {
-            insights.push(`Hábito "${h.titulo}" com baixa aderência este mês: ${thisMonthLogs}/${expectedByNow} dias (${Math.round(completion * 100)}%).`);
-        } else if (completion >= 0.9 && dayOfMonth > 5) {
-            insights.push(`Hábito "${h.titulo}" com excelente consistência: ${thisMonthLogs}/${expectedByNow} dias este mês.`);
-        }
-    });
-
-    return insights;
+function createInlineBackend() {
+    return {
+        analyze: async columns => analyzeColumns(columns),
+    };
 }
 
-// ── Padrões Financeiros ────────────────────────────────────────────────────────
-
-function analyzeFinancePatterns(finances) {
-    if (!finances || finances.length < 3) return [];
-    const insights = [];
-
-    const despesas = finances.filter(f => f.tipo === 'despesa');
-    const receitas = finances.filter(f => f.tipo === 'receita');
-
-    const totalDespesas = despesas.reduce((s, f) => s + Number(f.valor), 0);
-    const totalReceitas = receitas.reduce((s, f) => s + Number(f.valor), 0);
-    const saldo = totalReceitas - totalDespesas;
-
-    if (saldo < 0) {
-        insights.push(`Atenção financeira: despesas (R$${totalDespesas.toFixed(2)}) superam receitas (R$${totalReceitas.toFixed(2)}) nos últimos 30 dias. Saldo: -R$${Math.abs(saldo).toFixed(2)}.`);
-    }
-
-    // Categoria com maior gasto
-    const catTotals = {};
-    despesas.forEach(f => {
-        const c = f.categoria || 'outros';
-        catTotals[c] = (catTotals[c] || 0) + Number(f.valor);
-    });
-    const topCat = Object.entries(catTotals).sort((a, b) => b[1] - a[1])[0];
-    if (topCat && topCat[1] > totalDespesas * 0.4) {
-        insights.push(`Concentração de gastos: categoria "${topCat[0]}" representa ${Math.round((topCat[1] / totalDespesas) * 100)}% das despesas do mês (R$${topCat[1].toFixed(2)}).`);
-    }
-
-    return insights;
+function createWorkerBackend() {
+    const worker = new Worker(new URL('../workers/analytics.worker.js', import.meta.url), { type: 'module' });
+    const waiting = new Map();
+    let seq = 0;
+
+    worker.onmessage = ({ data }) => {
+        const pending = waiting.get(data.id);
+        waiting.delete(data.id);
+        if (!pending) return;
+        if (data.error) pending.reject(new Error(data.error));
+        else pending.resolve(data.insights);
+    };
+    // Worker não carregou: troca para a thread principal (as colunas já foram
+    // transferidas, então as análises pendentes são refeitas a partir do snapshot)
+    worker.onerror = (e) => {
+        console.error('[Orbis] Worker de análises indisponível, usando thread principal:', e.message);
+        worker.terminate();
+        _backend = createInlineBackend();
+        const pending = [...waiting.values()];
+        waiting.clear();
+        pending.forEach(p => p.resolve(analyzeColumns(toColumns(p.snapshot))));
+    };
+
+    return {
+        analyze: (columns, snapshot) => new Promise((resolve, reject) => {
+            const id = ++seq;
+            waiting.set(id, { resolve, reject, snapshot });
+            worker.postMessage({ id, columns }, columnsTransferList(columns));
+        }),
+    };
 }
 
-// ── Padrões de Produtividade ───────────────────────────────────────────────────
-
-function analyzeTaskPatterns(tasks) {
-    if (!tasks || tasks.length === 0) return [];
-    const insights = [];
-
-    const atrasadas = tasks.filter(t => t.status === 'atrasada');
-    const alta = tasks.filter(t => t.prioridade === 'alta' && t.status !== 'concluida');
-
-    if (atrasadas.length >= 3) {
-        insights.push(`${atrasadas.length} tarefas atrasadas acumuladas. Possível sobrecarga ou subestimativa de prazos.`);
-    }
-
-    if (alta.length > 5) {
-        insights.push(`${alta.length} tarefas de alta prioridade abertas. Quando tudo é urgente, nada é urgente — considere reclassificar.`);
-    }
-
-    return insights;
+function backend() {
+    if (!_backend) _backend = typeof Worker !== 'undefined' ? createWorkerBackend() : createInlineBackend();
+    return _backend;
 }
 
-// ── Função Principal ───────────────────────────────────────────────────────────
+// ── API ────────────────────────────────────────────────────────────────────────
 
 /**
- * Recebe o snapshot já buscado do Supabase e retorna array de insights.
+ * Recebe o snapshot já buscado do Supabase e resolve um array de insights.
  * Cada insight é uma string em português, pronta para ser injetada no prompt.
  */
 export function detectPatterns(snapshot) {
-    if (!snapshot) return [];
-
-    const insights = [
-        ...analyzeHealthTrends(snapshot.healthLogs),
-        ...analyzeHabitConsistency(snapshot.habits),
-        ...analyzeFinancePatterns(snapshot.finances),
-        ...analyzeTaskPatterns(snapshot.tasks),
-    ];
-
-    return insights;
+    if (!snapshot) return Promise.resolve([]);
+    let result = _results.get(snapshot);
+    if (!result) {
+        result = backend().analyze(toColumns(snapshot), snapshot);
+        result.catch(() => _results.delete(snapshot));
+        _results.set(snapshot, result);
+    }
+    return result;
 }
 
 /**
  * Formata os padrões detectados em bloco de texto para o system prompt.
  */
-export function formatPatterns(snapshot) {
-    const patterns = detectPatterns(snapshot);
+export async function formatPatterns(snapshot) {
+    const patterns = await detectPatterns(snapshot);
     if (patterns.length === 0) return '';
     return '\n\nPADRÕES DETECTADOS PELO SISTEMA:\n' + patterns.map(p => `- ${p}`).join('\n');
 }
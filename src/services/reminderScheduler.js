@@ -0,0 +1,117 @@
+/**
+ * reminderScheduler.js
+ * Agenda os avisos de lembretes do app (NotificationTray).
+ *
+ * Em vez de varrer todos os lembretes a cada poucos segundos, as próximas
+ * ocorrências ficam num min-heap por horário de aviso (ocorrência − 5 min) e
+ * um único setTimeout aponta para o topo. Ao disparar, saem do heap só os
+ * vencidos; lembretes recorrentes voltam com a ocorrência seguinte.
+ *
+ * - sync(reminders): a lista mudou (DataContext) — remonta o heap em O(n) e rearma;
+ * - snooze(id, at, ms): adia aquela ocorrência; o aviso volta em `ms`;
+ * - wake(): rearma (aba voltou do segundo plano / máquina acordou, quando o
+ *   navegador pode ter segurado o timer);
+ * - stop(): desarma.
+ *
+ * Cada ocorrência avisa uma vez (chave id@ocorrência): editar o horário avisa
+ * de novo. O timer nunca passa de MAX_TIMER_MS, para um relógio ajustado ou
+ * uma suspensão longa não deixarem o próximo aviso muito atrasado.
+ * Horários em tempo de parede (utils/reminderSchedule).
+ */
+
+import {
+    createMinHeap, nextOccurrence, wallTime,
+    REMINDER_LEAD_MS, REMINDER_GRACE_MS,
+} from '../utils/reminderSchedule';
+
+const MAX_TIMER_MS = 60 * 60 * 1000;
+
+/**
+ * onDue(reminder, at) é chamado quando a ocorrência `at` (tempo de parede) de
+ * um lembrete entra na janela de aviso.
+ */
+export function createReminderScheduler({ onDue, clock = () => wallTime(), timers = globalThis } = {}) {
+    const heap = createMinHeap(entry => entry.fireAt);
+    const notified = new Set();     // 'id@at' já avisadas
+    const snoozed = new Map();      // id → { at, until }
+    let byId = new Map();
+    let timer = null;
+
+    const keyOf = (id, at) => `${id}@${at}`;
+    const handled = (id, at) => notified.has(keyOf(id, at)) || snoozed.get(id)?.at === at;
+
+    // Próxima ocorrência ainda não avisada nem adiada, a partir de `fromWall`
+    function upcoming(reminder, fromWall) {
+        let at = nextOccurrence(reminder, fromWall);
+        while (at !== null && handled(reminder.id, at)) {
+            if (!reminder.recorrencia) return null;
+            at = nextOccurrence(reminder, at + 1);
+        }
+        return at;
+    }
+
+    function arm() {
+        if (timer !== null) timers.clearTimeout(timer);
+        timer = null;
+        const top = heap.peek();
+        if (!top) return;
+        const delay = Math.min(Math.max(top.fireAt - clock(), 0), MAX_TIMER_MS);
+        timer = timers.setTimeout(fire, delay);
+    }
+
+    function fire() {
+        timer = null;
+        const now = clock();
+        while (heap.size > 0 && heap.peek().fireAt <= now) {
+            const { id, at, fireAt, isSnooze } = heap.pop();
+            const reminder = byId.get(id);
+            if (!reminder) continue;
+            // Adiamento substituído por outro mais novo
+            if (isSnooze && snoozed.get(id)?.until !== fireAt) continue;
+            const key = keyOf(id, at);
+            if (!notified.has(key) && (isSnooze || now - at <= REMINDER_GRACE_MS)) {
+                notified.add(key);
+                if (isSnooze) snoozed.delete(id);
+                onDue(reminder, at);
+            }
+            if (reminder.recorrencia && !isSnooze) {
+                const next = upcoming(reminder, at + 1);
+                if (next !== null) heap.push({ id, at: next, fireAt: next - REMINDER_LEAD_MS });
+            }
+        }
+        arm();
+    }
+
+    return {
+        sync(reminders) {
+            byId = new Map(reminders.map(r => [r.id, r]));
+            const from = clock() - REMINDER_GRACE_MS;
+            const entries = [];
+            for (const reminder of reminders) {
+                const at = upcoming(reminder, from);
+                if (at !== null) entries.push({ id: reminder.id, at, fireAt: at - REMINDER_LEAD_MS });
+            }
+            for (const [id, { at, until }] of snoozed) {
+                if (byId.has(id)) entries.push({ id, at, fireAt: until, isSnooze: true });
+                else snoozed.delete(id);
+            }
+            heap.from(entries);
+            arm();
+        },
+
+        snooze(id, at, ms) {
+            const until = clock() + ms;
+            notified.delete(keyOf(id, at));
+            snoozed.set(id, { at, until });
+            heap.push({ id, at, fireAt: until, isSnooze: true });
+            arm();
+        },
+
+        wake: () => fire(),
+
+        stop() {
+            if (timer !== null) timers.clearTimeout(timer);
+            timer = null;
+        },
+    };
+}
@@ -0,0 +1,156 @@
+/**
+ * responseCacheService.js
+ * Cache das respostas da IA nos chats das páginas (tarefas, hábitos, finanças):
+ * o mesmo atalho ("Minha consistência", "Onde economizar?"...) com os mesmos
+ * dados volta na hora, sem nova chamada.
+ *
+ * Chave: provedor + modelo + conversa + prompt normalizado + hash do bloco de
+ * contexto da página (buildTaskContext/buildHabitContext/buildFinanceContext)
+ * + hash dos turnos anteriores — a mesma pergunta no meio de outra conversa não
+ * reaproveita a resposta — + hash do system prompt e contexto ao vivo
+ * (liveContextFingerprint: data de hoje e snapshot do Supabase). Mudou qualquer
+ * dado do contexto, ou o dia, mudou a chave.
+ *
+ * Dois níveis:
+ *   - memória: LRU de MEMORY_MAX entradas (Map em ordem de uso);
+ *   - IndexedDB ('orbis_ai_cache'): sobrevive ao recarregar, podado por idade/tamanho.
+ * Entradas valem por TTL_MS. Respostas com JSON de ação nunca entram: repetir
+ * a resposta não repetiria a ação (e não deveria).
+ */
+
+import { extractActionJsons } from '../utils/actionJson';
+
+const DB_NAME = 'orbis_ai_cache';
+const STORE = 'responses';
+const TTL_MS = 6 * 60 * 60 * 1000;
+const MEMORY_MAX = 50;
+const PERSISTED_MAX = 200;
+
+const _memory = new Map();     // chave → { key, prompt, text, at }
+let _dbPromise = null;
+
+// ── Hash / chave ───────────────────────────────────────────────────────────────
+
+// cyrb53: hash de 53 bits, rápido e bom o bastante para chave de cache
+function hash(text) {
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < text.length; i++) {
+        const ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(36);
+}
+
+function normalizePrompt(prompt) {
+    return prompt
+        .toLowerCase()
+        .normalize('NFD').replace(/[\u0300-\u036f]/g, '')
+        .replace(/\s+/g, ' ')
+        .replace(/[\s.!?]+$/, '')
+        .trim();
+}
+
+/**
+ * parts: { provider, model, scope, prompt, context, history, live }
+ * history: turnos anteriores ({ tipo, mensagem }), sem a pergunta atual.
+ * live: liveContextFingerprint() de aiProviderService.
+ */
+function cacheKey({ provider, model, scope, prompt, context, history = [], live }) {
+    const turns = history.map(m => `${m.tipo}:${m.mensagem}`).join('\n');
+    return [provider, model || '', scope, hash(normalizePrompt(prompt)), hash(context || ''), hash(turns), hash(live || '')].join('|');
+}
+
+// ── IndexedDB ──────────────────────────────────────────────────────────────────
+
+function requestToPromise(req) {
+    return new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function openDb() {
+    if (!_dbPromise) {
+        _dbPromise = typeof indexedDB === 'undefined'
+            ? Promise.resolve(null)
+            : new Promise((resolve, reject) => {
+                const req = indexedDB.open(DB_NAME, 1);
+                req.onupgradeneeded = () => {
+                    const store = req.result.createObjectStore(STORE, { keyPath: 'key' });
+                    store.createIndex('at', 'at');
+                };
+                req.onsuccess = () => resolve(req.result);
+                req.onerror = () => reject(req.error);
+            }).then(db => { prune(db).catch(() => {}); return db; })
+              .catch(e => {
+                  console.warn('[Orbis] Cache de respostas sem IndexedDB, só em memória:', e);
+                  return null;
+              });
+    }
+    return _dbPromise;
+}
+
+// Remove vencidas e, acima de PERSISTED_MAX, as mais antigas
+async function prune(db) {
+    const tx = db.transaction(STORE, 'readwrite');
+    const index = tx.objectStore(STORE).index('at');
+    const total = await requestToPromise(tx.objectStore(STORE).count());
+    let excess = total - PERSISTED_MAX;
+    const expiredBefore = Date.now() - TTL_MS;
+    await new Promise((resolve, reject) => {
+        const req = index.openCursor();
+        req.onsuccess = () => {
+            const cursor = req.result;
+            if (!cursor || (cursor.value.at >= expiredBefore && excess <= 0)) return resolve();
+            cursor.delete();
+            excess--;
+            cursor.continue();
+        };
+        req.onerror = () => reject(req.error);
+    });
+}
+
+// ── Memória (LRU) ──────────────────────────────────────────────────────────────
+
+function remember(entry) {
+    _memory.delete(entry.key);
+    _memory.set(entry.key, entry);
+    if (_memory.size > MEMORY_MAX) _memory.delete(_memory.keys().next().value);
+}
+
+// ── API ────────────────────────────────────────────────────────────────────────
+
+/** Resposta em cache para estes dados, ou null. */
+export async function getCachedResponse(parts) {
+    const key = cacheKey(parts);
+    const prompt = normalizePrompt(parts.prompt);
+    let entry = _memory.get(key);
+    if (!entry) {
+        try {
+            const db = await openDb();
+            if (db) entry = await requestToPromise(db.transaction(STORE).objectStore(STORE).get(key));
+        } catch (e) {
+            console.warn('[Orbis] Falha ao ler cache de respostas:', e);
+        }
+    }
+    // Confere o prompt (o hash poderia colidir) e a validade
+    if (!entry || entry.prompt !== prompt || Date.now() - entry.at > TTL_MS) {
+        _memory.delete(key);
+        return null;
+    }
+    remember(entry);
+    return entry.text;
+}
+
+/** Guarda a resposta, exceto se ela emitiu ações (nunca são repetidas). */
+export function putCachedResponse(parts, text) {
+    if (!text?.trim() || extractActionJsons(text).length > 0) return;
+    const entry = { key: cacheKey(parts), prompt: normalizePrompt(parts.prompt), text, at: Date.now() };
+    remember(entry);
+    openDb()
+        .then(db => db && requestToPromise(db.transaction(STORE, 'readwrite').objectStore(STORE).put(entry)))
+        .catch(e => console.warn('[Orbis] Falha ao gravar cache de respostas:', e));
+}
@@ -0,0 +1,278 @@
+/**
+ * storageService.js
+ * Backend de armazenamento local por trás do useLocalStorage.
+ *
+ * Coleções grandes (tarefas, finanças, hábitos, chats, notas...) ficam no
+ * IndexedDB, um registro por item (chave [coleção, id]). A cada escrita, só os
+ * itens cuja referência mudou são regravados — o estado React é imutável, então
+ * comparar referências basta para achar o que mudou, sem JSON.stringify da
+ * coleção inteira. As escritas são agrupadas (debounce) numa única transação.
+ * Custo por escrita: a comparação é O(n) em referências, e quando itens entram,
+ * saem ou mudam de posição a lista de chaves (meta.order) é regravada inteira —
+ * O(n) em ids, não em itens. Os itens em si são O(alterados).
+ *
+ * Demais chaves (configurações, chaves de API, perfil) continuam no localStorage:
+ * são pequenas e vários módulos as leem direto com localStorage.getItem.
+ *
+ * initStorage() precisa rodar antes do primeiro render (ver main.jsx): carrega
+ * as coleções em memória para que o hook continue com leitura síncrona.
+ * Sem IndexedDB (navegação privada antiga etc.), tudo cai no localStorage.
+ */
+
+const DB_NAME = 'orbis';
+const DB_VERSION = 1;
+const RECORDS_STORE = 'records';  // [coleção, chave do item] → item
+const META_STORE = 'meta';        // coleção → { order: [chaves] } | { blob: valor }
+const WRITE_DEBOUNCE_MS = 250;
+
+// Coleções migradas para o IndexedDB (o resto segue no localStorage)
+export const SHARDED_KEYS = new Set([
+    'orbis_tasks', 'orbis_finances', 'orbis_habits', 'orbis_projects',
+    'orbis_reminders', 'orbis_wishes', 'orbis_notes', 'orbis_diary',
+    'orbis_health_logs', 'orbis_chat_history', 'orbis_task_chat',
+    'orbis_habit_chat', 'orbis_finance_chat', 'orbis_brainstorm_chat',
+]);
+
+let _db = null;
+// coleção → { value, byKey: Map<chave, item> | null }
+const _cache = new Map();
+// coleção → { upserts: Map, deletes: Set, order: array | null, blob?: valor }
+const _dirty = new Map();
+// coleções vindas do localStorage que ainda precisam ser removidas de lá
+const _migrated = new Set();
+let _flushTimer = null;
+// ouvintes de escrita (ex: índice da busca local)
+const _listeners = new Set();
+
+// ── Helpers ────────────────────────────────────────────────────────────────────
+
+function recordKey(item) {
+    if (!item || typeof item !== 'object') return undefined;
+    const k = item.id ?? item.date;
+    return typeof k === 'string' || typeof k === 'number' ? k : undefined;
+}
+
+// Mapa chave → item se a coleção puder ser fragmentada (array, todos com chave única)
+function indexRecords(value) {
+    if (!Array.isArray(value)) return null;
+    const byKey = new Map();
+    for (const item of value) {
+        const k = recordKey(item);
+        if (k === undefined || byKey.has(k)) return null;
+        byKey.set(k, item);
+    }
+    return byKey;
+}
+
+function readLocal(key, fallback) {
+    try {
+        const item = window.localStorage.getItem(key);
+        return item ? JSON.parse(item) : fallback;
+    } catch (error) {
+        console.error(error);
+        return fallback;
+    }
+}
+
+function requestToPromise(req) {
+    return new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function openDb() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, DB_VERSION);
+        req.onupgradeneeded = () => {
+            const db = req.result;
+            if (!db.objectStoreNames.contains(RECORDS_STORE)) db.createObjectStore(RECORDS_STORE);
+            if (!db.objectStoreNames.contains(META_STORE)) db.createObjectStore(META_STORE);
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+async function loadCollection(db, key) {
+    const tx = db.transaction([RECORDS_STORE, META_STORE], 'readonly');
+    const meta = await requestToPromise(tx.objectStore(META_STORE).get(key));
+    if (!meta) return undefined;
+    if ('blob' in meta) return meta.blob;
+
+    const range = IDBKeyRange.bound([key], [key, []]);
+    const [keys, items] = await Promise.all([
+        requestToPromise(tx.objectStore(RECORDS_STORE).getAllKeys(range)),
+        requestToPromise(tx.objectStore(RECORDS_STORE).getAll(range)),
+    ]);
+    const byKey = new Map(keys.map((k, i) => [k[1], items[i]]));
+    return meta.order.map(k => byKey.get(k)).filter(Boolean);
+}
+
+// ── Init / migração ────────────────────────────────────────────────────────────
+
+/**
+ * Abre o IndexedDB e carrega as coleções em memória. Na primeira execução,
+ * migra as chaves existentes do localStorage (removidas de lá após gravar).
+ */
+export async function initStorage() {
+    if (_db || typeof indexedDB === 'undefined') return;
+    try {
+        const db = await openDb();
+        for (const key of SHARDED_KEYS) {
+            const stored = await loadCollection(db, key);
+            if (stored !== undefined) {
+                _cache.set(key, { value: stored, byKey: indexRecords(stored) });
+                continue;
+            }
+            const legacy = readLocal(key, undefined);
+            if (legacy === undefined) continue;
+            _cache.set(key, { value: undefined, byKey: null });
+            _migrated.add(key);
+            markDirty(key, legacy);
+        }
+        _db = db;
+        if (_dirty.size > 0) await flushStorage();
+    } catch (e) {
+        console.error('[Orbis] IndexedDB indisponível, usando localStorage:', e);
+        // Migração falhou depois de abrir o banco: leitura e escrita voltam
+        // juntas para o localStorage (onde os dados migrados continuam)
+        _db?.close();
+        _db = null;
+        _cache.clear();
+        _dirty.clear();
+        _migrated.clear();
+    }
+}
+
+// ── Leitura / escrita ──────────────────────────────────────────────────────────
+
+/** Lê o valor de uma chave (síncrono). */
+export function readStored(key, initialValue) {
+    if (SHARDED_KEYS.has(key) && _cache.has(key)) {
+        const { value } = _cache.get(key);
+        return value === undefined ? initialValue : value;
+    }
+    return readLocal(key, initialValue);
+}
+
+// Registra o que mudou desde o último valor gravado: O(n) comparações de
+// referência; só os itens alterados entram na fila, mas a ordem (lista de
+// chaves) é regravada inteira quando muda — inclusive ao incluir/excluir
+function markDirty(key, value) {
+    const prev = _cache.get(key);
+    const byKey = indexRecords(value);
+    const dirty = _dirty.get(key) || { upserts: new Map(), deletes: new Set(), order: null };
+
+    if (!byKey) {
+        dirty.blob = value;
+        dirty.upserts.clear();
+        dirty.deletes.clear();
+        dirty.order = null;
+    } else {
+        delete dirty.blob;
+        // Sem índice anterior (migração ou coleção antes em blob): grava todos os itens
+        const prevByKey = prev?.byKey;
+        for (const [k, item] of byKey) {
+            if (!prevByKey || prevByKey.get(k) !== item) {
+                dirty.upserts.set(k, item);
+                dirty.deletes.delete(k);
+            }
+        }
+        if (prevByKey) {
+            for (const k of prevByKey.keys()) {
+                if (!byKey.has(k)) {
+                    dirty.deletes.add(k);
+                    dirty.upserts.delete(k);
+                }
+            }
+        }
+        const prevValue = prev?.value;
+        const sameOrder = prevByKey && Array.isArray(prevValue) && prevValue.length === value.length
+            && value.every((item, i) => recordKey(prevValue[i]) === recordKey(item));
+        if (!sameOrder) dirty.order = value.map(recordKey);
+    }
+
+    _cache.set(key, { value, byKey });
+    _dirty.set(key, dirty);
+}
+
+/**
+ * Avisa a cada escrita: listener(key, value). Chamado de dentro do setState
+ * do useLocalStorage — o ouvinte deve só anotar a mudança e adiar o trabalho.
+ */
+export function subscribeStored(listener) {
+    _listeners.add(listener);
+    return () => _listeners.delete(listener);
+}
+
+/** Grava o valor de uma chave. Coleções fragmentadas são persistidas em lote, de forma assíncrona. */
+export function writeStored(key, value) {
+    _listeners.forEach(fn => fn(key, value));
+    if (!_db || !SHARDED_KEYS.has(key)) {
+        window.localStorage.setItem(key, JSON.stringify(value));
+        return;
+    }
+    markDirty(key, value);
+    if (!_flushTimer) {
+        _flushTimer = setTimeout(() => {
+            _flushTimer = null;
+            flushStorage().catch(console.error);
+        }, WRITE_DEBOUNCE_MS);
+    }
+}
+
+/** Persiste imediatamente tudo que está pendente numa única transação. */
+export function flushStorage() {
+    if (!_db || _dirty.size === 0) return Promise.resolve();
+    if (_flushTimer) { clearTimeout(_flushTimer); _flushTimer = null; }
+
+    const batch = new Map(_dirty);
+    _dirty.clear();
+    const migrated = [..._migrated].filter(k => batch.has(k));
+
+    return new Promise((resolve, reject) => {
+        const tx = _db.transaction([RECORDS_STORE, META_STORE], 'readwrite');
+        const records = tx.objectStore(RECORDS_STORE);
+        const meta = tx.objectStore(META_STORE);
+
+        for (const [key, dirty] of batch) {
+            if ('blob' in dirty) {
+                records.delete(IDBKeyRange.bound([key], [key, []]));
+                meta.put({ blob: dirty.blob }, key);
+                continue;
+            }
+            for (const k of dirty.deletes) records.delete([key, k]);
+            for (const [k, item] of dirty.upserts) records.put(item, [key, k]);
+            if (dirty.order) meta.put({ order: dirty.order }, key);
+        }
+
+        tx.oncomplete = () => {
+            migrated.forEach(k => { window.localStorage.removeItem(k); _migrated.delete(k); });
+            resolve();
+        };
+        // Falhou (erro num request ou abort no commit, ex: QuotaExceededError):
+        // regrava as coleções afetadas por inteiro a partir da memória. Itens
+        // órfãos que sobrarem no store ficam fora de meta.order e são ignorados.
+        // error seguido de abort chega aqui duas vezes; só a primeira conta.
+        let failed = false;
+        const requeue = () => {
+            if (failed) return;
+            failed = true;
+            for (const key of batch.keys()) {
+                const { value } = _cache.get(key);
+                _cache.set(key, { value, byKey: null });
+                markDirty(key, value);
+            }
+            reject(tx.error ?? new DOMException('Transação abortada', 'AbortError'));
+        };
+        tx.onerror = requeue;
+        tx.onabort = requeue;
+    });
+}
+
+if (typeof document !== 'undefined') {
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flushStorage().catch(console.error);
+    });
+}
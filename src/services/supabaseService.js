@@ -2,7 +2,7 @@
  * supabaseService.js
  * Camada de persistência Supabase para o Orbis.
  * Arquitetura local-first: localStorage é a fonte de verdade,
- * Supabase é sincronizado em background (fire-and-forget).
+ * Supabase é sincronizado em background via outbox (write-behind em lote).
  *
  * SQL para criar as tabelas no Supabase (cole no SQL Editor):
  *
@@ -127,6 +127,178 @@
  *   created_at  timestamptz default now(),
  *   updated_at  timestamptz default now()
  * );
+ *
+ * -- Histórico dos bots WhatsApp/Telegram (CONVERSATION_STORE=supabase, ver api/lib/conversation-store.js)
+ * create table if not exists bot_conversations (
+ *   channel           text    not null,
+ *   conversation_key  text    not null,
+ *   messages          jsonb   not null default '[]',
+ *   updated_at        timestamptz default now(),
+ *   primary key (channel, conversation_key)
+ * );
+ *
+ * -- Busca aproximada de títulos (bot: /concluir, /habito, COMPLETE_TASK, LOG_HABIT) — migration
+ * -- Ignora acentos e caixa ("ingles" acha "Inglês") e usa índice trigram em vez
+ * -- de varrer a tabela com ilike '%termo%'. score: 1 = título idêntico,
+ * -- ~0.7+ = termo contido no título (ver findTaskByTitle em api/lib/supabase-server.js).
+ * create extension if not exists pg_trgm;
+ * create extension if not exists unaccent;
+ *
+ * -- unaccent() é STABLE; o índice de expressão precisa de uma função IMMUTABLE
+ * create or replace function orbis_fold(t text) returns text
+ *   language sql immutable parallel safe
+ *   as $$ select lower(public.unaccent('public.unaccent'::regdictionary, coalesce(t, ''))) $$;
+ *
+ * create index if not exists tasks_titulo_trgm_idx  on tasks  using gin (orbis_fold(titulo) gin_trgm_ops);
+ * create index if not exists habits_titulo_trgm_idx on habits using gin (orbis_fold(titulo) gin_trgm_ops);
+ *
+ * create or replace function orbis_match_tasks(p_term text, p_limit int default 5)
+ * returns table (id text, titulo text, status text, prioridade text, data_prazo date, score real)
+ * language sql stable as $$
+ *   select t.id, t.titulo, t.status, t.prioridade, t.data_prazo,
+ *          (0.7 * word_similarity(orbis_fold(p_term), orbis_fold(t.titulo))
+ *         + 0.3 * similarity(orbis_fold(p_term), orbis_fold(t.titulo)))::real as score
+ *     from tasks t
+ *    where t.status <> 'concluida'
+ *      and (orbis_fold(p_term) <% orbis_fold(t.titulo)
+ *           or orbis_fold(t.titulo) like '%' || orbis_fold(p_term) || '%')
+ *    order by score desc
+ *    limit p_limit;
+ * $$;
+ *
+ * create or replace function orbis_match_habits(p_term text, p_limit int default 3)
+ * returns table (id text, titulo text, icone text, score real)
+ * language sql stable as $$
+ *   select h.id, h.titulo, h.icone,
+ *          (0.7 * word_similarity(orbis_fold(p_term), orbis_fold(h.titulo))
+ *         + 0.3 * similarity(orbis_fold(p_term), orbis_fold(h.titulo)))::real as score
+ *     from habits h
+ *    where orbis_fold(p_term) <% orbis_fold(h.titulo)
+ *       or orbis_fold(h.titulo) like '%' || orbis_fold(p_term) || '%'
+ *    order by score desc
+ *    limit p_limit;
+ * $$;
+ *
+ * -- Sync incremental (delta pull no startup) — migration
+ * -- updated_at passa a ser carimbado pelo servidor (relógio único, sem skew entre
+ * -- dispositivos) e deletes deixam uma lápide em sync_tombstones.
+ * alter table habit_logs add column if not exists updated_at timestamptz default now();
+ *
+ * create table if not exists sync_tombstones (
+ *   id          bigint    generated always as identity primary key,
+ *   table_name  text      not null,
+ *   row_id      text      not null,   -- habit_logs: '<habit_id>|<date>'
+ *   deleted_at  timestamptz default now()
+ * );
+ * create index if not exists sync_tombstones_table_deleted_idx on sync_tombstones (table_name, deleted_at);
+ *
+ * create or replace function orbis_touch_updated_at() returns trigger as $$
+ * begin new.updated_at := now(); return new; end;
+ * $$ language plpgsql;
+ *
+ * create or replace function orbis_record_tombstone() returns trigger as $$
+ * begin
+ *   insert into sync_tombstones (table_name, row_id)
+ *   values (tg_table_name, case when tg_table_name = 'habit_logs'
+ *                               then old.habit_id || '|' || old.date
+ *                               else old.id::text end);
+ *   return old;
+ * end;
+ * $$ language plpgsql;
+ *
+ * -- Repetir para: tasks, finances, habits, habit_logs, projects, reminders, wishes
+ * create index if not exists tasks_updated_at_idx on tasks (updated_at);
+ * create trigger tasks_touch before insert or update on tasks
+ *   for each row execute function orbis_touch_updated_at();
+ * create trigger tasks_tombstone after delete on tasks
+ *   for each row execute function orbis_record_tombstone();
+ *
+ * -- Contexto da IA dos bots agregado no banco — migration
+ * -- Uma chamada devolve totais e contagens prontos (finanças de 30 dias, check-ins
+ * -- do mês por hábito, tarefas atrasadas) em vez de linhas cruas e de todo o
+ * -- histórico de habit_logs (ver fetchServerAiContext em api/lib/supabase-server.js).
+ * create index if not exists finances_data_idx on finances (data);
+ *
+ * -- Check-ins por hábito e mês (a busca por habit_id usa o índice de unique (habit_id, date))
+ * create or replace view orbis_habit_month_counts as
+ *   select habit_id, date_trunc('month', date)::date as month, count(*)::int as total
+ *     from habit_logs
+ *    group by habit_id, date_trunc('month', date);
+ *
+ * create or replace function orbis_finance_summary(p_since date)
+ * returns jsonb language sql stable as $$
+ *   select jsonb_build_object(
+ *     'receitas', coalesce(sum(valor) filter (where tipo = 'receita'), 0),
+ *     'despesas', coalesce(sum(valor) filter (where tipo = 'despesa'), 0),
+ *     'count',    count(*),
+ *     'top_categories', coalesce((
+ *       select jsonb_agg(jsonb_build_array(c.categoria, c.total) order by c.total desc)
+ *         from (select coalesce(categoria, 'outros') as categoria, sum(valor) as total
+ *                 from finances
+ *                where tipo = 'despesa' and data >= p_since
+ *                group by 1 order by 2 desc limit 3) c), '[]'::jsonb))
+ *   from finances
+ *   where data >= p_since;
+ * $$;
+ *
+ * create or replace function orbis_ai_context(p_today date default current_date)
+ * returns jsonb language sql stable as $$
+ *   select jsonb_build_object(
+ *     'today', p_today,
+ *     'tasks', coalesce((select jsonb_agg(t) from (
+ *         select titulo, status, prioridade, data_prazo from tasks
+ *          where status <> 'concluida'
+ *          order by data_prazo asc nulls last limit 20) t), '[]'::jsonb),
+ *     'overdue_tasks', (select count(*) from tasks
+ *          where status <> 'concluida' and (status = 'atrasada' or data_prazo < p_today)),
+ *     'habits', coalesce((select jsonb_agg(h) from (
+ *         select h.titulo, h.icone, coalesce(c.total, 0) as month_count
+ *           from habits h
+ *           left join orbis_habit_month_counts c
+ *             on c.habit_id = h.id and c.month = date_trunc('month', p_today)::date
+ *          limit 15) h), '[]'::jsonb),
+ *     'finance', orbis_finance_summary(p_today - 30),
+ *     'projects', coalesce((select jsonb_agg(p) from (
+ *         select titulo, status, cor from projects where status = 'ativo' limit 10) p), '[]'::jsonb),
+ *     'reminders', coalesce((select jsonb_agg(r) from (
+ *         select titulo, importancia, data_hora from reminders
+ *          order by data_hora asc limit 10) r), '[]'::jsonb),
+ *     'health_logs', coalesce((select jsonb_agg(l) from (
+ *         select date, sleep_hours, energy, weight from health_logs
+ *          where date >= p_today - 7 order by date desc) l), '[]'::jsonb),
+ *     'notes', coalesce((select jsonb_agg(n) from (
+ *         select titulo, left(conteudo, 120) as conteudo from notes
+ *          order by updated_at desc limit 5) n), '[]'::jsonb),
+ *     'diary', coalesce((select jsonb_agg(d) from (
+ *         select data, left(conteudo, 150) as conteudo from diary_entries
+ *          order by data desc limit 5) d), '[]'::jsonb));
+ * $$;
+ *
+ * -- Histórico do chat paginado por cursor (timestamp, id) — migration
+ * -- fetchChatPage lê páginas "antes de"/"depois de" uma mensagem; o índice
+ * -- composto deixa cada página custar o mesmo em qualquer ponto do histórico.
+ * create index if not exists chat_messages_ts_id_idx on chat_messages (timestamp desc, id desc);
+ *
+ * -- Lembretes: recorrência e envio pelo cron dos bots (api/reminders.js) — migration
+ * -- notified_for guarda a ocorrência já enviada (evita envio duplicado entre
+ * -- execuções do cron); o índice em data_hora atende a busca dos vencidos.
+ * alter table reminders add column if not exists recorrencia text;   -- diaria | semanal | mensal
+ * alter table reminders add column if not exists notified_for timestamptz;
+ * create index if not exists reminders_data_hora_idx on reminders (data_hora);
+ *
+ * -- Totais diários de finanças (tendência de gastos do patternService) — migration
+ * -- Um ano de lançamentos passaria do limite de linhas do PostgREST; somado por
+ * -- dia são no máximo 366 linhas, lidas pelo índice finances_data_idx.
+ * create or replace function orbis_finance_daily(p_since date)
+ * returns table (data date, receitas numeric, despesas numeric) language sql stable as $$
+ *   select data,
+ *          coalesce(sum(valor) filter (where tipo = 'receita'), 0),
+ *          coalesce(sum(valor) filter (where tipo = 'despesa'), 0)
+ *     from finances
+ *    where data >= p_since
+ *    group by data
+ *    order by data;
+ * $$;
  */
 
 import { createClient } from '@supabase/supabase-js';
@@ -176,12 +348,299 @@ export function isSupabaseConfigured() {
     return !!(url && key);
 }
 
+// ── Outbox (write-behind) ──────────────────────────────────────────────────────
+// As mutações locais não vão direto ao Supabase: entram numa fila persistida
+// no localStorage, indexada por tabela → id. Upserts repetidos do mesmo id se
+// fundem (vale o último) e um delete substitui o upsert pendente. A cada
+// OUTBOX_FLUSH_MS a fila vira um upsert([...]) + um delete().in() por tabela.
+// Falhas transitórias (offline, 5xx, 429) devolvem as operações à fila e
+// re-tentam com backoff. Erros permanentes (constraint, FK, RLS, payload
+// inválido) não adiantam repetir: o lote é reenviado linha a linha e só as
+// linhas rejeitadas vão para a dead-letter (OUTBOX_DEAD_KEY), sem travar a tabela.
+
+const OUTBOX_KEY = 'orbis_sync_outbox';
+const OUTBOX_FLUSH_MS = 1500;
+const OUTBOX_RETRY_BASE_MS = 2000;
+const OUTBOX_RETRY_MAX_MS = 60000;
+// Ordem de flush: pais antes dos filhos (habit_logs referencia habits)
+const OUTBOX_TABLE_ORDER = [
+    'tasks', 'habits', 'habit_logs', 'finances', 'projects', 'reminders',
+    'wishes', 'notes', 'diary_entries', 'chat_messages',
+];
+
+const OUTBOX_DEAD_KEY = 'orbis_sync_dead_letter';
+const OUTBOX_DEAD_MAX = 50;
+// Filhos que o banco apaga em cascata junto com o pai: ao apagar o pai, as
+// escritas pendentes deles saem da fila (senão violariam a FK no flush)
+const OUTBOX_CHILDREN = {
+    habits: [['habit_logs', 'habit_id']],
+};
+
+let _outbox = null;
+let _outboxTimer = null;
+let _outboxFlushing = null;
+let _outboxRetries = 0;
+
+function loadOutbox() {
+    if (!_outbox) _outbox = safeJsonParse(localStorage.getItem(OUTBOX_KEY), {});
+    return _outbox;
+}
+
+function persistOutbox() {
+    try {
+        const empty = Object.keys(_outbox).length === 0;
+        if (empty) localStorage.removeItem(OUTBOX_KEY);
+        else localStorage.setItem(OUTBOX_KEY, JSON.stringify(_outbox));
+    } catch (e) {
+        console.error('[Orbis] Falha ao persistir outbox:', e);
+    }
+}
+
+function scheduleFlush(delay = OUTBOX_FLUSH_MS) {
+    if (_outboxTimer) return;
+    _outboxTimer = setTimeout(() => {
+        _outboxTimer = null;
+        flushOutbox().catch(console.error);
+    }, delay);
+}
+
+function enqueue(table, id, entry) {
+    const outbox = loadOutbox();
+    (outbox[table] ||= {})[id] = entry;
+    persistOutbox();
+    invalidateAiContextSnapshot();
+    scheduleFlush();
+}
+
+// key: id da fila; por padrão a PK 'id', ou informada para chaves compostas
+function enqueueUpsert(table, row, onConflict = 'id', key = row.id) {
+    enqueue(table, key, { op: 'upsert', row, onConflict });
+}
+
+function enqueueDelete(table, id, match = null) {
+    const outbox = loadOutbox();
+    for (const [child, fk] of OUTBOX_CHILDREN[table] || []) {
+        const pending = outbox[child];
+        if (!pending) continue;
+        for (const [key, entry] of Object.entries(pending)) {
+            if ((entry.row || entry.match)?.[fk] === id) delete pending[key];
+        }
+        if (Object.keys(pending).length === 0) delete outbox[child];
+    }
+    enqueue(table, id, match ? { op: 'delete', match } : { op: 'delete' });
+}
+
+// Sem resposta (offline, CORS, timeout), 5xx, 408 e 429 podem dar certo depois;
+// o resto (4xx: constraint 23xxx, RLS 42501, coluna inexistente...) não
+function isRetryableSyncError(e) {
+    const status = e?.status;
+    return !status || status >= 500 || status === 408 || status === 429;
+}
+
+function deadLetter(table, entry, error) {
+    console.error(`[Orbis] Escrita em ${table} rejeitada pelo Supabase, descartada:`, error?.code, error?.message, entry);
+    try {
+        const dead = safeJsonParse(localStorage.getItem(OUTBOX_DEAD_KEY), []);
+        dead.push({ table, entry, code: error?.code || null, message: error?.message || String(error), at: Date.now() });
+        localStorage.setItem(OUTBOX_DEAD_KEY, JSON.stringify(dead.slice(-OUTBOX_DEAD_MAX)));
+    } catch (e) {
+        console.error('[Orbis] Falha ao gravar dead-letter da outbox:', e);
+    }
+}
+
+/** true se há escrita local ainda não enviada para este id (o pull não deve sobrescrevê-la). */
+export function hasPendingWrite(table, id) {
+    return !!loadOutbox()[table]?.[id];
+}
+
+// Erro do PostgREST com o status HTTP junto (para isRetryableSyncError)
+function check({ error, status }) {
+    if (error) throw Object.assign(error, { status });
+}
+
+async function flushTable(supabase, table, ops) {
+    const upserts = ops.filter(([, e]) => e.op === 'upsert');
+    const deletes = ops.filter(([, e]) => e.op === 'delete');
+    if (upserts.length > 0) {
+        check(await supabase.from(table)
+            .upsert(upserts.map(([, e]) => e.row), { onConflict: upserts[0][1].onConflict }));
+    }
+    if (deletes.length > 0) {
+        // Chave composta (ex: habit_logs por habit_id + date) vira um único filtro or()
+        const composite = deletes.filter(([, e]) => e.match);
+        const byId = deletes.filter(([, e]) => !e.match).map(([id]) => id);
+        if (byId.length > 0) {
+            check(await supabase.from(table).delete().in('id', byId));
+        }
+        if (composite.length > 0) {
+            const filter = composite
+                .map(([, e]) => `and(${Object.entries(e.match).map(([k, v]) => `${k}.eq.${v}`).join(',')})`)
+                .join(',');
+            check(await supabase.from(table).delete().or(filter));
+        }
+    }
+}
+
+/**
+ * Envia as operações de uma tabela. Erro permanente no lote: reenvia uma a uma
+ * para isolar a(s) linha(s) rejeitada(s), que vão para a dead-letter.
+ * Devolve as operações que falharam por erro transitório (voltam à fila).
+ */
+async function flushTableOps(supabase, table, ops) {
+    try {
+        await flushTable(supabase, table, ops);
+        return [];
+    } catch (e) {
+        if (isRetryableSyncError(e)) return ops;
+        if (ops.length === 1) {
+            deadLetter(table, ops[0][1], e);
+            return [];
+        }
+    }
+    const retry = [];
+    for (const op of ops) {
+        try {
+            await flushTable(supabase, table, [op]);
+        } catch (e) {
+            if (isRetryableSyncError(e)) retry.push(op);
+            else deadLetter(table, op[1], e);
+        }
+    }
+    return retry;
+}
+
+/**
+ * Envia tudo que está na fila. Uma requisição por tabela e tipo de operação.
+ * Operações com falha transitória voltam à fila, a menos que tenham sido
+ * substituídas por uma escrita mais nova enquanto o flush estava em andamento;
+ * as rejeitadas de vez vão para a dead-letter.
+ */
+export function flushOutbox() {
+    if (_outboxFlushing) return _outboxFlushing;
+    const supabase = getClient();
+    const outbox = loadOutbox();
+    if (!supabase || Object.keys(outbox).length === 0) return Promise.resolve();
+
+    // Offline: o listener de 'online' (abaixo) rearma o flush quando a rede voltar
+    if (typeof navigator !== 'undefined' && navigator.onLine === false) return Promise.resolve();
+
+    const batch = outbox;
+    _outbox = {};
+    persistOutbox();
+
+    _outboxFlushing = (async () => {
+        let failed = false;
+        const tables = [...OUTBOX_TABLE_ORDER, ...Object.keys(batch).filter(t => !OUTBOX_TABLE_ORDER.includes(t))];
+        for (const table of tables) {
+            const ops = Object.entries(batch[table] || {});
+            if (ops.length === 0) continue;
+            const retry = await flushTableOps(supabase, table, ops);
+            if (retry.length > 0) {
+                console.error(`[Orbis] Falha ao sincronizar ${table}, nova tentativa em breve`);
+                failed = true;
+                const pending = (_outbox[table] ||= {});
+                retry.forEach(([id, entry]) => { if (!pending[id]) pending[id] = entry; });
+            }
+        }
+        persistOutbox();
+        if (failed) {
+            _outboxRetries++;
+            scheduleFlush(Math.min(OUTBOX_RETRY_BASE_MS * 2 ** (_outboxRetries - 1), OUTBOX_RETRY_MAX_MS));
+        } else {
+            _outboxRetries = 0;
+            if (Object.keys(_outbox).length > 0) scheduleFlush();
+        }
+    })().finally(() => { _outboxFlushing = null; });
+
+    return _outboxFlushing;
+}
+
+// Retoma a fila deixada por uma sessão anterior e tenta esvaziá-la ao sair da aba
+if (typeof window !== 'undefined') {
+    if (Object.keys(loadOutbox()).length > 0) scheduleFlush();
+    window.addEventListener('online', () => scheduleFlush(0));
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flushOutbox().catch(console.error);
+    });
+}
+
+// ── Row mappers (snake_case do banco → shape local) ──────────────────────────
+
+function mapTaskRow(t) {
+    return {
+        id:         t.id,
+        titulo:     t.titulo,
+        descricao:  t.descricao  || '',
+        status:     t.status,
+        prioridade: t.prioridade,
+        dataPrazo:  t.data_prazo,
+        // projeto foi serializado como JSON; parse de volta para { titulo, cor }
+        projeto:    safeJsonParse(t.projeto),
+    };
+}
+
+function mapFinanceRow(f) {
+    return {
+        id:        f.id,
+        descricao: f.descricao,
+        valor:     Number(f.valor),
+        tipo:      f.tipo,
+        categoria: f.categoria || 'outros',
+        data:      f.data,
+    };
+}
+
+function mapHabitRow(h) {
+    return {
+        id:         h.id,
+        titulo:     h.titulo,
+        descricao:  h.descricao || '',
+        icone:      h.icone || '✨',
+        metaMensal: h.meta_mensal || 30,
+        logs:       (h.habit_logs || []).map(l => ({ data: l.date })),
+    };
+}
+
+function mapProjectRow(p) {
+    return {
+        id:        p.id,
+        titulo:    p.titulo,
+        descricao: p.descricao || '',
+        cor:       p.cor || '#06b6d4',
+        status:    p.status || 'ativo',
+    };
+}
+
+function mapReminderRow(r) {
+    return {
+        id:          r.id,
+        titulo:      r.titulo,
+        descricao:   r.descricao || '',
+        importancia: r.importancia || 'media',
+        dataHora:    r.data_hora || null,
+        recorrencia: r.recorrencia || '',
+    };
+}
+
+function mapWishRow(w) {
+    return {
+        id:         w.id,
+        titulo:     w.titulo,
+        descricao:  w.descricao  || '',
+        preco:      w.preco      ? Number(w.preco) : null,
+        categoria:  w.categoria  || 'outros',
+        mes:        w.mes        || '',
+        prioridade: w.prioridade || 'media',
+        status:     w.status     || 'desejado',
+        link:       w.link       || '',
+    };
+}
+
 // ── Tasks ──────────────────────────────────────────────────────────────────────
 
 export async function syncTask(task) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('tasks').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('tasks', {
         id:         task.id,
         titulo:     task.titulo,
         descricao:  task.descricao  || null,
@@ -191,121 +650,86 @@ export async function syncTask(task) {
         // projeto é { titulo, cor } — serializado como JSON para coluna text
         projeto:    task.projeto ? JSON.stringify(task.projeto) : null,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteTaskSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('tasks').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('tasks', id);
 }
 
 export async function fetchTasks() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('tasks').select('*').order('created_at', { ascending: false });
-    return (data || []).map(t => ({
-        id:         t.id,
-        titulo:     t.titulo,
-        descricao:  t.descricao  || '',
-        status:     t.status,
-        prioridade: t.prioridade,
-        dataPrazo:  t.data_prazo,
-        // projeto foi serializado como JSON; parse de volta para { titulo, cor }
-        projeto:    safeJsonParse(t.projeto),
-    }));
+    return (data || []).map(mapTaskRow);
 }
 
 export async function fetchFinances() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('finances').select('*').order('data', { ascending: false });
-    return (data || []).map(f => ({
-        id:        f.id,
-        descricao: f.descricao,
-        valor:     Number(f.valor),
-        tipo:      f.tipo,
-        categoria: f.categoria || 'outros',
-        data:      f.data,
-    }));
+    return (data || []).map(mapFinanceRow);
 }
 
 export async function fetchHabits() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('habits').select('*, habit_logs(date)').order('created_at', { ascending: false });
-    return (data || []).map(h => ({
-        id:         h.id,
-        titulo:     h.titulo,
-        descricao:  h.descricao || '',
-        icone:      h.icone || '✨',
-        metaMensal: h.meta_mensal || 30,
-        logs:       (h.habit_logs || []).map(l => ({ data: l.date })),
-    }));
+    return (data || []).map(mapHabitRow);
 }
 
 export async function fetchProjects() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('projects').select('*').order('created_at', { ascending: false });
-    return (data || []).map(p => ({
-        id:        p.id,
-        titulo:    p.titulo,
-        descricao: p.descricao || '',
-        cor:       p.cor || '#06b6d4',
-        status:    p.status || 'ativo',
-    }));
+    return (data || []).map(mapProjectRow);
 }
 
 export async function fetchReminders() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('reminders').select('*').order('created_at', { ascending: false });
-    return (data || []).map(r => ({
-        id:          r.id,
-        titulo:      r.titulo,
-        descricao:   r.descricao || '',
-        importancia: r.importancia || 'media',
-        dataHora:    r.data_hora || null,
-    }));
+    return (data || []).map(mapReminderRow);
 }
 
 // ── Habits ─────────────────────────────────────────────────────────────────────
 
 export async function syncHabit(habit) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('habits').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('habits', {
         id:         habit.id,
         titulo:     habit.titulo,
         descricao:  habit.descricao  || null,
         icone:      habit.icone      || '✨',
         meta_mensal: habit.metaMensal || 30,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
-
-    // Delete-then-insert garante que dias desmarcados sejam removidos do Supabase.
-    // Upsert sozinho nunca deleta — logs fantasmas voltariam no próximo startup.
-    await supabase.from('habit_logs').delete().eq('habit_id', habit.id);
-    if (habit.logs && habit.logs.length > 0) {
-        await supabase.from('habit_logs').insert(
-            habit.logs.map(l => ({ habit_id: habit.id, date: l.data }))
-        );
-    }
+    });
+}
+
+/**
+ * Marca (done=true) ou desmarca um único dia de um hábito.
+ * Escreve exatamente uma linha em habit_logs: upsert sobre unique (habit_id, date)
+ * — idempotente mesmo se o bot já registrou o dia — ou delete dessa linha.
+ * Toggles repetidos do mesmo dia se fundem na outbox antes do envio.
+ */
+export async function toggleHabitLog(habitId, date, done) {
+    if (!isSupabaseConfigured()) return;
+    const key = `${habitId}|${date}`;
+    if (done) enqueueUpsert('habit_logs', { habit_id: habitId, date }, 'habit_id,date', key);
+    else enqueueDelete('habit_logs', key, { habit_id: habitId, date });
 }
 
 export async function deleteHabitSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('habits').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('habits', id);
 }
 
 // ── Finances ───────────────────────────────────────────────────────────────────
 
 export async function syncFinance(entry) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('finances').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('finances', {
         id:        entry.id,
         descricao: entry.descricao,
         valor:     entry.valor,
@@ -313,63 +737,59 @@ export async function syncFinance(entry) {
         categoria: entry.categoria || null,
         data:      entry.data,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteFinanceSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('finances').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('finances', id);
 }
 
 // ── Projects ───────────────────────────────────────────────────────────────────
 
 export async function syncProject(project) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('projects').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('projects', {
         id:        project.id,
         titulo:    project.titulo,
         descricao: project.descricao || null,
         cor:       project.cor       || '#06b6d4',
         status:    project.status    || 'ativo',
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteProjectSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('projects').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('projects', id);
 }
 
 // ── Reminders ──────────────────────────────────────────────────────────────────
 
 export async function syncReminder(reminder) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('reminders').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('reminders', {
         id:         reminder.id,
         titulo:     reminder.titulo,
         descricao:  reminder.descricao  || null,
         importancia: reminder.importancia || 'media',
         data_hora:  reminder.dataHora   || null,
+        // Só com recorrência: sem a migration dos lembretes a coluna não existe
+        ...(reminder.recorrencia && { recorrencia: reminder.recorrencia }),
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteReminderSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('reminders').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('reminders', id);
 }
 
 // ── Wishes (Lista de Desejos) ──────────────────────────────────────────────────
 
 export async function syncWish(wish) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('wishes').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('wishes', {
         id:         wish.id,
         titulo:     wish.titulo,
         descricao:  wish.descricao  || null,
@@ -380,54 +800,202 @@ export async function syncWish(wish) {
         status:     wish.status     || 'desejado',
         link:       wish.link       || null,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteWishSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('wishes').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('wishes', id);
 }
 
 export async function fetchWishes() {
     const supabase = getClient();
     if (!supabase) return [];
     const { data } = await supabase.from('wishes').select('*').order('created_at', { ascending: true });
-    return (data || []).map(w => ({
-        id:         w.id,
-        titulo:     w.titulo,
-        descricao:  w.descricao  || '',
-        preco:      w.preco      ? Number(w.preco) : null,
-        categoria:  w.categoria  || 'outros',
-        mes:        w.mes        || '',
-        prioridade: w.prioridade || 'media',
-        status:     w.status     || 'desejado',
-        link:       w.link       || '',
-    }));
+    return (data || []).map(mapWishRow);
 }
 
-// ── Chat Messages ──────────────────────────────────────────────────────────────
+// ── Sync incremental (delta pull) ──────────────────────────────────────────────
+// Cada tabela guarda um high-water mark (maior updated_at/deleted_at já visto,
+// sempre carimbado pelo servidor). Com cursor, o startup baixa só as linhas
+// alteradas e as lápides de delete desde então; sem cursor, faz o pull completo.
+
+const SYNC_CURSORS_KEY = 'orbis_sync_cursors';
+// Janela de sobreposição: cobre transações que commitam fora de ordem.
+// O merge por id é idempotente, então re-baixar alguns segundos é inofensivo.
+const SYNC_OVERLAP_MS = 5000;
+
+const SYNC_TABLES = {
+    tasks:     { map: mapTaskRow,     order: ['created_at', { ascending: false }] },
+    finances:  { map: mapFinanceRow,  order: ['data',       { ascending: false }] },
+    habits:    { map: mapHabitRow,    order: ['created_at', { ascending: false }] },
+    projects:  { map: mapProjectRow,  order: ['created_at', { ascending: false }] },
+    reminders: { map: mapReminderRow, order: ['created_at', { ascending: false }] },
+    wishes:    { map: mapWishRow,     order: ['created_at', { ascending: true }] },
+};
+
+export function getSyncCursor(table) {
+    return safeJsonParse(localStorage.getItem(SYNC_CURSORS_KEY), {})[table] || null;
+}
+
+export function saveSyncCursor(table, cursor) {
+    if (!cursor) return;
+    const cursors = safeJsonParse(localStorage.getItem(SYNC_CURSORS_KEY), {});
+    cursors[table] = cursor;
+    localStorage.setItem(SYNC_CURSORS_KEY, JSON.stringify(cursors));
+}
+
+function maxTimestamp(current, candidate) {
+    if (!candidate) return current;
+    return !current || candidate > current ? candidate : current;
+}
 
-export async function syncChatMessage(msg) {
+async function fetchTombstones(supabase, table, since) {
+    const { data, error } = await supabase
+        .from('sync_tombstones')
+        .select('row_id, deleted_at')
+        .eq('table_name', table)
+        .gt('deleted_at', since);
+    if (error) throw error;
+    return data || [];
+}
+
+async function pullFull(supabase, table) {
+    const { map, order } = SYNC_TABLES[table];
+    const select = table === 'habits' ? '*, habit_logs(date)' : '*';
+    const { data, error } = await supabase.from(table).select(select).order(...order);
+    if (error) throw error;
+    let cursor = null;
+    (data || []).forEach(r => { cursor = maxTimestamp(cursor, r.updated_at); });
+    return { mode: 'full', rows: (data || []).map(map), deletedIds: [], cursor };
+}
+
+async function pullDelta(supabase, table, since) {
+    const { map } = SYNC_TABLES[table];
+    const sinceIso = new Date(new Date(since).getTime() - SYNC_OVERLAP_MS).toISOString();
+
+    const [rowsRes, tombstones] = await Promise.all([
+        supabase.from(table).select('*').gt('updated_at', sinceIso).order('updated_at', { ascending: true }),
+        fetchTombstones(supabase, table, sinceIso),
+    ]);
+    if (rowsRes.error) throw rowsRes.error;
+
+    let cursor = since;
+    const rows = (rowsRes.data || []).map(r => {
+        cursor = maxTimestamp(cursor, r.updated_at);
+        return map(r);
+    });
+    const deletedIds = tombstones.map(t => {
+        cursor = maxTimestamp(cursor, t.deleted_at);
+        return t.row_id;
+    });
+    const result = { mode: 'delta', rows, deletedIds, cursor };
+
+    // Hábitos: logs têm delta próprio (linha a linha), sem re-baixar o histórico
+    if (table === 'habits') {
+        const [logsRes, logTombstones] = await Promise.all([
+            supabase.from('habit_logs').select('habit_id, date, updated_at').gt('updated_at', sinceIso),
+            fetchTombstones(supabase, 'habit_logs', sinceIso),
+        ]);
+        if (logsRes.error) throw logsRes.error;
+        result.addedLogs = (logsRes.data || []).map(l => {
+            result.cursor = maxTimestamp(result.cursor, l.updated_at);
+            return { habitId: l.habit_id, data: l.date };
+        });
+        result.removedLogs = logTombstones.map(t => {
+            result.cursor = maxTimestamp(result.cursor, t.deleted_at);
+            const sep = t.row_id.lastIndexOf('|');
+            return { habitId: t.row_id.slice(0, sep), data: t.row_id.slice(sep + 1) };
+        });
+    }
+    return result;
+}
+
+/**
+ * Puxa as mudanças remotas de uma tabela desde o último cursor salvo.
+ * Retorna { mode: 'full' | 'delta', rows, deletedIds, cursor } — e, para
+ * hábitos em modo delta, também { addedLogs, removedLogs }.
+ * O cursor só deve ser persistido (saveSyncCursor) depois do merge local.
+ * Se a migration de sync ainda não rodou, o delta falha e cai no pull completo.
+ */
+export async function pullTableChanges(table) {
     const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('chat_messages').upsert({
+    if (!supabase) return null;
+    const since = getSyncCursor(table);
+    let changes = null;
+    if (since) {
+        try {
+            changes = await pullDelta(supabase, table, since);
+        } catch (e) {
+            console.warn(`[Orbis] Delta sync indisponível para ${table}, usando pull completo:`, e?.message || e);
+        }
+    }
+    if (!changes) changes = await pullFull(supabase, table);
+    return withoutPendingWrites(table, changes);
+}
+
+// Escritas locais ainda na outbox vencem o estado remoto (que está defasado)
+function withoutPendingWrites(table, changes) {
+    const pending = loadOutbox();
+    if (!pending[table] && !pending.habit_logs) return changes;
+    const keep = id => !hasPendingWrite(table, id);
+    const keepLog = l => !hasPendingWrite('habit_logs', `${l.habitId}|${l.data}`);
+    return {
+        ...changes,
+        rows: changes.rows.filter(r => keep(r.id)),
+        deletedIds: changes.deletedIds.filter(keep),
+        ...(changes.addedLogs && { addedLogs: changes.addedLogs.filter(keepLog) }),
+        ...(changes.removedLogs && { removedLogs: changes.removedLogs.filter(keepLog) }),
+    };
+}
+
+// ── Chat Messages ──────────────────────────────────────────────────────────────
+
+/** Entra na outbox: as mensagens de uma conversa vão juntas num único upsert. */
+export function syncChatMessage(msg) {
+    enqueueUpsert('chat_messages', {
         id:        msg.id,
         tipo:      msg.tipo,
         mensagem:  msg.mensagem,
         timestamp: msg.timestamp,
-    }, { onConflict: 'id' });
+    });
 }
 
-export async function fetchRecentChatMessages(limit = 100) {
+export const CHAT_PAGE_SIZE = 50;
+
+// Valor entre aspas no filtro or() do PostgREST (timestamps têm ':' e '.')
+const pgQuote = v => `"${String(v).replace(/"/g, '\\"')}"`;
+
+/**
+ * Página do histórico por keyset em (timestamp, id): `before` traz as
+ * mensagens imediatamente mais antigas que o cursor, `after` as mais novas;
+ * sem cursor, as mais recentes. Sempre em ordem cronológica.
+ * hasMore: existe pelo menos mais uma mensagem além da página nessa direção.
+ */
+export async function fetchChatPage({ before = null, after = null, limit = CHAT_PAGE_SIZE } = {}) {
     const supabase = getClient();
-    if (!supabase) return [];
-    const { data } = await supabase
-        .from('chat_messages')
-        .select('*')
-        .order('timestamp', { ascending: false })
-        .limit(limit);
-    return (data || []).reverse();
+    if (!supabase) return { messages: [], hasMore: false };
+    const ascending = !!after;
+    let query = supabase.from('chat_messages').select('id, tipo, mensagem, timestamp');
+    const cursor = before || after;
+    if (cursor) {
+        const op = ascending ? 'gt' : 'lt';
+        const ts = pgQuote(cursor.timestamp);
+        query = query.or(`timestamp.${op}.${ts},and(timestamp.eq.${ts},id.${op}.${pgQuote(cursor.id)})`);
+    }
+    const { data, error } = await query
+        .order('timestamp', { ascending })
+        .order('id', { ascending })
+        .limit(limit + 1);
+    if (error) throw error;
+    const rows = data || [];
+    const page = rows.slice(0, limit);
+    return { messages: ascending ? page : page.reverse(), hasMore: rows.length > limit };
+}
+
+export async function fetchRecentChatMessages(limit = 100) {
+    const { messages } = await fetchChatPage({ limit });
+    return messages;
 }
 
 // ── Health Logs ────────────────────────────────────────────────────────────────
@@ -448,6 +1016,7 @@ export async function syncHealthLog(entry) {
         }, { onConflict: 'date' })
         .select()
         .single();
+    if (!error) invalidateAiContextSnapshot();
     return { data, error };
 }
 
@@ -467,20 +1036,18 @@ export async function fetchHealthLogs(days = 90) {
 // ── Notes (Caderno) ────────────────────────────────────────────────────────────
 
 export async function syncNote(note) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('notes').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('notes', {
         id:         note.id,
         titulo:     note.titulo    || 'Sem título',
         conteudo:   note.conteudo  || null,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteNoteSupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('notes').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('notes', id);
 }
 
 export async function fetchNotes() {
@@ -496,20 +1063,18 @@ export async function fetchNotes() {
 // ── Diary Entries (Caderno) ────────────────────────────────────────────────────
 
 export async function syncDiaryEntry(entry) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('diary_entries').upsert({
+    if (!isSupabaseConfigured()) return;
+    enqueueUpsert('diary_entries', {
         id:         entry.id,
         data:       entry.data,
         conteudo:   entry.conteudo || null,
         updated_at: new Date().toISOString(),
-    }, { onConflict: 'id' });
+    });
 }
 
 export async function deleteDiaryEntrySupabase(id) {
-    const supabase = getClient();
-    if (!supabase) return;
-    await supabase.from('diary_entries').delete().eq('id', id);
+    if (!isSupabaseConfigured()) return;
+    enqueueDelete('diary_entries', id);
 }
 
 export async function fetchDiaryEntries() {
@@ -619,14 +1184,55 @@ export const fetchProfile = async (userId) => {
 };
 
 // ── AI Context Snapshot ────────────────────────────────────────────────────────
+// Cacheado por usuário com TTL curto: mensagens seguidas de uma conversa
+// reaproveitam o mesmo snapshot em vez de refazer as 9 consultas. Toda escrita
+// local (enqueue na outbox, log de saúde) invalida o cache.
+
+const AI_SNAPSHOT_TTL_MS = 60 * 1000;
+// Uma linha por dia: 2 anos ficam abaixo do limite padrão de 1000 linhas do PostgREST
+const HEALTH_HISTORY_DAYS = 730;
+const FINANCE_HISTORY_DAYS = 365;
+let _aiSnapshot = null; // { key, at, promise }
+
+/** Descarta o snapshot em cache; a próxima chamada busca de novo. */
+export function invalidateAiContextSnapshot() {
+    _aiSnapshot = null;
+}
+
+async function aiSnapshotKey(supabase) {
+    const { data } = await supabase.auth.getSession();
+    return `${_clientUrl}|${data?.session?.user?.id || 'anon'}`;
+}
+
 /**
  * Busca um snapshot compacto de todos os dados para injetar no prompt da IA.
  * Retorna null se Supabase não estiver configurado.
+ * Usa o cache se ainda válido; force ignora o cache.
  */
-export async function fetchAiContextSnapshot() {
+export async function fetchAiContextSnapshot({ force = false } = {}) {
     const supabase = getClient();
     if (!supabase) return null;
 
+    const key = await aiSnapshotKey(supabase);
+    const cached = _aiSnapshot;
+    if (!force && cached && cached.key === key && Date.now() - cached.at < AI_SNAPSHOT_TTL_MS) {
+        return cached.promise;
+    }
+
+    const entry = { key, at: Date.now(), promise: loadAiContextSnapshot(supabase) };
+    _aiSnapshot = entry;
+    entry.promise.catch(() => { if (_aiSnapshot === entry) _aiSnapshot = null; });
+    return entry.promise;
+}
+
+async function loadAiContextSnapshot(supabase) {
+    // Escritas locais ainda na outbox precisam chegar ao banco antes da leitura,
+    // senão o snapshot não refletiria o que o usuário acabou de fazer
+    // (um flush já em andamento não leva o que foi enfileirado depois dele)
+    const inFlight = !!_outboxFlushing;
+    await flushOutbox().catch(() => {});
+    if (inFlight) await flushOutbox().catch(() => {});
+
     const weekAgo = new Date();
     weekAgo.setDate(weekAgo.getDate() - 7);
     const weekAgoStr = weekAgo.toISOString().split('T')[0];
@@ -635,7 +1241,17 @@ export async function fetchAiContextSnapshot() {
     thirtyDaysAgo.setDate(thirtyDaysAgo.getDate() - 30);
     const thirtyDaysAgoStr = thirtyDaysAgo.toISOString().split('T')[0];
 
-    const [tasksRes, habitsRes, financesRes, projectsRes, remindersRes, healthRes, notesRes, diaryRes] =
+    // Histórico longo para as tendências/correlações do patternService (séries
+    // diárias em utils/timeSeries); o prompt mostra só a última semana de saúde
+    const healthFrom = new Date();
+    healthFrom.setDate(healthFrom.getDate() - HEALTH_HISTORY_DAYS);
+    const healthFromStr = healthFrom.toISOString().split('T')[0];
+
+    const financeFrom = new Date();
+    financeFrom.setDate(financeFrom.getDate() - FINANCE_HISTORY_DAYS);
+    const financeFromStr = financeFrom.toISOString().split('T')[0];
+
+    const [tasksRes, habitsRes, financesRes, projectsRes, remindersRes, healthRes, notesRes, diaryRes, financeDailyRes] =
         await Promise.allSettled([
             supabase.from('tasks')
                 .select('titulo, status, prioridade, data_prazo')
@@ -665,7 +1281,7 @@ export async function fetchAiContextSnapshot() {
 
             supabase.from('health_logs')
                 .select('date, sleep_hours, energy, weight')
-                .gte('date', weekAgoStr)
+                .gte('date', healthFromStr)
                 .order('date', { ascending: false }),
 
             supabase.from('notes')
@@ -677,15 +1293,21 @@ export async function fetchAiContextSnapshot() {
                 .select('data, conteudo')
                 .order('data', { ascending: false })
                 .limit(5),
+
+            supabase.rpc('orbis_finance_daily', { p_since: financeFromStr }),
         ]);
 
+    const healthHistory = healthRes.status === 'fulfilled' ? (healthRes.value.data || []) : [];
+
     return {
         tasks:      tasksRes.status      === 'fulfilled' ? (tasksRes.value.data      || []) : [],
         habits:     habitsRes.status     === 'fulfilled' ? (habitsRes.value.data     || []) : [],
         finances:   financesRes.status   === 'fulfilled' ? (financesRes.value.data   || []) : [],
         projects:   projectsRes.status   === 'fulfilled' ? (projectsRes.value.data   || []) : [],
         reminders:  remindersRes.status  === 'fulfilled' ? (remindersRes.value.data  || []) : [],
-        healthLogs: healthRes.status     === 'fulfilled' ? (healthRes.value.data     || []) : [],
+        healthLogs: healthHistory.filter(l => l.date >= weekAgoStr),
+        healthHistory,
+        financeHistory: financeDailyRes.status === 'fulfilled' ? (financeDailyRes.value.data || []) : [],
         notes:      notesRes.status      === 'fulfilled' ? (notesRes.value.data      || []) : [],
         diary:      diaryRes.status      === 'fulfilled' ? (diaryRes.value.data      || []) : [],
         today: new Date().toISOString().split('T')[0],
@@ -0,0 +1,152 @@
+/**
+ * actionJson.js
+ * Leitura dos JSONs de ação ({ "action": ..., "data": ... }) que a IA embute
+ * no texto da resposta. Única implementação do projeto: usada pelas páginas,
+ * pelo useClaudeChat (via streamWithActions) e pelos webhooks em api/.
+ *
+ * O scanner percorre o texto uma única vez (O(n)), pode ser alimentado em
+ * pedaços (streaming) e é ciente de strings e escapes — chaves dentro de
+ * valores não confundem a contagem. Só "{" seguido de aspas (após espaços)
+ * abre um candidato, então chaves soltas na prosa ("{nome}") não engolem o
+ * resto do texto. Cada objeto de topo que fecha e tem a chave "action" vira
+ * uma ação; os demais voltam ao texto visível.
+ *
+ * Sem dependências: roda no navegador e no Node (api/lib/action-parser.js).
+ */
+
+const TEXT = 0;     // prosa
+const OPEN = 1;     // viu "{", aguardando o primeiro caractere não-branco
+const OBJECT = 2;   // dentro de um objeto candidato
+const STRING_STOP = /[\\"]/g;
+
+export function createActionJsonScanner() {
+    let mode = TEXT;
+    let visible = '';
+    let pending = '';       // candidato ainda aberto (pode atravessar pedaços)
+    let objStart = 0;       // posição absoluta do "{" do candidato
+    let offset = 0;         // posição absoluta do início do pedaço atual
+    let depth = 0;
+    let inString = false;
+    let escaped = false;
+    const actions = [];
+    const matches = [];
+
+    function closeObject(raw, end, found) {
+        let parsed = null;
+        try { parsed = JSON.parse(raw); } catch { /* não é JSON válido: volta ao texto */ }
+        if (parsed && typeof parsed === 'object' && parsed.action) {
+            actions.push(parsed);
+            matches.push({ start: objStart, end, action: parsed });
+            found.push(parsed);
+        } else {
+            visible += raw;
+        }
+    }
+
+    return {
+        /** Consome um pedaço; retorna as ações completadas nele. */
+        push(chunk) {
+            const found = [];
+            let from = 0; // início do trecho do pedaço ainda não atribuído
+            for (let i = 0; i < chunk.length; i++) {
+                const c = chunk[i];
+
+                if (mode === TEXT) {
+                    // Prosa: salta direto para o próximo "{"
+                    const next = c === '{' ? i : chunk.indexOf('{', i);
+                    if (next === -1) break;
+                    i = next;
+                    visible += chunk.slice(from, i);
+                    from = i;
+                    objStart = offset + i;
+                    mode = OPEN;
+                    continue;
+                }
+
+                if (mode === OPEN) {
+                    if (c === ' ' || c === '\n' || c === '\r' || c === '\t') continue;
+                    if (c === '"') {
+                        mode = OBJECT;
+                        depth = 1;
+                        inString = true;
+                        continue;
+                    }
+                    // Não é objeto JSON: o "{" volta ao texto e c é reprocessado como prosa
+                    visible += pending + chunk.slice(from, i);
+                    pending = '';
+                    from = i;
+                    mode = TEXT;
+                    i--;
+                    continue;
+                }
+
+                if (inString) {
+                    if (escaped) { escaped = false; continue; }
+                    // Dentro da string só importam "\\" e aspas
+                    STRING_STOP.lastIndex = i;
+                    const stop = STRING_STOP.exec(chunk);
+                    if (!stop) { i = chunk.length; break; }
+                    i = stop.index;
+                    if (chunk[i] === '\\') escaped = true;
+                    else inString = false;
+                    continue;
+                }
+                if (c === '"') inString = true;
+                else if (c === '{') depth++;
+                else if (c === '}' && --depth === 0) {
+                    closeObject(pending + chunk.slice(from, i + 1), offset + i + 1, found);
+                    pending = '';
+                    from = i + 1;
+                    mode = TEXT;
+                }
+            }
+            if (mode === TEXT) visible += chunk.slice(from);
+            else pending += chunk.slice(from);
+            offset += chunk.length;
+            return found;
+        },
+
+        /** Fim do stream: um candidato que nunca fechou volta ao texto visível. */
+        end() {
+            visible += pending;
+            pending = '';
+            mode = TEXT;
+            depth = 0;
+            inString = false;
+            escaped = false;
+        },
+
+        /** Texto fora dos JSONs de ação recebido até agora. */
+        get visible() { return visible; },
+
+        /** Todas as ações encontradas até agora, na ordem. */
+        get actions() { return actions; },
+
+        /** Ações com a posição no texto completo: { start, end, action }. */
+        get matches() { return matches; },
+    };
+}
+
+function scan(text) {
+    const scanner = createActionJsonScanner();
+    scanner.push(text || '');
+    scanner.end();
+    return scanner;
+}
+
+/** Posições de cada JSON de ação no texto: [{ start, end, action }]. */
+export function findActionJsons(text) {
+    return scan(text).matches;
+}
+
+/** Todos os objetos de ação do texto, na ordem em que aparecem. */
+export function extractActionJsons(text) {
+    return scan(text).actions;
+}
+
+/** Texto sem os JSONs de ação (inalterado se não houver nenhum). */
+export function removeActionJsons(text) {
+    const scanner = scan(text);
+    if (scanner.actions.length === 0) return text;
+    return scanner.visible.replace(/\n{3,}/g, '\n\n').trim();
+}
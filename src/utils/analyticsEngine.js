@@ -0,0 +1,351 @@
+/**
+ * analyticsEngine.js
+ * Regras de padrões do patternService sobre cópias colunares dos dados.
+ *
+ * toColumns(snapshot) roda na thread principal: uma passada pelos objetos do
+ * snapshot gera colunas tipadas alinhadas por dia, do primeiro registro de
+ * saúde (anos, se houver) até snapshot.today — nunca menos que MIN_WINDOW_DAYS.
+ * As colunas vão ao worker por transferência (sem cópia) e analyzeColumns roda
+ * lá — ou na thread principal, mesma função, quando não há Worker.
+ *
+ * Colunas:
+ *   health                      série diária (utils/timeSeries): sleep_hours/energy/weight
+ *   habits.done                 Uint8Array[hábito × dia], 1 = feito, mesmo eixo de health
+ *   financeDaily                série diária: receitas/despesas somadas por dia (Float64)
+ *   finances.day/cents/kind/category  um lançamento por posição (últimos 30 dias)
+ *   tasks.status/priority       códigos (STATUS/PRIORITIES)
+ * Texto (títulos, categorias) segue em arrays comuns, indexados pelas colunas.
+ *
+ * Tendências e correlações só viram insight quando passam no teste de
+ * significância de timeSeries (Fisher, ~5%) e têm tamanho que importe.
+ *
+ * Sem dependência de DOM: importado pelo worker.
+ */
+
+import { dayOrdinal, habitDays } from './habitDays';
+import {
+    seriesFromDailyRows, seriesTransferList,
+    describe, pearson, linearTrend, rollingSum,
+} from './timeSeries';
+
+const MIN_WINDOW_DAYS = 90;
+const RECENT_DAYS = 8;            // "últimos 7 dias" do snapshot: hoje e os 7 anteriores
+const TREND_DAYS = 90;
+const MIN_CORRELATION_DAYS = 14;
+const MIN_CORRELATION = 0.3;      // significativa mas mais fraca que isso não vira conselho
+const SPENDING_WINDOW = 30;
+const MIN_SPENDING_HISTORY = 120; // o mês atual + ao menos 3 para comparar
+
+const HEALTH_FIELDS = ['sleep_hours', 'energy', 'weight'];
+const FINANCE_FIELDS = ['receitas', 'despesas'];
+const STATUS = ['pendente', 'fazendo', 'concluida', 'atrasada'];
+const PRIORITIES = ['baixa', 'media', 'alta'];
+const KIND_RECEITA = 1;
+const KIND_DESPESA = 2;
+
+const round1 = n => Math.round(n * 10) / 10;
+const round2 = n => Math.round(n * 100) / 100;
+
+// ── Colunas ────────────────────────────────────────────────────────────────────
+
+export function toColumns(snapshot) {
+    const todayStr = snapshot.today || new Date().toISOString().slice(0, 10);
+    const today = dayOrdinal(todayStr);
+
+    // Saúde: série diária do histórico inteiro; define o eixo de dias
+    const health = seriesFromDailyRows(snapshot.healthHistory || snapshot.healthLogs || [], {
+        fields: HEALTH_FIELDS,
+        from: today - MIN_WINDOW_DAYS + 1,
+        until: today,
+    });
+    const days = health.length;
+
+    // Hábitos: matriz hábito × dia lida direto do bitmap; firstDay = primeiro dia
+    // com algum registro (antes dele os hábitos provavelmente nem existiam)
+    const habitList = snapshot.habits || [];
+    const done = new Uint8Array(habitList.length * days);
+    let firstDay = days;
+    habitList.forEach((h, k) => {
+        const set = habitDays(h);
+        if (set.size === 0) return;
+        const row = k * days;
+        for (let i = 0; i < days; i++) {
+            if (set.hasOrdinal(health.start + i)) {
+                done[row + i] = 1;
+                if (i < firstDay) firstDay = i;
+            }
+        }
+    });
+
+    // Finanças no tempo: totais por dia (orbis_finance_daily); dia sem lançamento = 0
+    const financeDaily = seriesFromDailyRows(snapshot.financeHistory || [], {
+        fields: FINANCE_FIELDS,
+        dateKey: 'data',
+        until: today,
+        ArrayType: Float64Array,
+        fill: 0,
+    });
+
+    // Finanças do mês: centavos inteiros em Float64 (soma exata), categoria por dicionário
+    const financeList = snapshot.finances || [];
+    const categories = [];
+    const categoryIndex = new Map();
+    const fDay = new Int32Array(financeList.length);
+    const cents = new Float64Array(financeList.length);
+    const kind = new Uint8Array(financeList.length);
+    const category = new Uint16Array(financeList.length);
+    financeList.forEach((f, i) => {
+        fDay[i] = dayOrdinal(f.data) || 0;
+        cents[i] = Math.round((Number(f.valor) || 0) * 100);
+        kind[i] = f.tipo === 'receita' ? KIND_RECEITA : f.tipo === 'despesa' ? KIND_DESPESA : 0;
+        const cat = f.categoria || 'outros';
+        if (!categoryIndex.has(cat)) {
+            categoryIndex.set(cat, categories.length);
+            categories.push(cat);
+        }
+        category[i] = categoryIndex.get(cat);
+    });
+
+    const taskList = snapshot.tasks || [];
+    const status = new Uint8Array(taskList.length);
+    const priority = new Uint8Array(taskList.length);
+    taskList.forEach((t, i) => {
+        status[i] = Math.max(STATUS.indexOf(t.status), 0);
+        priority[i] = PRIORITIES.indexOf(t.prioridade) >= 0 ? PRIORITIES.indexOf(t.prioridade) : 1;
+    });
+
+    return {
+        today: todayStr,
+        health,
+        habits: { titles: habitList.map(h => h.titulo), done, days, firstDay },
+        financeDaily,
+        finances: { day: fDay, cents, kind, category, categories },
+        tasks: { status, priority },
+    };
+}
+
+/** Buffers das colunas, para postMessage(columns, transferList). */
+export function columnsTransferList(columns) {
+    const { health, habits, financeDaily, finances, tasks } = columns;
+    return [
+        ...seriesTransferList(health),
+        ...seriesTransferList(financeDaily),
+        ...[
+            habits.done,
+            finances.day, finances.cents, finances.kind, finances.category,
+            tasks.status, tasks.priority,
+        ].map(a => a.buffer),
+    ];
+}
+
+// Fração dos hábitos feitos em cada dia do eixo (NaN antes do primeiro registro)
+function habitRateByDay({ titles, done, days, firstDay }) {
+    const count = titles.length;
+    const rate = new Float32Array(days).fill(NaN);
+    if (count === 0) return rate;
+    for (let i = firstDay; i < days; i++) {
+        let doneToday = 0;
+        for (let k = 0; k < count; k++) doneToday += done[k * days + i];
+        rate[i] = doneToday / count;
+    }
+    return rate;
+}
+
+// ── Regras ─────────────────────────────────────────────────────────────────────
+
+function analyzeHealthTrends(health) {
+    const { sleep_hours: sleep, energy } = health.columns;
+    const end = health.length;
+    const from = Math.max(end - RECENT_DAYS, 0);
+    const insights = [];
+    const sleepWeek = describe(sleep, from, end);
+    const energyWeek = describe(energy, from, end);
+
+    if (sleepWeek.n >= 3) {
+        const sleepAvg = sleepWeek.mean;
+        if (sleepAvg < 6) {
+            insights.push(`Média de sono abaixo de 6h nos últimos dias (${round1(sleepAvg)}h). Déficit crônico reduz performance cognitiva em até 40%.`);
+        } else if (sleepAvg >= 8) {
+            insights.push(`Sono consistente acima de 8h nos últimos dias (${round1(sleepAvg)}h). Boa base para recuperação muscular e memória.`);
+        }
+    }
+
+    // Correlação sono × energia (noites curtas vs adequadas)
+    if (sleepWeek.n >= 3 && energyWeek.n >= 3) {
+        let lowSum = 0, lowN = 0, highSum = 0, highN = 0;
+        for (let i = from; i < end; i++) {
+            const s = sleep[i], e = energy[i];
+            if (s !== s || e !== e) continue;
+            if (s < 6.5) { lowSum += e; lowN++; } else { highSum += e; highN++; }
+        }
+        if (lowN && highN && (highSum / highN - lowSum / lowN) > 0.8) {
+            insights.push(`Padrão detectado: quando dorme menos de 6.5h, energia cai para ${round1(lowSum / lowN)}/5. Com sono adequado, sobe para ${round1(highSum / highN)}/5.`);
+        }
+    }
+
+    return insights;
+}
+
+// Tendências de TREND_DAYS, regularidade recente e a relação sono × energia no histórico todo
+function analyzeHealthHistory(health) {
+    const { sleep_hours: sleep, energy, weight } = health.columns;
+    const end = health.length;
+    if (end === 0) return [];
+    const insights = [];
+
+    const sleepTrend = linearTrend(sleep, end - TREND_DAYS, end);
+    if (sleepTrend.significant && sleepTrend.n >= 20 && Math.abs(sleepTrend.slope * 30) >= 0.25) {
+        const minutes = Math.round(Math.abs(sleepTrend.slope * 30) * 60);
+        insights.push(`Sono ${sleepTrend.slope > 0 ? 'subindo' : 'caindo'} cerca de ${minutes}min por mês nos últimos ${TREND_DAYS} dias (tendência consistente em ${sleepTrend.n} registros).`);
+    }
+
+    const weightTrend = linearTrend(weight, end - TREND_DAYS, end);
+    if (weightTrend.significant && weightTrend.n >= 8 && Math.abs(weightTrend.slope * 30) >= 0.5) {
+        insights.push(`Peso ${weightTrend.slope > 0 ? 'subindo' : 'caindo'} cerca de ${round1(Math.abs(weightTrend.slope * 30))}kg por mês nos últimos ${TREND_DAYS} dias (${weightTrend.n} pesagens).`);
+    }
+
+    const lastTwoWeeks = describe(sleep, end - 14, end);
+    const sleepSd = Math.sqrt(lastTwoWeeks.variance);
+    if (lastTwoWeeks.n >= 7 && sleepSd >= 1.5) {
+        insights.push(`Sono irregular nas últimas 2 semanas: varia ±${round1(sleepSd)}h de uma noite para outra. Regularidade ajuda tanto quanto a duração.`);
+    }
+
+    const link = pearson(sleep, energy);
+    if (link.significant && link.n >= 30 && link.r >= MIN_CORRELATION && link.slope > 0) {
+        insights.push(`Em ${link.n} dias de histórico, cada hora a mais de sono acompanha +${round1(link.slope)} de energia (correlação ${round2(link.r)}).`);
+    }
+
+    return insights;
+}
+
+// Sono/energia × hábitos cumpridos desde o primeiro registro de hábito
+function analyzeHealthHabitCorrelation(health, habits) {
+    if (habits.titles.length === 0 || habits.firstDay >= habits.days) return [];
+    const rate = habitRateByDay(habits);
+    const insights = [];
+    const pairs = [
+        [health.columns.sleep_hours, 'noites com mais sono'],
+        [health.columns.energy, 'dias com mais energia'],
+    ];
+    for (const [col, label] of pairs) {
+        const { r, n, significant } = pearson(col, rate, habits.firstDay, habits.days);
+        if (!significant || n < MIN_CORRELATION_DAYS || Math.abs(r) < MIN_CORRELATION) continue;
+        insights.push(r > 0
+            ? `Em ${n} dias de histórico, ${label} vêm junto com mais hábitos cumpridos (correlação ${round2(r)}).`
+            : `Em ${n} dias de histórico, ${label} vêm junto com MENOS hábitos cumpridos (correlação ${round2(r)}) — vale investigar.`);
+    }
+    return insights;
+}
+
+function analyzeHabitConsistency(habits, todayStr) {
+    const { titles, done, days } = habits;
+    if (titles.length === 0) return [];
+    const insights = [];
+    const dayOfMonth = Number(todayStr.slice(8, 10));
+    const monthFrom = Math.max(days - dayOfMonth, 0);
+
+    for (let k = 0; k < titles.length; k++) {
+        let thisMonthLogs = 0;
+        for (let i = monthFrom; i < days; i++) thisMonthLogs += done[k * days + i];
+        const completion = dayOfMonth > 0 ? thisMonthLogs / dayOfMonth : 0;
+        const titulo = titles[k];
+
+        if (completion < 0.3 && dayOfMonth > 7) {
+            insights.push(`Hábito "${titulo}" com baixa aderência este mês: ${thisMonthLogs}/${dayOfMonth} dias (${Math.round(completion * 100)}%).`);
+        } else if (completion >= 0.9 && dayOfMonth > 5) {
+            insights.push(`Hábito "${titulo}" com excelente consistência: ${thisMonthLogs}/${dayOfMonth} dias este mês.`);
+        }
+    }
+    return insights;
+}
+
+// Gasto dos últimos 30 dias contra todas as janelas de 30 dias anteriores (z-score)
+function analyzeSpendingTrend(financeDaily) {
+    const end = financeDaily.length;
+    if (end < MIN_SPENDING_HISTORY) return [];
+    const monthly = rollingSum(financeDaily.columns.despesas, SPENDING_WINDOW);
+    const current = monthly[end - 1];
+    const past = describe(monthly, SPENDING_WINDOW - 1, end - SPENDING_WINDOW);
+    const sd = Math.sqrt(past.variance || 0);
+    if (!past.mean || sd === 0) return [];
+
+    const z = (current - past.mean) / sd;
+    if (z >= 1.5) {
+        return [`Gastos dos últimos 30 dias (R$${current.toFixed(2)}) bem acima do seu padrão: a média dos períodos de 30 dias anteriores é R$${past.mean.toFixed(2)} (${round1(z)} desvios acima).`];
+    }
+    if (z <= -1.5) {
+        return [`Gastos dos últimos 30 dias (R$${current.toFixed(2)}) bem abaixo do seu padrão (média R$${past.mean.toFixed(2)} por 30 dias). Bom momento para reforçar a reserva.`];
+    }
+    return [];
+}
+
+function analyzeFinancePatterns({ cents, kind, category, categories }) {
+    if (cents.length < 3) return [];
+    const insights = [];
+
+    let receitas = 0, despesas = 0;
+    const byCategory = new Float64Array(categories.length);
+    for (let i = 0; i < cents.length; i++) {
+        if (kind[i] === KIND_RECEITA) receitas += cents[i];
+        else if (kind[i] === KIND_DESPESA) {
+            despesas += cents[i];
+            byCategory[category[i]] += cents[i];
+        }
+    }
+    const totalReceitas = receitas / 100;
+    const totalDespesas = despesas / 100;
+    const saldo = (receitas - despesas) / 100;
+
+    if (saldo < 0) {
+        insights.push(`Atenção financeira: despesas (R$${totalDespesas.toFixed(2)}) superam receitas (R$${totalReceitas.toFixed(2)}) nos últimos 30 dias. Saldo: -R$${Math.abs(saldo).toFixed(2)}.`);
+    }
+
+    // Categoria com maior gasto
+    let top = -1;
+    for (let c = 0; c < byCategory.length; c++) {
+        if (byCategory[c] > 0 && (top < 0 || byCategory[c] > byCategory[top])) top = c;
+    }
+    if (top >= 0) {
+        const topValue = byCategory[top] / 100;
+        if (topValue > totalDespesas * 0.4) {
+            insights.push(`Concentração de gastos: categoria "${categories[top]}" representa ${Math.round((topValue / totalDespesas) * 100)}% das despesas do mês (R$${topValue.toFixed(2)}).`);
+        }
+    }
+
+    return insights;
+}
+
+function analyzeTaskPatterns({ status, priority }) {
+    if (status.length === 0) return [];
+    const insights = [];
+    const LATE = STATUS.indexOf('atrasada');
+    const DONE = STATUS.indexOf('concluida');
+    const HIGH = PRIORITIES.indexOf('alta');
+
+    let atrasadas = 0, alta = 0;
+    for (let i = 0; i < status.length; i++) {
+        if (status[i] === LATE) atrasadas++;
+        if (priority[i] === HIGH && status[i] !== DONE) alta++;
+    }
+
+    if (atrasadas >= 3) {
+        insights.push(`${atrasadas} tarefas atrasadas acumuladas. Possível sobrecarga ou subestimativa de prazos.`);
+    }
+    if (alta > 5) {
+        insights.push(`${alta} tarefas de alta prioridade abertas. Quando tudo é urgente, nada é urgente — considere reclassificar.`);
+    }
+    return insights;
+}
+
+/** Insights (strings em português) a partir das colunas de toColumns. */
+export function analyzeColumns(columns) {
+    return [
+        ...analyzeHealthTrends(columns.health),
+        ...analyzeHealthHistory(columns.health),
+        ...analyzeHealthHabitCorrelation(columns.health, columns.habits),
+        ...analyzeHabitConsistency(columns.habits, columns.today),
+        ...analyzeFinancePatterns(columns.finances),
+        ...analyzeSpendingTrend(columns.financeDaily),
+        ...analyzeTaskPatterns(columns.tasks),
+    ];
+}
@@ -0,0 +1,206 @@
+/**
+ * financeAggregates.js
+ * Totais financeiros mantidos incrementalmente: geral, por mês (YYYY-MM),
+ * por tipo e por categoria. Lançar ou apagar um registro custa O(1); gráficos
+ * e contextos da IA leem os totais prontos em vez de varrer o livro-caixa.
+ *
+ * Valores são acumulados em centavos inteiros, então somar e subtrair o mesmo
+ * lançamento volta exatamente ao total anterior (sem deriva de ponto flutuante).
+ *
+ * Usado pelo DataContext (liveFinanceAggregates: cada array novo de finanças
+ * deriva do anterior por diff de referência, sem alterar o agregado antigo),
+ * por AnalisesPage/FinancasPage/DashboardPage e pelos montadores de contexto
+ * (aiProviderService, patternService, api/lib/ai-server.js) via aggregateFinances().
+ */
+
+const TIPOS = ['receita', 'despesa'];
+
+const toCents = v => Math.round((Number(v) || 0) * 100);
+const fromCents = c => c / 100;
+const monthOf = f => (f.data || '').slice(0, 7);
+const categoryOf = f => f.categoria || 'outros';
+const dateOf = f => f.data || f.created_at || '';
+
+function emptyBucket() {
+    return { receita: 0, despesa: 0, count: 0, categorias: new Map(), entries: new Set() };
+}
+
+const copyBucket = b => ({ ...b, categorias: new Map(b.categorias), entries: new Set(b.entries) });
+
+function bump(map, key, delta) {
+    const next = (map.get(key) || 0) + delta;
+    if (next === 0) map.delete(key);
+    else map.set(key, next);
+}
+
+export function createFinanceAggregates(entries = []) {
+    let byId = new Map();           // id → lançamento
+    let months = new Map();         // YYYY-MM → bucket ('' = sem data)
+    const all = emptyBucket();      // totais gerais (sem a lista de entries)
+    let categoryUses = new Map();   // categoria → nº de lançamentos (para listar as existentes)
+    let inherited = new Set();      // buckets ainda compartilhados com o agregado de origem (update)
+
+    function apply(entry, sign) {
+        const tipo = TIPOS.includes(entry.tipo) ? entry.tipo : null;
+        const cents = sign * toCents(entry.valor);
+        const key = monthOf(entry);
+        let bucket = months.get(key);
+        if (!bucket) {
+            bucket = emptyBucket();
+            months.set(key, bucket);
+        } else if (inherited.has(bucket)) {
+            // Copia na primeira escrita: o agregado de origem continua intacto
+            inherited.delete(bucket);
+            bucket = copyBucket(bucket);
+            months.set(key, bucket);
+        }
+        for (const b of [all, bucket]) {
+            b.count += sign;
+            if (!tipo) continue;
+            b[tipo] += cents;
+            if (tipo === 'despesa') bump(b.categorias, categoryOf(entry), cents);
+        }
+        if (sign > 0) bucket.entries.add(entry);
+        else bucket.entries.delete(entry);
+        if (bucket.count === 0) months.delete(key);
+        if (entry.categoria) bump(categoryUses, entry.categoria, sign);
+    }
+
+    function add(entry) {
+        if (!entry || entry.id === undefined) return;
+        const prev = byId.get(entry.id);
+        if (prev) apply(prev, -1);
+        byId.set(entry.id, entry);
+        apply(entry, +1);
+    }
+
+    function remove(id) {
+        const prev = byId.get(id);
+        if (!prev) return;
+        byId.delete(id);
+        apply(prev, -1);
+    }
+
+    function reset(list = []) {
+        byId.clear();
+        months.clear();
+        categoryUses.clear();
+        inherited.clear();
+        Object.assign(all, emptyBucket());
+        list.forEach(add);
+    }
+
+    const summarize = b => ({
+        receitas: fromCents(b?.receita || 0),
+        despesas: fromCents(b?.despesa || 0),
+        saldo: fromCents((b?.receita || 0) - (b?.despesa || 0)),
+        count: b?.count || 0,
+    });
+
+    reset(entries);
+
+    return {
+        add,
+        remove,
+        reset,
+        get size() { return byId.size; },
+
+        /**
+         * Novo agregado para `list`, derivado deste por diff de referência (o
+         * estado React é imutável: mesma referência = lançamento igual). Os
+         * mapas são copiados e só os meses tocados são duplicados, na primeira
+         * escrita; este agregado não é alterado. O(n) comparações de referência.
+         */
+        update(list = []) {
+            const next = createFinanceAggregates();
+            next._load({ byId, months, all, categoryUses });
+            let kept = 0;
+            for (const entry of list) {
+                if (!entry || entry.id === undefined) continue;
+                const prev = byId.get(entry.id);
+                if (prev !== undefined) kept++;
+                if (prev !== entry) next.add(entry);
+            }
+            // Algum id sumiu da lista: remove-o
+            if (kept !== byId.size) {
+                const ids = new Set(list.map(e => e?.id));
+                for (const id of byId.keys()) if (!ids.has(id)) next.remove(id);
+            }
+            return next;
+        },
+
+        _load(state) {
+            byId = new Map(state.byId);
+            months = new Map(state.months);
+            inherited = new Set(state.months.values());
+            Object.assign(all, copyBucket(state.all));
+            categoryUses = new Map(state.categoryUses);
+        },
+
+        /** { receitas, despesas, saldo, count } de todo o histórico. */
+        totals: () => summarize(all),
+
+        /** Mesmo formato de totals(), restrito a um mês 'YYYY-MM'. */
+        month: key => summarize(months.get(key)),
+
+        /** Despesas por categoria, maior primeiro: [[categoria, valor]]. Opcionalmente de um mês. */
+        expenseCategories(monthKey) {
+            const source = monthKey === undefined ? all : months.get(monthKey);
+            if (!source) return [];
+            return [...source.categorias]
+                .map(([cat, cents]) => [cat, fromCents(cents)])
+                .sort((a, b) => b[1] - a[1]);
+        },
+
+        /** Categorias em uso (qualquer tipo), em ordem alfabética. */
+        categoryNames: () => [...categoryUses.keys()].sort(),
+
+        /**
+         * Os n lançamentos mais recentes. Percorre os meses do mais novo para o
+         * mais antigo e só ordena os lançamentos dos meses necessários.
+         */
+        recent(n = 10) {
+            // Lançamentos sem data ordenam por created_at: entram sempre na disputa (são raros)
+            const picked = [...(months.get('')?.entries || [])];
+            const keys = [...months.keys()].filter(Boolean).sort().reverse();
+            let dated = 0;
+            for (const key of keys) {
+                if (dated >= n) break;
+                const { entries } = months.get(key);
+                picked.push(...entries);
+                dated += entries.size;
+            }
+            return picked
+                .sort((a, b) => (dateOf(b) > dateOf(a) ? 1 : dateOf(b) < dateOf(a) ? -1 : 0))
+                .slice(0, n);
+        },
+    };
+}
+
+// Coleção viva do DataContext: o último array e seu agregado
+let _live = null;
+
+/**
+ * Agregado das finanças do app. Chamado com cada array novo do estado; deriva
+ * do último visto (update), então o custo é o do diff, não o de reagregar.
+ */
+export function liveFinanceAggregates(list) {
+    if (_live?.list === list) return _live.agg;
+    const agg = _live ? _live.agg.update(list) : createFinanceAggregates(list);
+    _live = { list, agg };
+    return agg;
+}
+
+// Agregados de listas somente-leitura (snapshots da IA), calculados uma vez por array
+const _cache = new WeakMap();
+
+export function aggregateFinances(finances) {
+    const list = Array.isArray(finances) ? finances : [];
+    let agg = _cache.get(list);
+    if (!agg) {
+        // Snapshots do servidor não trazem id: a posição serve de chave
+        agg = createFinanceAggregates(list.map((f, i) => (f.id === undefined ? { ...f, id: `#${i}` } : f)));
+        _cache.set(list, agg);
+    }
+    return agg;
+}
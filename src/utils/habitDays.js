@@ -0,0 +1,208 @@
+/**
+ * habitDays.js
+ * Dias feitos de um hábito como bitmap: 1 bit por dia (ordinal = dias desde
+ * 1970-01-01 UTC), em palavras Uint32. Dez anos de histórico cabem em ~460 bytes.
+ *
+ * - has(dia): O(1), sem varrer a lista de logs.
+ * - countMonth / countRange: popcount palavra a palavra.
+ * - streak: varre os bits de trás para frente, 32 dias por passo.
+ *
+ * O formato persistido não muda (logs: [{ data }] no app, habit_logs: [{ date }]
+ * no Supabase). habitDays(h) converte na leitura e guarda o bitmap por array de
+ * logs (o estado é imutável: array novo ⇔ logs mudaram). toggleHabitDay já
+ * entrega o bitmap do array novo, então marcar um dia não reconverte o histórico.
+ */
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+/** 'YYYY-MM-DD' → ordinal do dia (NaN se inválido). */
+export function dayOrdinal(date) {
+    if (typeof date !== 'string' || date.length < 10) return NaN;
+    const y = +date.slice(0, 4), m = +date.slice(5, 7), d = +date.slice(8, 10);
+    return Math.floor(Date.UTC(y, m - 1, d) / DAY_MS);
+}
+
+export function ordinalToDate(ord) {
+    return new Date(ord * DAY_MS).toISOString().slice(0, 10);
+}
+
+function popcount(x) {
+    x -= (x >>> 1) & 0x55555555;
+    x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+    return (((x + (x >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+}
+
+// Bits 0..n-1 ligados (n de 0 a 32)
+const lowMask = n => (n >= 32 ? 0xffffffff : ((1 << n) - 1)) >>> 0;
+
+export function createDayBitmap(dates = []) {
+    let base = 0;                      // ordinal do bit 0 de words[0] (múltiplo de 32)
+    let words = new Uint32Array(0);
+    let size = 0;
+
+    // Garante que o ordinal cabe no array (cresce para trás ou para frente)
+    function reserve(ord) {
+        const wordBase = Math.floor(ord / 32) * 32;
+        if (words.length === 0) {
+            base = wordBase;
+            words = new Uint32Array(1);
+            return;
+        }
+        if (wordBase < base) {
+            const extra = (base - wordBase) / 32;
+            const next = new Uint32Array(words.length + extra);
+            next.set(words, extra);
+            words = next;
+            base = wordBase;
+        } else if (wordBase >= base + words.length * 32) {
+            const next = new Uint32Array((wordBase - base) / 32 + 1);
+            next.set(words);
+            words = next;
+        }
+    }
+
+    function hasOrd(ord) {
+        const i = ord - base;
+        if (i < 0 || i >= words.length * 32) return false;
+        return (words[i >>> 5] & (1 << (i & 31))) !== 0;
+    }
+
+    function setOrd(ord, on) {
+        if (Number.isNaN(ord) || hasOrd(ord) === on) return;
+        if (on) reserve(ord);
+        const i = ord - base;
+        if (on) words[i >>> 5] |= 1 << (i & 31);
+        else words[i >>> 5] &= ~(1 << (i & 31));
+        size += on ? 1 : -1;
+    }
+
+    // Dias feitos entre os ordinais from e to (inclusivos)
+    function countOrd(from, to) {
+        const lo = Math.max(from - base, 0);
+        const hi = Math.min(to - base, words.length * 32 - 1);
+        if (hi < lo) return 0;
+        let total = 0;
+        for (let w = lo >>> 5; w <= hi >>> 5; w++) {
+            let bits = words[w];
+            if (w === lo >>> 5) bits &= ~lowMask(lo & 31);
+            if (w === hi >>> 5) bits &= lowMask((hi & 31) + 1);
+            total += popcount(bits >>> 0);
+        }
+        return total;
+    }
+
+    // Dias seguidos feitos terminando em ord (inclusive), 32 por iteração
+    function runEndingAt(ord) {
+        let i = ord - base;
+        if (i < 0) return 0;
+        if (i >= words.length * 32) return 0;
+        let count = 0;
+        let w = i >>> 5;
+        let b = i & 31;
+        while (w >= 0) {
+            const zeros = ~words[w] & lowMask(b + 1);
+            if (zeros === 0) {
+                count += b + 1;
+                w--;
+                b = 31;
+                continue;
+            }
+            return count + b - (31 - Math.clz32(zeros));
+        }
+        return count;
+    }
+
+    const bitmap = {
+        get size() { return size; },
+        has: date => hasOrd(dayOrdinal(date)),
+        hasOrdinal: hasOrd,
+        add: date => setOrd(dayOrdinal(date), true),
+        delete: date => setOrd(dayOrdinal(date), false),
+
+        /** Dias feitos entre duas datas 'YYYY-MM-DD' (inclusivas). */
+        countRange: (from, to) => countOrd(dayOrdinal(from), dayOrdinal(to)),
+
+        /** Dias feitos no mês 'YYYY-MM'. */
+        countMonth(month) {
+            const first = dayOrdinal(`${month}-01`);
+            const [y, m] = month.split('-').map(Number);
+            const last = Math.floor(Date.UTC(y, m, 0) / DAY_MS);
+            return countOrd(first, last);
+        },
+
+        /**
+         * Sequência atual em dias: termina hoje, ou ontem se hoje ainda não
+         * foi marcado (o dia não acabou).
+         */
+        streak(today) {
+            const ord = dayOrdinal(today);
+            return hasOrd(ord) ? runEndingAt(ord) : runEndingAt(ord - 1);
+        },
+
+        /** União (OU bit a bit) com outro bitmap, no lugar. */
+        or(other) {
+            const o = other._raw();
+            if (o.words.length === 0) return bitmap;
+            reserve(o.base);
+            reserve(o.base + o.words.length * 32 - 1);
+            const offset = (o.base - base) / 32;
+            size = 0;
+            for (let w = 0; w < o.words.length; w++) words[offset + w] |= o.words[w];
+            for (let w = 0; w < words.length; w++) size += popcount(words[w]);
+            return bitmap;
+        },
+
+        clone() {
+            const copy = createDayBitmap();
+            copy._load(base, words.slice(), size);
+            return copy;
+        },
+
+        _raw: () => ({ base, words }),
+        _load(b, w, s) { base = b; words = w; size = s; },
+    };
+
+    for (const date of dates) bitmap.add(date);
+    return bitmap;
+}
+
+// ── Hábitos ────────────────────────────────────────────────────────────────────
+
+// array de logs → bitmap (o array é imutável no estado; mudou ⇔ array novo)
+const _byLogs = new WeakMap();
+const EMPTY = [];
+
+const logsOf = habit => habit?.logs || habit?.habit_logs || EMPTY;
+
+/** Bitmap dos dias feitos do hábito (logs [{ data }] do app ou habit_logs [{ date }] do Supabase). */
+export function habitDays(habit) {
+    const logs = logsOf(habit);
+    let days = _byLogs.get(logs);
+    if (!days) {
+        days = createDayBitmap(logs.map(l => l.data ?? l.date));
+        _byLogs.set(logs, days);
+    }
+    return days;
+}
+
+/**
+ * Marca/desmarca o dia. Devolve os logs novos (formato persistido) e se o dia
+ * ficou feito; o bitmap dos logs novos já fica em cache (cópia + 1 bit).
+ */
+export function toggleHabitDay(habit, date) {
+    const days = habitDays(habit).clone();
+    const done = !days.has(date);
+    const logs = habit.logs || [];
+    const nextLogs = done ? [...logs, { data: date }] : logs.filter(l => l.data !== date);
+    if (done) days.add(date);
+    else days.delete(date);
+    _byLogs.set(nextLogs, days);
+    return { logs: nextLogs, done };
+}
+
+/** Dias em que pelo menos um hábito foi feito. */
+export function anyHabitDays(habits) {
+    const union = createDayBitmap();
+    for (const h of habits || EMPTY) union.or(habitDays(h));
+    return union;
+}
@@ -0,0 +1,20 @@
+/**
+ * memoizeLast.js
+ * Guarda o resultado da última chamada: com os mesmos argumentos (por
+ * referência — o estado React é imutável), devolve o mesmo valor sem recalcular.
+ * Usado pelos montadores de contexto das páginas: o texto só é refeito quando
+ * os dados mudam, não a cada mensagem enviada.
+ */
+
+export function memoizeLast(fn) {
+    let lastArgs = null;
+    let lastResult;
+    return (...args) => {
+        if (lastArgs && lastArgs.length === args.length && args.every((a, i) => a === lastArgs[i])) {
+            return lastResult;
+        }
+        lastResult = fn(...args);
+        lastArgs = args;
+        return lastResult;
+    };
+}
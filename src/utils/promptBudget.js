@@ -0,0 +1,220 @@
+/**
+ * promptBudget.js
+ * Montagem do prompt dentro de um orçamento de tokens de entrada.
+ *
+ * Segmentos, na ordem em que disputam o orçamento:
+ *   1. system prompt + addon da página + mensagem atual (sempre vão)
+ *   2. seções do contexto ao vivo, por prioridade, até CONTEXT_SHARE do que sobrou
+ *   3. turnos anteriores, do mais novo para o mais antigo (os MIN_RECENT_TURNS
+ *      últimos entram cortados se não couberem inteiros)
+ *   4. resumo dos turnos que ficaram de fora, no lugar dos mais antigos
+ * O que não cabe é cortado (seção por linhas, mensagem por palavras) ou sai
+ * do prompt; turnos que saem viram `older` para o resumo acumulado.
+ *
+ * Tokens são estimados (sem tokenizer no bundle): ~1 por palavra curta, 1 a
+ * cada 4 letras em palavras longas, 1 por símbolo. Erra para cima em
+ * português, o que é o lado seguro para um orçamento.
+ * Sem dependências (usado no app e pode ser importado pelo api/).
+ */
+
+export const DEFAULT_PROMPT_BUDGET = 6000;
+const MIN_RECENT_TURNS = 2;
+const CONTEXT_SHARE = 0.45;
+const MAX_TURN_TOKENS = 900;      // um turno antigo gigante não come o histórico todo
+const MIN_SECTION_TOKENS = 40;    // abaixo disso não vale cortar uma seção pela metade
+const TRUNCATED = ' [...]';
+
+const WORD_RE = /[\p{L}\p{N}]+|[^\s\p{L}\p{N}]/gu;
+
+/** Estimativa de tokens de um texto. */
+export function estimateTokens(text) {
+    if (!text) return 0;
+    let tokens = 0;
+    for (const [word] of text.matchAll(WORD_RE)) {
+        tokens += word.length <= 4 ? 1 : Math.ceil(word.length / 4);
+    }
+    return tokens;
+}
+
+// Mensagens do estado são imutáveis: a estimativa fica em cache pelo objeto
+const _messageTokens = new WeakMap();
+
+export function messageTokens(msg) {
+    let tokens = _messageTokens.get(msg);
+    if (tokens === undefined) {
+        tokens = estimateTokens(msg.mensagem) + 4;   // + papel/separadores
+        _messageTokens.set(msg, tokens);
+    }
+    return tokens;
+}
+
+/** Corta o texto para caber em maxTokens (num espaço ou quebra de linha). */
+export function truncateToTokens(text, maxTokens) {
+    const total = estimateTokens(text);
+    if (total <= maxTokens) return text;
+    // O marcador de corte também conta (' [...]' = 5 símbolos)
+    const room = maxTokens - estimateTokens(TRUNCATED);
+    if (room <= 0) return '';
+    let cut = Math.floor(text.length * (room / total));
+    while (cut > 0 && estimateTokens(text.slice(0, cut)) > room) cut = Math.floor(cut * 0.9);
+    const boundary = Math.max(text.lastIndexOf('\n', cut), text.lastIndexOf(' ', cut));
+    return text.slice(0, boundary > cut * 0.6 ? boundary : cut).trimEnd() + TRUNCATED;
+}
+
+/**
+ * Escolhe seções de contexto para caber em `budget`.
+ * sections: [{ id, text, priority }] — priority menor entra primeiro.
+ * Uma seção que não cabe inteira é cortada por linhas (a 1ª linha é o título).
+ * Devolve as seções mantidas na ordem original + ids cortados/removidos.
+ */
+export function fitSections(sections, budget) {
+    const order = sections
+        .map((s, i) => ({ ...s, index: i, tokens: estimateTokens(s.text) }))
+        .sort((a, b) => (a.priority ?? 0) - (b.priority ?? 0) || a.index - b.index);
+    const kept = [];
+    const truncated = [];
+    const dropped = [];
+    let left = budget;
+    for (const s of order) {
+        if (s.tokens <= left) {
+            kept.push(s);
+            left -= s.tokens;
+            continue;
+        }
+        if (left < MIN_SECTION_TOKENS) { dropped.push(s.id); continue; }
+        const lines = s.text.split('\n');
+        const out = [lines[0]];
+        let used = estimateTokens(lines[0]) + 1;
+        for (let i = 1; i < lines.length; i++) {
+            const t = estimateTokens(lines[i]) + 1;
+            if (used + t > left) break;
+            out.push(lines[i]);
+            used += t;
+        }
+        if (out.length < 2) { dropped.push(s.id); continue; }
+        kept.push({ ...s, text: out.join('\n'), tokens: used });
+        truncated.push(s.id);
+        left -= used;
+    }
+    kept.sort((a, b) => a.index - b.index);
+    return { sections: kept, tokens: budget - left, truncated, dropped };
+}
+
+/**
+ * Turnos anteriores que cabem em `budget`, do mais novo para o mais antigo.
+ * Turnos longos são cortados em MAX_TURN_TOKENS. Devolve { recent, older, tokens }:
+ * recent em ordem cronológica; older = tudo que ficou de fora (para resumir).
+ */
+export function planHistory(history, budget) {
+    const recent = [];
+    let used = 0;
+    let i = history.length - 1;
+    for (; i >= 0; i--) {
+        let msg = history[i];
+        let tokens = messageTokens(msg);
+        if (tokens > MAX_TURN_TOKENS) {
+            msg = { ...msg, mensagem: truncateToTokens(msg.mensagem, MAX_TURN_TOKENS) };
+            tokens = estimateTokens(msg.mensagem) + 4;
+        }
+        if (used + tokens > budget) {
+            // Os últimos turnos dão sentido à pergunta atual: entram cortados se preciso
+            const room = budget - used - 4;
+            if (recent.length >= MIN_RECENT_TURNS || room < MIN_SECTION_TOKENS * 2) break;
+            msg = { ...msg, mensagem: truncateToTokens(msg.mensagem, room) };
+            tokens = estimateTokens(msg.mensagem) + 4;
+        }
+        recent.push(msg);
+        used += tokens;
+    }
+    recent.reverse();
+    return { recent, older: history.slice(0, i + 1), tokens: used };
+}
+
+/**
+ * Resumo sem IA dos turnos que saíram: a primeira frase de cada um, do mais
+ * novo para o mais antigo, até maxTokens. Serve enquanto o resumo da IA não chega.
+ */
+export function extractiveSummary(messages, maxTokens) {
+    const lines = [];
+    let used = 0;
+    for (let i = messages.length - 1; i >= 0; i--) {
+        const m = messages[i];
+        const first = (m.mensagem || '').replace(/\s+/g, ' ').trim().split(/(?<=[.!?])\s/)[0];
+        if (!first) continue;
+        const line = `- ${m.tipo === 'usuario' ? 'Caçador' : 'LYRA'}: ${truncateToTokens(first, 40)}`;
+        const t = estimateTokens(line) + 1;
+        if (used + t > maxTokens) break;
+        lines.push(line);
+        used += t;
+    }
+    return lines.reverse().join('\n');
+}
+
+/**
+ * Monta o prompt inteiro dentro do orçamento.
+ * - system, addon: texto fixo (sempre entra)
+ * - sections: contexto ao vivo [{ id, text, priority }] com cabeçalho `contextHeader`
+ * - messages: histórico completo; a última é a mensagem atual (sempre entra)
+ * - summary(older): devolve o texto de resumo para os turnos que ficaram de fora
+ * Retorna { system, messages, older, usage }, usage em tokens estimados por segmento.
+ */
+export function assemblePrompt({ system = '', addon = '', sections = [], contextHeader = '', messages, budget = DEFAULT_PROMPT_BUDGET, summary }) {
+    const current = messages[messages.length - 1];
+    const history = messages.slice(0, -1);
+
+    const fixed = estimateTokens(system) + estimateTokens(addon);
+    let currentMsg = current;
+    let currentTokens = messageTokens(current);
+    // A mensagem atual só é cortada se sozinha passar do orçamento inteiro
+    if (fixed + currentTokens > budget) {
+        currentMsg = { ...current, mensagem: truncateToTokens(current.mensagem, Math.max(budget - fixed, 200)) };
+        currentTokens = estimateTokens(currentMsg.mensagem) + 4;
+    }
+    let left = Math.max(budget - fixed - currentTokens, 0);
+
+    const contextBudget = Math.floor(left * CONTEXT_SHARE);
+    const fitted = fitSections(sections, contextBudget - estimateTokens(contextHeader));
+    const context = fitted.sections.length
+        ? contextHeader + fitted.sections.map(s => s.text).join('\n')
+        : '';
+    const contextTokens = estimateTokens(context);
+    left -= contextTokens;
+
+    let plan = planHistory(history, left);
+    let summaryText = '';
+    if (plan.older.length > 0 && summary) {
+        const block = older => {
+            const raw = summary(older) || '';
+            return raw ? `\n\nRESUMO DA CONVERSA ANTERIOR (turnos mais antigos):\n${raw}` : '';
+        };
+        summaryText = block(plan.older);
+        if (summaryText) {
+            // O resumo toma o lugar dos turnos mais antigos que ainda cabiam
+            const summaryTokens = Math.min(estimateTokens(summaryText), Math.floor(left / 2));
+            const replanned = planHistory(history, left - summaryTokens);
+            if (replanned.older.length !== plan.older.length) summaryText = block(replanned.older);
+            plan = replanned;
+            summaryText = truncateToTokens(summaryText, left - plan.tokens);
+        }
+    }
+
+    const systemText = system + context + addon + summaryText;
+    const usage = {
+        system: estimateTokens(system),
+        addon: estimateTokens(addon),
+        context: contextTokens,
+        summary: estimateTokens(summaryText),
+        history: plan.tokens,
+        current: currentTokens,
+        budget,
+    };
+    usage.total = usage.system + usage.addon + usage.context + usage.summary + usage.history + usage.current;
+
+    return {
+        system: systemText,
+        messages: [...plan.recent, currentMsg],
+        older: plan.older,
+        droppedSections: fitted.dropped,
+        usage,
+    };
+}
@@ -0,0 +1,149 @@
+/**
+ * reminderSchedule.js
+ * Horários de lembretes compartilhados entre o app (services/reminderScheduler)
+ * e o cron dos bots (api/lib/reminder-dispatch.js).
+ *
+ * dataHora é hora de parede sem fuso ('YYYY-MM-DDTHH:MM', do datetime-local ou
+ * da IA); o Supabase devolve a mesma hora como '...+00:00'. Por isso tudo aqui
+ * é "tempo de parede": os campos da data lidos como se fossem UTC
+ * (Date.UTC(ano, mês, dia, hora, min)). O app compara com o relógio local, o
+ * servidor com o relógio no fuso do usuário (wallTime(now, timeZone)).
+ * Nesse espaço não existe horário de verão: "todo dia às 8h" é sempre +24h.
+ *
+ * Recorrência (reminder.recorrencia): 'diaria' | 'semanal' | 'mensal' | vazio.
+ */
+
+export const RECURRENCES = ['diaria', 'semanal', 'mensal'];
+export const REMINDER_LEAD_MS = 5 * 60 * 1000;   // avisa 5 min antes
+export const REMINDER_GRACE_MS = 2 * 60 * 1000;  // e até 2 min depois
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const PERIOD_MS = { diaria: DAY_MS, semanal: 7 * DAY_MS };
+
+// ── Tempo de parede ────────────────────────────────────────────────────────────
+
+const _formatters = new Map();
+
+function zoneFormatter(timeZone) {
+    if (!_formatters.has(timeZone)) {
+        _formatters.set(timeZone, new Intl.DateTimeFormat('en-US', {
+            timeZone, hourCycle: 'h23',
+            year: 'numeric', month: '2-digit', day: '2-digit',
+            hour: '2-digit', minute: '2-digit', second: '2-digit',
+        }));
+    }
+    return _formatters.get(timeZone);
+}
+
+/** Relógio de parede de `date` — no fuso local, ou em `timeZone` (IANA) se dado. */
+export function wallTime(date = new Date(), timeZone) {
+    if (!timeZone) {
+        return Date.UTC(date.getFullYear(), date.getMonth(), date.getDate(),
+            date.getHours(), date.getMinutes(), date.getSeconds(), date.getMilliseconds());
+    }
+    const p = {};
+    for (const { type, value } of zoneFormatter(timeZone).formatToParts(date)) p[type] = +value;
+    return Date.UTC(p.year, p.month - 1, p.day, p.hour, p.minute, p.second, date.getMilliseconds());
+}
+
+/** dataHora ('YYYY-MM-DDTHH:MM[...]') → tempo de parede; NaN se inválida. */
+export function reminderWallTime(dataHora) {
+    const m = /^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})/.exec(dataHora || '');
+    return m ? Date.UTC(+m[1], +m[2] - 1, +m[3], +m[4], +m[5]) : NaN;
+}
+
+/** Tempo de parede → 'YYYY-MM-DDTHH:MM' (mesmo formato de dataHora). */
+export function wallToIso(wall) {
+    return new Date(wall).toISOString().slice(0, 16);
+}
+
+// ── Ocorrências ────────────────────────────────────────────────────────────────
+
+// Mesmo dia do mês `months` meses depois; dia 31 vira o último dia dos meses curtos
+function addMonths(wall, months) {
+    const d = new Date(wall);
+    const day = d.getUTCDate();
+    const target = new Date(Date.UTC(d.getUTCFullYear(), d.getUTCMonth() + months, 1,
+        d.getUTCHours(), d.getUTCMinutes()));
+    const lastDay = new Date(Date.UTC(target.getUTCFullYear(), target.getUTCMonth() + 1, 0)).getUTCDate();
+    target.setUTCDate(Math.min(day, lastDay));
+    return target.getTime();
+}
+
+/**
+ * Primeira ocorrência do lembrete em ou após `fromWall` (tempo de parede), ou
+ * null. Sem recorrência, a única ocorrência é o próprio dataHora.
+ */
+export function nextOccurrence(reminder, fromWall) {
+    const base = reminderWallTime(reminder.dataHora ?? reminder.data_hora);
+    if (Number.isNaN(base)) return null;
+    if (base >= fromWall) return base;
+
+    const period = PERIOD_MS[reminder.recorrencia];
+    if (period) return base + Math.ceil((fromWall - base) / period) * period;
+
+    if (reminder.recorrencia === 'mensal') {
+        const from = new Date(fromWall), b = new Date(base);
+        let months = (from.getUTCFullYear() - b.getUTCFullYear()) * 12 + from.getUTCMonth() - b.getUTCMonth();
+        let at = addMonths(base, months);
+        while (at < fromWall) at = addMonths(base, ++months);
+        return at;
+    }
+    return null;
+}
+
+// ── Min-heap ───────────────────────────────────────────────────────────────────
+
+/**
+ * Heap binário de mínimo por keyOf(item). push/pop O(log n), peek O(1);
+ * from(items) monta em O(n).
+ */
+export function createMinHeap(keyOf) {
+    let items = [];
+
+    const less = (i, j) => keyOf(items[i]) < keyOf(items[j]);
+    const swap = (i, j) => { [items[i], items[j]] = [items[j], items[i]]; };
+
+    function up(i) {
+        while (i > 0) {
+            const parent = (i - 1) >> 1;
+            if (!less(i, parent)) return;
+            swap(i, parent);
+            i = parent;
+        }
+    }
+
+    function down(i) {
+        for (;;) {
+            const l = 2 * i + 1, r = l + 1;
+            let min = i;
+            if (l < items.length && less(l, min)) min = l;
+            if (r < items.length && less(r, min)) min = r;
+            if (min === i) return;
+            swap(i, min);
+            i = min;
+        }
+    }
+
+    return {
+        get size() { return items.length; },
+        peek: () => items[0],
+        push(item) {
+            items.push(item);
+            up(items.length - 1);
+        },
+        pop() {
+            const top = items[0];
+            const last = items.pop();
+            if (items.length > 0) {
+                items[0] = last;
+                down(0);
+            }
+            return top;
+        },
+        from(list) {
+            items = [...list];
+            for (let i = (items.length >> 1) - 1; i >= 0; i--) down(i);
+        },
+    };
+}
@@ -0,0 +1,272 @@
+/**
+ * searchIndex.js
+ * Índice invertido em memória para a busca local (Ctrl+K).
+ *
+ * - Tokens sem acento e em minúsculas ("Inglês" → "ingles").
+ * - Vocabulário indexado por n-gramas: prefixos de 1–2 letras ("^i", "^in") e
+ *   trigramas ("ing", "ngl", ...). Uma palavra da consulta acha os termos que
+ *   começam com ela ou a contêm sem varrer o vocabulário inteiro.
+ * - Postings por termo: docId → peso do campo (título vale mais que corpo).
+ * - Atualização incremental: upsert/remove por chave, sem reconstruir o índice.
+ * - Ranking: todas as palavras precisam casar (AND); cada uma soma
+ *   qualidade (exato > prefixo > meio da palavra) × peso do campo × idf.
+ *   Só os k melhores são mantidos (sem ordenar todos os candidatos).
+ * - Palavras de 1–2 letras usam postings por prefixo, fundidas sob demanda e
+ *   mantidas em cache até algum termo com aquele prefixo mudar.
+ *
+ * Sem dependências de DOM: roda no Web Worker (workers/searchIndex.worker.js)
+ * ou na thread principal como fallback.
+ */
+
+const TITLE_WEIGHT = 2;
+const BODY_WEIGHT = 1;
+const MAX_BODY_TERMS = 200;     // textos longos (notas, chat) indexam só os primeiros termos distintos
+
+const EXACT = 3;
+const PREFIX = 2;
+const INFIX = 1;
+
+export function foldText(text) {
+    return (text || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+}
+
+export function tokenize(text) {
+    return foldText(text).split(/[^a-z0-9]+/).filter(Boolean);
+}
+
+function gramsOf(term) {
+    const out = ['^' + term[0]];
+    if (term.length > 1) out.push('^' + term.slice(0, 2));
+    for (let i = 0; i + 3 <= term.length; i++) out.push(term.slice(i, i + 3));
+    return out;
+}
+
+export function createSearchIndex() {
+    let nextId = 1;
+    const freeIds = [];          // ids de docs removidos, reaproveitados (mantém os acumuladores pequenos)
+    const docs = new Map();      // docId → { terms: Map<termo, peso>, hit }
+    const byKey = new Map();     // chave → docId
+    const postings = new Map();  // termo → Map<docId, peso>
+    const grams = new Map();     // n-grama → Set<termo>
+    const packed = new Map();    // termo → { ids, weights } em typed arrays (cache de leitura das postings)
+    const prefixed = new Map();  // "^a"/"^ab" → postings fundidas de todos os termos com esse prefixo (cache)
+
+    function addPosting(term, id, weight) {
+        let list = postings.get(term);
+        if (!list) {
+            list = new Map();
+            postings.set(term, list);
+            for (const g of gramsOf(term)) {
+                if (!grams.has(g)) grams.set(g, new Set());
+                grams.get(g).add(term);
+            }
+        }
+        list.set(id, weight);
+        touchTerm(term);
+    }
+
+    // O termo mudou: descarta as leituras em cache que dependem dele
+    function touchTerm(term) {
+        packed.delete(term);
+        prefixed.delete('^' + term[0]);
+        if (term.length > 1) prefixed.delete('^' + term.slice(0, 2));
+    }
+
+    function dropPosting(term, id) {
+        const list = postings.get(term);
+        if (!list) return;
+        list.delete(id);
+        touchTerm(term);
+        if (list.size > 0) return;
+        postings.delete(term);
+        for (const g of gramsOf(term)) {
+            const set = grams.get(g);
+            set.delete(term);
+            if (set.size === 0) grams.delete(g);
+        }
+    }
+
+    function remove(key) {
+        const id = byKey.get(key);
+        if (id === undefined) return;
+        for (const term of docs.get(id).terms.keys()) dropPosting(term, id);
+        docs.delete(id);
+        byKey.delete(key);
+        freeIds.push(id);
+    }
+
+    /** doc: { key, title, body, ...campos devolvidos nos resultados } */
+    function upsert(doc) {
+        remove(doc.key);
+        const terms = new Map();
+        for (const t of tokenize(doc.title)) terms.set(t, TITLE_WEIGHT);
+        let bodyTerms = 0;
+        for (const t of tokenize(doc.body)) {
+            if (terms.has(t)) continue;
+            if (bodyTerms++ >= MAX_BODY_TERMS) break;
+            terms.set(t, BODY_WEIGHT);
+        }
+        if (terms.size === 0) return;
+
+        const { body: _body, ...hit } = doc;
+        const id = freeIds.length > 0 ? freeIds.pop() : nextId++;
+        docs.set(id, { terms, hit });
+        byKey.set(doc.key, id);
+        for (const [term, weight] of terms) addPosting(term, id, weight);
+    }
+
+    // Termos do vocabulário que casam com a palavra (3+ letras) → qualidade do casamento
+    function matchTerms(word) {
+        const matched = new Map();
+        let candidates;
+        // O trigrama mais raro da palavra limita os candidatos
+        for (let i = 0; i + 3 <= word.length; i++) {
+            const set = grams.get(word.slice(i, i + 3));
+            if (!set) return matched;
+            if (!candidates || set.size < candidates.size) candidates = set;
+        }
+        if (!candidates) return matched;
+        for (const term of candidates) {
+            if (term === word) matched.set(term, EXACT);
+            else if (term.startsWith(word)) matched.set(term, PREFIX);
+            else if (term.includes(word)) matched.set(term, INFIX);
+        }
+        return matched;
+    }
+
+    // Postings de um termo empacotadas para iterar rápido; refeitas só se o termo mudou
+    function packedPostings(term) {
+        let p = packed.get(term);
+        if (!p) {
+            const list = postings.get(term);
+            p = { ids: new Uint32Array(list.size), weights: new Uint8Array(list.size) };
+            let i = 0;
+            for (const [id, weight] of list) {
+                p.ids[i] = id;
+                p.weights[i++] = weight;
+            }
+            packed.set(term, p);
+        }
+        return p;
+    }
+
+    // Palavras de 1–2 letras casam com milhares de termos; as postings de todos
+    // eles são fundidas uma vez (melhor pontuação por doc) e reusadas enquanto
+    // nenhum termo com o prefixo mudar. Digitar a primeira letra fica O(docs).
+    function prefixPostings(word) {
+        const key = '^' + word;
+        let p = prefixed.get(key);
+        if (!p) {
+            const scores = new Map();
+            for (const term of grams.get(key) || []) {
+                const { ids, weights } = packedPostings(term);
+                const boost = (term === word ? EXACT : PREFIX) * Math.log(1 + docs.size / ids.length);
+                for (let j = 0; j < ids.length; j++) {
+                    const s = boost * weights[j];
+                    if (s > (scores.get(ids[j]) || 0)) scores.set(ids[j], s);
+                }
+            }
+            p = { ids: new Uint32Array(scores.size), weights: new Float64Array(scores.size) };
+            let i = 0;
+            for (const [id, s] of scores) {
+                p.ids[i] = id;
+                p.weights[i++] = s;
+            }
+            prefixed.set(key, p);
+        }
+        return p;
+    }
+
+    // Listas a percorrer para uma palavra: [{ ids, weights, boost }]
+    function wordPostings(word) {
+        if (word.length < 3) {
+            const p = prefixPostings(word);
+            return p.ids.length > 0 ? [{ ...p, boost: 1 }] : [];
+        }
+        const lists = [];
+        for (const [term, quality] of matchTerms(word)) {
+            const p = packedPostings(term);
+            lists.push({ ...p, boost: quality * Math.log(1 + docs.size / p.ids.length) });
+        }
+        return lists;
+    }
+
+    // Acumuladores por docId reaproveitados entre buscas (sem Map por consulta).
+    // mark[id] === stamp da passada anterior ⇔ o doc casou todas as palavras até ali.
+    let best = new Float64Array(1024);
+    let total = new Float64Array(1024);
+    let mark = new Uint32Array(1024);
+    let stamp = 0;
+
+    function ensureCapacity(n) {
+        if (n <= mark.length) return;
+        const size = Math.max(n, mark.length * 2);
+        const grow = (Type, old) => { const a = new Type(size); a.set(old); return a; };
+        best = grow(Float64Array, best);
+        total = grow(Float64Array, total);
+        mark = grow(Uint32Array, mark);
+    }
+
+    function search(query, k = 8) {
+        const words = [...new Set(tokenize(query))];
+        if (words.length === 0 || docs.size === 0) return [];
+        ensureCapacity(nextId);
+
+        // Palavras mais seletivas primeiro: as seguintes só pontuam quem já casou
+        const perWord = words.map(word => {
+            const lists = wordPostings(word);
+            return { lists, size: lists.reduce((n, l) => n + l.ids.length, 0) };
+        }).sort((a, b) => a.size - b.size);
+
+        let touched = [];
+        for (let w = 0; w < perWord.length; w++) {
+            const prev = stamp;
+            const cur = ++stamp;
+            const next = [];
+            for (const { ids, weights, boost } of perWord[w].lists) {
+                for (let j = 0; j < ids.length; j++) {
+                    const id = ids[j];
+                    const s = boost * weights[j];
+                    if (mark[id] === cur) {
+                        if (s > best[id]) best[id] = s;
+                    } else if (w === 0 || mark[id] === prev) {
+                        mark[id] = cur;
+                        best[id] = s;
+                        next.push(id);
+                    }
+                }
+            }
+            for (const id of next) total[id] = (w === 0 ? 0 : total[id]) + best[id];
+            touched = next;
+            if (touched.length === 0) return [];
+        }
+
+        // Top-k por inserção num array pequeno (k << candidatos)
+        const top = [];
+        for (const id of touched) {
+            const score = total[id];
+            if (top.length === k && score <= top[k - 1].score) continue;
+            if (top.length === k) top.pop();
+            let i = top.length;
+            top.push(null);
+            while (i > 0 && top[i - 1].score < score) {
+                top[i] = top[i - 1];
+                i--;
+            }
+            top[i] = { id, score };
+        }
+        return top.map(({ id, score }) => ({ ...docs.get(id).hit, score }));
+    }
+
+    return {
+        upsert,
+        remove,
+        search,
+        /** Aplica um lote de mudanças (como chega do worker). */
+        apply(upserts = [], removes = []) {
+            removes.forEach(remove);
+            upserts.forEach(upsert);
+        },
+        get size() { return docs.size; },
+    };
+}
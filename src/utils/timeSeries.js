@@ -0,0 +1,211 @@
+/**
+ * timeSeries.js
+ * Séries diárias colunares: uma coluna tipada por métrica, posição = dia
+ * (ordinal de habitDays.dayOrdinal a partir de `start`). Dia sem valor = NaN.
+ *
+ *   { start, length, columns: { sleep_hours: Float32Array, ... } }
+ *
+ * Medidas de saúde em Float32 (sono, energia, peso cabem com folga); valores
+ * financeiros em Float64, para somas longas não perderem centavos.
+ *
+ * É só dado (sem closures), então vai para o worker por transferência
+ * (seriesTransferList) e volta a ser usado lá sem reconstrução.
+ *
+ * As estatísticas são laços únicos sobre as colunas, ignorando NaN:
+ *   - rollingMean / rollingVariance / rollingPearson: janela deslizante em
+ *     O(n) com somas acumuladas (não recalcula a janela inteira a cada dia);
+ *   - pearson e linearTrend num intervalo, com teste de significância pela
+ *     transformação de Fisher (|z| > 1.96 ≈ 5%).
+ * Anos de histórico diário são alguns milhares de posições: milissegundos.
+ */
+
+import { dayOrdinal } from './habitDays';
+
+const Z_95 = 1.96;
+
+const toOrdinal = day => (typeof day === 'number' ? day : dayOrdinal(day));
+
+// ── Construção ─────────────────────────────────────────────────────────────────
+
+function emptySeries(start, length, names, ArrayType, fill) {
+    const columns = {};
+    for (const name of names) columns[name] = new ArrayType(Math.max(length, 0)).fill(fill);
+    return { start, length: Math.max(length, 0), columns };
+}
+
+/**
+ * Uma linha por dia (ex: health_logs; finanças já somadas por dia): cada field
+ * vira uma coluna. A série cobre do primeiro ao último dia das linhas; `from`
+ * a estende para trás e `until` fixa o último dia (ex: hoje, para as janelas
+ * terminarem nele; linhas depois dele ficam de fora). Datas: 'YYYY-MM-DD' ou ordinal.
+ * Dias sem linha ficam com `fill` — NaN para medidas, 0 para valores somados.
+ */
+export function seriesFromDailyRows(rows, { fields, dateKey = 'date', from, until, ArrayType = Float32Array, fill = NaN } = {}) {
+    let lo = from !== undefined ? toOrdinal(from) : Infinity;
+    let hi = until !== undefined ? toOrdinal(until) : -Infinity;
+    for (const row of rows) {
+        const ord = dayOrdinal(row[dateKey]);
+        if (Number.isNaN(ord) || (until !== undefined && ord > hi)) continue;
+        if (ord < lo) lo = ord;
+        if (until === undefined && ord > hi) hi = ord;
+    }
+    if (lo === Infinity || hi === -Infinity) return emptySeries(0, 0, fields, ArrayType, fill);
+
+    const series = emptySeries(lo, hi - lo + 1, fields, ArrayType, fill);
+    for (const row of rows) {
+        const i = dayOrdinal(row[dateKey]) - lo;
+        if (!(i >= 0 && i < series.length)) continue;
+        for (const field of fields) {
+            const v = row[field];
+            if (v != null && v !== '') series.columns[field][i] = +v;
+        }
+    }
+    return series;
+}
+
+/** Posição do dia na série ('YYYY-MM-DD' ou ordinal); pode cair fora de [0, length). */
+export function indexOfDay(series, day) {
+    return toOrdinal(day) - series.start;
+}
+
+/** Buffers das colunas, para postMessage(..., transferList). */
+export function seriesTransferList(series) {
+    return Object.values(series.columns).map(col => col.buffer);
+}
+
+// ── Estatística num intervalo ──────────────────────────────────────────────────
+
+const clampRange = (col, from, to) => [Math.max(0, from ?? 0), Math.min(col.length, to ?? col.length)];
+
+/** { mean, variance, n } dos valores de col[from..to). variance amostral. */
+export function describe(col, from, to) {
+    [from, to] = clampRange(col, from, to);
+    let n = 0, sum = 0, sumSq = 0;
+    for (let i = from; i < to; i++) {
+        const v = col[i];
+        if (v !== v) continue;
+        n++; sum += v; sumSq += v * v;
+    }
+    if (n === 0) return { mean: null, variance: null, n };
+    const mean = sum / n;
+    return { mean, variance: n > 1 ? Math.max(0, (sumSq - sum * mean) / (n - 1)) : 0, n };
+}
+
+/** Correlação forte o bastante para não ser acaso (Fisher, ~5% bicaudal)? */
+export function isSignificant(r, n) {
+    if (r === null || n < 4 || Math.abs(r) >= 1) return r !== null && n >= 4;
+    return Math.abs(Math.atanh(r)) * Math.sqrt(n - 3) > Z_95;
+}
+
+/**
+ * Pearson entre xs e ys em [from..to), só nos dias em que ambas têm valor.
+ * slope: inclinação da reta de ys em xs (quanto ys muda por unidade de xs).
+ */
+export function pearson(xs, ys, from, to) {
+    [from, to] = clampRange(xs, from, to);
+    let n = 0, sx = 0, sy = 0, sxx = 0, syy = 0, sxy = 0;
+    for (let i = from; i < to; i++) {
+        const x = xs[i], y = ys[i];
+        if (x !== x || y !== y) continue;
+        n++; sx += x; sy += y; sxx += x * x; syy += y * y; sxy += x * y;
+    }
+    if (n < 3) return { r: null, slope: null, n, significant: false };
+    const cov = sxy - (sx * sy) / n;
+    const vx = sxx - (sx * sx) / n;
+    const vy = syy - (sy * sy) / n;
+    const r = vx > 0 && vy > 0 ? Math.max(-1, Math.min(1, cov / Math.sqrt(vx * vy))) : null;
+    return { r, slope: vx > 0 ? cov / vx : null, n, significant: isSignificant(r, n) };
+}
+
+/**
+ * Reta de mínimos quadrados de col[from..to) contra o dia.
+ * slope em unidades por dia; significant = a correlação dia × valor passa no teste.
+ */
+export function linearTrend(col, from, to) {
+    [from, to] = clampRange(col, from, to);
+    let n = 0, st = 0, sy = 0, stt = 0, syy = 0, sty = 0;
+    for (let i = from; i < to; i++) {
+        const y = col[i];
+        if (y !== y) continue;
+        const t = i - from;
+        n++; st += t; sy += y; stt += t * t; syy += y * y; sty += t * y;
+    }
+    if (n < 3) return { slope: null, intercept: null, r2: null, n, significant: false };
+    const vt = stt - (st * st) / n;
+    const vy = syy - (sy * sy) / n;
+    const cov = sty - (st * sy) / n;
+    if (vt === 0) return { slope: null, intercept: null, r2: null, n, significant: false };
+    const slope = cov / vt;
+    const intercept = (sy - slope * st) / n;
+    const r = vy > 0 ? cov / Math.sqrt(vt * vy) : 0;
+    return { slope, intercept, r2: r * r, n, significant: isSignificant(r, n) };
+}
+
+// ── Janelas deslizantes ────────────────────────────────────────────────────────
+// out[i] = estatística de col[i-window+1..i]; NaN com menos de minPeriods valores
+
+export function rollingMean(col, window, minPeriods = 1) {
+    const out = new Float64Array(col.length);
+    let n = 0, sum = 0;
+    for (let i = 0; i < col.length; i++) {
+        const v = col[i];
+        if (v === v) { n++; sum += v; }
+        if (i >= window) {
+            const old = col[i - window];
+            if (old === old) { n--; sum -= old; }
+        }
+        out[i] = n >= minPeriods && n > 0 ? sum / n : NaN;
+    }
+    return out;
+}
+
+export function rollingVariance(col, window, minPeriods = 2) {
+    const out = new Float64Array(col.length);
+    let n = 0, sum = 0, sumSq = 0;
+    for (let i = 0; i < col.length; i++) {
+        const v = col[i];
+        if (v === v) { n++; sum += v; sumSq += v * v; }
+        if (i >= window) {
+            const old = col[i - window];
+            if (old === old) { n--; sum -= old; sumSq -= old * old; }
+        }
+        out[i] = n >= minPeriods && n > 1 ? Math.max(0, (sumSq - (sum * sum) / n) / (n - 1)) : NaN;
+    }
+    return out;
+}
+
+/** Soma móvel (dias sem valor contam 0) — ex: gasto dos últimos 30 dias, dia a dia. */
+export function rollingSum(col, window) {
+    const out = new Float64Array(col.length);
+    let sum = 0;
+    for (let i = 0; i < col.length; i++) {
+        const v = col[i];
+        if (v === v) sum += v;
+        if (i >= window) {
+            const old = col[i - window];
+            if (old === old) sum -= old;
+        }
+        out[i] = sum;
+    }
+    return out;
+}
+
+export function rollingPearson(xs, ys, window, minPeriods = 5) {
+    const out = new Float64Array(xs.length);
+    let n = 0, sx = 0, sy = 0, sxx = 0, syy = 0, sxy = 0;
+    const add = (i, sign) => {
+        const x = xs[i], y = ys[i];
+        if (x !== x || y !== y) return;
+        n += sign; sx += sign * x; sy += sign * y;
+        sxx += sign * x * x; syy += sign * y * y; sxy += sign * x * y;
+    };
+    for (let i = 0; i < xs.length; i++) {
+        add(i, 1);
+        if (i >= window) add(i - window, -1);
+        if (n < Math.max(minPeriods, 3)) { out[i] = NaN; continue; }
+        const vx = sxx - (sx * sx) / n;
+        const vy = syy - (sy * sy) / n;
+        out[i] = vx > 1e-9 && vy > 1e-9 ? (sxy - (sx * sy) / n) / Math.sqrt(vx * vy) : NaN;
+    }
+    return out;
+}
@@ -0,0 +1,19 @@
+/**
+ * analytics.worker.js
+ * Roda as regras de padrões (utils/analyticsEngine.js) fora da thread principal.
+ *
+ * Mensagens recebidas:
+ *   { id, columns }  — colunas de toColumns (buffers transferidos); responde { id, insights, ms }
+ */
+
+import { analyzeColumns } from '../utils/analyticsEngine';
+
+self.onmessage = ({ data }) => {
+    const t0 = performance.now();
+    try {
+        const insights = analyzeColumns(data.columns);
+        self.postMessage({ id: data.id, insights, ms: performance.now() - t0 });
+    } catch (e) {
+        self.postMessage({ id: data.id, error: e.message });
+    }
+};
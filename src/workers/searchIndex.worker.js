@@ -0,0 +1,22 @@
+/**
+ * searchIndex.worker.js
+ * Mantém o índice da busca local fora da thread principal.
+ *
+ * Mensagens recebidas:
+ *   { type: 'apply', upserts, removes }  — mudanças incrementais
+ *   { type: 'search', id, query, k }     — responde { id, hits, ms }
+ */
+
+import { createSearchIndex } from '../utils/searchIndex';
+
+const index = createSearchIndex();
+
+self.onmessage = ({ data }) => {
+    if (data.type === 'apply') {
+        index.apply(data.upserts, data.removes);
+    } else if (data.type === 'search') {
+        const t0 = performance.now();
+        const hits = index.search(data.query, data.k);
+        self.postMessage({ id: data.id, hits, ms: performance.now() - t0 });
+    }
+};
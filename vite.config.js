@@ -1,10 +1,11 @@
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
+import { bundleReport } from './scripts/bundle-report.js'
 
 // https://vite.dev/config/
 export default defineConfig({
   base: '/',
-  plugins: [react()],
+  plugins: [react(), bundleReport()],
   server: {
     proxy: {
       '/brave-search': {